@@ -16,6 +16,13 @@ rsd
     RSD power spectra.
 pygcl
     Python bindings for a C++ "General Cosmology Library"
+
+The loops in the ``pygcl`` library are parallelized with OpenMP, if
+available at build time. The number of threads is set with the
+``PYRSD_NUM_THREADS`` (or ``OMP_NUM_THREADS``) environment variable, or
+at runtime with :func:`pyRSD.pygcl.set_num_threads`. If neither variable
+is set, ``rsdfit`` uses a single thread in each process when running with
+more than one MPI process.
 """
 
 # save the absolute path of the package and data directories
@@ -70,6 +77,11 @@ def _init():
     cvar.ClassEngine_two_photon_tables_hyrec_file = r['two_photon_tables_hyrec_file']
     cvar.ClassEngine_sBBN_file = r['sBBN_file']
 
+    # the number of OpenMP threads used by the GCL library
+    nthreads = os.environ.get('PYRSD_NUM_THREADS', None)
+    if nthreads is not None:
+        pygcl.set_num_threads(int(nthreads))
+
 if pygcl is not None:
     _init(); del _init
 
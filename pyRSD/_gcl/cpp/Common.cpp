@@ -5,6 +5,10 @@
 #include <iostream>
 #include "Common.h"
 
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
 void Common::throw_error(const char* msg, std::string file, int lineno)
 {
     std::string emsg(msg);
@@ -72,3 +76,26 @@ void Common::error(const char* format, ...) {
     fflush(stderr);
     abort();
 }
+
+bool Common::openmp_enabled() {
+#ifdef _OPENMP
+    return true;
+#else
+    return false;
+#endif
+}
+
+void Common::set_num_threads(int n) {
+#ifdef _OPENMP
+    static int default_threads = omp_get_max_threads();
+    omp_set_num_threads(n > 0 ? n : default_threads);
+#endif
+}
+
+int Common::get_num_threads() {
+#ifdef _OPENMP
+    return omp_get_max_threads();
+#else
+    return 1;
+#endif
+}
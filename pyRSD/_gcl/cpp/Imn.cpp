@@ -142,7 +142,7 @@ static double ComputeIntegral(ImnKernel f, const PowerSpectrum& P_L, double k, d
 parray Imn::EvaluateMany(const parray& k, int m, int n) const {
     int size = (int)k.size();
     parray toret(size);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < size; i++)
         toret[i] = Evaluate(k[i], m, n);
     return toret;
@@ -188,30 +188,67 @@ double Imn::Evaluate(double k, int m, int n) const {
     }
 }
 
+/*----------------------------------------------------------------------------*/
+/* All 16 integrals on a shared set of nodes */
+/*----------------------------------------------------------------------------*/
 
+typedef double (*ImnKernelPtr)(double, double);
+
+static const ImnKernelPtr kernels[16] = {
+    f00, f01, f02, f03, f10, f11, f12, f13,
+    f20, f21, f22, f23, f30, f31, f32, f33
+};
+
+/* Non-symmetric kernels; under v -> -v the wavenumbers q and r are swapped,
+ * so the product P_L(q) P_L(r) is shared and only the kernel changes */
+static const bool symmetric[16] = {
+    true, true, true, false, false, true, true, false,
+    true, true, false, true, false, false, true, true
+};
+
+struct ImnAllIntegrand {
+    const PowerSpectrum& P_L;
+    double k;
+
+    ImnAllIntegrand(const PowerSpectrum& P_L_, double k_) : P_L(P_L_), k(k_) {}
+
+    void operator()(const double* x, double* fx) const {
+        double u = exp(x[0]), v = x[1];
+        double q = (k/2)*(u - v);
+        double r = (k/2)*(u + v);
+        double w = u * q * r * P_L(q) * P_L(r);
+        for(int i = 0; i < 16; i++) {
+            if(symmetric[i])
+                fx[i] = w * kernels[i](u, v);
+            else
+                fx[i] = 0.5 * w * (kernels[i](u, v) + kernels[i](u, -v));
+        }
+    }
+};
 
+parray Imn::EvaluateAll(double k) const {
+    parray toret(16);
+    if(k <= 0) return toret;
 
+    double umin = 1, umax = 2*QMAX/k;
+    double a[] = { log(umin), 0. };
+    double b[] = { log(umax), 1. };
+    double V = k / (8*M_PI*M_PI);
+    double result[16];
+    IntegrateMany<2>(ImnAllIntegrand(P_L, k), 16, a, b, result, epsrel, epsrel*P_L(k)/V);
+    for(int i = 0; i < 16; i++)
+        toret[i] = 2*V*result[i];
+    return toret;
+}
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+parray Imn::EvaluateManyAll(const parray& k) const {
+    int size = (int)k.size();
+    parray toret(size, 16);
+    #pragma omp parallel for schedule(dynamic)
+    for(int i = 0; i < size; i++) {
+        parray Ik = EvaluateAll(k[i]);
+        for(int j = 0; j < 16; j++)
+            toret(i, j) = Ik[j];
+    }
+    return toret;
+}
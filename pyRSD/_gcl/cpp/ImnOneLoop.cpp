@@ -118,7 +118,7 @@ double ImnOneLoop::EvaluateLinear(double k, int m, int n) const {
 parray ImnOneLoop::EvaluateLinear(const parray& k, int m, int n) const {
     int size = (int)k.size();
     parray toret(size);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < size; i++) 
         toret[i] = EvaluateLinear(k[i], m, n);
     return toret;
@@ -178,7 +178,7 @@ double ImnOneLoop::EvaluateCross(double k, int m, int n) const {
 parray ImnOneLoop::EvaluateCross(const parray& k, int m, int n) const {
     int size = (int)k.size();
     parray toret(size);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < size; i++) 
         toret[i] = EvaluateCross(k[i], m, n);
     return toret;
@@ -209,7 +209,7 @@ double ImnOneLoop::EvaluateOneLoop(double k, int m, int n) const {
 parray ImnOneLoop::EvaluateOneLoop(const parray& k, int m, int n) const {
     int size = (int)k.size();
     parray toret(size);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < size; i++) 
         toret[i] = EvaluateOneLoop(k[i], m, n);
     return toret;
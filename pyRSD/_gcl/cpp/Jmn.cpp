@@ -112,7 +112,7 @@ static double ComputeIntegral(JmnKernel g, const PowerSpectrum& P_L, double k, d
 parray Jmn::EvaluateMany(const parray& k, int m, int n) const {
     int size = (int)k.size();
     parray toret(size);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < size; i++) 
         toret[i] = Evaluate(k[i], m, n);
     return toret;
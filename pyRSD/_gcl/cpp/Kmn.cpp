@@ -140,7 +140,7 @@ static double ComputeIntegral(KmnKernel f, const PowerSpectrum& P_L, double k, d
 parray Kmn::EvaluateMany(const parray& k, int m, int n,  bool tidal, int part) const {
     int size = (int)k.size();
     parray toret(size);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < size; i++) 
         toret[i] = Evaluate(k[i], m, n, tidal, part);
     return toret;
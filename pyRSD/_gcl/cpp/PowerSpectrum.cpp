@@ -44,7 +44,7 @@ double PowerSpectrum::Sigma(double R) const {
 parray PowerSpectrum::Sigma(const parray& R) const {
     int n = (int)R.size();
     parray sig(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++)
         sig[i] = Sigma(R[i]);
     return sig;
@@ -64,7 +64,7 @@ double PowerSpectrum::VelocityDispersion(double k, double factor ) const {
 parray PowerSpectrum::VelocityDispersion(const parray& k, double factor) const {
     int n = (int)k.size();
     parray sigmasq(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++)
         sigmasq[i] = VelocityDispersion(k[i], factor);
     return sigmasq;
@@ -102,7 +102,7 @@ double PowerSpectrum::X_Zel(double k) const {
 parray PowerSpectrum::X_Zel(const parray& k) const {
     int n = (int)k.size();
     parray out(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++)
         out[i] = X_Zel(k[i]);
     return out;
@@ -120,7 +120,7 @@ double PowerSpectrum::Y_Zel(double k) const {
 parray PowerSpectrum::Y_Zel(const parray& k) const {
     int n = (int)k.size();
     parray out(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++)
         out[i] = Y_Zel(k[i]);
     return out;
@@ -138,7 +138,7 @@ double PowerSpectrum::Q3_Zel(double k) const {
 parray PowerSpectrum::Q3_Zel(const parray& k) const {
     int n = (int)k.size();
     parray out(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++)
         out[i] = Q3_Zel(k[i]);
     return out;
@@ -164,7 +164,7 @@ double PowerSpectrum::sigma3_squared(double k) const {
 parray PowerSpectrum::sigma3_squared(const parray& k) const {
     int n = (int)k.size();
     parray out(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++)
         out[i] = sigma3_squared(k[i]);
     return out;
@@ -1,3 +1,4 @@
+#include <algorithm>
 #include "ZeldovichPS.h"
 #include "LinearPS.h"
 #include "Spline.h"
@@ -50,42 +51,54 @@ void ZeldovichPS::InitializeR()
     
     for (int i = 1; i <= NUM_PTS; i++)
         r[i-1] = pow(10., (logrc+(i-nc)*dlogr));
+    
+    r15 = parray(NUM_PTS);
+    for (int i = 0; i < NUM_PTS; i++)
+        r15[i] = pow(r[i], 1.5);
+    
+    InitializeFFTLog();
+}
+
+void ZeldovichPS::InitializeFFTLog() 
+{
+    // the FFTLog of order n is linear in a(r), with output
+    // b[m] = sum_i a[i] * K[(m+i) % N]; so store K = b(delta_0) and
+    // the output k grid for each order, rather than transforming each k
+    fftlog_kernels.resize(NMAX+1);
+    fftlog_logkc = parray(NMAX+1);
+    for (int n = 0; n <= NMAX; n++) {
+        
+        FortranFFTLog fftlogger(NUM_PTS, dlogr*log(10.), 0.5 + double(n), 0., 1.0, 1);
+        parray K = parray::zeros(NUM_PTS);
+        K[0] = 1.;
+        bool ok = fftlogger.Transform(K, 1);
+        if (!ok) error("FFTLog failed\n");
+        
+        fftlog_kernels[n] = K;
+        fftlog_logkc[n] = log10(fftlogger.KR()) - logrc;
+    }
 }
 
 
 ZeldovichPS::~ZeldovichPS() {}
 
-static void nearest_interp_1d(int nd, double *xd, double *yd, int ni, double *xi, double *yi) 
+/* The transform of a(r) at output index m, using the FFTLog kernel K */
+static double fftlog_transform_at(const parray& a, const parray& K, int m) 
 {
-    double d, d2;
-    int i, j, k, l;
-    
-    for (i = 0; i < ni; i++) {
-        k = 0;
-        d = fabs(xi[i] - xd[k]);
-        for(j = 1; j < nd; j++) {
-            d2 = fabs(xi[i] - xd[j]);
-            if (d2 < d) {
-                k = j;
-                d = d2;
-            }
-        }
-        if (xi[i] > xd[k]) {
-            l = k+1;
-            yi[i] = yd[l] + (yd[k] - yd[l])/(xd[k] - xd[l])*(xi[i]-xd[l]);
-        } else if (xi[i] < xd[k]) {
-            l = k-1;
-            yi[i] = yd[l] + (yd[k] - yd[l] )/(xd[k] - xd[l])*(xi[i]-xd[l]);
-        } else
-            yi[i] = yd[k];
-    }
+    int N = (int)a.size();
+    double toret = 0.;
+    for (int i = 0; i < N - m; i++)
+        toret += a[i]*K[m+i];
+    for (int i = N - m; i < N; i++)
+        toret += a[i]*K[m+i-N];
+    return toret;
 }
 
 parray ZeldovichPS::EvaluateMany(const parray& k) const 
 {    
     int n = (int)k.size();
     parray pk(n);
-    #pragma omp parallel for
+    #pragma omp parallel for schedule(dynamic)
     for(int i = 0; i < n; i++) {
         pk[i] = Evaluate(k[i]);
     }
@@ -111,39 +124,44 @@ void ZeldovichPS::SetSigma8AtZ(double new_sigma8_z)
 
 double ZeldovichPS::fftlog_compute(double k, double factor) const 
 {    
-    double q = 0; // unbiased
-    double mu;
+    parray a(NUM_PTS), E(NUM_PTS), base(NUM_PTS), ratio(NUM_PTS);
     
-    parray a(NUM_PTS);
-    parray kmesh(NUM_PTS);
+    // terms shared by all orders
+    for (int i = 0; i < NUM_PTS; i++) {
+        E[i] = exp(-0.5*pow2(k)*(XX[i] + YY[i]));
+        base[i] = r15[i]*E[i];
+        ratio[i] = k*YY[i]/r[i];
+    }
 
-    // logspaced between RMIN and RMAX
+    double logk = log10(k);
     double this_Pk = 0.;
     for (int n = 0; n <= NMAX; n++) {
         
-        // the order of the Bessel function
-        mu = 0.5 + double(n);
-        
-        // compute a(r)
+        // compute a(r); base = r^(1.5-n) (kY)^n E
         if (n == 0) 
-            Fprim(a, r, k);
-        else
-            Fsec(a, r, k, double(n));
+            Fprim(a, E, k);
+        else {
+            for (int i = 0; i < NUM_PTS; i++) base[i] *= ratio[i];
+            Fsec(a, base, k, double(n));
+        }
         
-        // do the fft
-        FortranFFTLog fftlogger(NUM_PTS, dlogr*log(10.), mu, q, 1.0, 1);
+        // the nearest point on the output grid, k_m = 10^(logkc + (m+1-nc)*dlogr)
+        const double& logkc = fftlog_logkc[n];
+        int m = (int)floor((logk - logkc)/dlogr + nc - 0.5);
+        m = std::max(0, std::min(NUM_PTS-1, m));
+        double km = pow(10., logkc + (m+1-nc)*dlogr);
         
-        bool ok = fftlogger.Transform(a, 1);
-        if (!ok) error("FFTLog failed\n");
-        double kr = fftlogger.KR();
-        double logkc = log10(kr) - logrc;
+        // linearly interpolate using the neighboring point
+        double out = fftlog_transform_at(a, fftlog_kernels[n], m);
+        if (k != km) {
+            int l = (k > km) ? m+1 : m-1;
+            if (l < 0 || l >= NUM_PTS) l = 2*m - l;
+            double kl = pow(10., logkc + (l+1-nc)*dlogr);
+            double yl = fftlog_transform_at(a, fftlog_kernels[n], l);
+            out = yl + (out - yl)/(km - kl)*(k - kl);
+        }
         
-        for (int j = 1; j <= NUM_PTS; j++) 
-            kmesh[j-1] = pow(10., (logkc+(j-nc)*dlogr));
-             
         // sum it up
-        double out;
-        nearest_interp_1d(NUM_PTS, (double*)(kmesh), (double*)(a), 1, &k, &out);
         this_Pk += factor*sqrt(0.5*M_PI)*pow(k, -1.5)*out;   
     }
         
@@ -187,18 +205,19 @@ double ZeldovichP00::Evaluate(double k) const
         return LowKApprox(k);
 }
 
-void ZeldovichP00::Fprim(parray& a, const parray& r, double k) const 
+void ZeldovichP00::Fprim(parray& a, const parray& E, double k) const 
 {    
+    double E0 = exp(-pow2(k)*sigma_sq);
     for (int i = 0; i < NUM_PTS; i++) {
-        a[i] = pow(r[i], 1.5) * (exp(-0.5*pow2(k)*(XX[i] + YY[i])) - exp(-pow2(k)*sigma_sq));
+        a[i] = r15[i] * (E[i] - E0);
     }
     
 }
 
-void ZeldovichP00::Fsec(parray& a, const parray& r, double k, double n) const 
+void ZeldovichP00::Fsec(parray& a, const parray& base, double k, double n) const 
 {    
     for (int i = 0; i < NUM_PTS; i++) {
-        a[i] = pow(r[i], 1.5-n)*pow(k*YY[i], n)*exp(-0.5*pow2(k)*(XX[i] + YY[i]));
+        a[i] = base[i];
     }
 }
 
@@ -234,17 +253,18 @@ double ZeldovichP01::Evaluate(double k) const {
         return LowKApprox(k);
 }
 
-void ZeldovichP01::Fprim(parray& a, const parray& r, double k) const {
+void ZeldovichP01::Fprim(parray& a, const parray& E, double k) const {
     
+    double E0 = exp(-pow2(k)*sigma_sq);
     for (int i = 0; i < NUM_PTS; i++) {
-        a[i] =  pow(r[i], 1.5)*pow2(k)*((XX[i] + YY[i])*exp(-0.5*pow2(k)*(XX[i] + YY[i])) - 2*sigma_sq*exp(-pow2(k)*sigma_sq));
+        a[i] =  r15[i]*pow2(k)*((XX[i] + YY[i])*E[i] - 2*sigma_sq*E0);
     }
 }
 
-void ZeldovichP01::Fsec(parray& a, const parray& r, double k, double n) const {
+void ZeldovichP01::Fsec(parray& a, const parray& base, double k, double n) const {
       
     for (int i = 0; i < NUM_PTS; i++) {
-        a[i] = pow(r[i], 1.5-n)*pow(k*YY[i], n)*(pow2(k)*(XX[i] + YY[i]) - 2*n)*exp(-0.5*pow2(k)*(XX[i] + YY[i]));
+        a[i] = base[i]*(pow2(k)*(XX[i] + YY[i]) - 2*n);
       }
 }
 
@@ -275,19 +295,19 @@ double ZeldovichP11::Evaluate(double k) const {
         return LowKApprox(k);
 }
 
-void ZeldovichP11::Fprim(parray& a, const parray& r, double k) const 
+void ZeldovichP11::Fprim(parray& a, const parray& E, double k) const 
 {
     double k2 = pow2(k), k4 = pow4(k);
     double term1, term2;
     
+    term2 = -4*k4*pow2(sigma_sq)*exp(-k2*sigma_sq);
     for (int i = 0; i < NUM_PTS; i++) {
-        term1 = (k4*pow2(XX[i]) - 2*k2*X0[i] + 2*(k2*XX[i]-1)*k2*YY[i] + k4*pow2(YY[i]))*exp(-0.5*k2*(XX[i]+YY[i]));
-        term2 = -4*k4*pow2(sigma_sq)*exp(-k2*sigma_sq);
-        a[i] =  pow(r[i],1.5)*(term1 + term2);
+        term1 = (k4*pow2(XX[i]) - 2*k2*X0[i] + 2*(k2*XX[i]-1)*k2*YY[i] + k4*pow2(YY[i]))*E[i];
+        a[i] =  r15[i]*(term1 + term2);
     }
 }
 
-void ZeldovichP11::Fsec(parray& a, const parray& r, double k, double n) const {
+void ZeldovichP11::Fsec(parray& a, const parray& base, double k, double n) const {
     
     double k2 = pow2(k), k4 = pow4(k);
     double term1, term2;
@@ -295,7 +315,7 @@ void ZeldovichP11::Fsec(parray& a, const parray& r, double k, double n) const {
     for (int i = 0; i < NUM_PTS; i++) {
         term1 = k4*pow2(XX[i]) - 2*k2*X0[i] + 2*(k2*XX[i]-1)*(k2*YY[i]-2*n);
         term2 = k4*pow2(YY[i]) - 4*k2*n*YY[i] + 4*n*(n-1);
-        a[i] = pow(r[i],1.5-n)*pow(k*YY[i],n) * (term1 + term2) * exp(-0.5*k2*(XX[i]+YY[i]));
+        a[i] = base[i] * (term1 + term2);
     }
 }
 
@@ -2,6 +2,7 @@
 #include <cmath>
 #include <cstdlib>
 #include <cstring>
+#include <utility>
 
 #include "parray.h"
 
@@ -57,6 +58,13 @@ parray::parray(const parray& v) : vector<double>(v) {
     n[2] = v.n[2];
 }
 
+parray::parray(parray&& v) : vector<double>(std::move(v)) {
+    n[0] = v.n[0];
+    n[1] = v.n[1];
+    n[2] = v.n[2];
+    v.n[0] = v.n[1] = v.n[2] = 0;
+}
+
 parray& parray::operator=(const parray& v) {
     vector<double>::operator=(v);
     n[0] = v.n[0];
@@ -65,6 +73,15 @@ parray& parray::operator=(const parray& v) {
     return *this;
 }
 
+parray& parray::operator=(parray&& v) {
+    vector<double>::operator=(std::move(v));
+    n[0] = v.n[0];
+    n[1] = v.n[1];
+    n[2] = v.n[2];
+    v.n[0] = v.n[1] = v.n[2] = 0;
+    return *this;
+}
+
 parray::~parray() {
 }
 
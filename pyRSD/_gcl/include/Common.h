@@ -54,6 +54,15 @@ namespace Common {
     //   Print to stderr and abort.
     void error(const char* format, ...);
 
+    /***** OpenMP thread control *****/
+
+    /* Whether the library was compiled with OpenMP support */
+    bool openmp_enabled();
+    /* Set the number of threads used by parallel loops; n <= 0 restores the default */
+    void set_num_threads(int n);
+    /* The maximum number of threads used by parallel loops (1 without OpenMP) */
+    int get_num_threads();
+
 
     /***** Math routines *****/
 
@@ -28,6 +28,14 @@ public:
     /* Evaluate integral at many k values (parallelized for speed) */
     parray EvaluateMany(const parray& k, int m, int n) const;
     parray operator()(const parray& k, int m, int n) const { return EvaluateMany(k, m, n); }
+
+    /* Evaluate all 16 integrals (index 4*m + n) at a single k, sharing
+       the integration nodes and the P_L(q) P_L(|k-q|) evaluations */
+    parray EvaluateAll(double k) const;
+
+    /* Evaluate all 16 integrals at many k values, returning an array
+       of shape (len(k), 16) (parallelized for speed) */
+    parray EvaluateManyAll(const parray& k) const;
     
     // accessors
     const PowerSpectrum& GetLinearPS() const { return P_L; }
@@ -85,6 +85,22 @@ template<int n, typename Function>
 double Integrate(Function f, double* a, double* b, double epsrel = 1e-5, double epsabs = 1e-10, double* abserr = 0, int* neval = 0);
 
 
+/**
+ * \brief Compute an n-dimensional definite integral of a vector-valued function.
+ *
+ * Compute the m integrals $\int f_i(\vec{x}) d^nx$ on a shared set of nodes,
+ * using the same Genz-Malik rule as Integrate<n>().  The function f should
+ * have the signature
+ *   void f(const double* x, double* fx);
+ * and fill the m values fx[0], ..., fx[m-1].  The subregion with the largest
+ * error, relative to the tolerance of each component, is divided at each step,
+ * and the routine continues until _every_ component has either
+ * relative error < epsrel or absolute error < epsabs.  The results are stored
+ * in result[0], ..., result[m-1], and the errors in abserr (if not null). */
+template<int n, typename Function>
+void IntegrateMany(Function f, int m, double* a, double* b, double* result, double epsrel = 1e-5, double epsabs = 1e-10, double* abserr = 0, int* neval = 0);
+
+
 #include "Quadrature.inl"
 
 #endif // QUADRATURE_H
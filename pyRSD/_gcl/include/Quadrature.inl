@@ -2,6 +2,8 @@
 #include <cfloat>
 #include <cstdlib>
 #include <map>
+#include <queue>
+#include <vector>
 
 #include "Common.h"
 
@@ -521,3 +523,213 @@ double Integrate(Function f, double* a, double* b, double epsrel, double epsabs,
 
     return finest;
 }
+
+
+/***** IntegrateMany<n> *****/
+
+template<int n>
+struct vregion {
+    double center[n];
+    double width[n];
+    std::vector<double> val;
+    std::vector<double> err;
+    double score;   // largest error relative to the tolerance of each component
+    int divaxn;
+
+    bool operator<(const vregion& other) const { return score < other.score; }
+};
+
+/* Apply the Genz-Malik basic rule to a vector-valued function on a single
+ * region, weighting the fourth differences of each component by 1/scale[i]
+ * when choosing the axis to divide */
+template<int n, typename Function>
+void GenzMalikVectorRule(Function& f, int m, const std::vector<double>& scale, vregion<n>& r) {
+    const int two_to_the_n = (1 << n);
+    const double lambda2 = sqrt(9./70.);
+    const double lambda4 = sqrt(9./10.);
+    const double lambda5 = sqrt(9./19.);
+    const double wt1 = (12824. - 9120.*n + 400.*n*n)/19683.;
+    const double wt2 = 980./6561.;
+    const double wt3 = (1820. - 400.*n)/19683.;
+    const double wt4 = 200./19683.;
+    const double wt5 = 6859./19683./two_to_the_n;
+    const double wtp1 = (729. - 950.*n + 50.*n*n)/729.;
+    const double wtp2 = 245./486.;
+    const double wtp3 = (265. - 100.*n)/1458.;
+    const double wtp4 = 25./729.;
+    const double ratio = Common::pow2(lambda2/lambda4);
+
+    double widthl[n], z[n];
+    std::vector<double> fz(m), fl2m(m), fl2p(m), fl4m(m), fl4p(m);
+    std::vector<double> sum1(m), sum2(m, 0.), sum3(m, 0.), sum4(m, 0.), sum5(m, 0.);
+
+    double rgnvol = (double)two_to_the_n;
+    for(int j = 0; j < n; j++) {
+        rgnvol *= r.width[j];
+        z[j] = r.center[j];
+    }
+    f(z, &sum1[0]);
+
+    /* Compute symmetric sums of f(lambda2,0,...,0) and f(lambda4,0,...,0), and
+     * maximum (weighted) fourth difference */
+    double difmax = 0.;
+    r.divaxn = 0;
+    for(int j = 0; j < n; j++) {
+        z[j] = r.center[j] - lambda2*r.width[j];
+        f(z, &fl2m[0]);
+        z[j] = r.center[j] + lambda2*r.width[j];
+        f(z, &fl2p[0]);
+        widthl[j] = lambda4*r.width[j];
+        z[j] = r.center[j] - widthl[j];
+        f(z, &fl4m[0]);
+        z[j] = r.center[j] + widthl[j];
+        f(z, &fl4p[0]);
+
+        double dif = 0.;
+        for(int i = 0; i < m; i++) {
+            sum2[i] += fl2m[i] + fl2p[i];
+            sum3[i] += fl4m[i] + fl4p[i];
+            double df1 = fl2m[i] + fl2p[i] - 2*sum1[i];
+            double df2 = fl4m[i] + fl4p[i] - 2*sum1[i];
+            dif += fabs(df1 - ratio*df2) / scale[i];
+        }
+        if(dif >= difmax) {
+            difmax = dif;
+            r.divaxn = j;
+        }
+        z[j] = r.center[j];
+    }
+
+    /* Compute symmetric sum of f(lambda4,lambda4,0,...,0) */
+    for(int j = 1; j < n; j++) {
+        for(int k = j; k < n; k++) {
+            for(int l = 1; l <= 2; l++) {
+                widthl[j-1] = -widthl[j-1];
+                z[j-1] = r.center[j-1] + widthl[j-1];
+                for(int p = 1; p <= 2; p++) {
+                    widthl[k] = -widthl[k];
+                    z[k] = r.center[k] + widthl[k];
+                    f(z, &fz[0]);
+                    for(int i = 0; i < m; i++)
+                        sum4[i] += fz[i];
+                }
+            }
+            z[k] = r.center[k];
+        }
+        z[j-1] = r.center[j-1];
+    }
+
+    /* Compute symmetric sum of f(lambda5,lambda5,...,lambda5) */
+    for(int j = 0; j < n; j++) {
+        widthl[j] = -lambda5*r.width[j];
+        z[j] = r.center[j] + widthl[j];
+    }
+    for(int j = 0; j != n; ) {
+        f(z, &fz[0]);
+        for(int i = 0; i < m; i++)
+            sum5[i] += fz[i];
+        for(j = 0; j < n; j++) {
+            widthl[j] = -widthl[j];
+            z[j] = r.center[j] + widthl[j];
+            if(widthl[j] > 0)
+                break;
+        }
+    }
+
+    /* Compute fifth and seventh degree rules and error */
+    r.val.resize(m);
+    r.err.resize(m);
+    r.score = 0.;
+    for(int i = 0; i < m; i++) {
+        double rgncmp = rgnvol*(wtp1*sum1[i] + wtp2*sum2[i] + wtp3*sum3[i] + wtp4*sum4[i]);
+        r.val[i] = rgnvol*(wt1*sum1[i] + wt2*sum2[i] + wt3*sum3[i] + wt4*sum4[i] + wt5*sum5[i]);
+        r.err[i] = fabs(r.val[i] - rgncmp);
+        r.score = fmax(r.score, r.err[i] / scale[i]);
+    }
+}
+
+template<int n, typename Function>
+void IntegrateMany(Function f, int m, double* a, double* b, double* result, double epsrel, double epsabs, double* pabserr, int* pneval) {
+    assert(n >= 1 && n <= 15);
+    const int rulcls = (1 << n) + 2*n*n + 2*n + 1;  // number of function calls per basic rule
+
+    /* Basic rule on the whole region */
+    vregion<n> r;
+    for(int j = 0; j < n; j++) {
+        r.center[j] = 0.5*(a[j] + b[j]);
+        r.width[j] = 0.5*(b[j] - a[j]);
+    }
+    std::vector<double> scale(m, 1.);
+    GenzMalikVectorRule<n>(f, m, scale, r);
+    int funcls = rulcls;
+
+    /* The tolerance of each component sets the relative weight of its error */
+    r.score = 0.;
+    for(int i = 0; i < m; i++) {
+        scale[i] = fmax(epsrel*fabs(r.val[i]), epsabs);
+        if(scale[i] <= 0)
+            scale[i] = 1.;
+        r.score = fmax(r.score, r.err[i] / scale[i]);
+    }
+
+    std::vector<double> finest(r.val), abserr(r.err);
+    std::priority_queue< vregion<n> > regions;
+    regions.push(r);
+
+    int ifail = 3;
+    while(true) {
+        /** Make checks for possible termination of routine **/
+        bool converged = true;
+        for(int i = 0; i < m; i++) {
+            if(!(abserr[i] < epsrel*fabs(finest[i]) || abserr[i] < epsabs)) {
+                converged = false;
+                break;
+            }
+        }
+        if(funcls + 2*rulcls > GM_MAXPTS)
+            ifail = 1;
+        if(converged && funcls >= GM_MINPTS)
+            ifail = 0;
+        if(ifail < 3)
+            break;
+
+        /** Divide the subregion with the largest error in half **/
+        vregion<n> parent = regions.top();
+        regions.pop();
+        for(int i = 0; i < m; i++) {
+            finest[i] -= parent.val[i];
+            abserr[i] -= parent.err[i];
+        }
+
+        int divaxn = parent.divaxn;
+        double halfwidth = 0.5*parent.width[divaxn];
+        for(int side = -1; side <= 1; side += 2) {
+            vregion<n> child;
+            for(int j = 0; j < n; j++) {
+                child.center[j] = parent.center[j];
+                child.width[j] = parent.width[j];
+            }
+            child.width[divaxn] = halfwidth;
+            child.center[divaxn] += side*halfwidth;
+            GenzMalikVectorRule<n>(f, m, scale, child);
+
+            for(int i = 0; i < m; i++) {
+                finest[i] += child.val[i];
+                abserr[i] += child.err[i];
+            }
+            regions.push(child);
+        }
+        funcls += 2*rulcls;
+    }
+
+    if(ifail == 1)
+        Common::verbose("IntegrateMany: did not converge after %d function evaluations\n", funcls);
+
+    for(int i = 0; i < m; i++) {
+        result[i] = finest[i];
+        if(pabserr)
+            pabserr[i] = abserr[i];
+    }
+    if(pneval)
+        *pneval = funcls;
+}
@@ -70,10 +70,20 @@ protected:
     double sigma_sq;
     parray r, X0, XX, YY; 
     
+    // r^1.5 on the grid, and the FFTLog kernels for each order, such that the
+    // transform of a(r) at output index m is sum_i a[i] * kernel[(m+i) % N]
+    parray r15;
+    std::vector<parray> fftlog_kernels;
+    parray fftlog_logkc;
+    
     void InitializeR();
+    void InitializeFFTLog();
     double fftlog_compute(double k, const double factor = 1) const;
-    virtual void Fprim(parray&, const parray&, double) const;
-    virtual void Fsec(parray&, const parray&, double, double) const;
+    
+    // the integrands for the zero-th and higher orders, given the terms
+    // shared by all orders: E = exp(-k^2 (X+Y)/2) and base = r^(1.5-n) (kY)^n E
+    virtual void Fprim(parray& a, const parray& E, double k) const;
+    virtual void Fsec(parray& a, const parray& base, double k, double n) const;
     
 };
 
@@ -89,8 +99,8 @@ public:
 
 private:
     
-    void Fprim(parray& a, const parray& r, double k) const;
-    void Fsec(parray& a, const parray& r, double k, double n) const;   
+    void Fprim(parray& a, const parray& E, double k) const;
+    void Fsec(parray& a, const parray& base, double k, double n) const;   
 };
 
 class ZeldovichP01 : public ZeldovichPS {
@@ -104,8 +114,8 @@ public:
 
 private:
         
-    void Fprim(parray& a, const parray& r, double k) const;
-    void Fsec(parray& a, const parray& r, double k, double n) const;
+    void Fprim(parray& a, const parray& E, double k) const;
+    void Fsec(parray& a, const parray& base, double k, double n) const;
 };
 
 class ZeldovichP11 : public ZeldovichPS {
@@ -120,8 +130,8 @@ public:
 
 private:
         
-    void Fprim(parray& a, const parray& r, double k) const;
-    void Fsec(parray& a, const parray& r, double k, double n) const;
+    void Fprim(parray& a, const parray& E, double k) const;
+    void Fsec(parray& a, const parray& base, double k, double n) const;
 };
 
 #endif // ZELDOVICH_PS_H
\ No newline at end of file
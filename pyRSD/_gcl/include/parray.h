@@ -39,9 +39,15 @@ public:
     /* Copy constructor. */
     parray(const parray& v);
 
+    /* Move constructor.  The storage of v is taken over, leaving v empty. */
+    parray(parray&& v);
+
     /* Assignment.  This array is resized, and the elements of v are copied. */
     parray& operator=(const parray& v);
 
+    /* Move assignment.  The storage of v is taken over, leaving v empty. */
+    parray& operator=(parray&& v);
+
     /* Destructor. */
     ~parray();
 
@@ -88,6 +88,13 @@ struct Constants {
 };
 
 
+/* OpenMP thread control */
+namespace Common {
+    bool openmp_enabled();
+    void set_num_threads(int n);
+    int get_num_threads();
+}
+
 /* Allow any float-able type to be treated as a double */
 %typemap(in) double {
     PyObject* floatobj = PyNumber_Float($input);
@@ -104,7 +111,9 @@ struct Constants {
             $1 = 1;
             Py_DECREF(floatobj);
         }
-        else 
+        else {
+            PyErr_Clear();
             $1 = 0;
+        }
     }
 }
@@ -13,6 +13,10 @@ public:
     // translated to __call__ -> calls EvaluateMany(K)
     parray operator()(const parray& k, int m, int n) const;
 
+    // all 16 integrals, indexed by 4*m + n
+    parray EvaluateAll(double k) const;
+    parray EvaluateManyAll(const parray& k) const;
+
     const LinearPS& GetLinearPS() const;
     const double& GetEpsrel() const;
 };
@@ -1,9 +1,36 @@
 %{
 #include "parray.h"
+
+/* Free the parray owned by a NumPy array, when the array is deleted */
+static void parray_capsule_free(PyObject* capsule) {
+    delete (parray*) PyCapsule_GetPointer(capsule, NULL);
+}
+
+/* Return a 1-D NumPy array that takes over the memory of v, without copying;
+ * v is left empty */
+static PyObject* parray_to_numpy(parray& v) {
+    parray* owner = new parray(std::move(v));
+    npy_intp dims[1] = { (npy_intp) owner->size() };
+    PyObject* arrayobj = PyArray_SimpleNewFromData(1, dims, NPY_DOUBLE, owner->data());
+    if(arrayobj == NULL) {
+        delete owner;
+        return NULL;
+    }
+
+    /* the capsule deletes the parray when the NumPy array is deleted */
+    PyObject* capsule = PyCapsule_New(owner, NULL, parray_capsule_free);
+    if(capsule == NULL || PyArray_SetBaseObject((PyArrayObject*) arrayobj, capsule) < 0) {
+        if(capsule == NULL) delete owner;
+        Py_DECREF(arrayobj);
+        return NULL;
+    }
+    return arrayobj;
+}
 %}
 
 
-/* Allow Python sequences to be passed as arrays */
+/* Allow Python sequences to be passed as arrays; contiguous float64 arrays
+   are copied with a single memcpy, anything else is converted first */
 %typemap(in) const parray& {
     PyArrayObject* pyarray = (PyArrayObject*) PyArray_ContiguousFromAny($input, NPY_DOUBLE, 1, 1);
     if(pyarray == NULL) {
@@ -12,16 +39,19 @@
     }
 
     int n = PyArray_DIM(pyarray, 0);
-    $1 = new parray(n);
-    for(int i = 0; i < n; i++)
-        (*$1)[i] = *(double *)((char*)(PyArray_DATA(pyarray)) + i * (PyArray_STRIDE(pyarray, 0)));
+    $1 = new parray(n, (const double*) PyArray_DATA(pyarray));
     Py_DECREF(pyarray);
 }
 %typemap(freearg) const parray& {
     delete $1;
 }
 %typemap(typecheck) const parray& {
-    if(!PySequence_Check($input)) {     // Make sure we have a sequence
+    if(($input) && PyArray_Check($input)) {
+        // numpy arrays: check the shape and type, without touching the elements
+        PyArrayObject* pyarray = (PyArrayObject*) $input;
+        $1 = (PyArray_NDIM(pyarray) == 1 && PyArray_CanCastSafely(PyArray_TYPE(pyarray), NPY_DOUBLE)) ? 1 : 0;
+    }
+    else if(!PySequence_Check($input)) {     // Make sure we have a sequence
         printf("Not a Python sequence.\n");
         $1 = 0;
     }
@@ -36,6 +66,7 @@
             if(floatobj != NULL) {
                 Py_DECREF(floatobj);
             } else {
+                PyErr_Clear();
                 $1 = 0;
                 break;
             }
@@ -43,30 +74,18 @@
     }
 }
 
-/* Return numpy arrays */
+/* Return numpy arrays that own the memory of the returned parray */
 %typemap(out) parray {
-    int n = $1.size();
-    npy_intp dims[1];
-    dims[0] = (npy_intp) n;
-    $result =  PyArray_SimpleNew(1, dims, NPY_DOUBLE);
-    memcpy(PyArray_DATA((PyArrayObject*) $result), $1.data(), n*sizeof(double));
+    $result = parray_to_numpy($1);
+    if($result == NULL) SWIG_fail;
 }
-//%typemap(out) const array& {
-//    int n = $1->size();
-//    npy_intp dims[1];
-//    dims[0] = (npy_intp) n;
-//    $result = PyArray_SimpleNew(1, dims, NPY_DOUBLE);
-//    memcpy(((PyArrayObject*) $result)->data, $1->data(), n*sizeof(double));
-//}
 
 %typemap(in,numinputs=0) parray& OUTPUT {
     $1 = new parray();
 }
 %typemap(argout) parray& OUTPUT {
-    int n = $1->size();
-    npy_intp dims[1] = { (npy_intp) n };
-    PyObject* arrayobj = PyArray_SimpleNew(1, dims, NPY_DOUBLE);
-    memcpy(PyArray_DATA((PyArrayObject*) arrayobj), $1->data(), n*sizeof(double));
+    PyObject* arrayobj = parray_to_numpy(*$1);
+    if(arrayobj == NULL) SWIG_fail;
     $result = SWIG_Python_AppendOutput($result, arrayobj);
 }
 %typemap(freearg) parray& OUTPUT {
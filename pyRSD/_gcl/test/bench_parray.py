@@ -0,0 +1,37 @@
+"""
+ bench_parray.py
+ micro-benchmark of passing large arrays between NumPy and parray
+
+ The time of each call is given in units of the time to copy the input
+ array once with NumPy. Inputs are copied into a parray with a single
+ memcpy and outputs are returned without a copy, with the NumPy array
+ owning the memory of the C++ parray; run this script against builds
+ before and after a change to the typemaps in python/parray.i to compare.
+"""
+from pyRSD import pygcl
+import numpy as np
+import timeit
+
+def best_time(f, number=5, repeat=5):
+    return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+def main():
+
+    # a linear spline is the cheapest evaluation, so copies dominate
+    x = np.linspace(0., 1., 100)
+    spl = pygcl.LinearSpline(x, x**2)
+
+    print("%10s %12s %12s %12s" %("N", "numpy copy", "spline(k)", "copies"))
+    for N in [10**3, 10**4, 10**5, 10**6, 10**7]:
+
+        k = np.random.uniform(size=N)
+        out = spl(k)
+        assert isinstance(out, np.ndarray) and not out.flags.owndata
+
+        t_copy = best_time(lambda: k.copy())
+        t_call = best_time(lambda: spl(k))
+        print("%10d %12.3e %12.3e %12.2f" %(N, t_copy, t_call, t_call/t_copy))
+
+#-------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
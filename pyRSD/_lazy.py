@@ -0,0 +1,53 @@
+"""
+Lazily import the attributes of a package on first access
+
+This uses the module ``__getattr__`` of PEP 562, so that importing a
+package does not import all of its submodules; on Python versions
+before 3.7, the attributes are imported immediately.
+"""
+import importlib
+import sys
+
+def lazy_attributes(name, attributes):
+    """
+    Return the ``__getattr__`` and ``__dir__`` functions of the module
+    ``name`` that import ``attributes`` on first access
+
+    Parameters
+    ----------
+    name : str
+        the name of the module, i.e., ``__name__``
+    attributes : dict
+        the name of each attribute and the (relative) name of the module
+        defining it; if the attribute is the module itself, its name
+        should be the last component of the module name
+
+    Returns
+    -------
+    __getattr__, __dir__ : callable
+        the functions to define in the module
+    """
+    module = sys.modules[name]
+
+    def __getattr__(attr):
+        if attr not in attributes:
+            raise AttributeError("module '%s' has no attribute '%s'" %(name, attr))
+
+        source = importlib.import_module(attributes[attr], name)
+        if source.__name__.rsplit('.', 1)[-1] == attr and not hasattr(source, attr):
+            value = source
+        else:
+            value = getattr(source, attr)
+
+        # only import once
+        setattr(module, attr, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(module)) | set(attributes))
+
+    if sys.version_info < (3, 7):
+        for attr in attributes:
+            __getattr__(attr)
+
+    return __getattr__, __dir__
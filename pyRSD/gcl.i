@@ -1,4 +1,4 @@
-%module gcl
+%module(threads="1") gcl
 
 %{
 #define SWIG_FILE_WITH_INIT
@@ -30,6 +30,29 @@ using std::string;
 }
 
 
+/* Only release the GIL in the long-running, pure C++ evaluation routines,
+   so that Python threads can overlap them */
+%nothread;
+
+%thread Imn::operator()(const parray&, int, int) const;
+%thread Imn::EvaluateAll;
+%thread Imn::EvaluateManyAll;
+%thread Jmn::operator()(const parray&, int, int) const;
+%thread Kmn::operator()(const parray&, int, int, bool, int) const;
+%thread ImnOneLoop::EvaluateLinear(const parray&, int, int) const;
+%thread ImnOneLoop::EvaluateCross(const parray&, int, int) const;
+%thread ImnOneLoop::EvaluateOneLoop(const parray&, int, int) const;
+%thread OneLoopPdd::OneLoopPdd;
+%thread OneLoopPdv::OneLoopPdv;
+%thread OneLoopPvv::OneLoopPvv;
+%thread OneLoopP22Bar::OneLoopP22Bar;
+%thread ZeldovichPS::operator()(const parray&) const;
+%thread CorrelationFunction::operator()(const parray&) const;
+%thread ComputeXiLM;
+%thread compute_xilm_fftlog;
+%thread pk_to_xi;
+%thread xi_to_pk;
+
 %feature("kwargs");
 %feature("autodoc");
 
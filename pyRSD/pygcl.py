@@ -17,6 +17,7 @@ from .gcl import xi_to_pk, pk_to_xi
 from .gcl import ComputeXiLM, compute_xilm_fftlog as ComputeXiLM_fftlog
 from .gcl import IntegrationMethods
 from .gcl import SimpsIntegrate, TrapzIntegrate
+from .gcl import openmp_enabled, set_num_threads, get_num_threads
 
 class DocFixer(type):
 
@@ -7,26 +7,63 @@ INTERP_KMAX = 1.0
 import threading
 APLock = threading.Lock()
 
-# compute the RSD model version with git string
-from ..extern.astropy_helpers.git_helpers import get_git_devstr
 from .. import pkg_dir
 
-# compute the version
+def _git_hash(path):
+    """
+    The SHA1 hash of the HEAD commit of the git repository holding
+    ``path``, or an empty string if there is none
+
+    The hash is read from the ``.git`` directory, rather than by
+    running git, so no process is spawned at import
+    """
+    import os
+
+    # find the repository
+    while not os.path.exists(os.path.join(path, '.git')):
+        parent = os.path.dirname(path)
+        if parent == path: return ''
+        path = parent
+    gitdir = os.path.join(path, '.git')
+
+    try:
+        # a worktree or submodule points to the git directory
+        if os.path.isfile(gitdir):
+            with open(gitdir, 'r') as ff:
+                gitdir = os.path.join(path, ff.read().split('gitdir:', 1)[1].strip())
+        with open(os.path.join(gitdir, 'HEAD'), 'r') as ff:
+            head = ff.read().strip()
+        if not head.startswith('ref:'):
+            return head
+        ref = head[4:].strip()
+
+        # the refs of a worktree are in the common directory
+        dirs = [gitdir]
+        if os.path.exists(os.path.join(gitdir, 'commondir')):
+            with open(os.path.join(gitdir, 'commondir'), 'r') as ff:
+                dirs.append(os.path.join(gitdir, ff.read().strip()))
+
+        for d in dirs:
+            if os.path.exists(os.path.join(d, ref)):
+                with open(os.path.join(d, ref), 'r') as ff:
+                    return ff.read().strip()
+        for d in dirs:
+            if os.path.exists(os.path.join(d, 'packed-refs')):
+                with open(os.path.join(d, 'packed-refs'), 'r') as ff:
+                    for line in ff:
+                        fields = line.split()
+                        if len(fields) == 2 and fields[1] == ref:
+                            return fields[0]
+    except (IOError, OSError, IndexError):
+        pass
+    return ''
+
+# compute the RSD model version with git string
 __version__ = '0.3.1'
-_githash = get_git_devstr(sha=True, show_warning=False, path=pkg_dir)[:7]
+_githash = _git_hash(pkg_dir)[:7]
 if _githash:
     __version__ += ".dev." + _githash
 
-# import model classes
-from .power.dm     import DarkMatterSpectrum
-from .power.biased import BiasedSpectrum, HaloSpectrum
-from .power.gal    import GalaxySpectrum
-from .power.qso    import QuasarSpectrum
-
-from . import transfers
-from .power_extrapolator import ExtrapolatedPowerSpectrum
-from .correlation import SmoothedXiMultipoles
-
 def print_version():
     """
     Print out the RSD model version
@@ -44,12 +81,22 @@ class OutdatedModelWarning(UserWarning):
     """
     pass
 
-def load_model(filename, show_warning=True):
+def load_model(filename, show_warning=True, check=True):
     """
-    Load a model from a npy
+    Load a model from a snapshot directory (see :mod:`pyRSD.rsd.snapshot`),
+    or from a pickled ``.npy`` file
+
+    An :class:`OutdatedModelWarning` is issued for a model saved by another
+    version, if ``show_warning`` is `True`. Snapshots saved by another
+    model release raise an :class:`~pyRSD.rsd.snapshot.IncompatibleSnapshotError`,
+    unless ``check`` is `False`.
     """
     from .. import os, numpy
 
+    if os.path.isdir(filename):
+        from .snapshot import load_snapshot
+        return load_snapshot(filename, check=check, show_warning=show_warning)
+
     # check the filename extension
     _, ext = os.path.splitext(filename)
     desired_ext = os.path.extsep + 'npy'
@@ -68,3 +115,18 @@ def load_model(filename, show_warning=True):
         warnings.warn(msg, OutdatedModelWarning)
 
     return model
+
+# the model classes and modules are imported on first access
+from .._lazy import lazy_attributes
+__getattr__, __dir__ = lazy_attributes(__name__,
+                                       {'DarkMatterSpectrum' : '.power.dm',
+                                        'BiasedSpectrum' : '.power.biased',
+                                        'HaloSpectrum' : '.power.biased',
+                                        'GalaxySpectrum' : '.power.gal',
+                                        'QuasarSpectrum' : '.power.qso',
+                                        'transfers' : '.transfers',
+                                        'save_snapshot' : '.snapshot',
+                                        'load_snapshot' : '.snapshot',
+                                        'IncompatibleSnapshotError' : '.snapshot',
+                                        'ExtrapolatedPowerSpectrum' : '.power_extrapolator',
+                                        'SmoothedXiMultipoles' : '.correlation'})
@@ -1,8 +1,11 @@
 from .. import numpy
 from ._interpolate import InterpolationDomainError
+from ._disk_cache import persisted
 
 import functools
-from collections import OrderedDict
+import contextlib
+import time
+from collections import OrderedDict, defaultdict, Counter
 import inspect
 import fnmatch
 from six import add_metaclass, PY3, string_types
@@ -13,6 +16,10 @@ except ImportError:
     from pyRSD.extern.backports.lru_cache import lru_cache
 
 import types
+import sys
+
+# sentinel for missing values
+_missing = object()
 
 if not PY3:
     def _pickle_method(m):
@@ -97,7 +104,10 @@ class CachedProperty(Property):
 
         # clear the cache of any parameters that depend
         # on this cached property attribute
-        for dep in self._deps:
+        stats = getattr(obj, '_cache_stats', None)
+        for dep in self._deps.intersection(obj._cache):
+            if stats is not None:
+                stats.invalidate(dep, self.fget.__name__)
             obj._cache.pop(dep, None)
 
 class CacheSchema(type):
@@ -123,6 +133,7 @@ class CacheSchema(type):
         cls._cachemap = OrderedDict()
         cls._cached_names = set()
         cls._param_names = set()
+        cls._cache_roots = {}
 
         # for each class and base classes, track ParameterProperty
         # and CachedProperty attributes
@@ -183,21 +194,437 @@ class Cache(object):
     The main class to do handle caching of parameters; this is the
     class that should serve as the base class
     """
+    # parameters that are always set by update(), even if unchanged
+    _always_set = set()
+
     def __new__(cls, *args, **kwargs):
         obj = object.__new__(cls)
         obj._cache = {}
+        obj._cache_stats = None
+        obj._snapshots = None
         return obj
 
     def __init__(self, *args, **kwargs):
         super(Cache, self).__init__(*args, **kwargs)
 
+    def update(self, **kwargs):
+        """
+        Update the parameters with the specified values
+
+        The numeric values are compared to the values set by the previous
+        call in a single vectorized comparison, and only the parameters
+        that changed are set, so the cost scales with the number of
+        changed parameters; other values (and attributes that are not
+        parameters) are always set, which checks their equality with the
+        current value before invalidating the cache
+
+        A value found unchanged is still set if the setter of a parameter
+        earlier in ``kwargs`` (i.e., ``z``, which can set ``f``) changed it
+
+        Parameters whose setters depend on other state should be listed
+        in the ``_always_set`` class attribute, so they are always set
+        """
+        state = self.__dict__.get('_param_state', None)
+        if state is None:
+            state = self._param_state = ParameterState()
+
+        # find the numeric parameters that changed
+        names = [k for k in kwargs if k in self._param_names and _is_number(kwargs[k])
+                    and k not in self._always_set]
+        changed = state.changed(names, [kwargs[k] for k in names])
+        unchanged = set(name for name, c in zip(names, changed) if not c)
+
+        for k, v in kwargs.items():
+
+            # skip unchanged values, unless a previous setter changed them
+            if k in unchanged and state.matches(k, v):
+                continue
+            try:
+                setattr(self, k, v)
+            except Exception as e:
+                raise RuntimeError("failure to set parameter `%s` to value %s: %s" %(k, str(v), str(e)))
+
+            # record the value, unless it was reset while setting
+            if k in self._param_names and _is_number(v) and k not in self._always_set:
+                current = self.__dict__.get('__'+k, None)
+                if _is_number(current) and current == v:
+                    state.record(k, v)
+
+    def enable_cache_stats(self, enable=True):
+        """
+        Start (or stop, if ``enable`` is `False`) recording the hits,
+        misses, invalidations and evaluation time of each cached attribute;
+        starting discards any previous records
+        """
+        self._cache_stats = CacheStats() if enable else None
+
+    def cache_stats(self):
+        """
+        Return the :class:`CacheStats` recorded since instrumentation was
+        enabled with :func:`enable_cache_stats`, or `None` if disabled
+        """
+        return getattr(self, '_cache_stats', None)
+
+    @contextlib.contextmanager
+    def profile_cache(self):
+        """
+        A context manager that records the cache activity within its scope,
+        yielding the :class:`CacheStats` instance
+
+        The records are also added to any stats already being recorded
+
+        Examples
+        --------
+        >>> with model.profile_cache() as stats:
+        ...     model.update(**theta)
+        ...     model.power(k, mu)
+        >>> print(stats)
+        """
+        previous = getattr(self, '_cache_stats', None)
+        stats = CacheStats()
+        self._cache_stats = stats
+        try:
+            yield stats
+        finally:
+            self._cache_stats = previous
+            if previous is not None:
+                previous.merge(stats)
+
+    def enable_snapshots(self, enable=True, maxbytes=256*1024**2):
+        """
+        Start (or stop, if ``enable`` is `False`) keeping the values of
+        cached attributes for recently seen parameter values
+
+        When a cached attribute is evaluated, its value is also stored in a
+        :class:`SnapshotCache`, keyed by the values of all the parameters
+        it depends on; if the parameters later return to these values, the
+        value is restored from the snapshots rather than recomputed. This
+        is useful when samplers or finite differences revisit recent
+        parameter vectors.
+
+        The snapshots assume, as the cache does, that each cached value
+        depends only on its declared parents; values that are modified in
+        place when parameters change (i.e., the sub-models updated by
+        parameter setters) must be declared with ``snapshot=False``, so
+        they are never stored or restored
+
+        Parameters
+        ----------
+        enable : bool, optional
+            whether to enable the snapshots; disabling discards them
+        maxbytes : int, optional
+            the memory budget of the snapshots, in bytes; the least
+            recently used values are evicted beyond this
+        """
+        self._snapshots = SnapshotCache(maxbytes) if enable else None
+
+    def _snapshot_key(self, name):
+        """
+        Return the key identifying the cached attribute ``name`` in the
+        snapshots, the tuple of the values of the parameters it depends on,
+        or `None` if any of the values cannot be used as a key
+        """
+        roots = self._cache_roots.get(name, None)
+        if roots is None:
+            roots = set()
+            seen = set()
+            parents = list(self._cachemap.get(name, []))
+            while parents:
+                p = parents.pop()
+                if p in seen: continue
+                seen.add(p)
+                if p in self._cachemap:
+                    parents += self._cachemap[p]
+                else:
+                    roots.add(p)
+            roots = tuple(sorted(roots))
+            self._cache_roots[name] = roots
+
+        try:
+            return (name,) + tuple(_hashable(getattr(self, p)) for p in roots)
+        except (TypeError, ValueError):
+            return None
+
+class CacheStats(object):
+    """
+    The record of the cache activity of a :class:`Cache` instance
+
+    For each cached attribute, this tracks the number of cache hits, the
+    number of misses (evaluations), the number of times a cached value
+    was invalidated and the name of the parameter or cached property
+    whose change triggered each invalidation. The wall time of the
+    evaluations is recorded both including (``time``) and excluding
+    (``self_time``) the time spent evaluating other cached attributes.
+    """
+    def __init__(self):
+        self.hits          = defaultdict(int)
+        self.misses        = defaultdict(int)
+        self.invalidations = defaultdict(int)
+        self.triggers      = defaultdict(Counter)
+        self.time          = defaultdict(float)
+        self.self_time     = defaultdict(float)
+        self._stack        = []
+
+    def hit(self, name):
+        """
+        Record a cache hit for ``name``
+        """
+        self.hits[name] += 1
+
+    def start(self, name):
+        """
+        Record a cache miss for ``name`` and start timing its evaluation
+        """
+        self.misses[name] += 1
+        self._stack.append([name, time.time(), 0.])
+
+    def stop(self):
+        """
+        Stop timing the most recent evaluation
+        """
+        name, start, children = self._stack.pop()
+        elapsed = time.time() - start
+        self.time[name] += elapsed
+        self.self_time[name] += elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def invalidate(self, name, trigger):
+        """
+        Record that the cached value of ``name`` was removed because
+        ``trigger`` changed
+        """
+        self.invalidations[name] += 1
+        self.triggers[name][trigger] += 1
+
+    def merge(self, other):
+        """
+        Add the records of another :class:`CacheStats` to this one
+        """
+        for attr in ['hits', 'misses', 'invalidations', 'time', 'self_time']:
+            d = getattr(self, attr)
+            for name, value in getattr(other, attr).items():
+                d[name] += value
+        for name, counts in other.triggers.items():
+            self.triggers[name].update(counts)
+
+    def reset(self):
+        """
+        Clear all records
+        """
+        self.__init__()
+
+    @property
+    def names(self):
+        """
+        The names of all attributes with records
+        """
+        names = set(self.hits) | set(self.misses) | set(self.invalidations)
+        return sorted(names)
+
+    def summary(self, sort_by='self_time'):
+        """
+        Return a list of dictionaries, one per cached attribute, holding
+        the records, sorted in descending order by ``sort_by``
+        """
+        toret = []
+        for name in self.names:
+            toret.append({'name'          : name,
+                          'hits'          : self.hits.get(name, 0),
+                          'misses'        : self.misses.get(name, 0),
+                          'invalidations' : self.invalidations.get(name, 0),
+                          'time'          : self.time.get(name, 0.),
+                          'self_time'     : self.self_time.get(name, 0.),
+                          'triggers'      : dict(self.triggers.get(name, {}))})
+        if sort_by is not None:
+            toret = sorted(toret, key=lambda d: d[sort_by], reverse=True)
+        return toret
+
+    def __str__(self):
+        header = "%-30s %8s %8s %8s %10s %10s  %s"
+        row = "%-30s %8d %8d %8d %10.4f %10.4f  %s"
+        lines = [header %('name', 'hits', 'misses', 'invalid', 'time [s]', 'self [s]', 'triggers')]
+        for d in self.summary():
+            triggers = Counter(d['triggers']).most_common(3)
+            triggers = ", ".join("%s (%d)" %t for t in triggers)
+            lines.append(row %(d['name'], d['hits'], d['misses'], d['invalidations'],
+                                d['time'], d['self_time'], triggers))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "<CacheStats: %d attributes>" %len(self.names)
+
+class ParameterState(object):
+    """
+    The values of the numeric parameters last set by :func:`Cache.update`,
+    stored in a single array so that a new set of values can be compared
+    to it at once
+
+    A value is reset to NaN (which compares unequal to everything) whenever
+    the parameter is set by any other means
+    """
+    def __init__(self):
+        self.index  = {}
+        self.values = numpy.empty(0)
+
+    def _indices(self, names):
+        """
+        The indices of ``names`` in the values array, adding new names
+        """
+        new = [name for name in names if name not in self.index]
+        if new:
+            N = len(self.values)
+            self.index.update((name, N+i) for i, name in enumerate(new))
+            self.values = numpy.concatenate([self.values, numpy.repeat(numpy.nan, len(new))])
+        return [self.index[name] for name in names]
+
+    def changed(self, names, values):
+        """
+        Return a boolean array that is `True` where ``values`` differ
+        from the recorded values of ``names``
+        """
+        if not len(names):
+            return numpy.zeros(0, dtype=bool)
+        indices = self._indices(names)
+        old = self.values[indices]
+        return ~(old == numpy.asarray(values, dtype='f8'))
+
+    def matches(self, name, value):
+        """
+        Whether ``value`` equals the recorded value of ``name``, which
+        is `False` if it was reset since it was recorded
+        """
+        i = self.index.get(name, None)
+        return i is not None and self.values[i] == value
+
+    def record(self, name, value):
+        """
+        Record the current value of ``name``
+        """
+        i = self._indices([name])[0]
+        self.values[i] = value
+
+    def invalidate(self, name):
+        """
+        Forget the recorded value of ``name``
+        """
+        i = self.index.get(name, None)
+        if i is not None:
+            self.values[i] = numpy.nan
+
+def _is_number(value):
+    """
+    Whether ``value`` is a real scalar number
+    """
+    return isinstance(value, (int, float, numpy.integer, numpy.floating))
+
+class SnapshotCache(object):
+    """
+    A least-recently-used store of cached values, with a memory budget
+
+    Values are keyed by the name of the cached attribute and the values
+    of the parameters it depends on (see :func:`Cache.enable_snapshots`)
+    """
+    def __init__(self, maxbytes):
+        """
+        Parameters
+        ----------
+        maxbytes : int
+            the maximum total size of the stored values, in bytes
+        """
+        self.maxbytes = maxbytes
+        self.nbytes   = 0
+        self.hits     = 0
+        self.misses   = 0
+        self._data    = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        """
+        Return the value stored for ``key``, marking it as most recently
+        used, or ``_missing`` if there is none
+        """
+        item = self._data.pop(key, None)
+        if item is None:
+            self.misses += 1
+            return _missing
+        self._data[key] = item
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, value):
+        """
+        Store ``value`` for ``key``, evicting the least recently used
+        values if the memory budget is exceeded
+        """
+        size = _nbytes(value) + _nbytes(key)
+        if size > self.maxbytes:
+            return
+
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._data[key] = (value, size)
+        self.nbytes += size
+
+        while self.nbytes > self.maxbytes:
+            _, (_, size) = self._data.popitem(last=False)
+            self.nbytes -= size
+
+    def clear(self):
+        """
+        Remove all stored values
+        """
+        self._data.clear()
+        self.nbytes = 0
+
+    def __repr__(self):
+        args = (len(self), self.nbytes/1024.**2, self.maxbytes/1024.**2)
+        return "<SnapshotCache: %d values, %.1f/%.1f MB>" %args
+
+def _hashable(value):
+    """
+    Return a hashable representation of a parameter value, raising a
+    `TypeError` if there is none
+    """
+    if isinstance(value, numpy.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    hash(value)
+    return value
+
+def _nbytes(value, depth=3):
+    """
+    An estimate of the memory used by a cached value, counting the
+    arrays it holds up to a depth of ``depth`` attributes or items
+    """
+    if isinstance(value, numpy.ndarray):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if depth > 0:
+        if isinstance(value, (list, tuple)):
+            size += sum(_nbytes(v, depth-1) for v in value)
+        elif isinstance(value, dict):
+            size += sum(_nbytes(v, depth-1) for v in value.values())
+        elif hasattr(value, '__dict__'):
+            size += sum(_nbytes(v, depth-1) for v in vars(value).values())
+    return size
+
 def obj_eq(new_val, old_val):
     """
     Test the equality of an old and new value
     """
     equal = False
     try:
-        if old_val is not None:
+        if old_val is not None and new_val is not None:
             try:
                 if numpy.isscalar(new_val) and numpy.isscalar(old_val):
                     equal = new_val == old_val
@@ -221,6 +648,12 @@ def parameter(f, **kwargs):
     name = f.__name__
     _name = '__'+name
     def _set_property(self, value, deps=[]):
+
+        # the value recorded by Cache.update is no longer current
+        state = self.__dict__.get('_param_state', None)
+        if state is not None:
+            state.invalidate(name)
+
         val = f(self, value)
         try:
             old_val = getattr(self, _name)
@@ -234,8 +667,13 @@ def parameter(f, **kwargs):
 
             # clear the cache of any parameters that depend
             # on this attribute
+            stats = getattr(self, '_cache_stats', None)
             for dep in deps:
-                self._cache.pop(dep, None)
+                if dep not in self._cache:
+                    continue
+                if stats is not None:
+                    stats.invalidate(dep, name)
+                self._cache.pop(dep)
         return val
 
     @functools.wraps(f)
@@ -254,6 +692,9 @@ def parameter(f, **kwargs):
             return self.__dict__[_name]
 
     def _del_property(self):
+        state = self.__dict__.get('_param_state', None)
+        if state is not None:
+            state.invalidate(name)
         if _name in self.__dict__:
             self.__dict__.pop(_name)
         else:
@@ -265,13 +706,32 @@ def parameter(f, **kwargs):
         prop._default = default
     return prop
 
+def _restore_snapshot(obj, name):
+    """
+    Return the snapshot key of the cached attribute ``name`` and its value
+    in the snapshots of ``obj``, which is ``_missing`` if not stored; the
+    key is `None` if snapshots are disabled
+    """
+    snapshots = getattr(obj, '_snapshots', None)
+    if snapshots is None:
+        return None, _missing
+    key = obj._snapshot_key(name)
+    if key is None:
+        return None, _missing
+    return key, snapshots.get(key)
+
 def cached_property(*parents, **kws):
     """
     Decorator to represent a model parameter will be cached
     and automatically updated if any of its dependencies change
+
+    If ``snapshot`` is `False`, the value is excluded from the snapshots of
+    recent states (see :func:`Cache.enable_snapshots`); this is required
+    for values that are modified in place
     """
     _lru_cache = kws.pop('lru_cache', False)
     maxsize = kws.pop('maxsize', 128)
+    snapshot = kws.pop('snapshot', True)
 
     def cache(f):
         name = f.__name__
@@ -284,11 +744,28 @@ def cached_property(*parents, **kws):
                 return self._cache_overrides[name]
 
             # add to cache
+            stats = getattr(self, '_cache_stats', None)
             if name not in self._cache:
-                val = f(self)
+
+                # restore from the snapshots of recent states
+                key, val = _restore_snapshot(self, name) if snapshot else (None, _missing)
+                if val is not _missing:
+                    if stats is not None: stats.hit(name)
+                    self._cache[name] = val
+                    return val
+
+                if stats is not None: stats.start(name)
+                try:
+                    val = f(self)
+                finally:
+                    if stats is not None: stats.stop()
                 if _lru_cache and callable(val):
                     val = lru_cache(maxsize=maxsize)(val)
+                elif key is not None:
+                    self._snapshots.put(key, val)
                 self._cache[name] = val
+            elif stats is not None:
+                stats.hit(name)
 
             # return the cached value
             return self._cache[name]
@@ -302,6 +779,7 @@ def cached_property(*parents, **kws):
 
         prop._lru_cache = _lru_cache
         prop._maxsize   = maxsize
+        prop._snapshot  = snapshot
 
         return prop
     return cache
@@ -346,7 +824,36 @@ def interpolated_function(*parents, **kwargs):
     A decorator that represents a cached property that
     is a function of `k`. The cached property that is stored
     is a spline that predicts the function as a function of `k`
+
+    If ``persist`` is `True`, the function values on the interpolation
+    domain are stored in the disk cache of the instance (its
+    ``_disk_cache`` attribute), and loaded from there when available; a
+    tuple of values is stored as a 2D array
     """
+    persist = kwargs.get('persist', False)
+
+    def _make_interpolated(self, f, name):
+        """
+        Evaluate ``f`` on the interpolation domain and return the
+        :class:`InterpolatedFunction`
+        """
+        interp_domain = getattr(self, kwargs.get("interp", "k_interp"))
+        if persist:
+            val = persisted(self, name, lambda: f(self, interp_domain), domain=interp_domain)
+            if numpy.ndim(val) == 2: val = tuple(val)
+        else:
+            val = f(self, interp_domain)
+        spline_kwargs = getattr(self, 'spline_kwargs', {})
+
+        # tuple of splines
+        if isinstance(val, tuple):
+            splines = [self.spline(interp_domain, x, **spline_kwargs) for x in val]
+            return InterpolatedFunction(splines, name)
+        # single spline
+        else:
+            spl = self.spline(interp_domain, val, **spline_kwargs)
+            return InterpolatedFunction(spl, name)
+
     def wrapper(f):
         name = f.__name__
 
@@ -361,21 +868,24 @@ def interpolated_function(*parents, **kwargs):
                 return f(self, *args)
 
             # the spline isn't in the cache, make the spline
+            stats = getattr(self, '_cache_stats', None)
             if name not in self._cache:
 
-                # make the spline
-                interp_domain = getattr(self, kwargs.get("interp", "k_interp"))
-                val = f(self, interp_domain)
-                spline_kwargs = getattr(self, 'spline_kwargs', {})
-
-                # tuple of splines
-                if isinstance(val, tuple):
-                    splines = [self.spline(interp_domain, x, **spline_kwargs) for x in val]
-                    self._cache[name] = InterpolatedFunction(splines, name)
-                # single spline
+                # restore from the snapshots of recent states
+                key, val = _restore_snapshot(self, name)
+                if val is not _missing:
+                    if stats is not None: stats.hit(name)
+                    self._cache[name] = val
                 else:
-                    spl = self.spline(interp_domain, val, **spline_kwargs)
-                    self._cache[name] = InterpolatedFunction(spl, name)
+                    if stats is not None: stats.start(name)
+                    try:
+                        self._cache[name] = _make_interpolated(self, f, name)
+                    finally:
+                        if stats is not None: stats.stop()
+                    if key is not None:
+                        self._snapshots.put(key, self._cache[name])
+            elif stats is not None:
+                stats.hit(name)
 
             return self._cache[name](*args, **kws)
 
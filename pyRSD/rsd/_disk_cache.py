@@ -0,0 +1,274 @@
+"""
+A persistent, content-addressed cache of expensive model arrays on disk
+
+Arrays are stored as ``.npy`` files in a directory named by a hash of
+everything they depend on (the cosmology, the transfer function, and the
+model version), and are loaded back as read-only memory maps, so a model
+built for a known cosmology does not need to recompute them.
+
+The cache directory is ``~/.cache/pyRSD`` by default (see
+:func:`user_cache_dir`), and can be changed with the ``PYRSD_CACHE_DIR``
+environment variable. Set ``PYRSD_DISK_CACHE=0`` to disable the cache.
+Additional, read-only directories to search for arrays (i.e., the arrays
+of a model snapshot) can be registered with :func:`add_search_path`.
+"""
+from .. import numpy as np, os, sys
+
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger('pyRSD.disk_cache')
+
+# read-only root directories searched after the cache directory
+_search_paths = []
+
+def add_search_path(root):
+    """
+    Search the directory ``root`` for arrays missing from the cache
+    directory; ``root`` should hold a sub-directory for each key, as
+    the cache directory does
+    """
+    root = os.path.abspath(root)
+    if root not in _search_paths:
+        _search_paths.append(root)
+
+def user_cache_dir(appname):
+    r"""
+
+    This function is copied from:
+    https://github.com/pypa/pip/blob/master/pip/utils/appdirs.py
+
+    Return full path to the user-specific cache dir for this application.
+
+    Parameters
+    ----------
+    appname : str
+        the name of application
+
+    Notes
+    -----
+    Typical user cache directories are:
+
+        - Mac OS X: ~/Library/Caches/<AppName>
+        - Unix: ~/.cache/<AppName> (XDG default)
+    """
+    from os.path import expanduser
+    WINDOWS = (sys.platform.startswith("win") or
+               (sys.platform == 'cli' and os.name == 'nt'))
+
+    if WINDOWS:
+        raise OSError("sorry, not supported on Windows")
+    elif sys.platform == "darwin":
+        # Get the base path
+        path = expanduser("~/Library/Caches")
+
+        # Add our app name to it
+        path = os.path.join(path, appname)
+    else:
+        # Get the base path
+        path = os.getenv("XDG_CACHE_HOME", expanduser("~/.cache"))
+
+        # Add our app name to it
+        path = os.path.join(path, appname)
+
+    return path
+
+def cache_dir():
+    """
+    The root directory of the disk cache, either ``PYRSD_CACHE_DIR`` or
+    the user cache directory for pyRSD
+    """
+    path = os.environ.get('PYRSD_CACHE_DIR', None)
+    if path is None:
+        path = user_cache_dir('pyRSD')
+    return path
+
+def enabled():
+    """
+    Whether the disk cache is enabled, i.e., ``PYRSD_DISK_CACHE`` is not
+    set to a false value
+    """
+    flag = os.environ.get('PYRSD_DISK_CACHE', '1')
+    return flag.lower() not in ['0', 'false', 'no', 'off', '']
+
+def _update_hash(h, value):
+    """
+    Update the hash ``h`` with a canonical representation of ``value``
+    """
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value, dtype='f8')
+        h.update(str(value.shape).encode())
+        h.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(b'(')
+        for v in value: _update_hash(h, v)
+        h.update(b')')
+    elif isinstance(value, float):
+        h.update(repr(float(value)).encode())
+    else:
+        h.update(str(value).encode())
+    h.update(b';')
+
+def hash_arrays(*values):
+    """
+    Return a hex digest identifying the input values, which can be
+    strings, numbers, arrays, or (nested) sequences of these
+    """
+    h = hashlib.sha1()
+    for v in values: _update_hash(h, v)
+    return h.hexdigest()
+
+def cosmology_hash(cosmo, *extras):
+    """
+    Return a canonical hash of a :class:`pygcl.Cosmology`, which identifies
+    the linear power spectrum it describes
+
+    The hash includes the CLASS parameters, the transfer function fit,
+    sigma8 and the tabulated transfer function, as well as any
+    additional values in ``extras``
+
+    Parameters
+    ----------
+    cosmo : pygcl.Cosmology
+        the cosmology instance
+    *extras :
+        additional values to include in the hash, i.e., the model version
+    """
+    params = sorted((str(k), str(v)) for k, v in cosmo.GetParams().items())
+    values = [params, int(cosmo.GetTransferFit()), float(cosmo.sigma8()),
+              np.asarray(cosmo.GetDiscreteK()), np.asarray(cosmo.GetDiscreteTk())]
+    return hash_arrays(*(values + list(extras)))
+
+class DiskCache(object):
+    """
+    A directory of arrays, identified by a key that hashes everything the
+    arrays depend on
+
+    Arrays are loaded as read-only memory maps and saved atomically, so
+    several processes can share the same directory
+    """
+    def __init__(self, key, root=None):
+        """
+        Parameters
+        ----------
+        key : str
+            the hash identifying the contents of the cache
+        root : str, optional
+            the root directory of the cache; default is :func:`cache_dir`
+        """
+        if root is None:
+            root = cache_dir()
+        self.key = key
+        self.path = os.path.join(root, key)
+
+    def __repr__(self):
+        return "<DiskCache: %s>" %self.path
+
+    def filename(self, name):
+        """
+        The name of the file holding the array ``name``
+        """
+        return os.path.join(self.path, name + '.npy')
+
+    def find(self, name):
+        """
+        The name of the existing file holding the array ``name``, in the
+        cache directory or one of the search paths, or ``None``
+        """
+        filename = self.filename(name)
+        if os.path.exists(filename):
+            return filename
+        for root in _search_paths:
+            filename = os.path.join(root, self.key, name + '.npy')
+            if os.path.exists(filename):
+                return filename
+        return None
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def files(self):
+        """
+        A dictionary of the names of all arrays available to this cache,
+        in the cache directory or the search paths, and their file names
+        """
+        toret = {}
+        for path in [self.path] + [os.path.join(root, self.key) for root in _search_paths]:
+            if not os.path.isdir(path): continue
+            for f in sorted(os.listdir(path)):
+                name, ext = os.path.splitext(f)
+                if ext == '.npy' and not name.startswith('.') and name not in toret:
+                    toret[name] = os.path.join(path, f)
+        return toret
+
+    def load(self, name):
+        """
+        Load the array ``name`` as a read-only memory map, returning
+        ``None`` if it is not in the cache
+        """
+        filename = self.find(name)
+        if filename is None:
+            return None
+        try:
+            return np.load(filename, mmap_mode='r')
+        except Exception as e:
+            logger.warning("cannot load '%s' from disk cache: %s" %(filename, str(e)))
+            return None
+
+    def save(self, name, value):
+        """
+        Save the array ``name`` to the cache, writing to a temporary file
+        and renaming it so that readers never see a partial file
+
+        Failures to write (i.e., a read-only file system) are logged
+        and otherwise ignored
+        """
+        filename = self.filename(name)
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+        except OSError:
+            if not os.path.isdir(self.path):
+                logger.warning("cannot create disk cache directory '%s'" %self.path)
+                return
+
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(prefix='.', suffix='.npy', dir=self.path)
+            with os.fdopen(fd, 'wb') as ff:
+                np.save(ff, np.asarray(value))
+            os.rename(tmp, filename)
+        except Exception as e:
+            logger.warning("cannot save '%s' to disk cache: %s" %(filename, str(e)))
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def load_or_compute(self, name, compute):
+        """
+        Return the array ``name`` from the cache, or evaluate ``compute()``
+        and save the result to the cache if it is missing
+        """
+        value = self.load(name)
+        if value is None:
+            logger.debug("computing '%s' for disk cache %s" %(name, self.key))
+            value = compute()
+            self.save(name, value)
+        return value
+
+def persisted(obj, name, compute, domain=None):
+    """
+    Return the array ``name`` from the disk cache of ``obj``, computing
+    it with ``compute()`` if needed
+
+    The disk cache is the ``_disk_cache`` attribute of ``obj``; if it is
+    missing or ``None``, ``compute()`` is returned directly. If ``domain``
+    is given, the file name also identifies the domain the array is
+    evaluated on.
+    """
+    cache = getattr(obj, '_disk_cache', None)
+    if cache is None:
+        return compute()
+    if domain is not None:
+        name = name + '-' + hash_arrays(np.asarray(domain))[:10]
+    return cache.load_or_compute(name, compute)
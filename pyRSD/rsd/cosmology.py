@@ -1,6 +1,7 @@
 from astropy import cosmology, units
 import numpy as np
 import functools
+import sys
 from pyRSD.pygcl import transfers
 
 def removeunits(f):
@@ -396,14 +397,28 @@ class Cosmology(dict):
         cosmo.SetSigma8(self.sigma8)
         return cosmo
 
-# override these with Cosmology classes below
-from astropy.cosmology import Planck13, Planck15, WMAP5, WMAP7, WMAP9
+# the sigma8 and n_s of the preset cosmologies from astropy, which
+# are built on first access
+_presets = {'Planck13' : {'sigma8':0.8288, 'n_s':0.9611},
+            'Planck15' : {'sigma8':0.8159, 'n_s':0.9667},
+            'WMAP5' : {'sigma8':0.817, 'n_s':0.962},
+            'WMAP7' : {'sigma8':0.810, 'n_s':0.967},
+            'WMAP9' : {'sigma8':0.820, 'n_s':0.9608}}
 
-# Planck defaults with sigma8, n_s
-Planck13 = Cosmology.from_astropy(Planck13, sigma8=0.8288, n_s=0.9611)
-Planck15 = Cosmology.from_astropy(Planck15, sigma8=0.8159, n_s=0.9667)
-
-# WMAP defaults with sigma8, n_s
-WMAP5 = Cosmology.from_astropy(WMAP5, sigma8=0.817, n_s=0.962)
-WMAP7 = Cosmology.from_astropy(WMAP7, sigma8=0.810, n_s=0.967)
-WMAP9 = Cosmology.from_astropy(WMAP9, sigma8=0.820, n_s=0.9608)
+def __getattr__(name):
+    """
+    Return the preset :class:`Cosmology` ``name``, i.e., ``Planck15``,
+    building it on first access
+    """
+    if name not in _presets:
+        raise AttributeError("module '%s' has no attribute '%s'" %(__name__, name))
+    value = Cosmology.from_astropy(getattr(cosmology, name), **_presets[name])
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_presets))
+
+# build the presets now if the module __getattr__ is not supported
+if sys.version_info < (3, 7):
+    for name in _presets: __getattr__(name)
@@ -0,0 +1,674 @@
+r"""
+FFTLog-based evaluation of the one-loop perturbation theory integrals
+
+The linear power spectrum is decomposed into a sum of complex power laws,
+
+.. math::
+
+    P_L(q) = \sum_m c_m q^{-2\nu_m},
+
+with a single FFT on a log-spaced grid. For a single power law, the
+P22-type integrals (:math:`I_{mn}` and :math:`K_{mn}`) reduce to the
+analytic one-loop "massless propagator" integral, and the P13-type integrals
+(:math:`J_{mn}`) reduce to the Mellin transform of the kernel
+(see Simonovic et al. 2018, arxiv:1708.08130). The integrals then become
+quadratic (or linear) forms in the coefficients :math:`c_m k^{-2\nu_m}`,
+with kernel matrices (vectors) that are independent of cosmology. The cost
+for each new linear power spectrum is an FFT and a few matrix products,
+rather than an adaptive cubature at each wavenumber.
+"""
+from .. import numpy as np
+from scipy.special import loggamma
+
+# the wavenumbers where the pygcl.OneLoopPS classes are splined
+ONELOOP_K = np.logspace(-5, 1, 1000)
+
+#-------------------------------------------------------------------------------
+# polynomial algebra for the P22-type kernels
+#-------------------------------------------------------------------------------
+class _Monomials(object):
+    r"""
+    A sum of monomials :math:`\sum_{ij} c_{ij} q^i r^j k^{-(i+j)}`, where
+    ``q`` and ``r = |k-q|`` are the magnitudes of the two wavevectors
+    in the P22-type integrand
+
+    The kernels are written in terms of ``u = (q + r) / k`` and
+    ``v = (r - q) / k``, and division is only supported by a single
+    monomial, i.e., powers of ``u - v = 2 q / k`` and ``u + v = 2 r / k``
+    """
+    def __init__(self, terms):
+        self.terms = {key: val for key, val in terms.items() if val != 0}
+
+    def __add__(self, other):
+        other = _as_monomials(other)
+        terms = dict(self.terms)
+        for key, val in other.terms.items():
+            terms[key] = terms.get(key, 0.) + val
+        return _Monomials(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return _Monomials({key: -val for key, val in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + (-_as_monomials(other))
+
+    def __rsub__(self, other):
+        return _as_monomials(other) - self
+
+    def __mul__(self, other):
+        other = _as_monomials(other)
+        terms = {}
+        for (i1, j1), c1 in self.terms.items():
+            for (i2, j2), c2 in other.terms.items():
+                key = (i1+i2, j1+j2)
+                terms[key] = terms.get(key, 0.) + c1*c2
+        return _Monomials(terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, n):
+        toret = _Monomials({(0, 0): 1.})
+        for i in range(n):
+            toret = toret * self
+        return toret
+
+    def __truediv__(self, other):
+        if not isinstance(other, _Monomials):
+            return self * (1./other)
+        if len(other.terms) != 1:
+            raise ValueError("kernels can only be divided by a single monomial")
+        (i2, j2), c2 = list(other.terms.items())[0]
+        return _Monomials({(i1-i2, j1-j2): c1/c2 for (i1, j1), c1 in self.terms.items()})
+
+    __div__ = __truediv__
+
+def _as_monomials(x):
+    if isinstance(x, _Monomials):
+        return x
+    return _Monomials({(0, 0): float(x)})
+
+def _pow2(x):
+    return x*x
+
+def _pow3(x):
+    return x*x*x
+
+def _pow4(x):
+    return _pow2(_pow2(x))
+
+#-------------------------------------------------------------------------------
+# the P22-type kernels, functions of u = (q+r)/k and v = (r-q)/k
+#-------------------------------------------------------------------------------
+def _f00(u, v):
+    return (4*_pow2(4 + 3*v*v + u*u*(3 - 10*v*v)) / (49*_pow4(u*u - v*v)))
+
+def _f01(u, v):
+    u2 = u*u; v2 = v*v
+    return (4*(-8 + v2 + u2*(1 + 6*v2))*(-4 - 3*v2 + u2*(-3 + 10*v2))) / (49*_pow4(u2 - v2))
+
+def _f02(u, v):
+    u2 = u*u; v2 = v*v
+    return -((8*(-1 + u2)*(-1 + v2)*(-4 - 3*v2 + u2*(-3 + 10*v2))) / (7*_pow4(u2 - v2)))
+
+def _f03(u, v):
+    return (8*(-1 + u*u)*(-1 + 3*u*v)*(-1 + v*v)) / (_pow4(u - v)*_pow2(u + v))
+
+def _f10(u, v):
+    return (4*(-1 + u*v)*(-4 - 3*v*v + u*u*(-3 + 10*v*v))) / (7*_pow4(u - v)*_pow2(u + v))
+
+def _f11(u, v):
+    u2 = u*u; v2 = v*v
+    return (4*_pow2(-8 + u2 + v2 + 6*u2*v2)) / (49*_pow4(u2 - v2))
+
+def _f12(u, v):
+    u2 = u*u; v2 = v*v
+    return -((8*(-1 + u2)*(-1 + v2)*(-8 + u2 + v2 + 6*u2*v2)) / (7*_pow4(u2 - v2)))
+
+def _f13(u, v):
+    u2 = u*u; v2 = v*v
+    return (8*(v2 + u2*(1 - 2*v2) + _pow3(u)*v*(-2 + 3*v2) + u*(v - 2*_pow3(v)))) / (_pow4(u - v)*_pow2(u + v))
+
+def _f20(u, v):
+    u2 = u*u; v2 = v*v
+    return (8*(-1 - v2 + u2*(-1 + 3*v2))*(-4 - 3*v2 + u2*(-3 + 10*v2))) / (7*_pow4(u2 - v2))
+
+def _f21(u, v):
+    u2 = u*u; v2 = v*v
+    return (8*(-1 - v2 + u2*(-1 + 3*v2))*(-8 + v2 + u2*(1 + 6*v2)))/(7*_pow4(u2 - v2))
+
+def _f22(u, v):
+    return (4*(-1 + u*v)*(-8 + v*v + u*u*(1 + 6*v*v))) / (7*_pow4(u - v)*_pow2(u + v))
+
+def _f23(u, v):
+    u2 = u*u; v2 = v*v
+    return (48*_pow2(-1 + u2)*_pow2(-1 + v2)) / _pow4(u2 - v2)
+
+def _f30(u, v):
+    return -((8*(1 + v*v + u*u*(1 - 3*v*v) + _pow3(u)*v*(-3 + 5*v*v) + u*(v - 3*_pow3(v)))) / (_pow4(u - v)*_pow2(u + v)))
+
+def _f31(u, v):
+    return -((8*u*(-1 + u*u)*v*(-1 + v*v)) / (_pow4(u - v)*_pow2(u + v)))
+
+def _f32(u, v):
+    u2 = u*u; v2 = v*v
+    return -((16*(-1 + u2)*(-1 + v2)*(-1 - 3*v2 + 3*u2*(-1 + 5*v2))) / _pow4(u2 - v2))
+
+def _f33(u, v):
+    return (16*(3 + 2*v*v + 3*_pow4(v) + u*u*(2 + 12*v*v - 30*_pow4(v)) + _pow4(u)*(3 - 30*v*v + 35*_pow4(v))))/_pow4(u*u - v*v)
+
+# the kernels of the Kmn integrals
+def _F2(u, v):
+    u2 = u*u; v2 = v*v
+    return (8 + 6*v2 + u2*(6 - 20*v2))/(7*_pow2(u2 - v2))
+
+def _G2(u, v):
+    u2 = u*u; v2 = v*v
+    return -((2*(-8 + u2 + v2 + 6*u2*v2)) / (7*_pow2(u2 - v2)))
+
+def _S2(u, v):
+    u2 = u*u; v2 = v*v
+    return (2*(6 + u2*u2 - 6*v2 + v2*v2 + u2*(-6 + 4*v2)))/(3*_pow2(u2 - v2))
+
+def _h03(u, v):
+    u2 = u*u; v2 = v*v
+    return 2*(-1 + u2)*(-1 + v2) / _pow2(u2 - v2)
+
+def _h04(u, v):
+    u2 = u*u; v2 = v*v
+    return 2*(1 + v2 + u2*(1-3*v2)) / _pow2(u2 - v2)
+
+def _k11(u, v):
+    return (2 - 2*u*v)/_pow2(u - v)
+
+# the power-law bias of each kernel must lie in the window where the integral
+# of a single power law converges; this is -1 < bias < 1/2 for the Imn kernels,
+# which decay as q^-4 in the UV and grow as q^-2 in the IR
+IMN_KERNELS = {(0, 0): _f00, (0, 1): _f01, (0, 2): _f02, (0, 3): _f03,
+               (1, 0): _f10, (1, 1): _f11, (1, 2): _f12, (1, 3): _f13,
+               (2, 0): _f20, (2, 1): _f21, (2, 2): _f22, (2, 3): _f23,
+               (3, 0): _f30, (3, 1): _f31, (3, 2): _f32, (3, 3): _f33}
+IMN_BIAS = -0.3
+
+# keyed by (m, n, tidal, part), as in pygcl.Kmn, with values (kernel, bias);
+# the kernels that are constant in the UV require bias < -3/2
+KMN_KERNELS = {(0, 0, False, 0): (_F2, -1.25),
+               (0, 0, True, 0): (lambda u, v: _F2(u, v)*_S2(u, v), -1.25),
+               (0, 1, False, 0): (lambda u, v: 1, -2.25),
+               (0, 1, True, 0): (lambda u, v: _pow2(_S2(u, v)), -2.25),
+               (0, 2, True, 0): (_S2, -2.25),
+               (1, 0, False, 0): (_G2, -1.25),
+               (1, 0, True, 0): (lambda u, v: _G2(u, v)*_S2(u, v), -1.25),
+               (1, 1, False, 0): (_k11, -1.25),
+               (1, 1, True, 0): (lambda u, v: _k11(u, v)*_S2(u, v), -1.25),
+               (2, 0, False, 0): (_h03, -1.25),
+               (2, 0, False, 1): (_h04, -1.25),
+               (2, 0, True, 0): (lambda u, v: _S2(u, v)*_h03(u, v), -1.25),
+               (2, 0, True, 1): (lambda u, v: _S2(u, v)*_h04(u, v), -1.25)}
+
+#-------------------------------------------------------------------------------
+# the P13-type kernels, functions of r = q/k
+#-------------------------------------------------------------------------------
+def _log_ratio(r):
+    return np.log((r+1.)/abs(r-1.))
+
+def _g00(r):
+    small = lambda r: (1./3024.)*(12./(r*r) - 158. + 100.*r*r - 42.*_pow4(r) + 3./_pow3(r)*_pow3(r*r-1.)*(7.*r*r+2.)*_log_ratio(r))
+    large = lambda r: (-2./3024)*(70. + 125.*r*r - 354.*_pow4(r) + 263.*r**6 + 400.*r**8 - 1008.*r**10 + 5124.*r**12)/(105.*r**12)
+    return small, large
+
+def _g01(r):
+    small = lambda r: (1./3024.)*(24./(r*r) - 202. + 56.*r*r - 30.*_pow4(r) + 3./_pow3(r)*_pow3(r*r-1.)*(5.*r*r+4.)*_log_ratio(r))
+    large = lambda r: (-2./3024)*(140. - 65.*r*r - 168.*_pow4(r) + 229.*r**6 + 656.*r**8 - 3312.*r**10 + 10500.*r**12)/(105.*r**12)
+    return small, large
+
+def _g10(r):
+    small = lambda r: (1./1008.)*(-38. + 48.*r*r - 18.*_pow4(r) + 9./r*_pow3(r*r-1.)*_log_ratio(r))
+    large = lambda r: (8./1008)*(-28. - 60.*r*r - 156.*_pow4(r) - 572.*r**6 - 5148.*r**8 + 1001.*r**10)/(5005.*r**10)
+    return small, large
+
+def _g11(r):
+    small = lambda r: (1./1008.)*(12./(r*r) - 82. + 4.*r*r - 6.*_pow4(r) + 3./(r*r*r)*_pow3(r*r-1.)*(r*r+2.)*_log_ratio(r))
+    large = lambda r: (-2./1008)*(70. - 85.*r*r + 6.*_pow4(r) + 65.*r**6 + 304.*r**8 - 1872.*r**10 + 5292.*r**12)/(105.*r**12)
+    return small, large
+
+def _g02(r):
+    small = lambda r: (1./224.)*(2./(r*r)*(r*r+1.)*(3.*_pow4(r) - 14.*r*r + 3.) - 3./(r*r*r)*_pow4(r*r-1.)*_log_ratio(r))
+    large = lambda r: (-2./224)*(35. - 95.*r*r + 93.*_pow4(r) - 17.*r**6 + 128.*r**8 - 1152.*r**10 + 2688.*r**12)/(105.*r**12)
+    return small, large
+
+def _g20(r):
+    small = lambda r: (1./672.)*(2./(r*r)*(9. - 109.*r*r + 63.*_pow4(r) - 27.*r**6) + 9./(r*r*r)*_pow3(r*r-1.)*(3*r*r+1.)*_log_ratio(r))
+    large = lambda r: (-2./672)*(35. + 45.*r*r - 147.*_pow4(r) + 115.*r**6 + 192.*r**8 - 576.*r**10 + 2576.*r**12)/(35.*r**12)
+    return small, large
+
+JMN_KERNELS = {(0, 0): _g00, (0, 1): _g01, (0, 2): _g02,
+               (1, 0): _g10, (1, 1): _g11, (2, 0): _g20}
+
+# the Mellin transform of the Jmn kernels does not converge for any single
+# power law, since the kernels are constant as r -> 0 and r -> infinity, so
+# the UV limit is subtracted and integrated separately
+JMN_BIAS = -0.3
+
+def _evaluate_jmn_kernel(g, r):
+    """
+    Evaluate a P13-type kernel, using the asymptotic series at large ``r``
+
+    The kernel is held constant below ``r = 1e-3``, where the exact
+    expression suffers from round-off, and the (integrable) singularity
+    at ``r = 1`` is avoided
+    """
+    small, large = g(r)
+    r = np.where(r == 1., 1.-1e-10, np.maximum(r, 1e-3))
+    toret = np.empty_like(r)
+    idx = r < 60
+    toret[idx] = small(r[idx])
+    toret[~idx] = large(r[~idx])
+    return toret
+
+def _jmn_uv_limit(g):
+    """
+    The constant value of a P13-type kernel as ``r -> infinity``
+    """
+    return _evaluate_jmn_kernel(g, np.array([1e8]))[0]
+
+#-------------------------------------------------------------------------------
+# the cosmology-independent kernel matrices
+#-------------------------------------------------------------------------------
+def _massless_loop_A(nu):
+    """
+    The log of the factor of the one-loop integral of two power laws that
+    depends on a single exponent; see :func:`_massless_loop_B`
+    """
+    return loggamma(1.5 - nu) - loggamma(nu)
+
+def _massless_loop_B(nu12):
+    r"""
+    The log of the factor of the one-loop integral of two power laws that
+    depends on the sum of the exponents, such that
+
+    .. math::
+
+        \int \frac{d^3q}{(2\pi)^3} q^{-2\nu_1} |k-q|^{-2\nu_2} = k^{3-2\nu_{12}} e^{A(\nu_1) + A(\nu_2) + B(\nu_{12})}
+    """
+    return loggamma(nu12 - 1.5) - loggamma(3. - nu12) - np.log(8*np.pi**1.5)
+
+def p22_matrix(kernel, nu):
+    """
+    The matrix ``M`` such that the P22-type integral of ``kernel`` is
+    ``k^3 x^T M x``, where ``x_m = c_m k^{-2 nu_m}`` are the power-law
+    coefficients of the linear power spectrum
+
+    Parameters
+    ----------
+    kernel : callable
+        the kernel as a function of ``u`` and ``v``; see :data:`IMN_KERNELS`
+    nu : array_like
+        the (complex) power-law exponents of the decomposition
+
+    Returns
+    -------
+    M : array_like, (len(nu), len(nu))
+        the complex kernel matrix
+    """
+    u = _Monomials({(1, 0): 1., (0, 1): 1.})
+    v = _Monomials({(0, 1): 1., (1, 0): -1.})
+    f = _as_monomials(kernel(u, v))
+
+    # the exponents are evenly spaced, so nu1 + nu2 only takes 2N-1 values
+    N = len(nu)
+    nu_sum = np.concatenate([nu[0] + nu, nu[-1] + nu[1:]])
+    index = np.add.outer(np.arange(N), np.arange(N))
+
+    # each term q^i r^j shifts the exponents of the two power laws
+    M = np.zeros((N, N), dtype=complex)
+    for (i, j), c in f.terms.items():
+        A1 = _massless_loop_A(nu - 0.5*i)
+        A2 = _massless_loop_A(nu - 0.5*j)
+        B = _massless_loop_B(nu_sum - 0.5*(i+j))
+        M += c * np.exp(A1[:,None] + A2[None,:] + B[index])
+    return M
+
+def p13_vector(kernel, bias, eta, nx=2**17):
+    r"""
+    The vector ``G`` such that the P13-type integral of ``kernel`` is
+    ``k/(2 pi^2) x^T G``, where ``x_m = c_m k^{-2 nu_m}``, and
+    ``-2 nu_m = bias + i eta_m``
+
+    ``G`` is the Mellin transform :math:`\int_0^\infty dr r^{-2\nu} g(r)`
+    of the kernel, with its UV limit subtracted, which is computed with
+    a single FFT in ``log r``
+
+    Parameters
+    ----------
+    kernel : callable
+        the kernel as a function of ``r = q/k``; see :data:`JMN_KERNELS`
+    bias : float
+        the real part of the power-law exponents
+    eta : array_like
+        the imaginary part of the power-law exponents, which must be
+        multiples of the fundamental frequency ``eta[1] - eta[0]``
+    nx : int, optional
+        the number of samples in ``log r``
+    """
+    eta = np.asarray(eta)
+    deta = eta[1] - eta[0]
+
+    # the period in log r is an integer multiple of 2 pi / deta, such that
+    # the FFT frequencies include all values of eta
+    L = 2*np.pi/deta
+    L *= max(1, np.ceil(80./L))
+    x = np.linspace(-0.5*L, 0.5*L, nx, endpoint=False)
+    dx = x[1] - x[0]
+    # the difference from the UV limit decays as r^-2, and is extrapolated
+    # beyond r = 1e3 to avoid round-off in the asymptotic series
+    r = np.exp(x)
+    g = _evaluate_jmn_kernel(kernel, np.minimum(r, 1e3)) - _jmn_uv_limit(kernel)
+    g *= np.where(r > 1e3, (1e3/r)**2, 1.)
+    h = np.exp((bias+1)*x) * g
+
+    # int dx h(x) e^{i eta x}, with eta on the FFT frequencies
+    H = np.fft.ifft(h) * nx * dx
+    j = np.rint(eta * L / (2*np.pi)).astype(int)
+    return H[j % nx] * np.exp(1j*eta*x[0])
+
+#-------------------------------------------------------------------------------
+# the engine
+#-------------------------------------------------------------------------------
+class FFTLogPT(object):
+    """
+    Evaluate the one-loop PT integrals (:math:`I_{mn}`, :math:`J_{mn}`,
+    and :math:`K_{mn}`) from a power-law decomposition of the linear
+    power spectrum
+
+    Parameters
+    ----------
+    power_lin : callable
+        the linear power spectrum, i.e., a :class:`pygcl.LinearPS`
+    kmin : float, optional
+        the minimum wavenumber of the decomposition [units: `h/Mpc`]
+    kmax : float, optional
+        the maximum wavenumber of the decomposition [units: `h/Mpc`]
+    N : int, optional
+        the number of log-spaced samples of the linear power spectrum
+    window : float, optional
+        the fraction of the highest frequencies to smoothly filter
+
+    Notes
+    -----
+    The kernel matrices do not depend on the linear power spectrum and
+    are shared between all instances with the same ``kmin``, ``kmax``,
+    and ``N``.
+    """
+    _kernel_cache = {}
+
+    def __init__(self, power_lin, kmin=1e-7, kmax=1e3, N=512, window=0.25):
+
+        if N % 2:
+            raise ValueError("the number of samples `N` must be even")
+        self.kmin, self.kmax, self.N = kmin, kmax, N
+        self.window = window
+
+        self.k = np.logspace(np.log10(kmin), np.log10(kmax), N)
+        self.Pk = np.asarray(power_lin(self.k), dtype=float)
+        self.Pk_oneloop = np.asarray(power_lin(ONELOOP_K), dtype=float)
+        self.delta = np.log(kmax/kmin) / (N-1)
+
+        # the frequencies of the decomposition
+        m = np.arange(-N//2, N//2+1)
+        self.eta = 2*np.pi*m / (N*self.delta)
+        self._coefficients = {}
+
+    def _c_window(self):
+        """
+        Smoothly filter the highest frequencies (Fang et al. 2017)
+        """
+        m = np.arange(-self.N//2, self.N//2+1)
+        mmax = self.N//2
+        mcut = int((1.-self.window) * mmax)
+        x = (mmax - abs(m)) / float(mmax - mcut)
+        W = x - np.sin(2*np.pi*x) / (2*np.pi)
+        return np.where(abs(m) > mcut, W, 1.)
+
+    def coefficients(self, bias):
+        r"""
+        The power-law decomposition of the linear power spectrum, such
+        that :math:`P_L(k) = \sum_m c_m k^{-2\nu_m}`
+
+        Returns
+        -------
+        c : array_like
+            the complex coefficients
+        nu : array_like
+            the complex exponents, with ``-2 nu = bias + i eta``
+        """
+        if bias not in self._coefficients:
+            N = self.N
+            Pb = self.Pk * (self.k/self.kmin)**(-bias)
+            c = np.fft.fft(Pb) / N
+            c = np.concatenate([c[N//2:], c[:N//2+1]])
+            c[0] *= 0.5; c[-1] *= 0.5
+            c *= self._c_window()
+
+            s = bias + 1j*self.eta
+            self._coefficients[bias] = (c * self.kmin**(-s), -0.5*s)
+        return self._coefficients[bias]
+
+    def _x(self, k, bias):
+        c, nu = self.coefficients(bias)
+        return c[None,:] * np.exp(-2*nu[None,:]*np.log(k)[:,None])
+
+    def _p22_matrix(self, name, kernel, bias):
+        key = (name, self.kmin, self.kmax, self.N, bias)
+        if key not in self._kernel_cache:
+            nu = self.coefficients(bias)[1]
+            self._kernel_cache[key] = p22_matrix(kernel, nu)
+        return self._kernel_cache[key]
+
+    def _p13_vector(self, name, kernel, bias):
+        key = (name, self.kmin, self.kmax, self.N, bias)
+        if key not in self._kernel_cache:
+            self._kernel_cache[key] = p13_vector(kernel, bias, self.eta)
+        return self._kernel_cache[key]
+
+    def p22(self, kernels, k):
+        """
+        Evaluate P22-type integrals, returning an array of shape
+        ``(len(k), len(kernels))``
+
+        Parameters
+        ----------
+        kernels : list of (str, callable, float)
+            the unique name, kernel function, and power-law bias
+        k : array_like
+            the wavenumbers to evaluate at
+        """
+        k = np.atleast_1d(np.asarray(k, dtype=float))
+        toret = np.zeros((len(k), len(kernels)))
+        valid = k > 0
+        if not valid.any():
+            return toret
+
+        X = {}
+        for i, (name, kernel, bias) in enumerate(kernels):
+            if bias not in X:
+                X[bias] = self._x(k[valid], bias)
+            M = self._p22_matrix(name, kernel, bias)
+            toret[valid,i] = k[valid]**3 * np.einsum('ij,ij->i', X[bias].dot(M), X[bias]).real
+        return toret
+
+    def p13(self, kernels, k):
+        """
+        Evaluate P13-type integrals, returning an array of shape
+        ``(len(k), len(kernels))``
+
+        Parameters
+        ----------
+        kernels : list of (str, callable)
+            the unique name and kernel function
+        k : array_like
+            the wavenumbers to evaluate at
+        """
+        k = np.atleast_1d(np.asarray(k, dtype=float))
+        toret = np.zeros((len(k), len(kernels)))
+        valid = k > 0
+        if not valid.any():
+            return toret
+
+        # the UV limit of the kernel multiplies the integral of P_L
+        y = self.Pk*self.k
+        norm = (y.sum() - 0.5*(y[0]+y[-1])) * self.delta / (2*np.pi**2)
+        uv = np.array([_jmn_uv_limit(g) for name, g in kernels])
+
+        X = self._x(k[valid], JMN_BIAS)
+        G = np.column_stack([self._p13_vector(name, g, JMN_BIAS) for name, g in kernels])
+        toret[valid] = (k[valid,None] / (2*np.pi**2)) * X.dot(G).real + norm*uv[None,:]
+        return toret
+
+    def Imn(self, k, m, n):
+        """
+        The :math:`I_{mn}` integral, as computed by :class:`pygcl.Imn`
+        """
+        return self.p22([('I%d%d' %(m,n), IMN_KERNELS[(m,n)], IMN_BIAS)], k)[:,0]
+
+    def Jmn(self, k, m, n):
+        """
+        The :math:`J_{mn}` integral, as computed by :class:`pygcl.Jmn`
+        """
+        return self.p13([('J%d%d' %(m,n), JMN_KERNELS[(m,n)])], k)[:,0]
+
+    def Kmn(self, k, m, n, tidal=False, part=0):
+        """
+        The :math:`K_{mn}` integral, as computed by :class:`pygcl.Kmn`
+        """
+        kernel, bias = KMN_KERNELS[(m, n, bool(tidal), part)]
+        name = 'K%d%d%s_%d' %(m, n, 's' if tidal else '', part)
+        return self.p22([(name, kernel, bias)], k)[:,0]
+
+    def oneloop_power(self, name):
+        """
+        The 1-loop term of the SPT power spectra, evaluated at
+        :data:`ONELOOP_K`, as needed by the :class:`pygcl.OneLoopPS` classes
+
+        Parameters
+        ----------
+        name : {'dd', 'dv', 'vv', 'P22bar'}
+            the name of the spectrum
+        """
+        k = ONELOOP_K
+        if name == 'P22bar':
+            I = self.p22([('I%d%d' %mn, IMN_KERNELS[mn], IMN_BIAS) for mn in [(2,3), (3,2), (3,3)]], k)
+            return I[:,0] + (2./3)*I[:,1] + (1./5)*I[:,2]
+
+        indices = {'dd': (0, 0), 'dv': (0, 1), 'vv': (1, 1)}
+        if name not in indices:
+            raise ValueError("valid 1-loop spectra are %s" %(list(indices) + ['P22bar']))
+        mn = indices[name]
+        I = self.Imn(k, *mn)
+        J = self.Jmn(k, *mn)
+        return 2*I + 6*k**2 * J * self.Pk_oneloop
+
+#-------------------------------------------------------------------------------
+# drop-in replacements for the pygcl drivers
+#-------------------------------------------------------------------------------
+def _return_scalar(k, toret):
+    return toret[0] if np.isscalar(k) else toret
+
+class FFTLogImn(object):
+    """
+    The :math:`I_{mn}` integrals computed with :class:`FFTLogPT`, with
+    the same interface as :class:`pygcl.Imn`
+    """
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, k, m, n):
+        return _return_scalar(k, self.engine.Imn(k, m, n))
+
+    def EvaluateAll(self, k):
+        return self.EvaluateManyAll([k])[0]
+
+    def EvaluateManyAll(self, k):
+        kernels = [('I%d%d' %(i//4, i%4), IMN_KERNELS[(i//4, i%4)], IMN_BIAS) for i in range(16)]
+        return self.engine.p22(kernels, k)
+
+class FFTLogJmn(object):
+    """
+    The :math:`J_{mn}` integrals computed with :class:`FFTLogPT`, with
+    the same interface as :class:`pygcl.Jmn`
+    """
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, k, m, n):
+        return _return_scalar(k, self.engine.Jmn(k, m, n))
+
+class FFTLogKmn(object):
+    """
+    The :math:`K_{mn}` integrals computed with :class:`FFTLogPT`, with
+    the same interface as :class:`pygcl.Kmn`
+    """
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, k, m, n, tidal=False, part=0):
+        return _return_scalar(k, self.engine.Kmn(k, m, n, tidal, part))
+
+#-------------------------------------------------------------------------------
+# validation against the adaptive cubature
+#-------------------------------------------------------------------------------
+def validate(power_lin, k=None, epsrel=1e-5, **kwargs):
+    """
+    Compare the FFTLog integrals to the adaptive cubature of the
+    :mod:`pygcl` drivers
+
+    Parameters
+    ----------
+    power_lin : pygcl.PowerSpectrum
+        the linear power spectrum at z = 0
+    k : array_like, optional
+        the wavenumbers to compare at; default is 40 log-spaced values
+        between 1e-3 and 1 h/Mpc
+    epsrel : float, optional
+        the relative tolerance of the cubature; the default tolerance of the
+        :mod:`pygcl` drivers (up to 1e-3) is comparable to the accuracy of
+        the FFTLog integrals
+    **kwargs :
+        additional keywords passed to :class:`FFTLogPT`
+
+    Returns
+    -------
+    errors : dict
+        the maximum absolute difference of each integral, relative to the
+        maximum absolute value of the cubature result, keyed by the name,
+        i.e., ``I00``, ``J01``, ``K00s``, or ``K20_a``; the normalization
+        avoids spurious errors where an integral crosses zero
+    """
+    from pyRSD import pygcl
+
+    if k is None:
+        k = np.logspace(-3, 0, 40)
+    k = np.asarray(k, dtype=float)
+    engine = FFTLogPT(power_lin, **kwargs)
+
+    errors = {}
+    def compare(name, fftlog, cubature):
+        cubature = np.asarray(cubature)
+        errors[name] = np.max(abs(fftlog - cubature)) / np.max(abs(cubature))
+
+    I = pygcl.Imn(power_lin, epsrel)
+    for (m, n) in IMN_KERNELS:
+        compare('I%d%d' %(m,n), engine.Imn(k, m, n), I(k, m, n))
+
+    J = pygcl.Jmn(power_lin, epsrel)
+    for (m, n) in JMN_KERNELS:
+        compare('J%d%d' %(m,n), engine.Jmn(k, m, n), J(k, m, n))
+
+    K = pygcl.Kmn(power_lin, epsrel)
+    for (m, n, tidal, part) in KMN_KERNELS:
+        name = 'K%d%d%s' %(m, n, 's' if tidal else '')
+        if m == 2: name += '_b' if part else '_a'
+        compare(name, engine.Kmn(k, m, n, tidal, part), K(k, m, n, tidal, part))
+
+    return errors
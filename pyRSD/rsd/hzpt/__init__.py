@@ -230,13 +230,6 @@ class HaloZeldovichBase(Cache):
     #---------------------------------------------------------------------------
     # function calls
     #---------------------------------------------------------------------------
-    def update(self, **kwargs):
-        """
-        Update any attributes with the specified values
-        """
-        for k, v in kwargs.items():
-            setattr(self, k, v)
-
     def broadband(self, k):
         r"""
         The broadband power in units of :math:`(\mathrm{Mpc}/h)^3`
@@ -1,7 +1,8 @@
 from . import parameter
-from .. import INTERP_KMIN, INTERP_KMAX
+from .. import INTERP_KMIN, INTERP_KMAX, __version__
 from ... import pygcl, numpy as np
 from .._interpolate import RegularGridInterpolator, InterpolationDomainError
+from .._disk_cache import DiskCache, cosmology_hash, hash_arrays, enabled as disk_cache_enabled
 from . import HaloZeldovichP00, HaloZeldovichP01, HaloZeldovichP11, HaloZeldovichPhm
 
 
@@ -22,13 +23,127 @@ class InterpolationTable(dict):
     """
     Dict that returns an interpolation table for
     the given Zel'dovich terms
+
+    The tables are stored in the disk cache of the models, if enabled,
+    keyed by the cosmology and the grid definition, and loaded as
+    memory maps, which are shared by all processes on a node.
+
+    Parameters
+    ----------
+    models : InterpolatedHZPTModels
+        the HZPT models to tabulate
+    Nsigma8 : int, optional
+        the number of ``sigma8_z`` grid points
+    Nk : int, optional
+        the number of ``k`` grid points
+    rtol : float, optional
+        if not `None`, refine the ``sigma8_z`` grid by inserting the
+        midpoints until the interpolation error is below ``rtol``
+    Nmax : int, optional
+        the maximum number of ``sigma8_z`` points when refining
     """
-    grid = {}
-    grid['sigma8_z'] = np.linspace(0.3, 1.0, 100)
-    grid['k'] = np.logspace(np.log10(INTERP_KMIN), np.log10(INTERP_KMAX), 300)
+    sigma8_range = (0.3, 1.0)
 
-    def __init__(self, models):
+    def __init__(self, models, Nsigma8=100, Nk=300, rtol=None, Nmax=1600):
         self.models = models
+        self.rtol = rtol
+        self.Nmax = Nmax
+
+        self.grid = {}
+        self.grid['sigma8_z'] = np.linspace(self.sigma8_range[0], self.sigma8_range[1], Nsigma8)
+        self.grid['k'] = np.logspace(np.log10(INTERP_KMIN), np.log10(INTERP_KMAX), Nk)
+
+        # the maximum relative interpolation error of each table, if computed
+        self.errors = {}
+
+    @property
+    def _disk_cache(self):
+        return self.models._disk_cache
+
+    def _model(self, key):
+        """
+        The HZPT model for the Zel'dovich term ``key``
+        """
+        if key not in ['P00', 'P01', 'P11', 'Phm']:
+            raise KeyError("key '%s' not understood" %key)
+        return getattr(self.models, '_'+key)
+
+    def _tabulate(self, model, sigma8s, ks):
+        """
+        Evaluate the Zel'dovich term of ``model`` on the grid, with
+        shape (len(sigma8s), len(ks))
+        """
+        # save the original sigma8_z to restore later
+        original_s8z = model.sigma8_z
+
+        toret = np.empty((len(sigma8s), len(ks)))
+        try:
+            for i, s8 in enumerate(sigma8s):
+                model._driver.SetSigma8AtZ(s8)
+                toret[i] = model.zeldovich(ks)
+        finally:
+            model._driver.SetSigma8AtZ(original_s8z)
+        return toret
+
+    def _midpoint_error(self, sigma8s, values, exact):
+        """
+        The maximum relative error of linear interpolation at the
+        ``sigma8_z`` midpoints, given the ``exact`` values there
+        """
+        interp = 0.5*(values[1:] + values[:-1])
+        scale = abs(exact).max(axis=1, keepdims=True)
+        return (abs(interp - exact) / scale).max()
+
+    def compute(self, key):
+        """
+        Compute the table for the Zel'dovich term ``key``, refining
+        the ``sigma8_z`` grid if :attr:`rtol` is set
+
+        Returns
+        -------
+        sigma8s : array_like
+            the ``sigma8_z`` grid
+        values : array_like, (len(sigma8s), len(k))
+            the Zel'dovich term on the grid
+        error : float
+            the maximum relative interpolation error at the ``sigma8_z``
+            midpoints, or NaN if not computed
+        """
+        model = self._model(key)
+        sigma8s = self.grid['sigma8_z']
+        ks = self.grid['k']
+        values = self._tabulate(model, sigma8s, ks)
+        if self.rtol is None:
+            return sigma8s, values, np.nan
+
+        while True:
+            mid = 0.5*(sigma8s[1:] + sigma8s[:-1])
+            exact = self._tabulate(model, mid, ks)
+            error = self._midpoint_error(sigma8s, values, exact)
+            if error <= self.rtol or 2*len(sigma8s)-1 > self.Nmax:
+                break
+
+            # insert the midpoints, which are already computed
+            sigma8s = np.insert(sigma8s, np.arange(1, len(sigma8s)), mid)
+            values = np.insert(values, np.arange(1, len(values)), exact, axis=0)
+
+        return sigma8s, values, error
+
+    def interpolation_error(self, key):
+        """
+        The maximum relative error of the interpolation table ``key``
+        at the ``sigma8_z`` midpoints of the grid
+
+        This requires evaluating the Zel'dovich term at each midpoint,
+        unless the table was refined to :attr:`rtol`.
+        """
+        if key not in self.errors or not np.isfinite(self.errors[key]):
+            table = self[key]
+            sigma8s, ks = table.grid
+            mid = 0.5*(sigma8s[1:] + sigma8s[:-1])
+            exact = self._tabulate(self._model(key), mid, ks)
+            self.errors[key] = self._midpoint_error(sigma8s, table.values, exact)
+        return self.errors[key]
 
     def __missing__(self, key):
         """
@@ -39,34 +154,26 @@ class InterpolationTable(dict):
         This does not depend on redshift, as we are interpolating as a function
         of sigma8(z)
         """
-        if key == 'P00':
-            model = self.models._P00
-        elif key == 'P01':
-            model = self.models._P01
-        elif key == 'P11':
-            model = self.models._P11
-        elif key == 'Phm':
-            model = self.models._Phm
-        else:
-            raise KeyError("key '%s' not understood" %key)
+        self._model(key)
 
-        # save the original sigma8_z to restore later
-        original_s8z = model.sigma8_z
+        # load from the disk cache or compute
+        cache = self._disk_cache
+        tol = '%s-%d' %(self.rtol, self.Nmax)
+        name = 'hzpt_%s-%s' %(key, hash_arrays(self.grid['sigma8_z'], self.grid['k'], tol)[:10])
+        arrays = None
+        if cache is not None:
+            arrays = [cache.load(name + suffix) for suffix in ['_sigma8', '_values', '_error']]
+        if arrays is None or any(x is None for x in arrays):
+            arrays = self.compute(key)
+            if cache is not None:
+                for suffix, x in zip(['_sigma8', '_values', '_error'], arrays):
+                    cache.save(name + suffix, x)
 
-        # the interpolation grid points
-        sigma8s = self.grid['sigma8_z']
-        ks      = self.grid['k']
-
-        # get the grid values
-        grid_vals = []
-        for i, s8 in enumerate(sigma8s):
-            model._driver.SetSigma8AtZ(s8)
-            grid_vals += list(model.zeldovich(ks))
-        grid_vals = np.array(grid_vals).reshape((len(sigma8s), len(ks)))
+        sigma8s, values, error = arrays
+        self.errors[key] = float(error)
 
         # create the interpolator
-        model.sigma8_z = original_s8z
-        interpolator = RegularGridInterpolator((sigma8s, ks), grid_vals)
+        interpolator = RegularGridInterpolator((np.asarray(sigma8s), self.grid['k']), values)
 
         super(InterpolationTable, self).__setitem__(key, interpolator)
         return interpolator
@@ -76,7 +183,7 @@ class InterpolatedHZPTModels(object):
     """
     Class to handle interpolating HZPT models
     """
-    def __init__(self, cosmo, sigma8_z, f, interpolate=True):
+    def __init__(self, cosmo, sigma8_z, f, interpolate=True, disk_cache=True, **table_kws):
         """
         Parameters
         ----------
@@ -88,6 +195,12 @@ class InterpolatedHZPTModels(object):
             the growth rate
         interpolate : bool, optional
             whether to turn on interpolation
+        disk_cache : bool, optional
+            whether to store the interpolation tables on disk, keyed by
+            a hash of the cosmology (see :mod:`pyRSD.rsd._disk_cache`)
+        **table_kws :
+            additional keywords to pass to :class:`InterpolationTable`,
+            i.e., to set the grid size or the refinement tolerance
         """
         # the base Zel'dovich object
         self._base_zeldovich = pygcl.ZeldovichPS(cosmo, 0.)
@@ -97,8 +210,13 @@ class InterpolatedHZPTModels(object):
         self.f               = f
         self.interpolate     = interpolate
 
+        # the disk cache for the tables
+        self._disk_cache = None
+        if disk_cache and disk_cache_enabled():
+            self._disk_cache = DiskCache(cosmology_hash(cosmo, 'hzpt', __version__))
+
         # the interpolation table
-        self.table = InterpolationTable(self)
+        self.table = InterpolationTable(self, **table_kws)
 
     def _hasattr(self, m):
         """
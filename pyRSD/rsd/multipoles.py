@@ -0,0 +1,153 @@
+"""
+Legendre multipoles of the redshift-space power spectrum
+
+The models are even in :math:`\mu`, so the multipoles are
+
+.. math::
+
+    P_\ell(k) = (2\ell+1) \int_0^1 d\mu \ P(k,\mu) \mathcal{L}_\ell(\mu).
+
+If the model is a polynomial in :math:`\mu^2`, i.e., a sum of
+:math:`\mu^{2n} P_{\mu^{2n}}(k)`, the multipoles are exact linear
+combinations of the :math:`\mu` moments (see :func:`moment_coefficients`).
+Otherwise, i.e., with the AP effect or FOG damping, the integral is
+evaluated with a Gauss-Legendre rule, doubling the number of nodes for
+each ``k`` until the multipoles converge (see :func:`gauss_legendre_poles`).
+"""
+from .. import numpy as np
+from scipy.special import legendre
+
+import warnings
+
+def gauss_legendre(N, lower=0., upper=1.):
+    """
+    The nodes and weights of the ``N``-point Gauss-Legendre rule on the
+    interval [``lower``, ``upper``]
+
+    Returns
+    -------
+    x, w : array_like
+        the nodes and weights
+    """
+    x, w = np.polynomial.legendre.leggauss(N)
+    x = 0.5*(upper - lower)*x + 0.5*(upper + lower)
+    w = 0.5*(upper - lower)*w
+    return x, w
+
+def even_gauss_legendre(N):
+    """
+    The ``N`` positive nodes and weights of the ``2N``-point Gauss-Legendre
+    rule on [-1, 1], which integrates even functions over [0, 1] and is
+    exact for even polynomials of degree up to ``4N-2``
+
+    Returns
+    -------
+    mu, w : array_like
+        the nodes and weights, with ``mu`` in (0, 1)
+    """
+    x, w = np.polynomial.legendre.leggauss(2*N)
+    return x[N:], w[N:]
+
+def legendre_weights(ells, mu, w):
+    """
+    The weights mapping the power at the nodes ``mu`` to the multipoles
+    ``ells``, i.e., :math:`(2\ell+1) \mathcal{L}_\ell(\mu_i) w_i`
+
+    Returns
+    -------
+    W : array_like, (len(ells), len(mu))
+        the weights for each multipole and node
+    """
+    return np.array([(2*ell+1.)*legendre(ell)(mu)*w for ell in ells])
+
+def moment_coefficients(ells, max_mu):
+    """
+    The coefficients mapping the :math:`\mu^{2n}` moments to the multipoles,
+    :math:`(2\ell+1) \int_0^1 d\mu \ \mu^{2n} \mathcal{L}_\ell(\mu)`
+
+    Parameters
+    ----------
+    ells : list of int
+        the multipole numbers
+    max_mu : int
+        the largest (even) power of ``mu`` in the model
+
+    Returns
+    -------
+    C : array_like, (len(ells), max_mu//2+1)
+        the coefficients for each multipole and moment
+    """
+    ells = np.array(ells, ndmin=1)
+
+    # exact for the polynomial integrand
+    N = (max_mu + ells.max()) // 4 + 1
+    mu, w = even_gauss_legendre(N)
+    n = np.arange(max_mu//2 + 1)
+    return np.dot(legendre_weights(ells, mu, w), mu[:,None]**(2*n[None,:]))
+
+def _evaluate(power, k, mu):
+    """
+    Evaluate ``power`` on the (``k``, ``mu``) grid, with shape (Nk, Nmu)
+    """
+    P = np.asarray(power(k[:,None], mu[None,:]))
+    return P.reshape((len(k), len(mu)))
+
+def gauss_legendre_poles(power, k, ells, rtol=1e-5, atol=0., Nmin=4, Nmax=64):
+    """
+    The multipoles of ``power`` with an adaptive Gauss-Legendre rule
+
+    The number of nodes is doubled, starting from ``Nmin``, until the
+    multipoles of each ``k`` change by less than ``atol + rtol * |P_ell|``
+    (where the maximum over ``ells`` is used); only the ``k`` values
+    that have not converged are evaluated again.
+
+    Parameters
+    ----------
+    power : callable
+        the function ``power(k, mu)``, which returns the power with shape
+        ``(len(k), len(mu))`` for ``k`` and ``mu`` of shape (Nk,1) and (1,Nmu)
+    k : array_like
+        the wavenumbers to compute the multipoles at
+    ells : list of int
+        the multipole numbers
+    rtol, atol : float, optional
+        the relative and absolute tolerance of the multipoles
+    Nmin, Nmax : int, optional
+        the minimum and maximum number of nodes in [0, 1]
+
+    Returns
+    -------
+    poles : array_like, (len(ells), len(k))
+        the multipoles
+    """
+    k = np.array(k, ndmin=1, dtype=float)
+    ells = np.array(ells, ndmin=1)
+
+    toret = np.empty((len(ells), len(k)))
+    todo = np.arange(len(k))
+    previous = None
+
+    N = Nmin
+    while True:
+        mu, w = even_gauss_legendre(N)
+        poles = np.dot(legendre_weights(ells, mu, w), _evaluate(power, k[todo], mu).T)
+
+        if previous is not None:
+            err = abs(poles - previous).max(axis=0)
+            scale = abs(poles).max(axis=0)
+            converged = err <= atol + rtol*scale
+            if 2*N > Nmax:
+                converged[:] = True
+                if not np.all(err <= atol + rtol*scale):
+                    warnings.warn("multipoles not converged with %d Gauss-Legendre nodes" %N)
+
+            toret[:,todo[converged]] = poles[:,converged]
+            todo = todo[~converged]
+            if not len(todo):
+                break
+            poles = poles[:,~converged]
+
+        previous = poles
+        N *= 2
+
+    return toret
@@ -0,0 +1,358 @@
+"""
+The halo power moments of :class:`~pyRSD.rsd.BiasedSpectrum`, evaluated
+for each pair of biases from bias-independent spectra
+
+The moments ``P_mu0`` ... ``P_mu6`` depend on the biases of the two tracers
+only through array arithmetic on spectra that are independent of the
+biases (i.e., ``P00``, ``K00``, ``Pdv``). The power terms of this package
+(``P00.py`` ... ``P22.py``) are evaluated on a :class:`TracerPair`, which
+holds the bias quantities of the two tracers and returns the bias-independent
+spectra of the model, memoized on the `k` grid by :class:`BiasBasis`. The
+power terms thus remain the only expressions of the moments, while changing
+the biases (i.e., for each of the two-halo terms of
+:class:`~pyRSD.rsd.GalaxySpectrum`) does not rebuild the biased power terms
+of the model or re-evaluate the spectra.
+
+The bias quantities of a :class:`TracerPair` can also be stacked along
+a leading axis (see :class:`StackedTracer`), in which case the power
+terms return the moments of each pair of biases, with shape ``(N, len(k))``.
+"""
+import functools
+from pyRSD import numpy as np
+from pyRSD.rsd.power import PowerTerm
+from .P00 import P00PowerTerm, NoStochP00PowerTerm
+from .P01 import P01PowerTerm
+from .P02 import P02PowerTerm
+from .P03 import P03PowerTerm
+from .P04 import P04PowerTerm
+from .P11 import P11PowerTerm
+from .P12 import P12PowerTerm
+from .P13 import P13PowerTerm
+from .P22 import P22PowerTerm
+
+#-------------------------------------------------------------------------------
+# the power moments, from the biased power terms of a model
+#-------------------------------------------------------------------------------
+def P_mu0(m, k):
+    """
+    The halo power moment with no angular dependence, from P00_ss
+    """
+    return m.P00_ss.mu0(k)
+
+def P_mu2(m, k):
+    """
+    The halo power moment with mu^2 angular dependence, from P01_ss,
+    P11_ss, and P02_ss
+    """
+    toret = m.P01_ss.mu2(k) + m.P11_ss.mu2(k) + m.P02_ss.mu2(k)
+    if m.correct_mu2:
+        toret += m.mu2_model_correction(k)
+    return toret
+
+def P_mu4(m, k):
+    """
+    The halo power moment with mu^4 angular dependence, from P11_ss,
+    P02_ss, P12_ss, P03_ss, P22_ss, P13_ss, and P04_ss
+    """
+    toret = m.P11_ss.mu4(k) + m.P02_ss.mu4(k) + m.P12_ss.mu4(k) + m.P03_ss.mu4(k) + \
+            m.P22_ss.mu4(k) + m.P13_ss.mu4(k) + m.P04_ss.mu4(k)
+    if m.correct_mu4:
+        toret += m.mu4_model_correction(k)
+    return toret
+
+def P_mu6(m, k):
+    """
+    The halo power moment with mu^6 angular dependence, from P12_ss
+    """
+    return m.P12_ss.mu6(k) + 1./8*m.f**4 * m.I32(k)
+
+MOMENTS = [P_mu0, P_mu2, P_mu4, P_mu6]
+
+#-------------------------------------------------------------------------------
+# the bias-independent spectra and the bias quantities
+#-------------------------------------------------------------------------------
+class BiasBasis(object):
+    """
+    The bias-independent spectra of the model, with their values
+    on the `k` grid memoized by name
+    """
+    def __init__(self, model, k):
+        self.model = model
+        self.k     = k
+        self._data = {}
+
+    def wrap(self, name, value):
+        """
+        Return the attribute ``name`` of the model with value ``value``,
+        memoizing it on the `k` grid if it is a function of `k` or a
+        power term
+        """
+        if callable(value) or isinstance(value, PowerTerm):
+            return Spectrum(self, name, value)
+        return value
+
+class Spectrum(object):
+    """
+    A bias-independent spectrum (or power term) of the model, whose
+    values on the `k` grid are memoized by a :class:`BiasBasis`
+    """
+    def __init__(self, basis, name, value):
+        self.basis = basis
+        self.name  = name
+        self.value = value
+
+    def __getattr__(self, attr):
+        return self.basis.wrap(self.name + '.' + attr, getattr(self.value, attr))
+
+    def __call__(self, k):
+        if k is not self.basis.k:
+            return self.value(k)
+        if self.name not in self.basis._data:
+            self.basis._data[self.name] = self.value(k)
+        return self.basis._data[self.name]
+
+class Tracer(object):
+    """
+    The bias quantities of a single tracer with linear bias ``b1``,
+    on the `k` grid of the model
+    """
+    def __init__(self, model, b1):
+        self.model  = model
+        self.b1     = b1
+        self.bs     = model._tidal_bias(b1)
+        self.sigmav = model._sigmav_halo(b1)
+        self.Phm    = model._Phm(b1, model.k)
+        self._b2    = {}
+
+    def b2(self, name):
+        """
+        The nonlinear bias ``name`` (i.e., `b2_00_a`) of this tracer
+        """
+        if name not in self._b2:
+            self._b2[name] = getattr(self.model, name)(self.b1)
+        return self._b2[name]
+
+class StackedTracer(object):
+    """
+    The bias quantities of a stack of tracers (see :class:`Tracer`),
+    as arrays with the tracers along the leading axis
+    """
+    def __init__(self, tracers):
+        self.tracers = tracers
+        self.b1      = np.array([t.b1 for t in tracers], dtype=float).reshape((-1, 1))
+        self.bs      = np.array([t.bs for t in tracers], dtype=float).reshape((-1, 1))
+        self.sigmav  = np.array([t.sigmav for t in tracers], dtype=float).reshape((-1, 1))
+        self.Phm     = np.array([t.Phm for t in tracers])
+        self._b2     = {}
+
+    def b2(self, name):
+        """
+        The nonlinear bias ``name`` (i.e., `b2_00_a`) of each tracer
+        """
+        if name not in self._b2:
+            values = [t.b2(name) for t in self.tracers]
+            self._b2[name] = np.array(values, dtype=float).reshape((-1, 1))
+        return self._b2[name]
+
+def biased_attributes(model):
+    """
+    The names of the attributes of ``model`` that depend on the
+    linear biases
+    """
+    cls = model.__class__
+    return cls.b1._deps | cls.b1_bar._deps | set(['b1', 'b1_bar'])
+
+class TracerPair(object):
+    """
+    The model, as seen by the biased power terms, for two tracers
+
+    The bias-dependent attributes of the model used by the power terms
+    are those of the two tracers, and any other attribute is taken
+    from the model, through the bias-independent ``basis``
+
+    Parameters
+    ----------
+    model : BiasedSpectrum
+        the model instance
+    basis : BiasBasis
+        the bias-independent spectra of the model
+    t, t_bar : Tracer
+        the bias quantities of the two tracers
+    """
+    def __init__(self, model, basis, t, t_bar):
+        self._model   = model
+        self._basis   = basis
+        self._tracers = [t, t_bar]
+        self._biased  = biased_attributes(model)
+
+        # the bias quantities
+        self._ib1, self._ib1_bar = t.b1, t_bar.b1
+        self.bs, self.bs_bar = t.bs, t_bar.bs
+        self.sigmav_halo, self.sigmav_halo_bar = t.sigmav, t_bar.sigmav
+        self._Phm = (t.Phm, t_bar.Phm)
+
+        # the biased power terms
+        self.P00_ss_no_stoch = NoStochP00PowerTerm(self)
+        self.P00_ss = P00PowerTerm(self)
+        self.P01_ss = P01PowerTerm(self)
+        self.P02_ss = P02PowerTerm(self)
+        self.P03_ss = P03PowerTerm(self)
+        self.P04_ss = P04PowerTerm(self)
+        self.P11_ss = P11PowerTerm(self)
+        self.P12_ss = P12PowerTerm(self)
+        self.P13_ss = P13PowerTerm(self)
+        self.P22_ss = P22PowerTerm(self)
+
+    def __getattr__(self, name):
+
+        # the nonlinear biases, as a function of linear bias
+        if name in self._model.nonlinear_biases:
+            return lambda b1: self._tracer(b1).b2(name)
+
+        if name in self._biased:
+            raise AttributeError("'%s' depends on the biases, and is not defined for a TracerPair" %name)
+        return self._basis.wrap(name, getattr(self._model, name))
+
+    def _tracer(self, b1):
+        """
+        The tracer whose linear bias is ``b1``, one of ``_ib1``
+        and ``_ib1_bar``
+        """
+        for t in self._tracers:
+            if b1 is t.b1: return t
+        raise KeyError("no tracer with linear bias %s" %str(b1))
+
+    def Phm(self, k):
+        """
+        The halo - matter cross correlation for the 1st tracer
+        """
+        if k is not self._basis.k:
+            return self._model._Phm(self._ib1, k)
+        return self._Phm[0]
+
+    def Phm_bar(self, k):
+        """
+        The halo - matter cross correlation for the 2nd tracer
+        """
+        if k is not self._basis.k:
+            return self._model._Phm(self._ib1_bar, k)
+        return self._Phm[1]
+
+    def stochasticity(self, k):
+        """
+        The (type B) stochasticity of the two tracers
+        """
+        return self._model._stochasticity(self._ib1, self._ib1_bar, k)
+
+    def mu2_model_correction(self, k):
+        """
+        The mu2 correction to the model of the two tracers
+        """
+        m = self._model
+        return m._model_correction(m.Pmu2_correction, self._ib1, self._ib1_bar, k)
+
+    def mu4_model_correction(self, k):
+        """
+        The mu4 correction to the model of the two tracers
+        """
+        m = self._model
+        return m._model_correction(m.Pmu4_correction, self._ib1, self._ib1_bar, k)
+
+def halo_moment(model, i, b1, b1_bar):
+    """
+    Return the halo power moment ``P_mu{2i}`` on the `k` grid of ``model``,
+    for tracers with (internal) linear biases ``b1`` and ``b1_bar``
+
+    Parameters
+    ----------
+    model : BiasedSpectrum
+        the model instance
+    i : int
+        the index of the moment, i.e., 0 for ``P_mu0``, ..., 3 for ``P_mu6``
+    b1, b1_bar : float
+        the linear biases of the two tracers
+    """
+    basis = model._bias_basis
+    t, t_bar = model._tracer_biasing(b1), model._tracer_biasing(b1_bar)
+    return MOMENTS[i](TracerPair(model, basis, t, t_bar), basis.k)
+
+class StackedTracerPair(TracerPair):
+    """
+    The model, as seen by the biased power terms, for two stacks of
+    tracers (see :class:`StackedTracer`), such that the power terms
+    return the moments of each pair of tracers along the leading axis
+
+    The quantities that depend on both biases through the simulation
+    fits (i.e., the stochasticity) are evaluated once for each distinct
+    pair of biases
+    """
+    def __init__(self, model, basis, t, t_bar):
+        super(StackedTracerPair, self).__init__(model, basis, t, t_bar)
+        self._pairs = list(zip(t.b1.ravel(), t_bar.b1.ravel()))
+
+    def _stack(self, f, k):
+        """
+        Stack ``f(b1, b1_bar, k)`` for each pair of biases
+        """
+        values = {}
+        for pair in self._pairs:
+            if pair not in values:
+                values[pair] = f(pair[0], pair[1], k)
+        return np.array([values[pair] for pair in self._pairs])
+
+    def Phm(self, k):
+        """
+        The halo - matter cross correlation for the 1st tracers
+        """
+        if k is not self._basis.k:
+            return self._stack(lambda b1, b1_bar, k: self._model._Phm(b1, k), k)
+        return self._Phm[0]
+
+    def Phm_bar(self, k):
+        """
+        The halo - matter cross correlation for the 2nd tracers
+        """
+        if k is not self._basis.k:
+            return self._stack(lambda b1, b1_bar, k: self._model._Phm(b1_bar, k), k)
+        return self._Phm[1]
+
+    def stochasticity(self, k):
+        """
+        The (type B) stochasticity of each pair of tracers
+        """
+        return self._stack(self._model._stochasticity, k)
+
+    def mu2_model_correction(self, k):
+        """
+        The mu2 correction to the model of each pair of tracers
+        """
+        m = self._model
+        return self._stack(functools.partial(m._model_correction, m.Pmu2_correction), k)
+
+    def mu4_model_correction(self, k):
+        """
+        The mu4 correction to the model of each pair of tracers
+        """
+        m = self._model
+        return self._stack(functools.partial(m._model_correction, m.Pmu4_correction), k)
+
+def stacked_halo_moments(model, b1, b1_bar):
+    """
+    Return the halo power moments ``P_mu0`` ... ``P_mu{max_mu}`` on the `k`
+    grid of ``model``, for each pair of (internal) linear biases, as
+    arrays of shape ``(len(b1), len(k))``
+
+    Parameters
+    ----------
+    model : BiasedSpectrum
+        the model instance
+    b1, b1_bar : array_like
+        the linear biases of the two tracers, for each pair
+    """
+    basis = model._bias_basis
+    t = StackedTracer([model._tracer_biasing(b) for b in b1])
+    t_bar = StackedTracer([model._tracer_biasing(b) for b in b1_bar])
+    pair = StackedTracerPair(model, basis, t, t_bar)
+
+    shape = (len(t.tracers), len(basis.k))
+    return [np.broadcast_to(f(pair, basis.k), shape) for f in MOMENTS[:model.max_mu//2+1]]
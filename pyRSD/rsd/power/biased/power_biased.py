@@ -1,11 +1,13 @@
 from __future__ import print_function
 
 import contextlib
+import functools
 from pyRSD import numpy as np
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
 
 # tools
 from pyRSD.rsd._cache import parameter, cached_property, interpolated_function, CachedProperty
+from pyRSD.rsd import tools
 from pyRSD.rsd.tools import BiasToSigmaRelation
 
 # base model
@@ -21,19 +23,32 @@ from pyRSD.rsd.simulation import CrossStochasticityFits
 # nonliner biasing
 from pyRSD.rsd.nonlinear_biasing import NonlinearBiasingMixin
 
+# moments from bias-independent spectra
+from . import bias_basis
+
 GP_NK = 20
 
 class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
     """
     The power spectrum of two biased tracers, with linear biases `b1`
     and `b1_bar` in redshift space
+
+    If ``use_bias_basis`` is `True` (the default), the power moments
+    ``P_mu0`` ... ``P_mu6`` are evaluated from bias-independent spectra,
+    which are computed once, and the moments of each pair of biases are
+    memoized (see :mod:`~pyRSD.rsd.power.biased.bias_basis`), so changing
+    the biases back and forth does not recompute the biased power terms
     """
+    # the linear biases can be broadcast, through the bias basis
+    _broadcast_parameters = DarkMatterSpectrum._broadcast_parameters + ['b1', 'b1_bar']
+
     def __init__(self, use_tidal_bias=False,
                        use_mean_bias=False,
                        vel_disp_from_sims=False,
                        correct_mu2=False,
                        correct_mu4=False,
                        use_vlah_biasing=True,
+                       use_bias_basis=True,
                        **kwargs):
 
         # initalize the dark matter power spectrum
@@ -56,6 +71,9 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         # whether to use Vlah et al nonlinear biasing
         self.use_vlah_biasing = use_vlah_biasing
 
+        # whether to assemble the power moments from the bias basis
+        self.use_bias_basis = use_bias_basis
+
         # set b1_bar, unless we are fixed
         try: self.b1_bar = 2.
         except: pass
@@ -161,6 +179,14 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         return val
 
+    @parameter
+    def use_bias_basis(self, val):
+        """
+        If `True`, evaluate the power moments from the bias-independent
+        spectra, memoizing the moments for each pair of biases
+        """
+        return val
+
     @parameter
     def b1(self, val):
         """
@@ -241,47 +267,54 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         The quadratic, nonlocal tidal bias factor for the first tracer
         """
-        if self.use_tidal_bias:
-            return -2./7 * (self._ib1 - 1.)
-        else:
-            return 0.
+        return self._tidal_bias(self._ib1)
 
     @cached_property("_ib1_bar", "use_tidal_bias")
     def bs_bar(self):
         """
         The quadratic, nonlocal tidal bias factor
         """
+        return self._tidal_bias(self._ib1_bar)
+
+    def _tidal_bias(self, b1):
+        """
+        The quadratic, nonlocal tidal bias factor for linear bias ``b1``
+        """
         if self.use_tidal_bias:
-            return -2./7 * (self._ib1_bar - 1.)
+            return -2./7 * (b1 - 1.)
         else:
             return 0.
 
-    @cached_property()
+    @cached_property("cosmo", "disk_cache", snapshot=False)
     def bias_to_sigma_relation(self):
         """
         The relationship between bias and velocity dispersion, using the
         Tinker et al. relation for halo mass and bias, and the virial theorem
         scaling between mass and velocity dispersion
         """
-        return BiasToSigmaRelation(self.z, self.cosmo, interpolate=self.interpolate)
+        kws = {'interpolate':self.interpolate, 'disk_cache':self.disk_cache}
+        return BiasToSigmaRelation(self.z, self.cosmo, **kws)
 
     @cached_property("sigma_v", "sigma_lin", "vel_disp_from_sims", "_ib1", "sigma8_z")
     def sigmav_halo(self):
         """
         The velocity dispersion for halos, possibly as a function of bias
         """
-        if self.vel_disp_from_sims:
-            return self.vel_disp_fitter(b1=self._ib1, sigma8_z=self.sigma8_z)
-        else:
-            return self.sigma_v
+        return self._sigmav_halo(self._ib1)
 
     @cached_property("sigma_v", "sigma_lin", "vel_disp_from_sims", "_ib1_bar", "sigma8_z")
     def sigmav_halo_bar(self):
         """
         The velocity dispersion for halos, possibly as a function of bias
         """
+        return self._sigmav_halo(self._ib1_bar)
+
+    def _sigmav_halo(self, b1):
+        """
+        The velocity dispersion for halos with linear bias ``b1``
+        """
         if self.vel_disp_from_sims:
-            return self.vel_disp_fitter(b1=self._ib1_bar, sigma8_z=self.sigma8_z)
+            return self.vel_disp_fitter(b1=b1, sigma8_z=self.sigma8_z)
         else:
             return self.sigma_v
 
@@ -312,33 +345,29 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         The halo - matter cross correlation for the 1st tracer
         """
-        if self.use_Phm_model:
-            toret = self.hzpt.Phm(b1=self._ib1, k=k)
-        else:
-            # the bias values to use
-            b1, b2_00 = self._ib1, self.b2_00_a(self._ib1)
-
-            term1 = b1*self.P00.mu0(k)
-            term2 = b2_00*self.K00(k)
-            term3 = self.bs*self.K00s(k)
-            toret = term1 + term2 + term3
-
-        return toret
+        return self._Phm(self._ib1, k)
 
     @interpolated_function("_ib1_bar", "P00", "use_Phm_model", "sigma8_z", "b2_00_a", "k", interp="k")
     def Phm_bar(self, k):
         """
         The halo - matter cross correlation for the 2nd tracer
         """
+        return self._Phm(self._ib1_bar, k)
+
+    def _Phm(self, b1, k):
+        """
+        The halo - matter cross correlation for a tracer with linear
+        bias ``b1``
+        """
         if self.use_Phm_model:
-            toret = self.hzpt.Phm(b1=self._ib1_bar, k=k)
+            toret = self.hzpt.Phm(b1=b1, k=k)
         else:
             # the bias values to use
-            b1_bar, b2_00_bar = self._ib1_bar, self.b2_00_a(self._ib1_bar)
+            b2_00 = self.b2_00_a(b1)
 
-            term1 = b1_bar*self.P00.mu0(k)
-            term2 = b2_00_bar*self.K00(k)
-            term3 = self.bs_bar*self.K00s(k)
+            term1 = b1*self.P00.mu0(k)
+            term2 = b2_00*self.K00(k)
+            term3 = self._tidal_bias(b1)*self.K00s(k)
             toret = term1 + term2 + term3
 
         return toret
@@ -354,14 +383,21 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         *   The model for the (type B) stochasticity, interpolated as a function
             of sigma8(z), b1, and k using a Gaussian process
         """
+        return self._stochasticity(self._ib1, self._ib1_bar, k)
+
+    def _stochasticity(self, b1, b1_bar, k):
+        """
+        The (type B) stochasticity of tracers with linear biases ``b1``
+        and ``b1_bar``
+        """
         _k = np.logspace(np.log10(self.k.min()), np.log10(self.k.max()), GP_NK)
 
         params = {'sigma8_z' : self.sigma8_z, 'k':_k}
-        if self._ib1 != self._ib1_bar:
-            b1_1, b1_2 = sorted([self._ib1, self._ib1_bar])
+        if b1 != b1_bar:
+            b1_1, b1_2 = sorted([b1, b1_bar])
             toret = self.cross_stochasticity_fits(b1_1=b1_1, b1_2=b1_2, **params)
         else:
-            toret = self.auto_stochasticity_fits(b1=self._ib1, **params)
+            toret = self.auto_stochasticity_fits(b1=b1, **params)
 
         return spline(_k, toret)(k)
 
@@ -464,62 +500,157 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         The mu2 correction to the model evaluated at `k`
         """
-        b1, b1_bar = self._ib1, self._ib1_bar
-        mean_bias = (b1*b1_bar)**0.5
-        params = {'b1':mean_bias, 'sigma8_z':self.sigma8_z, 'k':k, 'f':self.f}
-        return self.Pmu2_correction(**params)
+        return self._model_correction(self.Pmu2_correction, self._ib1, self._ib1_bar, k)
 
     @interpolated_function("_ib1", "_ib1_bar", "sigma8_z", "f", "k", interp="k")
     def mu4_model_correction(self, k):
         """
         The mu4 correction to the model evaluated at `k`
         """
-        b1, b1_bar = self._ib1, self._ib1_bar
+        return self._model_correction(self.Pmu4_correction, self._ib1, self._ib1_bar, k)
+
+    def _model_correction(self, correction, b1, b1_bar, k):
+        """
+        Evaluate the sim-calibrated ``correction`` for tracers with
+        linear biases ``b1`` and ``b1_bar``, at their mean bias
+        """
         mean_bias = (b1*b1_bar)**0.5
         params = {'b1':mean_bias, 'sigma8_z':self.sigma8_z, 'k':k, 'f':self.f}
-        return self.Pmu4_correction(**params)
+        return correction(**params)
+
+    #---------------------------------------------------------------------------
+    # power moments from the bias basis
+    #---------------------------------------------------------------------------
+    @cached_property("P00", "P01", "P02", "P11", "P12", "P22", "Pdd", "Pdv", "Pvv",
+                     "_Imn", "_Jmn", "_Kmn", "_Imn1Loop_vvdd", "_Imn1Loop_dvdv",
+                     "power_lin", "_power_norm", "k")
+    def _bias_basis(self):
+        """
+        The bias-independent spectra entering the power moments, evaluated
+        (lazily) on the `k` grid
+        """
+        return bias_basis.BiasBasis(self, self.k)
+
+    @cached_property("use_tidal_bias", "sigma_v", "sigma_lin", "vel_disp_from_sims",
+                     "use_Phm_model", "hzpt", "sigma8_z", "P00", "_Kmn", "_power_norm",
+                     "b2_00_a", "b2_00_b", "b2_00_c", "b2_00_d", "b2_01_a", "b2_01_b",
+                     "k", lru_cache=True, maxsize=100)
+    def _tracer_biasing(self):
+        """
+        The bias quantities of a single tracer on the `k` grid, as a
+        function of its linear bias
+        """
+        return functools.partial(bias_basis.Tracer, self)
+
+    @cached_property("_bias_basis", "_tracer_biasing", "f", "z", "sigma8_z",
+                     "velocity_kurtosis", "correct_mu2", "correct_mu4",
+                     lru_cache=True, maxsize=100)
+    def _halo_moments(self):
+        """
+        The power moments on the `k` grid, as a function of the index
+        of the moment and the linear biases of the two tracers
+        """
+        return functools.partial(bias_basis.halo_moment, self)
+
+    def _from_bias_basis(self, k):
+        """
+        Whether to evaluate the power moments at ``k`` from the bias basis,
+        which is the case when evaluating them on the `k` grid without
+        any overrides of the cache
+        """
+        if not self.use_bias_basis or getattr(self, '_cache_overrides', None):
+            return False
+        return np.shape(k) == self.k.shape and np.array_equal(k, self.k)
+
+    def _can_stack_biases(self):
+        """
+        Whether the power can be evaluated for a column of linear biases,
+        which requires the power moments from the bias basis
+        """
+        return self.use_bias_basis and not getattr(self, '_cache_overrides', None)
+
+    def _broadcast_names(self):
+        """
+        The names of the parameters that :func:`power_batch` broadcasts,
+        excluding the biases if they cannot be stacked
+        """
+        toret = super(BiasedSpectrum, self)._broadcast_names()
+        if not self._can_stack_biases():
+            toret -= set(['b1', 'b1_bar'] + getattr(self, '_bias_parameters', []))
+        return toret
+
+    def _stacked_moments(self):
+        """
+        The domain of the power moments, and the moments ``P_mu0`` ...
+        ``P_mu{max_mu}`` on it, for each pair of the linear biases, which
+        are columns of values
+        """
+        b1, b1_bar = np.broadcast_arrays(np.ravel(self._ib1), np.ravel(self._ib1_bar))
+        return self.k, bias_basis.stacked_halo_moments(self, b1, b1_bar)
+
+    @tools.alcock_paczynski
+    def _stacked_power(self, k, mu):
+        """
+        Return the AP-distorted power, for each pair of the linear biases
+        """
+        if self.max_mu > 6:
+            raise NotImplementedError("cannot compute power spectrum including terms with order higher than mu^6")
+
+        domain, moments = self._stacked_moments()
+        moments = tools.evaluate_splines(domain, np.array(moments), k)
+        toret = sum(mu**(2*i) * Pmu for i, Pmu in enumerate(moments))
+
+        return np.nan_to_num(toret)
+
+    def _power(self, k, mu):
+        """
+        Return the power as sum of mu powers, evaluated for each pair of
+        the linear biases if these are columns of values
+        """
+        if np.ndim(self._ib1) or np.ndim(self._ib1_bar):
+            return self._stacked_power(k, mu)
+        return super(BiasedSpectrum, self)._power(k, mu)
 
     #---------------------------------------------------------------------------
     # power as a function of mu
     #---------------------------------------------------------------------------
-    @interpolated_function("P00_ss", "k", interp="k")
+    @interpolated_function("P00_ss", "use_bias_basis", "k", interp="k")
     def P_mu0(self, k):
         """
         The full halo power spectrum term with no angular dependence. Contributions
         from P00_ss.
         """
-        return self.P00_ss.mu0(k)
+        if self._from_bias_basis(k):
+            return self._halo_moments(0, self._ib1, self._ib1_bar)
+        return bias_basis.P_mu0(self, k)
 
-    @interpolated_function("P01_ss", "P11_ss", "P02_ss", "correct_mu2", "k", interp="k")
+    @interpolated_function("P01_ss", "P11_ss", "P02_ss", "correct_mu2", "use_bias_basis", "k", interp="k")
     def P_mu2(self, k):
         """
         The full halo power spectrum term with mu^2 angular dependence. Contributions
         from P01_ss, P11_ss, and P02_ss.
         """
-        P_mu2 = self.P01_ss.mu2(k) + self.P11_ss.mu2(k) + self.P02_ss.mu2(k)
-        if self.correct_mu2:
-            P_mu2 += self.mu2_model_correction(k)
-
-        return P_mu2
+        if self._from_bias_basis(k):
+            return self._halo_moments(1, self._ib1, self._ib1_bar)
+        return bias_basis.P_mu2(self, k)
 
     @interpolated_function("P11_ss", "P02_ss", "P12_ss", "P22_ss", "P03_ss",
-                           "P13_ss", "P04_ss", "correct_mu4", "k", interp="k")
+                           "P13_ss", "P04_ss", "correct_mu4", "use_bias_basis", "k", interp="k")
     def P_mu4(self, k):
         """
         The full halo power spectrum term with mu^4 angular dependence. Contributions
         from P11_ss, P02_ss, P12_ss, P03_ss, P13_ss, P22_ss, and P04_ss.
         """
-        P_mu4 = self.P11_ss.mu4(k) + self.P02_ss.mu4(k) + self.P12_ss.mu4(k) + self.P03_ss.mu4(k) + \
-                self.P22_ss.mu4(k) + self.P13_ss.mu4(k) + self.P04_ss.mu4(k)
-        if self.correct_mu4:
-            P_mu4 += self.mu4_model_correction(k)
-
-        return P_mu4
+        if self._from_bias_basis(k):
+            return self._halo_moments(2, self._ib1, self._ib1_bar)
+        return bias_basis.P_mu4(self, k)
 
-    @interpolated_function("P12_ss", "k", interp="k")
+    @interpolated_function("P12_ss", "use_bias_basis", "k", interp="k")
     def P_mu6(self, k):
         """
         The full halo power spectrum term with mu^6 angular dependence. Contributions
         from P12_ss, P13_ss, P22_ss.
         """
-        return self.P12_ss.mu6(k) + 1./8*self.f**4 * self.I32(k)
+        if self._from_bias_basis(k):
+            return self._halo_moments(3, self._ib1, self._ib1_bar)
+        return bias_basis.P_mu6(self, k)
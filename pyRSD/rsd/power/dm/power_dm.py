@@ -1,11 +1,13 @@
 import fnmatch
 import contextlib
+from collections import OrderedDict
 import warnings
 from six import string_types
 from scipy.special import legendre
 from scipy.integrate import simps
 
 from pyRSD.rsd._cache import Cache, parameter, interpolated_function, cached_property
+from pyRSD.rsd._cache import _hashable, _is_number
 from pyRSD.rsd import cosmology, tools, INTERP_KMIN, INTERP_KMAX, __version__
 from pyRSD import pygcl, numpy as np, data as sim_data, os
 
@@ -23,11 +25,24 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
     spline = tools.RSDSpline
     spline_kwargs = {'bounds_error' : True, 'fill_value' : 0}
 
+    # the redshift setter also updates the redshift parameters from ``cosmo``
+    _always_set = set(['z'])
+
+    # power() is a polynomial in mu, without anisotropic AP distortions
+    _mu_polynomial = True
+
+    # cached values stored in snapshots, which would otherwise run CLASS on load
+    _snapshot_cached = ['cosmo']
+
+    # the parameters that power_batch() sets to a column of values, one for
+    # each parameter set, which broadcast through power()
+    _broadcast_parameters = ['alpha_par', 'alpha_perp', 'alpha_drag']
+
     def __init__(self, kmin=1e-3,
                        kmax=0.5,
                        Nk=200,
                        z=0.,
-                       params=cosmology.Planck15,
+                       params=None,
                        include_2loop=False,
                        transfer_fit="CLASS",
                        max_mu=4,
@@ -36,6 +51,9 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
                        linear_power_file=None,
                        Pdv_model_type='jennings',
                        redshift_params=[],
+                       pt_engine='cubature',
+                       disk_cache=True,
+                       hzpt_table_kws={},
                        **kwargs):
         """
         Parameters
@@ -52,9 +70,10 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         z : float, optional
             The redshift to compute the power spectrum at. Default = 0.
 
-        params : pyRSD.cosmology.Cosmology, str
+        params : pyRSD.cosmology.Cosmology, str, optional
             Either a Cosmology instance or the name of a file to load
-            parameters from; see the 'data/params' directory for examples
+            parameters from; see the 'data/params' directory for examples.
+            Default is the Planck15 cosmology
 
         include_2loop : bool, optional
             If `True`, include 2-loop contributions in the model terms. Default
@@ -87,6 +106,24 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
 
         redshift_params : list of str, optional
             the names of parameters to be updated when redshift changes
+
+        pt_engine : str, optional ('cubature')
+            the method used to compute the PT integrals; either `cubature`,
+            which uses adaptive integration at each wavenumber, or `fftlog`,
+            which uses a power-law decomposition of the linear power spectrum
+            and is much faster when the cosmology varies
+
+        disk_cache : bool, optional (`True`)
+            whether to store the PT integrals and HZPT interpolation tables
+            on disk, keyed by a hash of the cosmology, and load them from
+            there when the cosmology is known;
+            the cache directory is ``~/.cache/pyRSD`` or ``PYRSD_CACHE_DIR``
+
+        hzpt_table_kws : dict, optional
+            keywords for the interpolation tables of the HZPT models, i.e.,
+            ``Nsigma8`` and ``Nk`` to set the grid size, or ``rtol`` to refine
+            the ``sigma8_z`` grid adaptively; see
+            :class:`~pyRSD.rsd.hzpt.interpolated.InterpolationTable`
         """
         # overload cosmo with a cosmo_filename kwargs to handle deprecated syntax
         if 'cosmo_filename' in kwargs:
@@ -110,6 +147,9 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         self.k0_low            = k0_low
         self.linear_power_file = linear_power_file
         self.Pdv_model_type    = Pdv_model_type
+        self.pt_engine         = pt_engine
+        self.disk_cache        = disk_cache
+        self.hzpt_table_kws    = hzpt_table_kws
         
         # set these last
         self.redshift_params = redshift_params
@@ -640,6 +680,34 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
             raise ValueError("`Pdv_model_type` must be one of %s" %str(allowed))
         return val
 
+    @parameter(default='cubature')
+    def pt_engine(self, val):
+        """
+        Either `cubature` or `fftlog` to describe how the PT integrals
+        are computed
+        """
+        allowed = ['cubature', 'fftlog']
+        if val not in allowed:
+            raise ValueError("`pt_engine` must be one of %s" %str(allowed))
+        return val
+
+    @parameter(default=True)
+    def disk_cache(self, val):
+        """
+        Whether to store the PT integrals and HZPT interpolation
+        tables in the disk cache
+        """
+        return bool(val)
+
+    @parameter(default={})
+    def hzpt_table_kws(self, val):
+        """
+        Keywords for the interpolation tables of the HZPT models, i.e.,
+        the grid size (``Nsigma8``, ``Nk``) or the tolerance of the
+        adaptive ``sigma8_z`` grid (``rtol``, ``Nmax``)
+        """
+        return dict(val)
+
     @parameter
     def redshift_params(self, val):
         """
@@ -649,15 +717,16 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
             raise ValueError("valid parameters for redshift scaling: 'f' and 'sigma8_z'")
         return val
 
-    @cached_property("cosmo")
+    @cached_property("cosmo", "disk_cache", "hzpt_table_kws", snapshot=False)
     def hzpt(self):
         """
         The class holding the (possibly interpolated) HZPT models
         """
-        kw = {'interpolate':self.interpolate}
+        kw = {'interpolate':self.interpolate, 'disk_cache':self.disk_cache}
+        kw.update(self.hzpt_table_kws)
         return InterpolatedHZPTModels(self.cosmo, self.sigma8_z, self.f, **kw)
 
-    @cached_property("power_lin")
+    @cached_property("power_lin", snapshot=False)
     def P11_sim_model(self):
         """
         The class holding the model for the P11 dark matter term, based
@@ -665,7 +734,7 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         """
         return SimulationP11(self.power_lin, self.z, self.sigma8_z, self.f)
 
-    @cached_property("power_lin")
+    @cached_property("power_lin", snapshot=False)
     def Pdv_sim_model(self):
         """
         The class holding the model for the Pdv dark matter term, based
@@ -720,9 +789,42 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
     def to_npy(self, filename):
         """
         Save to a ``.npy`` file by calling :func:`numpy.save`
+
+        .. note::
+            :func:`to_snapshot` is much faster to load
         """
         np.save(filename, self)
 
+    def to_snapshot(self, path, initialize=True):
+        """
+        Save to a snapshot directory, which holds the configuration of the
+        model and its arrays (see :mod:`pyRSD.rsd.snapshot`)
+
+        Parameters
+        ----------
+        path : str
+            the name of the snapshot directory
+        initialize : bool, optional
+            whether to initialize the model first, so the snapshot
+            holds the PT integrals and interpolation tables
+        """
+        from pyRSD.rsd.snapshot import save_snapshot
+        save_snapshot(self, path, initialize=initialize)
+
+    @classmethod
+    def from_snapshot(cls, path, check=True, show_warning=True):
+        """
+        Load a model from a snapshot directory, raising an
+        :class:`~pyRSD.rsd.snapshot.IncompatibleSnapshotError` if it was
+        saved by another model release and ``check`` is `True`
+        (see :func:`~pyRSD.rsd.snapshot.load_snapshot`)
+        """
+        from pyRSD.rsd.snapshot import load_snapshot
+        model = load_snapshot(path, check=check, show_warning=show_warning)
+        if not isinstance(model, cls):
+            raise TypeError("snapshot holds a %s, not a %s" %(model.__class__.__name__, cls.__name__))
+        return model
+
     @classmethod
     def from_npy(cls, filename):
         """
@@ -734,17 +836,6 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
     #---------------------------------------------------------------------------
     # utility functions
     #---------------------------------------------------------------------------
-    def update(self, **kwargs):
-        """
-        Update the attributes. Checks that the current value is not equal to
-        the new value before setting.
-        """
-        for k, v in kwargs.items():
-            try:
-                setattr(self, k, v)
-            except Exception as e:
-                raise RuntimeError("failure to set parameter `%s` to value %s: %s" %(k, str(v), str(e)))
-
     @classmethod
     def default_config(cls, **params):
         """
@@ -1013,10 +1104,156 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
 
         return pkmu
 
-    def poles(self, k, ells, Nmu=40):
+    def power_array(self, k, mu, out=None, flatten=False):
+        """
+        The redshift space power spectrum as a function of ``k`` and ``mu``,
+        returned as a contiguous numpy array rather than a
+        :class:`xarray.DataArray`
+
+        This skips the coordinate handling of :func:`power`, for use
+        in the inner loop of a fit.
+
+        Parameters
+        ----------
+        k : float or array_like
+            The wavenumbers in `h/Mpc` to evaluate the model at
+        mu : float, array_like
+            The mu values to evaluate the power at.
+        out : array_like, optional
+            If provided, the power is written into this array, which must
+            have the size of the result
+        flatten : bool, optional
+            If `True`, flatten the returned array
+
+        Returns
+        -------
+        pkmu : array_like
+            The power model P(k, mu), with the same shape as :func:`power`
+        """
+        return self.power(k, mu, flatten=flatten, raw=True, out=out)
+
+    def _broadcast_names(self):
+        """
+        The names of the parameters that :func:`power_batch` broadcasts
+        along a leading axis, rather than setting them for each
+        parameter set
+        """
+        return set(self._broadcast_parameters)
+
+    def power_batch(self, k, mu, thetas, flatten=False):
+        """
+        The redshift space power spectrum at ``k`` and ``mu`` for each of
+        a list of parameter sets, as a single array
+
+        The parameter sets are grouped by the values of the parameters
+        that cannot be broadcast (i.e., the cosmology and growth rate),
+        which are set once per group. The parameters of the model listed
+        in ``_broadcast_parameters`` (i.e., the AP parameters, and the
+        biases, velocity dispersions, and shot noise of the biased models)
+        are set to a column of values, one for each parameter set of the
+        group, such that the cached spectra are evaluated once and the
+        power of the group is a single broadcasted evaluation
+
+        The parameters of the model are restored on return.
+
+        Parameters
+        ----------
+        k : float or array_like
+            The wavenumbers in `h/Mpc` to evaluate the model at
+        mu : float, array_like
+            The mu values to evaluate the power at.
+        thetas : list of dict
+            the parameter sets, as dictionaries of parameter values that
+            can be passed to :func:`update`
+        flatten : bool, optional
+            If `True`, flatten the power of each parameter set
+
+        Returns
+        -------
+        pkmu : array_like
+            The power of each parameter set, with the shape of
+            :func:`power_array` preceded by the number of parameter sets
+        """
+        if not len(thetas):
+            raise ValueError("at least one parameter set is required")
+
+        # the (k,mu) pairs to evaluate, flattened as in power(flatten=True)
+        kk, mm = tools.broadcast_kmu_arrays(k, mu)
+        kf = np.ravel(kk, order='F'); mf = np.ravel(mm, order='F')
+        M = len(kf)
+
+        # at least 2 pairs, which is not squeezed by power()
+        if M == 1:
+            kf, mf = np.repeat(kf, 2), np.repeat(mf, 2)
+
+        # group the parameter sets by the values of the slow parameters
+        fast_names = self._broadcast_names()
+        groups = OrderedDict()
+        for i, theta in enumerate(thetas):
+            key = []
+            for name in sorted(theta):
+                if name in fast_names and _is_number(theta[name]):
+                    continue
+                key.append((name, _hashable(theta[name])))
+            groups.setdefault(tuple(key), []).append(i)
+
+        # save the values of the parameters that are set
+        names = set()
+        for theta in thetas: names |= set(theta)
+        saved = {name:self.__dict__.get('__'+name, None) for name in names if name in self._param_names}
+
+        toret = np.empty((len(thetas), M))
+        try:
+            for key, index in groups.items():
+                slow = [name for name, _ in key]
+                self.update(**{name:thetas[index[0]][name] for name in slow})
+
+                # a single parameter set is evaluated as usual
+                if len(index) == 1:
+                    self.update(**thetas[index[0]])
+                    P = self.power_array(kf, mf)
+                    toret[index] = P[:M]
+                    continue
+
+                # set the fast parameters of the group to columns
+                fast = set(thetas[index[0]]) - set(slow)
+                for name in fast:
+                    values = np.array([thetas[i][name] for i in index], dtype=float)
+                    setattr(self, name, values.reshape((-1, 1)))
+
+                P = self.power(kf, mf, raw=True)
+                toret[index] = np.broadcast_to(P, (len(index), len(kf)))[:, :M]
+        finally:
+            for name, value in saved.items():
+                if value is not None and not np.ndim(self.__dict__.get('__'+name)):
+                    setattr(self, name, value)
+                    continue
+
+                # a column of values compares equal to a constant, so
+                # unset the parameter and clear the dependent attributes
+                if '__'+name in self.__dict__:
+                    delattr(self, name)
+                for dep in getattr(self.__class__, name)._deps:
+                    self._cache.pop(dep, None)
+                if value is not None:
+                    setattr(self, name, value)
+
+        # the power of each parameter set, with the shape of power_array()
+        if flatten:
+            return toret
+        shape = tuple(n for n in kk.shape if n != 1) or (1,)
+        return toret.reshape((len(thetas),) + kk.shape, order='F').reshape((len(thetas),) + shape)
+
+    def poles(self, k, ells, Nmu=None, rtol=1e-5):
         """
         The multipole moments of the redshift-space power spectrum
 
+        If the power is a polynomial in ``mu``, i.e., without the anisotropic
+        AP effect (``alpha_par == alpha_perp``), the multipoles are computed
+        exactly from the ``mu`` moments (see :func:`mu_moments`); otherwise,
+        the ``mu`` integral uses an adaptive Gauss-Legendre rule (see
+        :func:`pyRSD.rsd.multipoles.gauss_legendre_poles`)
+
         Parameters
         ----------
         k : float, array_like
@@ -1024,24 +1261,78 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         ells : int, array_like
             The `ell` values of the multipole moments
         Nmu : int, optional
-            the number of ``mu`` bins to use when performing the multipole
-            integration
+            if given, the number of ``mu`` bins to use when performing the
+            multipole integration with Simpson's rule
+        rtol : float, optional
+            the relative tolerance of the Gauss-Legendre integration
 
         Returns
         -------
-        poles : array_like
-            returns tuples of arrays for each ell value in ``poles``
+        poles : xarray.DataArray
+            the multipoles, with ``k`` and ``ell`` dimensions
+
+        Notes
+        -----
+        Previously, the default was Simpson's rule with ``Nmu=40``; the
+        default multipoles now agree with those to the accuracy of
+        Simpson's rule, and passing ``Nmu=40`` restores the old integration
         """
         from pyRSD.rsd.transfers import MultipoleTransfer
+        import xarray as xr
 
-        # the transfer
-        t = MultipoleTransfer(k, ells, Nmu=Nmu)
+        # Simpson's rule on a uniform grid
+        if Nmu is not None:
+            t = MultipoleTransfer(k, ells, Nmu=Nmu)
+            P = self.power(t.flatk, t.flatmu)
+            return t(P)
 
-        # evaluate the model on the grid
-        P = self.power(t.flatk, t.flatmu)
+        k = np.array(k, ndmin=1, dtype=float)
+        ells = np.array(ells, ndmin=1)
+        Pell = self._poles(k, ells, rtol=rtol)
+        return xr.DataArray(Pell.T, coords=[('k', k), ('ell', ells)])
 
-        # return the transferred power
-        return t(P)
+    def _poles(self, k, ells, rtol=1e-5):
+        """
+        Internal function returning the multipoles as an array of
+        shape ``(len(ells), len(k))``
+        """
+        from pyRSD.rsd import multipoles
+
+        if self.has_mu_moments():
+            C = multipoles.moment_coefficients(ells, self.max_mu)
+            return np.dot(C, self.mu_moments(k))
+        else:
+            power = lambda k, mu: self.power(k, mu)
+            return multipoles.gauss_legendre_poles(power, k, ells, rtol=rtol)
+
+    def has_mu_moments(self):
+        """
+        Whether :func:`power` is a polynomial in ``mu``, with coefficients
+        given by :func:`mu_moments`, which is the case without FOG damping
+        and anisotropic AP distortions
+        """
+        return self._mu_polynomial and self.alpha_par == self.alpha_perp
+
+    def mu_moments(self, k):
+        """
+        The (AP-distorted) coefficients of ``mu^(2n)`` in :func:`power`,
+        for ``n = 0, ..., max_mu/2``
+
+        These are only the coefficients of the power if
+        :func:`has_mu_moments` is `True`
+
+        Returns
+        -------
+        moments : array_like, (max_mu//2+1, len(k))
+            the coefficients of each power of ``mu``
+        """
+        if self.max_mu > 6:
+            raise NotImplementedError("cannot compute power spectrum including terms with order higher than mu^6")
+
+        # with isotropic AP, k is rescaled and the mu=1 power is the moment
+        k = np.array(k, ndmin=1, dtype=float)
+        funcs = [self._P_mu0, self._P_mu2, self._P_mu4, self._P_mu6]
+        return np.array([funcs[i](k, 1.) for i in range(self.max_mu//2 + 1)])
 
     def apply_transfer(self, transfer):
         """
@@ -1159,36 +1450,55 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
 
         return np.nan_to_num(toret)
 
-    @tools.monopole
-    def monopole(self, k, mu, **kwargs):
+    def _single_pole(self, k, ell, rtol):
+        """
+        Internal function returning the multipole ``ell``
+
+        These methods were previously called as ``(k, mu)``, with ``mu``
+        unused; a ``mu`` array passed in place of ``rtol`` is ignored,
+        with a :class:`DeprecationWarning`
+        """
+        if np.ndim(rtol):
+            msg = "the `mu` argument of the multipole methods is deprecated and ignored; "
+            msg += "use `rtol` to set the accuracy of the mu integration"
+            warnings.warn(msg, DeprecationWarning, stacklevel=3)
+            rtol = 1e-5
+        return self._poles(np.array(k, ndmin=1, dtype=float), [ell], rtol=float(rtol))[0]
+
+    def monopole(self, k, rtol=1e-5):
         """
         The monopole moment of the power spectrum. Include mu terms up to
         mu**max_mu.
+
+        See :func:`poles` for the ``mu`` integration and ``rtol``.
         """
-        return self.power(k, mu, **kwargs)
+        return self._single_pole(k, 0, rtol)
 
-    @tools.quadrupole
-    def quadrupole(self, k, mu, **kwargs):
+    def quadrupole(self, k, rtol=1e-5):
         """
         The quadrupole moment of the power spectrum. Include mu terms up to
         mu**max_mu.
+
+        See :func:`poles` for the ``mu`` integration and ``rtol``.
         """
-        return self.power(k, mu, **kwargs)
+        return self._single_pole(k, 2, rtol)
 
-    @tools.hexadecapole
-    def hexadecapole(self, k, mu, **kwargs):
+    def hexadecapole(self, k, rtol=1e-5):
         """
         The hexadecapole moment of the power spectrum. Include mu terms up to
         mu**max_mu.
+
+        See :func:`poles` for the ``mu`` integration and ``rtol``.
         """
-        return self.power(k, mu, **kwargs)
+        return self._single_pole(k, 4, rtol)
 
-    @tools.tetrahexadecapole
-    def tetrahexadecapole(self, k, mu, **kwargs):
+    def tetrahexadecapole(self, k, rtol=1e-5):
         """
         The tetrahexadecapole (ell=6) moment of the power spectrum
+
+        See :func:`poles` for the ``mu`` integration and ``rtol``.
         """
-        return self.power(k, mu, **kwargs)
+        return self._single_pole(k, 6, rtol)
 
 
 class PowerTerm(object):
@@ -99,6 +99,10 @@ class TwoHaloTerm(object):
         """
         Evaluate the two-halo power by calling :func:`power`,
         evaluated at (`k`,`mu`)
+
+        The power moments of each pair of biases are memoized by the
+        model (see :mod:`~pyRSD.rsd.power.biased.bias_basis`), so setting
+        the biases only rebuilds the splines of the moments
         """
         with self.set_biases():
             return super(self.model.__class__, self.model).power(k, mu)
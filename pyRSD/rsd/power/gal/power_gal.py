@@ -70,6 +70,18 @@ class GalaxySpectrum(BiasedSpectrum):
         accounting for extra structure around centrals due
         to SO halo finders; default is `False`
     """
+    # the FOG damping is not a polynomial in mu
+    _mu_polynomial = False
+
+    # the two-halo terms set the biases ``b1`` and ``b1_bar`` from these
+    # parameters on every evaluation (see :class:`TwoHaloTerm`)
+    _bias_parameters = ['b1_cA', 'b1_cB', 'b1_sA', 'b1_sB']
+
+    # the sample fractions, velocity dispersions, and one-halo terms
+    # enter the power as array arithmetic, and broadcast
+    _broadcast_parameters = BiasedSpectrum._broadcast_parameters + _bias_parameters + \
+                            ['fs', 'fcB', 'fsB', 'sigma_c', 'sigma_s', 'sigma_sA', 'sigma_sB',
+                             'sigma_so', 'f_so', 'NcBs', 'NsBsB', 'N']
 
     def __init__(self, fog_model='modified_lorentzian',
                  use_so_correction=False,
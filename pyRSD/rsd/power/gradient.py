@@ -88,7 +88,7 @@ def _call_power_from_driver(k, mu, theta):
     from pyRSD.rsdfit import GlobalFittingDriver
     driver = GlobalFittingDriver.get()
     driver.theory.set_free_parameters(theta)
-    return driver.model.power(k, mu)
+    return driver.model.power_array(k, mu)
 
 class PkmuGradient(object):
     """
@@ -186,9 +186,10 @@ class PkmuGradient(object):
                 ii = Ellipsis
             tasks = numpy.concatenate([(theta+increments)[ii], (theta-increments)[ii]], axis=0)
 
-            # how to map
+            # how to map; without a pool, the tasks are evaluated together,
+            # broadcasting the parameters that do not invalidate the model
             if pool is None:
-                results = numpy.asarray([self._call_power(k, mu, t) for t in tasks])
+                results = self.model.power_batch(k, mu, [self._model_params(t) for t in tasks], flatten=True)
             else:
                 results = numpy.array(pool.map(self._call_power_mpi, tasks))
             results = results.reshape((2, -1, len(k)))
@@ -210,15 +211,12 @@ class PkmuGradient(object):
         """
         Internal function to update the parameters and the model
         """
-        self.pars.update_values(**dict(zip(self.pars.free_names, theta)))
-        self.model.update(**self.pars.to_dict())
+        self.model.update(**self._model_params(theta))
 
-    def _call_power(self, k, mu, theta):
+    def _model_params(self, theta):
         """
-        Internal function that handles updating the model and calling power(k,mu)
-
-        This is defined at the module level so we can pickle it
+        Internal function returning the model parameters for the free
+        parameters ``theta``
         """
-        # update the parameters
-        self._update(theta)
-        return self.model.power(k, mu).values # return numpy array, not DataArray
+        self.pars.update_values(**dict(zip(self.pars.free_names, theta)))
+        return self.pars.to_dict()
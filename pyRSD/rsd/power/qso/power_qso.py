@@ -54,6 +54,12 @@ class QuasarSpectrum(HaloSpectrum):
     """
     k_interp = np.logspace(np.log10(1e-8), np.log10(100.0), 500)
 
+    # the FOG damping is not a polynomial in mu
+    _mu_polynomial = False
+
+    # the velocity dispersion and shot noise broadcast
+    _broadcast_parameters = HaloSpectrum._broadcast_parameters + ['sigma_fog', 'N']
+
     def __init__(self, fog_model='gaussian', **kwargs):
         """
         Initialize the QuasarSpectrum
@@ -207,10 +213,16 @@ class QuasarSpectrum(HaloSpectrum):
         """
         The scale-dependent bias introduced by primordial non-Gaussianity
         """
+        return self._delta_bias(self.b1, k)
+
+    def _delta_bias(self, b1, k):
+        """
+        The scale-dependent bias of a tracer with linear bias ``b1``
+        """
         if self.f_nl == 0:
             return k*0.
 
-        return 2*(self.b1-self.p)*self.f_nl*self.delta_crit/self.alpha_png(k)
+        return 2*(b1-self.p)*self.f_nl*self.delta_crit/self.alpha_png(k)
 
     @interpolated_function("k", "b1", "delta_bias")
     def btot(self, k):
@@ -251,6 +263,25 @@ class QuasarSpectrum(HaloSpectrum):
         """
         return k*0.
 
+    def _can_stack_biases(self):
+        """
+        The Kaiser power moments are evaluated for a column of linear biases
+        """
+        return True
+
+    def _stacked_moments(self):
+        """
+        The interpolation domain, and the power moments on it for each
+        of the linear biases, which are a column of values
+        """
+        k = self.k_interp
+        Plin = self.normed_power_lin(k)
+        btot = np.ravel(self.b1)[:,None]
+        btot = btot + self._delta_bias(btot, k)
+
+        moments = [btot**2 * Plin, 2*self.f*btot * Plin, self.f**2 * Plin + 0*btot, 0*btot*k]
+        return k, moments[:self.max_mu//2+1]
+
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def power(self, k, mu, flatten=False):
@@ -279,10 +310,10 @@ class QuasarSpectrum(HaloSpectrum):
 
         # add FOG damping
         G = self.FOG(k, mu, self.sigma_fog)
-        pkmu *= G**2
+        pkmu = pkmu * G**2
 
         # add shot noise offset
-        pkmu += self.N
+        pkmu = pkmu + self.N
 
         if flatten:
             pkmu = np.ravel(pkmu, order='F')
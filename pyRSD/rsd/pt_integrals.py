@@ -2,7 +2,9 @@ from functools import wraps
 from .. import pygcl, numpy as np
 from ._cache import parameter, interpolated_function, cached_property
 from .tools import RSDSpline as spline
-from . import INTERP_KMIN, INTERP_KMAX
+from .fftlog_pt import FFTLogPT, FFTLogImn, FFTLogJmn, FFTLogKmn
+from ._disk_cache import DiskCache, cosmology_hash, persisted, enabled as disk_cache_enabled
+from . import INTERP_KMIN, INTERP_KMAX, __version__
 
 #-------------------------------------------------------------------------------
 # decorators to properly normalize integrals
@@ -49,6 +51,15 @@ class PTIntegralsMixin(object):
     The class is written such that the computationally-expensive parts do not
     depend on changes in sigma8(z) so the integrals can be renormalized to
     the correct sigma8(z) with an overall scaling
+
+    If ``pt_engine`` is `fftlog`, the Imn, Jmn, Kmn integrals and the 1-loop
+    power spectra are computed from a power-law decomposition of the linear
+    power spectrum (see :class:`~pyRSD.rsd.fftlog_pt.FFTLogPT`), rather than
+    with adaptive cubature at each wavenumber
+
+    If ``disk_cache`` is `True`, the tabulated integrals and 1-loop power
+    spectra are stored on disk, keyed by a hash of the cosmology, and
+    loaded from there for a known cosmology (see :mod:`pyRSD.rsd._disk_cache`)
     """
     def __init__(self):
 
@@ -56,59 +67,121 @@ class PTIntegralsMixin(object):
         msg = "Integrals: input linear power spectrum must be defined at z = 0"
         assert self.power_lin.GetRedshift() == 0., msg
 
+    @cached_property("power_lin", "pt_engine", "disk_cache")
+    def _disk_cache(self):
+        """
+        The disk cache holding the PT integrals for the current cosmology,
+        or `None` if the disk cache is disabled
+        """
+        if not self.disk_cache or not disk_cache_enabled():
+            return None
+
+        cosmo = self.power_lin.GetCosmology()
+        key = cosmology_hash(cosmo, self.pt_engine, __version__)
+        return DiskCache(key)
+
     #---------------------------------------------------------------------------
     # one-loop power spectra
     #---------------------------------------------------------------------------
     @cached_property("power_lin")
+    def _fftlog_pt(self):
+        """
+        The FFTLog engine for the PT integrals, used if ``pt_engine`` is `fftlog`
+        """
+        return FFTLogPT(self.power_lin)
+
+    def _oneloop_spectrum(self, cls, name):
+        """
+        Initialize a 1-loop power spectrum class, using precomputed
+        1-loop power from the FFTLog engine if requested
+
+        The 1-loop power is stored in the disk cache, if enabled
+        """
+        if self.pt_engine == 'fftlog':
+            compute = lambda: self._fftlog_pt.oneloop_power(name)
+        else:
+            compute = lambda: cls(self.power_lin).GetOneLoopPower()
+
+        power = persisted(self, 'oneloop_' + name, compute)
+        return cls(self.power_lin, 1e-4, power)
+
+    @cached_property("power_lin", "pt_engine")
     def _Pdd_0(self):
         """
         The 1-loop density auto spectrum
         """
-        return pygcl.OneLoopPdd(self.power_lin)
+        return self._oneloop_spectrum(pygcl.OneLoopPdd, 'dd')
 
-    @cached_property("power_lin")
+    @cached_property("power_lin", "pt_engine")
     def _Pdv_0(self):
         """
         The 1-loop density-velocity cross spectrum
         """
-        return pygcl.OneLoopPdv(self.power_lin)
+        return self._oneloop_spectrum(pygcl.OneLoopPdv, 'dv')
 
-    @cached_property("power_lin")
+    @cached_property("power_lin", "pt_engine")
     def _Pvv_0(self):
         """
         The 1-loop velocity auto spectrum
         """
-        return pygcl.OneLoopPvv(self.power_lin)
+        return self._oneloop_spectrum(pygcl.OneLoopPvv, 'vv')
 
-    @cached_property("power_lin")
+    @cached_property("power_lin", "pt_engine")
     def _P22bar_0(self):
         """
         The 1-loop P22 power spectrum
         """
-        return pygcl.OneLoopP22Bar(self.power_lin)
+        return self._oneloop_spectrum(pygcl.OneLoopP22Bar, 'P22bar')
 
     #---------------------------------------------------------------------------
     # drivers for the various PT integrals -- depend on Plin
     #---------------------------------------------------------------------------
-    @cached_property("power_lin")
+    @cached_property("power_lin", "pt_engine")
     def _Imn(self):
         """
         The internal driver class to compute the I(m, n) integrals
         """
+        if self.pt_engine == 'fftlog':
+            return FFTLogImn(self._fftlog_pt)
         return pygcl.Imn(self.power_lin)
 
-    @cached_property("power_lin")
+    @cached_property("_Imn")
+    def _Imn_table(self):
+        """
+        All 16 I(m, n) integrals evaluated at ``k_interp``, with shape
+        ``(len(k_interp), 16)`` and column index ``4*m + n``
+
+        The integrals are computed together, sharing the integration nodes
+        and the linear power spectrum evaluations
+        """
+        k = self.k_interp
+        return self._Imn.EvaluateManyAll(k).reshape((len(k), 16))
+
+    def _evaluate_Imn(self, k, m, n):
+        """
+        Evaluate the unnormalized I(m, n) integral, using the shared table
+        when ``k`` is the interpolation domain
+        """
+        if k is getattr(self, 'k_interp', None):
+            return self._Imn_table[:, 4*m + n]
+        return self._Imn(k, m, n)
+
+    @cached_property("power_lin", "pt_engine")
     def _Jmn(self):
         """
         The internal driver class to compute the J(m, n) integrals
         """
+        if self.pt_engine == 'fftlog':
+            return FFTLogJmn(self._fftlog_pt)
         return pygcl.Jmn(self.power_lin)
 
-    @cached_property("power_lin")
+    @cached_property("power_lin", "pt_engine")
     def _Kmn(self):
         """
         The internal driver class to compute the J(m, n) integrals
         """
+        if self.pt_engine == 'fftlog':
+            return FFTLogKmn(self._fftlog_pt)
         return pygcl.Kmn(self.power_lin)
 
     @cached_property("_Pdv_0")
@@ -138,37 +211,37 @@ class PTIntegralsMixin(object):
     #---------------------------------------------------------------------------
     # Jmn integrals as a function of input k
     #---------------------------------------------------------------------------
-    @interpolated_function("_Jmn")
+    @interpolated_function("_Jmn", persist=True)
     def _unnormalized_J00(self, k):
         """J(m=0,n=0) perturbation theory integral"""
         return self._Jmn(k, 0, 0)
     J00 = normalize_Jmn(_unnormalized_J00)
 
-    @interpolated_function("_Jmn")
+    @interpolated_function("_Jmn", persist=True)
     def _unnormalized_J01(self, k):
         """J(m=0,n=1) perturbation theory integral"""
         return self._Jmn(k, 0, 1)
     J01 = normalize_Jmn(_unnormalized_J01)
 
-    @interpolated_function("_Jmn")
+    @interpolated_function("_Jmn", persist=True)
     def _unnormalized_J10(self, k):
         """J(m=1,n=0) perturbation theory integral"""
         return self._Jmn(k, 1, 0)
     J10 = normalize_Jmn(_unnormalized_J10)
 
-    @interpolated_function("_Jmn")
+    @interpolated_function("_Jmn", persist=True)
     def _unnormalized_J11(self, k):
         """J(m=1,n=1) perturbation theory integral"""
         return self._Jmn(k, 1, 1)
     J11 = normalize_Jmn(_unnormalized_J11)
 
-    @interpolated_function("_Jmn")
+    @interpolated_function("_Jmn", persist=True)
     def _unnormalized_J02(self, k):
         """J(m=0,n=2) perturbation theory integral"""
         return self._Jmn(k, 0, 2)
     J02 = normalize_Jmn(_unnormalized_J02)
 
-    @interpolated_function("_Jmn")
+    @interpolated_function("_Jmn", persist=True)
     def _unnormalized_J20(self, k):
         """J(m=2,n=0) perturbation theory integral"""
         return self._Jmn(k, 2, 0)
@@ -177,179 +250,179 @@ class PTIntegralsMixin(object):
     #---------------------------------------------------------------------------
     # Imn integrals as a function of k
     #---------------------------------------------------------------------------
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I00(self, k):
         """I(m=0,n=0) perturbation theory integral"""
-        return self._Imn(k, 0, 0)
+        return self._evaluate_Imn(k, 0, 0)
     I00 = normalize_Imn(_unnormalized_I00)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I01(self, k):
         """I(m=0,n=1) perturbation theory integral"""
-        return self._Imn(k, 0, 1)
+        return self._evaluate_Imn(k, 0, 1)
     I01 = normalize_Imn(_unnormalized_I01)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I02(self, k):
         """I(m=0,n=2) perturbation theory integral"""
-        return self._Imn(k, 0, 2)
+        return self._evaluate_Imn(k, 0, 2)
     I02 = normalize_Imn(_unnormalized_I02)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I03(self, k):
         """I(m=0,n=3) perturbation theory integral"""
-        return self._Imn(k, 0, 3)
+        return self._evaluate_Imn(k, 0, 3)
     I03 = normalize_Imn(_unnormalized_I03)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I10(self, k):
         """I(m=1,n=0) perturbation theory integral"""
-        return self._Imn(k, 1, 0)
+        return self._evaluate_Imn(k, 1, 0)
     I10 = normalize_Imn(_unnormalized_I10)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I11(self, k):
         """I(m=1,n=1) perturbation theory integral"""
-        return self._Imn(k, 1, 1)
+        return self._evaluate_Imn(k, 1, 1)
     I11 = normalize_Imn(_unnormalized_I11)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I12(self, k):
         """I(m=1,n=2) perturbation theory integral"""
-        return self._Imn(k, 1, 2)
+        return self._evaluate_Imn(k, 1, 2)
     I12 = normalize_Imn(_unnormalized_I12)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I13(self, k):
         """I(m=1,n=3) perturbation theory integral"""
-        return self._Imn(k, 1, 3)
+        return self._evaluate_Imn(k, 1, 3)
     I13 = normalize_Imn(_unnormalized_I13)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I20(self, k):
         """I(m=2,n=0) perturbation theory integral"""
-        return self._Imn(k, 2, 0)
+        return self._evaluate_Imn(k, 2, 0)
     I20 = normalize_Imn(_unnormalized_I20)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I21(self, k):
         """I(m=2,n=1) perturbation theory integral"""
-        return self._Imn(k, 2, 1)
+        return self._evaluate_Imn(k, 2, 1)
     I21 = normalize_Imn(_unnormalized_I21)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I22(self, k):
         """I(m=2,n=2) perturbation theory integral"""
-        return self._Imn(k, 2, 2)
+        return self._evaluate_Imn(k, 2, 2)
     I22 = normalize_Imn(_unnormalized_I22)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I23(self, k):
         """I(m=2,n=3) perturbation theory integral"""
-        return self._Imn(k, 2, 3)
+        return self._evaluate_Imn(k, 2, 3)
     I23 = normalize_Imn(_unnormalized_I23)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I30(self, k):
         """I(m=3,n=0) perturbation theory integral"""
-        return self._Imn(k, 3, 0)
+        return self._evaluate_Imn(k, 3, 0)
     I30 = normalize_Imn(_unnormalized_I30)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I31(self, k):
         """I(m=3,n=1) perturbation theory integral"""
-        return self._Imn(k, 3, 1)
+        return self._evaluate_Imn(k, 3, 1)
     I31 = normalize_Imn(_unnormalized_I31)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I32(self, k):
         """I(m=3,n=2) perturbation theory integral"""
-        return self._Imn(k, 3, 2)
+        return self._evaluate_Imn(k, 3, 2)
     I32 = normalize_Imn(_unnormalized_I32)
 
-    @interpolated_function("_Imn")
+    @interpolated_function("_Imn", persist=True)
     def _unnormalized_I33(self, k):
         """I(m=3,n=3) perturbation theory integral"""
-        return self._Imn(k, 3, 3)
+        return self._evaluate_Imn(k, 3, 3)
     I33 = normalize_Imn(_unnormalized_I33)
 
     #---------------------------------------------------------------------------
     # Kmn integrals
     #---------------------------------------------------------------------------
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K00(self, k):
         """K(m=0,n=0) perturbation theory integral"""
         return self._Kmn(k, 0, 0)
     K00 = normalize_Kmn(_unnormalized_K00)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K00s(self, k):
         """K(m=0,n=0,s=True) perturbation theory integral"""
         return self._Kmn(k, 0, 0, True)
     K00s = normalize_Kmn(_unnormalized_K00s)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K01(self, k):
         """K(m=0,n=1) perturbation theory integral"""
         return self._Kmn(k, 0, 1)
     K01 = normalize_Kmn(_unnormalized_K01)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K01s(self, k):
         """K(m=0,n=1,s=True) perturbation theory integral"""
         return self._Kmn(k, 0, 1, True)
     K01s = normalize_Kmn(_unnormalized_K01s)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K02s(self, k):
         """K(m=0,n=2,s=True) perturbation theory integral"""
         return self._Kmn(k, 0, 2, True)
     K02s = normalize_Kmn(_unnormalized_K02s)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K10(self, k):
         """K(m=1,n=0) perturbation theory integral"""
         return self._Kmn(k, 1, 0)
     K10 = normalize_Kmn(_unnormalized_K10)
 
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K10s(self, k):
         """K(m=1,n=0,s=True) perturbation theory integral"""
         return self._Kmn(k, 1, 0, True)
     K10s = normalize_Kmn(_unnormalized_K10s)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K11(self, k):
         """K(m=1,n=1) perturbation theory integral"""
         return self._Kmn(k, 1, 1)
     K11 = normalize_Kmn(_unnormalized_K11)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K11s(self, k):
         """K(m=1,n=1,s=True) perturbation theory integral"""
         return self._Kmn(k, 1, 1, True)
     K11s = normalize_Kmn(_unnormalized_K11s)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K20_a(self, k):
         """K(m=2,n=0) mu^2 perturbation theory integral"""
         return self._Kmn(k, 2, 0, False, 0)
     K20_a = normalize_Kmn(_unnormalized_K20_a)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K20_b(self, k):
         """K(m=2,n=0) mu^4 perturbation theory integral"""
         return self._Kmn(k, 2, 0, False, 1)
     K20_b = normalize_Kmn(_unnormalized_K20_b)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K20s_a(self, k):
         """K(m=2,n=0,s=True) mu^2 perturbation theory integral"""
         return self._Kmn(k, 2, 0, True, 0)
     K20s_a = normalize_Kmn(_unnormalized_K20s_a)
 
-    @interpolated_function("_Kmn")
+    @interpolated_function("_Kmn", persist=True)
     def _unnormalized_K20s_b(self, k):
         """K(m=2,n=0,s=True) mu^4 perturbation theory integral"""
         return self._Kmn(k, 2, 0, True, 1)
@@ -358,7 +431,7 @@ class PTIntegralsMixin(object):
     #---------------------------------------------------------------------------
     # full 2-loop integrals
     #---------------------------------------------------------------------------
-    @interpolated_function("_Imn1Loop_vvdd")
+    @interpolated_function("_Imn1Loop_vvdd", persist=True)
     def _unnormalized_Ivvdd_h01(self, k):
         I_lin   = self._Imn1Loop_vvdd.EvaluateLinear(k, 0, 1)
         I_cross = self._Imn1Loop_vvdd.EvaluateCross(k, 0, 1)
@@ -367,7 +440,7 @@ class PTIntegralsMixin(object):
         return I_lin, I_cross, I_1loop
     Ivvdd_h01 = normalize_ImnOneLoop(_unnormalized_Ivvdd_h01)
 
-    @interpolated_function("_Imn1Loop_vvdd")
+    @interpolated_function("_Imn1Loop_vvdd", persist=True)
     def _unnormalized_Ivvdd_h02(self, k):
         I_lin   = self._Imn1Loop_vvdd.EvaluateLinear(k, 0, 2)
         I_cross = self._Imn1Loop_vvdd.EvaluateCross(k, 0, 2)
@@ -376,7 +449,7 @@ class PTIntegralsMixin(object):
         return I_lin, I_cross, I_1loop
     Ivvdd_h02 = normalize_ImnOneLoop(_unnormalized_Ivvdd_h02)
 
-    @interpolated_function("_Imn1Loop_dvdv")
+    @interpolated_function("_Imn1Loop_dvdv", persist=True)
     def _unnormalized_Idvdv_h03(self, k):
         I_lin   = self._Imn1Loop_dvdv.EvaluateLinear(k, 0, 3)
         I_cross = self._Imn1Loop_dvdv.EvaluateCross(k, 0, 3)
@@ -385,7 +458,7 @@ class PTIntegralsMixin(object):
         return I_lin, I_cross, I_1loop
     Idvdv_h03 = normalize_ImnOneLoop(_unnormalized_Idvdv_h03)
 
-    @interpolated_function("_Imn1Loop_dvdv")
+    @interpolated_function("_Imn1Loop_dvdv", persist=True)
     def _unnormalized_Idvdv_h04(self, k):
         I_lin   = self._Imn1Loop_dvdv.EvaluateLinear(k, 0, 4)
         I_cross = self._Imn1Loop_dvdv.EvaluateCross(k, 0, 4)
@@ -394,7 +467,7 @@ class PTIntegralsMixin(object):
         return I_lin, I_cross, I_1loop
     Idvdv_h04 = normalize_ImnOneLoop(_unnormalized_Idvdv_h04)
 
-    @interpolated_function("_Imn1Loop_vvvv")
+    @interpolated_function("_Imn1Loop_vvvv", persist=True)
     def _unnormalized_Ivvvv_f23(self, k):
         I_lin   = self._Imn1Loop_vvvv.EvaluateLinear(k, 2, 3)
         I_cross = self._Imn1Loop_vvvv.EvaluateCross(k, 2, 3)
@@ -403,7 +476,7 @@ class PTIntegralsMixin(object):
         return I_lin, I_cross, I_1loop
     Ivvvv_f23 = normalize_ImnOneLoop(_unnormalized_Ivvvv_f23)
 
-    @interpolated_function("_Imn1Loop_vvvv")
+    @interpolated_function("_Imn1Loop_vvvv", persist=True)
     def _unnormalized_Ivvvv_f32(self, k):
         I_lin   = self._Imn1Loop_vvvv.EvaluateLinear(k, 3, 2)
         I_cross = self._Imn1Loop_vvvv.EvaluateCross(k, 3, 2)
@@ -412,7 +485,7 @@ class PTIntegralsMixin(object):
         return I_lin, I_cross, I_1loop
     Ivvvv_f32 = normalize_ImnOneLoop(_unnormalized_Ivvvv_f32)
 
-    @interpolated_function("_Imn1Loop_vvvv")
+    @interpolated_function("_Imn1Loop_vvvv", persist=True)
     def _unnormalized_Ivvvv_f33(self, k):
         I_lin   = self._Imn1Loop_vvvv.EvaluateLinear(k, 3, 3)
         I_cross = self._Imn1Loop_vvvv.EvaluateCross(k, 3, 3)
@@ -439,7 +512,7 @@ class PTIntegralsMixin(object):
         """
         return self._power_norm**2 * self._unnormed_velocity_kurtosis
 
-    @interpolated_function("power_lin")
+    @interpolated_function("power_lin", persist=True)
     def _unnormalized_sigmasq_k(self, k):
         """
         The dark matter velocity dispersion at z, as a function of k,
@@ -1,15 +1,48 @@
 from ._cache import Cache, parameter, cached_property
 from ._interpolate import RegularGridInterpolator
+from ._disk_cache import DiskCache, enabled, hash_arrays
 from .. import pygcl, numpy as np, data as sim_data
 from . import tools
 
 import itertools
 import pandas as pd
+from scipy import linalg
 from sklearn import preprocessing
 import george
 
 GEORGE_v03 = george.__version__ >= '0.3'
 
+# the version of the stored Gaussian processes; increment when changing the format
+GP_FORMAT_VERSION = 2
+
+def _kernel_value(kernel, x1, x2):
+    """
+    The cross-covariance matrix of ``kernel`` between the points
+    ``x1`` and ``x2``, each of shape (N, ndim)
+    """
+    if GEORGE_v03:
+        return kernel.get_value(x1, x2)
+    else:
+        return kernel.value(x1, x2)
+
+def _domain_points(independent, args, indep_vars):
+    """
+    Return the (N, ndim) array of points to predict at from the
+    positional and keyword arguments of a call
+    """
+    if len(args):
+        if len(args) == 1 and len(independent) == 1:
+            indep_vars[independent[0]] = args[0]
+        else:
+            raise ValueError("please pass variables as keywords")
+
+    for p in independent:
+        if p not in indep_vars:
+            raise ValueError("please specify the `%s` independent variable" %p)
+
+    pts = np.broadcast_arrays(*[np.asarray(indep_vars[k], dtype=float) for k in independent])
+    return np.stack([np.ravel(x) for x in pts], axis=-1)
+
 #-------------------------------------------------------------------------------
 # simulation measurements, interpolated with a gaussian process
 #-------------------------------------------------------------------------------
@@ -29,7 +62,8 @@ class GeorgeSimulationData(Cache):
                     use_errors=True,
                     dependent_col='y',
                     kernel=george.kernels.ExpSquaredKernel,
-                    solver=george.BasicSolver):
+                    solver=george.BasicSolver,
+                    table_shape=None):
         """
         Parameters
         ----------
@@ -50,6 +84,9 @@ class GeorgeSimulationData(Cache):
             the kernel class to use in the Gaussian process covariance matrix
         solver : {`george.BasicSolver`, `george.HODLRSolver`}, optional
             the solver class to use when evaluating the Gaussian process
+        table_shape : int, list of int, optional
+            if provided, predict from a dense table of this shape over the
+            domain of the training set (see :attr:`table`)
         """
         self.use_errors  = use_errors
         self.data        = data
@@ -58,6 +95,7 @@ class GeorgeSimulationData(Cache):
         self.solver      = solver
         self.kernel      = kernel
         self.theta       = theta
+        self.table_shape = table_shape
 
     #---------------------------------------------------------------------------
     # parameters
@@ -86,6 +124,22 @@ class GeorgeSimulationData(Cache):
         """
         return val
 
+    @parameter
+    def table_shape(self, val):
+        """
+        The number of points of the dense table of predictions along
+        each independent variable; if `None`, the Gaussian process
+        is evaluated directly
+        """
+        if val is not None:
+            val = np.array(val, ndmin=1, dtype=int)
+            if len(val) == 1: val = np.repeat(val, len(self.independent))
+            if len(val) != len(self.independent):
+                raise ValueError("`table_shape` should have one entry per independent variable")
+            if (val < 2).any():
+                raise ValueError("`table_shape` needs at least 2 points per dimension")
+        return val
+
     @parameter
     def data(self, val):
         """
@@ -201,18 +255,25 @@ class GeorgeSimulationData(Cache):
         """
         return self.yerr / self.y_scaler.scale_
 
-    @cached_property("data", "kernel", "solver")
-    def gp(self):
+    @cached_property("kernel", "theta", "x")
+    def gp_kernel(self):
         """
-        The Gaussian process needed to do the interpolation
+        The kernel instance of the Gaussian process, with hyperparameters
+        :attr:`theta`
         """
         if self.ndim == self.xshape:
-            kernel = self.kernel(self.theta, ndim=self.xshape)
+            return self.kernel(self.theta, ndim=self.xshape)
         elif self.ndim == self.xshape+1:
-            kernel = self.theta[0] * self.kernel(self.theta[1:], ndim=self.xshape)
+            return self.theta[0] * self.kernel(self.theta[1:], ndim=self.xshape)
         else:
             raise ValueError("size mismatch between supplied `x` variables and `theta` length")
-        gp = george.GP(kernel, solver=self.solver)
+
+    @cached_property("gp_kernel", "solver", "use_errors")
+    def gp(self):
+        """
+        The Gaussian process needed to do the interpolation
+        """
+        gp = george.GP(self.gp_kernel, solver=self.solver)
 
         if GEORGE_v03:
             kws = {}
@@ -222,6 +283,158 @@ class GeorgeSimulationData(Cache):
         gp.compute(self.x_scaled, **kws)
         return gp
 
+    #---------------------------------------------------------------------------
+    # the trained Gaussian process, stored on disk
+    #---------------------------------------------------------------------------
+    @cached_property("data", "independent", "dependent", "use_errors", "kernel", "theta")
+    def checksum(self):
+        """
+        A hash of the training data and hyperparameters, which identifies
+        the stored Gaussian process
+        """
+        values = [GP_FORMAT_VERSION, GEORGE_v03, self.kernel.__name__, list(self.independent),
+                    self.dependent, bool(self.use_errors), np.asarray(self.theta, dtype=float),
+                    np.asarray(self.x, dtype=float), np.asarray(self.y, dtype=float)]
+        if self.use_errors:
+            values.append(np.asarray(self.yerr, dtype=float))
+        return hash_arrays(*values)
+
+    @cached_property("checksum")
+    def _gp_cache(self):
+        """
+        The directory of the user disk cache storing the trained Gaussian
+        process, or `None` if the disk cache is disabled
+        """
+        if not enabled():
+            return None
+        return DiskCache("%s-%s" %(self.dependent, self.checksum[:16]))
+
+    @cached_property("x")
+    def x_scaling(self):
+        """
+        The (mean, scale) of each independent variable, with shape (2, ndim),
+        such that the scaled variables are ``(x - mean) / scale``
+        """
+        return np.array([self.x_scaler.mean_, self.x_scaler.scale_])
+
+    @cached_property("y")
+    def y_scaling(self):
+        """
+        The (mean, scale) of the dependent variable, with shape (2,)
+        """
+        return np.array([self.y_scaler.mean_[0], self.y_scaler.scale_[0]])
+
+    @cached_property("gp_kernel", "yerr", "use_errors")
+    def factor(self):
+        """
+        The lower Cholesky factor of the covariance matrix of the (scaled)
+        training set, including the errors if :attr:`use_errors` is `True`
+        """
+        x = self.x_scaled.reshape(-1, self.xshape)
+        K = _kernel_value(self.gp_kernel, x, x)
+        if self.use_errors:
+            K[np.diag_indices_from(K)] += self.yerr_scaled**2
+        return linalg.cholesky(K, lower=True)
+
+    @cached_property("_gp_cache", "factor")
+    def alpha(self):
+        """
+        The weights :math:`K^{-1} y` of the (scaled) training set, such
+        that the predicted mean is the dot product of the cross-covariance
+        with the training set and ``alpha``
+
+        The weights are stored in the user disk cache, so the training
+        set is only factorized once for a given :attr:`checksum`.
+        """
+        compute = lambda: linalg.cho_solve((self.factor, True), self.y_scaled)
+        if self._gp_cache is None:
+            return compute()
+        return self._gp_cache.load_or_compute('alpha', compute)
+
+    @cached_property("x")
+    def domain(self):
+        """
+        The (lower, upper) bounds of the training set for each
+        independent variable, with shape (ndim, 2)
+        """
+        x = self.x.reshape(len(self.x), -1)
+        return np.array([x.min(axis=0), x.max(axis=0)]).T
+
+    def predict(self, pts, chunksize=10000):
+        """
+        Evaluate the mean of the Gaussian process at the points ``pts``
+
+        All points are predicted at once against the cached :attr:`alpha`,
+        in chunks of ``chunksize`` points to limit the memory of the
+        cross-covariance matrix
+
+        Parameters
+        ----------
+        pts : array_like, (N, ndim)
+            the unscaled independent variables to predict at, in the
+            order of :attr:`independent`
+
+        Returns
+        -------
+        mean : array_like, (N,)
+            the predicted dependent variable
+        """
+        pts = np.asarray(pts, dtype=float).reshape(-1, self.xshape)
+        x_mean, x_scale = self.x_scaling
+        x_train = (self.x.reshape(-1, self.xshape) - x_mean) / x_scale
+
+        toret = np.empty(len(pts))
+        for start in range(0, len(pts), chunksize):
+            x = (pts[start:start+chunksize] - x_mean) / x_scale
+            toret[start:start+chunksize] = np.dot(_kernel_value(self.gp_kernel, x, x_train), self.alpha)
+        y_mean, y_scale = self.y_scaling
+        return toret * y_scale + y_mean
+
+    @cached_property("alpha", "table_shape")
+    def table(self):
+        """
+        A :class:`RegularGridInterpolator` of the predictions on a dense,
+        regular grid of shape :attr:`table_shape` spanning :attr:`domain`,
+        or `None` if :attr:`table_shape` is `None`
+
+        Points outside the domain of the table are predicted directly.
+        """
+        if self.table_shape is None:
+            return None
+
+        axes = [np.linspace(lo, hi, N) for (lo, hi), N in zip(self.domain, self.table_shape)]
+        pts = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+        values = self.predict(pts).reshape(pts.shape[:-1])
+        return RegularGridInterpolator(axes, values, bounds_error=False, fill_value=np.nan)
+
+    @cached_property("table")
+    def table_error(self):
+        """
+        The maximum absolute error of the multilinear interpolation of
+        :attr:`table` with respect to the Gaussian process, evaluated at
+        the centers of the cells of the table
+        """
+        if self.table is None:
+            return 0.
+
+        centers = [0.5*(g[1:] + g[:-1]) for g in self.table.grid]
+        pts = np.stack(np.meshgrid(*centers, indexing='ij'), axis=-1).reshape(-1, self.xshape)
+        return abs(self.table(pts) - self.predict(pts)).max()
+
+    def _evaluate(self, pts):
+        """
+        Evaluate the prediction at the (N, ndim) points ``pts``, from
+        :attr:`table` if it is enabled
+        """
+        if self.table is None:
+            return self.predict(pts)
+
+        toret = self.table(pts)
+        missing = np.isnan(toret)
+        if missing.any():
+            toret[missing] = self.predict(pts[missing])
+        return toret
+
     @tools.align_input
     @tools.unpacked
     def __call__(self, *args, **indep_vars):
@@ -233,44 +446,78 @@ class GeorgeSimulationData(Cache):
         indep_vars : keywords
             the independent variables to evaluate at
         """
-        if len(args):
-            if len(args) == 1 and len(self.independent) == 1:
-                indep_vars[self.independent[0]] = args[0]
-            else:
-                raise ValueError("please pass variables as keywords")
-
-        for p in self.independent:
-            if p not in indep_vars:
-                raise ValueError("please specify the `%s` independent variable" %p)
-
-        # the domain point to predict
-        pt = np.asarray([indep_vars[k] for k in self.independent]).T
-        if pt.ndim == 1: pt = pt.reshape(1, -1)
-        pt = self.x_scaler.transform(pt)
-
-        if GEORGE_v03:
-            kws = {'return_cov':False}
-        else:
-            kws = {'mean_only':True}
-        return self.y_scaler.inverse_transform(self.gp.predict(self.y_scaled, pt, **kws))
+        return self._evaluate(_domain_points(self.independent, args, indep_vars))
 
 
 class GeorgeSimulationDataSet(object):
     """
     Class designed to hold a `GeorgeSimulationData` instance
     for several parameters of the same model
+
+    The predictions of all parameters are computed together and the
+    most recent result is kept, so selecting the parameters one at a time
+    at the same point only evaluates the Gaussian processes once. The
+    result is recomputed if the training data, hyperparameters, or table
+    of any of the parameters changed since.
     """
     def __init__(self, independent, dependent, data, theta, **kwargs):
 
         if len(dependent) != len(theta):
             raise ValueError("size mismatch between supplied parameter names and `theta`")
         self.dependents = dependent
+        self.independent = independent
 
         # initialize a Gaussian process for each dependent variable
         self._data = {}
         for i, dep in enumerate(dependent):
             self._data[dep] = GeorgeSimulationData(independent, data, theta[i], dependent_col=dep, **kwargs)
 
+        # the most recent (points, state, predictions)
+        self._last = (None, None, None)
+
+    def tabulate(self, table_shape):
+        """
+        Set the shape of the dense table of predictions for all parameters
+        (see :attr:`GeorgeSimulationData.table`)
+        """
+        for dep in self.dependents:
+            self._data[dep].table_shape = table_shape
+        self._last = (None, None, None)
+
+    @property
+    def table_error(self):
+        """
+        The maximum error of the dense tables of each parameter
+        """
+        return {dep:self._data[dep].table_error for dep in self.dependents}
+
+    def _state(self):
+        """
+        The cached weights and tables of each parameter, which are
+        recomputed (as new objects) when the training data, hyperparameters,
+        or table shape of the parameter change
+        """
+        return [(self._data[dep].alpha, self._data[dep].table) for dep in self.dependents]
+
+    def predict(self, pts):
+        """
+        Evaluate all of the parameters at the (N, ndim) points ``pts``
+
+        Returns
+        -------
+        values : dict
+            the predictions of shape (N,) for each parameter
+        """
+        pts = np.asarray(pts, dtype=float)
+        state = self._state()
+
+        last_pts, last_state, values = self._last
+        if last_pts is None or not np.array_equal(last_pts, pts) or \
+            any(a is not b or t is not u for (a, t), (b, u) in zip(state, last_state)):
+            values = {dep:self._data[dep]._evaluate(pts) for dep in self.dependents}
+            self._last = (pts.copy(), state, values)
+        return values
+
     @tools.unpacked
     def __call__(self, *args, **indep_vars):
 
@@ -283,7 +530,8 @@ class GeorgeSimulationDataSet(object):
         else:
             raise ValueError("do not understand `select` keyword")
 
-        return [self._data[par](*args, **indep_vars) for par in select]
+        values = self.predict(_domain_points(self.independent, args, indep_vars))
+        return [values[par][0] if len(values[par]) == 1 else values[par].copy() for par in select]
 
 
 class Pmu4ResidualCorrection(GeorgeSimulationData):
@@ -376,6 +624,18 @@ class CrossStochasticityFits(GeorgeSimulationData):
 
         super(CrossStochasticityFits, self).__init__(independent, data, theta, use_errors=True)
 
+def store_simulation_fits():
+    """
+    Train the Gaussian processes of all of the simulation fits and store
+    them in the user disk cache, so they are loaded from disk instead of
+    trained at startup
+    """
+    fits = [Pmu4ResidualCorrection(), Pmu2ResidualCorrection(), VelocityDispersionFits(),
+            AutoStochasticityFits(), CrossStochasticityFits()]
+    fits += list(NonlinearBiasFits()._data.values())
+    for fit in fits:
+        fit.alpha
+
 #-------------------------------------------------------------------------------
 # simulation data interpolated onto a grid
 #-------------------------------------------------------------------------------
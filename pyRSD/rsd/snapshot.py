@@ -0,0 +1,282 @@
+"""
+Save and load models as snapshots
+
+A snapshot is a directory holding
+
+- ``manifest.json``: the snapshot format, the model version and class,
+  and the parameters of the model that are plain JSON values
+- ``state.pickle``: the remaining attributes of the model, i.e., the
+  cosmology and the galaxy power terms, with every array stored separately
+- ``arrays/``: the arrays of ``state.pickle``, as ``.npy`` files
+- ``cache/``: the disk caches of the model (see :mod:`pyRSD.rsd._disk_cache`),
+  i.e., the PT integrals and HZPT tables, with a sub-directory for each key
+
+Arrays are loaded lazily as read-only memory maps, so the processes on a node
+share their pages, and the splines of the model are rebuilt from them on
+first use. Unlike a pickled model, the cached properties are not stored;
+the cosmology is stored with its transfer function, so CLASS is not run.
+
+A snapshot can only be loaded by the model release that saved it; a snapshot
+saved by another development build of the same release is loaded with an
+:class:`~pyRSD.rsd.OutdatedModelWarning`, as for ``.npy`` files; see
+:func:`check_compatibility`.
+"""
+from .. import numpy as np, os
+from . import _disk_cache
+
+import json
+import pickle
+import shutil
+import tempfile
+import importlib
+import time
+
+# the version of the snapshot format; increment when changing the layout
+SNAPSHOT_FORMAT = 1
+
+# attributes of the model that are never stored
+_transient = ['_cache', '_cache_stats', '_snapshots', '_param_state']
+
+class IncompatibleSnapshotError(ValueError):
+    """
+    The error raised when a snapshot cannot be loaded by the
+    current model version
+    """
+    pass
+
+def _is_json(value):
+    """
+    Whether ``value`` is represented exactly in JSON
+    """
+    if type(value) in (type(None), bool, int, float, str):
+        return True
+    if type(value) is list:
+        return all(_is_json(v) for v in value)
+    if type(value) is dict:
+        return all(isinstance(k, str) and _is_json(v) for k, v in value.items())
+    return False
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    A pickler that stores arrays as ``.npy`` files, and references
+    to the model itself by name
+    """
+    def __init__(self, ff, model, array_dir):
+        pickle.Pickler.__init__(self, ff, protocol=2)
+        self.model = model
+        self.array_dir = array_dir
+        self.arrays = []
+
+    def persistent_id(self, obj):
+        if obj is self.model:
+            return 'model'
+        if isinstance(obj, np.ndarray) and obj.dtype != object:
+            name = 'array_%d' %len(self.arrays)
+            np.save(os.path.join(self.array_dir, name + '.npy'), obj)
+            self.arrays.append(name)
+            return name
+        return None
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    An unpickler that loads arrays as memory maps, and
+    resolves references to the model
+    """
+    def __init__(self, ff, model, array_dir):
+        pickle.Unpickler.__init__(self, ff)
+        self.model = model
+        self.array_dir = array_dir
+
+    def persistent_load(self, pid):
+        if pid == 'model':
+            return self.model
+        return np.load(os.path.join(self.array_dir, pid + '.npy'), mmap_mode='r')
+
+def _disk_caches(model):
+    """
+    The disk caches used by the model and its cached attributes
+    """
+    toret = {}
+    for obj in [model] + list(model._cache.values()):
+        cache = getattr(obj, '_disk_cache', None)
+        if isinstance(cache, _disk_cache.DiskCache):
+            toret[cache.key] = cache
+    return list(toret.values())
+
+def _link_or_copy(src, dst):
+    """
+    Hard-link ``src`` to ``dst`` if possible, else copy it
+    """
+    try:
+        os.link(src, dst)
+    except (OSError, AttributeError):
+        shutil.copy2(src, dst)
+
+def save_snapshot(model, path, initialize=True):
+    """
+    Save ``model`` to a snapshot directory at ``path``, replacing any
+    existing snapshot
+
+    Parameters
+    ----------
+    model : DarkMatterSpectrum
+        the model instance to save
+    path : str
+        the name of the snapshot directory
+    initialize : bool, optional
+        if `True`, call :func:`initialize` on the model first, so that the
+        arrays in its disk caches have been computed
+    """
+    from . import __version__
+
+    if initialize:
+        model.initialize()
+
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+
+    # write to a temporary directory, which is renamed when complete
+    tmp = tempfile.mkdtemp(prefix='.' + os.path.basename(path), dir=parent)
+    try:
+        array_dir = os.path.join(tmp, 'arrays')
+        os.makedirs(array_dir)
+
+        # split the attributes into JSON values and the rest
+        state, objects = {}, {}
+        for name, value in model.__dict__.items():
+            if name in _transient: continue
+            if _is_json(value):
+                state[name] = value
+            else:
+                objects[name] = value
+
+        # the cached values that are expensive to recompute, i.e., the cosmology
+        cache = {}
+        for name in getattr(model, '_snapshot_cached', []):
+            if name in model._cache:
+                cache[name] = model._cache[name]
+
+        with open(os.path.join(tmp, 'state.pickle'), 'wb') as ff:
+            pickler = _SnapshotPickler(ff, model, array_dir)
+            pickler.dump({'objects':objects, 'cache':cache})
+
+        # the disk caches
+        caches = _disk_caches(model)
+        for c in caches:
+            dirname = os.path.join(tmp, 'cache', c.key)
+            os.makedirs(dirname)
+            for name, filename in c.files().items():
+                _link_or_copy(filename, os.path.join(dirname, name + '.npy'))
+
+        manifest = {'format' : SNAPSHOT_FORMAT,
+                    'version' : __version__,
+                    'class' : model.__class__.__module__ + '.' + model.__class__.__name__,
+                    'created' : time.ctime(),
+                    'state' : state,
+                    'arrays' : pickler.arrays,
+                    'caches' : sorted(c.key for c in caches)}
+        with open(os.path.join(tmp, 'manifest.json'), 'w') as ff:
+            json.dump(manifest, ff, indent=2, sort_keys=True)
+
+        # replace the existing snapshot
+        if os.path.exists(path):
+            old = tempfile.mkdtemp(prefix='.' + os.path.basename(path), dir=parent)
+            os.rename(path, os.path.join(old, 'snapshot'))
+            os.rename(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.rename(tmp, path)
+    except:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+def read_manifest(path):
+    """
+    Return the manifest of the snapshot at ``path``, as a dictionary
+    """
+    filename = os.path.join(path, 'manifest.json')
+    if not os.path.exists(filename):
+        raise IncompatibleSnapshotError("'%s' is not a model snapshot" %path)
+    with open(filename, 'r') as ff:
+        return json.load(ff)
+
+def base_version(version):
+    """
+    The release of the model version ``version``, i.e., without the
+    git hash of a development version
+    """
+    return str(version).split('.dev.')[0]
+
+def check_compatibility(manifest, show_warning=True):
+    """
+    Raise an :class:`IncompatibleSnapshotError` if the snapshot described
+    by ``manifest`` cannot be loaded by the current model version
+
+    A snapshot is compatible if it has the current snapshot format and
+    was saved by the current model release. If it was saved by another
+    development version of the release, an :class:`~pyRSD.rsd.OutdatedModelWarning`
+    is issued if ``show_warning`` is `True`.
+    """
+    from . import __version__, OutdatedModelWarning
+
+    if manifest.get('format', None) != SNAPSHOT_FORMAT:
+        args = (manifest.get('format', None), SNAPSHOT_FORMAT)
+        raise IncompatibleSnapshotError("snapshot format %s is not the current format %s" %args)
+
+    version = manifest.get('version', None)
+    if base_version(version) != base_version(__version__):
+        args = (version, __version__)
+        raise IncompatibleSnapshotError("snapshot saved with model version %s, but the current "
+                                        "version is %s; please save the model again" %args)
+    if show_warning and version != __version__:
+        import warnings
+        msg = "loading an outdated model snapshot:\n"
+        msg += '\tcurrent model version: %s\n' %(__version__)
+        msg += '\tloaded model version: %s\n' %(version)
+        warnings.warn(msg, OutdatedModelWarning)
+
+def load_snapshot(path, check=True, show_warning=True):
+    """
+    Load a model from the snapshot directory at ``path``
+
+    Parameters
+    ----------
+    path : str
+        the name of the snapshot directory
+    check : bool, optional
+        if `True`, raise an :class:`IncompatibleSnapshotError` if the
+        snapshot was saved by a different model release (see
+        :func:`check_compatibility`); otherwise, load it anyway, and
+        recompute any arrays that are not found
+    show_warning : bool, optional
+        if `True`, warn if the snapshot was saved by another development
+        version of the current release
+
+    Returns
+    -------
+    model :
+        the loaded model instance
+    """
+    path = os.path.abspath(path)
+    manifest = read_manifest(path)
+    if check:
+        check_compatibility(manifest, show_warning=show_warning)
+
+    # the model class
+    modname, clsname = manifest['class'].rsplit('.', 1)
+    cls = getattr(importlib.import_module(modname), clsname)
+
+    # the disk caches are searched in the snapshot
+    _disk_cache.add_search_path(os.path.join(path, 'cache'))
+
+    # restore the attributes, without calling __init__
+    model = cls.__new__(cls)
+    with open(os.path.join(path, 'state.pickle'), 'rb') as ff:
+        state = _SnapshotUnpickler(ff, model, os.path.join(path, 'arrays')).load()
+    model.__dict__.update(manifest['state'])
+    model.__dict__.update(state['objects'])
+    model._cache.update(state['cache'])
+
+    return model
@@ -3,21 +3,20 @@ from __future__ import print_function
 from .. import pygcl, numpy as np
 from . import APLock
 from ._cache import Cache, parameter, cached_property
-from ._interpolate import RegularGridInterpolator, InterpolationDomainError
+from ._interpolate import InterpolationDomainError
 
-from scipy.integrate import simps
 import scipy.interpolate as interp
 from scipy.optimize import brentq
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
 
 import functools
-import itertools
+import threading
 import inspect
 import hashlib
 from six import PY3
-import xarray as xr
 
 def return_xarray(pkmu, k, mu, flatten=False):
+    import xarray as xr
 
     if flatten:
         k = np.ravel(k, order='F')
@@ -26,8 +25,9 @@ def return_xarray(pkmu, k, mu, flatten=False):
     # ensure pkmu is at least 1D
     pkmu = np.atleast_1d(pkmu)
     if pkmu.ndim == 1:
+        # (k,mu) pairs, or a squeezed (Nk,1) or (1,Nmu) grid
         dims = ['i']
-        coords = {'k': (dims, k), 'mu': (dims, mu)}
+        coords = {'k': (dims, np.ravel(k)), 'mu': (dims, np.ravel(mu))}
     else:
         dims = ['k', 'mu']
         coords = {'k': k[:,0], 'mu':mu[0,:]}
@@ -59,7 +59,7 @@ def k_AP(k_obs, mu_obs, alpha_perp, alpha_par):
     the AP effect
     """
     F = alpha_par / alpha_perp
-    if (F != 1.):
+    if np.any(F != 1.):
         return (k_obs/alpha_perp)*(1 + mu_obs**2*(1./F**2 - 1))**(0.5)
     else:
         return k_obs/alpha_perp
@@ -208,10 +208,10 @@ def alcock_paczynski(f, alpha_par=None, alpha_perp=None, alpha_drag=None):
                 pkmu = f(self, *args, **kwargs)
 
                 # do the volume rescaling
-                pkmu /= (alpha_perp_**2 * alpha_par_)
+                pkmu = pkmu / (alpha_perp_**2 * alpha_par_)
 
                 # scale by (rs_drag^fid / rs_drag)**3
-                pkmu *= (alpha_drag_)**3 # see eq 46 of Beutler et al 2016
+                pkmu = pkmu * (alpha_drag_)**3 # see eq 46 of Beutler et al 2016
 
         # if locked, the distortion was already added
         else:
@@ -222,6 +222,40 @@ def alcock_paczynski(f, alpha_par=None, alpha_perp=None, alpha_drag=None):
     return wrap
 
 
+def broadcast_kmu_arrays(k, mu):
+    """
+    Return the `k` and `mu` arrays that functions decorated with
+    :func:`broadcast_kmu` are evaluated at, with shape (Nk, Nmu)
+
+    If `k` and `mu` are 1D arrays of the same length, they are
+    treated as (k,mu) pairs
+    """
+    if isinstance(k, list): k = np.array(k)
+    if isinstance(mu, list): mu = np.array(mu)
+    if np.isscalar(k): k = np.array([k])
+    if np.isscalar(mu): mu = np.array([mu])
+
+    mu_dim = np.ndim(mu); k_dim = np.ndim(k)
+    if mu_dim == 1 and k_dim == 1:
+        if len(mu) != len(k):
+            k = k[:, np.newaxis]
+            mu = mu[np.newaxis, :]
+    else:
+        if k_dim > 1 and mu_dim < 2:
+            mu =  mu[np.newaxis, :]
+        elif mu_dim > 1 and k_dim < 2:
+            k = k[:, np.newaxis]
+
+    k, mu = np.broadcast_arrays(k, mu)
+    if k.ndim > 2 or mu.ndim > 2:
+        raise ValueError(("incompatible `k`, `mu` dimensions for broadcasted; "
+                          "arrays should have maximum dimension of 2"))
+    return k, mu
+
+# whether a ``raw=True`` call of a broadcast_kmu function is in progress,
+# which is tracked per thread
+_raw_call = threading.local()
+
 def broadcast_kmu(f):
     """
     Decorator to properly handle broadcasting of k, mu.
@@ -230,6 +264,13 @@ def broadcast_kmu(f):
     broadcasted values, such that the input arguments
     have shape (Nk, Nmu)
 
+    The result is returned as a :class:`xarray.DataArray`, unless
+    the keyword ``raw=True`` is passed, in which case a contiguous
+    numpy array is returned, or an output array ``out`` is passed,
+    which is filled with the result and returned. Any nested
+    calls to decorated functions during a raw call also skip
+    the DataArray wrapping.
+
     Notes
     -----
     This assumes the first two arguments of ``f()``
@@ -237,91 +278,32 @@ def broadcast_kmu(f):
     """
     @functools.wraps(f)
     def wrapper(self, *args, **kwargs):
-        args = list(args)
-        k = args[0]
-        mu = args[1]
-        if isinstance(k, list): k = np.array(k)
-        if isinstance(mu, list): mu = np.array(mu)
-        if np.isscalar(k): k = np.array([k])
-        if np.isscalar(mu): mu = np.array([mu])
-
-        mu_dim = np.ndim(mu); k_dim = np.ndim(k)
-        if mu_dim == 1 and k_dim == 1:
-            if len(mu) != len(k):
-                k = k[:, np.newaxis]
-                mu = mu[np.newaxis, :]
-        else:
-            if k_dim > 1 and mu_dim < 2:
-                mu =  mu[np.newaxis, :]
-            elif mu_dim > 1 and k_dim < 2:
-                k = k[:, np.newaxis]
-
-        args[:2] = np.broadcast_arrays(k, mu)
-        if args[0].ndim > 2 or args[1].ndim > 2:
-            raise ValueError(("incompatible `k`, `mu` dimensions for broadcasted; "
-                              "arrays should have maximum dimension of 2"))
-        P = np.squeeze(f(self, *args, **kwargs))
-        return return_xarray(P, args[0], args[1], flatten=kwargs.get('flatten', False))
+        out = kwargs.pop('out', None)
+        raw = kwargs.pop('raw', False) or out is not None
 
-    return wrapper
+        args = list(args)
+        args[:2] = broadcast_kmu_arrays(args[0], args[1])
 
-def monopole(f):
-    """
-    Decorator to compute the monopole from a `self.power` function
-    """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        return np.array([simps(pk, x=mus) for pk in Pkmus])
-    return wrapper
+        # the outermost raw call sets the flag for any nested calls
+        nested = getattr(_raw_call, 'active', False)
+        if raw and not nested:
+            _raw_call.active = True
+            try:
+                P = np.squeeze(f(self, *args, **kwargs))
+            finally:
+                _raw_call.active = False
+        else:
+            P = np.squeeze(f(self, *args, **kwargs))
 
-def quadrupole(f):
-    """
-    Decorator to compute the quadrupole from a `self.power` function
-    """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        kern = 2.5*(3*mus**2 - 1.)
-        return np.array([simps(kern*pk, x=mus) for pk in Pkmus])
-    return wrapper
+        if not raw and not nested:
+            return return_xarray(P, args[0], args[1], flatten=kwargs.get('flatten', False))
 
-def hexadecapole(f):
-    """
-    Decorator to compute the hexadecapole from a `self.power` function
-    """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        kern = 9./8.*(35*mus**4 - 30.*mus**2 + 3.)
-        return np.array([simps(kern*pk, x=mus) for pk in Pkmus])
-    return wrapper
+        P = np.asarray(P)
+        if out is not None:
+            out[...] = P.reshape(out.shape)
+            return out
+        return np.ascontiguousarray(np.atleast_1d(P))
 
-def tetrahexadecapole(f):
-    """
-    Decorator to compute the tetrahexadecapole from a `self.power` function
-    """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        kern = 13./16.*(231*mus**6 - 315*mus**4 + 105*mus**2 - 5)
-        return np.array([simps(kern*pk, x=mus) for pk in Pkmus])
     return wrapper
 
 
@@ -387,6 +369,52 @@ class RSDSpline(interp.InterpolatedUnivariateSpline):
                 raise InterpolationDomainError(above_bounds=above, below_bounds=below)
             return y_new
 
+def evaluate_splines(x, y, x_new):
+    """
+    Evaluate the cubic splines interpolating each row of ``y`` on the
+    domain ``x``, which agree with :class:`RSDSpline`, at ``x_new``
+
+    Parameters
+    ----------
+    x : (N,) array_like
+        the increasing domain points
+    y : (..., M, N) array_like
+        the data points of each of the ``M`` splines, optionally for
+        several sets of splines along the leading axes
+    x_new : array_like
+        the points to evaluate the splines at; if 2D with ``M`` rows (or
+        if ``M`` is 1), the i-th spline is evaluated at the i-th row, and
+        otherwise, each spline is evaluated at all of the points
+
+    Returns
+    -------
+    y_new : array_like
+        the interpolated values, with shape ``y.shape[:-2] + x_new.shape``
+        if evaluated row-wise, and ``y.shape[:-1] + x_new.shape`` otherwise
+    """
+    x_new = np.asarray(x_new)
+    below = (x_new < x[0]).any()
+    above = (x_new > x[-1]).any()
+    if below or above:
+        raise InterpolationDomainError(above_bounds=above, below_bounds=below)
+
+    # the not-a-knot cubic spline of each row
+    y = np.asarray(y)
+    spl = interp.CubicSpline(x, y, axis=-1)
+    if x_new.ndim != 2 or y.ndim < 2 or y.shape[-2] not in (1, len(x_new)):
+        return spl(x_new)
+
+    # evaluate the polynomial piece of each spline at its own row,
+    # with coefficients of shape (..., 4, N-1, M)
+    c = np.moveaxis(spl.c, [0, 1], [-3, -2])
+    i = np.clip(np.searchsorted(x, x_new, side='right')-1, 0, len(x)-2)
+    rows = np.arange(len(x_new))[:,None] if y.shape[-2] > 1 else 0
+    dx = x_new - x[i]
+    toret = c[...,0,i,rows]
+    for j in range(1, 4):
+        toret = toret*dx + c[...,j,i,rows]
+    return toret
+
 #-------------------------------------------------------------------------------
 # bias to mass relation
 #-------------------------------------------------------------------------------
@@ -394,13 +422,24 @@ class BiasToMassRelation(Cache):
     """
     Class to handle conversions between mass (in M_sun/h) and bias quickly
     using an interpolation table
+
+    The table holds :math:`\sigma(M)` at :math:`z=0` on a fine mass grid,
+    which is stored in the disk cache keyed by the cosmology. The Tinker
+    bias relation depends only on :math:`\sigma`, so the mass of any
+    (``sigma8_z``, ``b1``) pairs is found by inverting the (monotonic)
+    bias and :math:`\sigma(M)` relations with splines, without any root
+    finding.
     """
-    # define the interpolation grid
+    # the nominal range of the tabulated relation
     interpolation_grid = {}
     interpolation_grid['sigma8_z'] = np.linspace(0.3, 1.0, 100)
     interpolation_grid['b1'] = np.linspace(0.9, 8., 70)
 
-    def __init__(self, z, cosmo, interpolate=False):
+    # the mass grid, in units of mass_norm
+    mass_norm = 1e13
+    mass_grid = np.logspace(-10, 4, 2000)
+
+    def __init__(self, z, cosmo, interpolate=False, disk_cache=True):
         """
         Parameters
         ----------
@@ -410,11 +449,15 @@ class BiasToMassRelation(Cache):
             The cosmology object
         interpolate : bool, optional
             Whether to return results from an interpolation table
+        disk_cache : bool, optional
+            Whether to store the interpolation table on disk, keyed by
+            a hash of the cosmology
         """
         # save the parameters
         self.z = z
         self.cosmo = cosmo
         self.interpolate = interpolate
+        self.disk_cache = disk_cache
         self.delta_halo = 200
 
     #---------------------------------------------------------------------------
@@ -445,6 +488,12 @@ class BiasToMassRelation(Cache):
     def delta_halo(self, val):
         return val
 
+    @parameter
+    def disk_cache(self, val):
+        """
+        Whether to store the interpolation table in the disk cache
+        """
+        return bool(val)
 
     @cached_property("cosmo")
     def power_lin(self):
@@ -453,52 +502,89 @@ class BiasToMassRelation(Cache):
         """
         return pygcl.LinearPS(self.cosmo, 0.)
 
+    @cached_property("cosmo", "disk_cache")
+    def _disk_cache(self):
+        """
+        The disk cache holding the interpolation table for the current
+        cosmology, or `None` if the disk cache is disabled
+        """
+        from ._disk_cache import DiskCache, cosmology_hash, enabled
+        from . import __version__
+
+        if not self.disk_cache or not enabled():
+            return None
+        return DiskCache(cosmology_hash(self.cosmo, 'bias_to_mass', __version__))
+
     #---------------------------------------------------------------------------
-    @cached_property()
-    def interpolation_table(self):
+    def _mass_to_radius(self, mass):
         """
-        Evaluate the bias to mass relation at the interpolation grid points
+        The Lagrangian radius of ``mass``, in units of :attr:`mass_norm`
         """
-        # setup a few functions we need
         mean_dens = self.cosmo.rho_bar_z(0.)
-        mass_norm = 1e13
-        mass_to_radius = lambda M: (3.*M*mass_norm/(4.*np.pi*mean_dens))**(1./3.)
-        s8_0 = self.cosmo.sigma8()
+        return (3.*mass*self.mass_norm/(4.*np.pi*mean_dens))**(1./3.)
+
+    @cached_property("power_lin", "_disk_cache")
+    def sigma_table(self):
+        """
+        The mass variance :math:`\sigma(M)` at `z=0` on :attr:`mass_grid`
+        """
+        from ._disk_cache import persisted
 
-        # setup the sigma spline
-        R_interp = np.logspace(-3, 4, 1000)
-        sigmas = self.power_lin.Sigma(R_interp)
-        sigma_spline = RSDSpline(R_interp, sigmas, bounds_error=True)
+        compute = lambda: self.power_lin.Sigma(self._mass_to_radius(self.mass_grid))
+        return np.asarray(persisted(self, 'sigma_M', compute, domain=self.mass_grid))
 
-        # the objective function to minimize
-        def objective(mass, bias, rescaling):
-            sigma = rescaling*sigma_spline(mass_to_radius(mass))
-            return bias_Tinker(sigma) - bias
+    @cached_property("sigma_table")
+    def interpolation_table(self):
+        """
+        The spline of log mass as a function of log :math:`\sigma` at `z=0`
+        """
+        # sigma decreases with mass
+        logsigma = np.log(self.sigma_table[::-1])
+        logmass = np.log(self.mass_grid[::-1])
+        return RSDSpline(logsigma, logmass, bounds_error=True)
 
-        # setup the grid points
-        sigma8s = self.interpolation_grid['sigma8_z']
-        b1s = self.interpolation_grid['b1']
-        pts = np.asarray(list(itertools.product(sigma8s, b1s)))
+    @cached_property("delta_halo")
+    def _bias_inverse(self):
+        """
+        The spline of log :math:`\sigma` as a function of the Tinker bias
 
-        grid_vals = []
-        for (s8_z, b1) in pts:
+        Only the branch where the bias increases with mass is used.
+        """
+        logsigma = np.linspace(np.log(100.), np.log(0.01), 4000)
+        b = bias_Tinker(np.exp(logsigma), delta_halo=self.delta_halo)
+        i = np.argmin(b)
+        return RSDSpline(b[i:], logsigma[i:], bounds_error=True)
 
-            # get appropriate rescalings
-            rescaling = (s8_z / s8_0)
+    def _compute_fresh(self, sigma8_z, b1):
+        """
+        Return the mass for a single (``sigma8_z``, ``b1``) pair
+        by root finding
+        """
+        rescaling = sigma8_z / self.cosmo.sigma8()
 
-            # find the zero
-            try:
-                M = brentq(objective, 1e-10, 1e4, args=(b1, rescaling))*mass_norm
-            except Exception as e:
-                print(s8, b1)
-                print(objective(1e-10, b1, rescaling), objective(1e4, b1, rescaling))
-                raise Exception(e)
+        # the objective function to minimize
+        def objective(mass):
+            sigma = rescaling*self.power_lin.Sigma(self._mass_to_radius(mass))
+            return bias_Tinker(sigma, delta_halo=self.delta_halo) - b1
 
-            grid_vals.append(M)
-        grid_vals = np.array(grid_vals).reshape((len(sigma8s), len(b1s)))
+        return brentq(objective, 1e-8, 1e3)*self.mass_norm
 
-        # return the interpolator
-        return RegularGridInterpolator((sigma8s, b1s), grid_vals)
+    def _mass_from_table(self, sigma8_z, b1):
+        """
+        Return the mass for arrays of (``sigma8_z``, ``b1``) from the
+        interpolation table, and a mask of the pairs within the table
+        """
+        toret = np.empty(np.shape(b1))
+        valid = (b1 >= self._bias_inverse.x[0])&(b1 <= self._bias_inverse.x[-1])
+
+        # the z = 0 sigma at these biases
+        logsigma = self._bias_inverse(b1[valid]) + np.log(self.cosmo.sigma8() / sigma8_z[valid])
+
+        spl = self.interpolation_table
+        inside = (logsigma >= spl.x[0])&(logsigma <= spl.x[-1])
+        valid[valid] = inside
+        toret[valid] = np.exp(spl(logsigma[inside]))*self.mass_norm
+        return toret, valid
 
     @unpacked
     def __call__(self, sigma8_z, b1):
@@ -508,32 +594,27 @@ class BiasToMassRelation(Cache):
 
         Parameters
         ----------
-        sigma8_z : float
+        sigma8_z : float, array_like
             The sigma8 value
-        b1 : float
-            The linear bias
+        b1 : float, array_like
+            The linear bias; this is broadcast against ``sigma8_z``
         """
-        def compute_fresh(sigma8_z, b1):
-            # setup a few functions we need
-            mean_dens = self.cosmo.rho_bar_z(0.)
-            mass_norm = 1e13
-            mass_to_radius = lambda M: (3.*M*mass_norm/(4.*np.pi*mean_dens))**(1./3.)
-            rescaling = sigma8_z / self.cosmo.sigma8()
-
-            # the objective function to minimize
-            def objective(mass):
-                sigma = rescaling*self.power_lin.Sigma(mass_to_radius(mass))
-                return bias_Tinker(sigma, delta_halo=self.delta_halo) - b1
-
-            return brentq(objective, 1e-8, 1e3)*mass_norm
+        sigma8_z, b1 = np.broadcast_arrays(np.asarray(sigma8_z, dtype=float),
+                                            np.asarray(b1, dtype=float))
+        shape = b1.shape
+        sigma8_z, b1 = sigma8_z.ravel(), b1.ravel()
 
         if self.interpolate:
-            try:
-                return self.interpolation_table([sigma8_z, b1])
-            except InterpolationDomainError:
-                return compute_fresh(sigma8_z, b1)
+            toret, valid = self._mass_from_table(sigma8_z, b1)
         else:
-            return compute_fresh(sigma8_z, b1)
+            toret, valid = np.empty(len(b1)), np.zeros(len(b1), dtype=bool)
+
+        # compute any remaining pairs from scratch
+        for i in np.nonzero(~valid)[0]:
+            toret[i] = self._compute_fresh(sigma8_z[i], b1[i])
+
+        toret = toret.reshape(shape)
+        return toret if toret.ndim else toret.item()
 
 
 #-------------------------------------------------------------------------------
@@ -543,7 +624,7 @@ class BiasToSigmaRelation(BiasToMassRelation):
     """
     Class to represent the relation between velocity dispersion and halo bias
     """
-    def __init__(self, z, cosmo, interpolate=False, sigmav_0=None, M_0=None):
+    def __init__(self, z, cosmo, interpolate=False, sigmav_0=None, M_0=None, disk_cache=True):
         """
         Parameters
         ----------
@@ -553,9 +634,13 @@ class BiasToSigmaRelation(BiasToMassRelation):
             The cosmology object
         interpolate : bool, optional
             Whether to return results from an interpolation table
+        disk_cache : bool, optional
+            Whether to store the interpolation table on disk, keyed by
+            a hash of the cosmology
         """
         # initialize the base class
-        super(BiasToSigmaRelation, self).__init__(z, cosmo, interpolate=interpolate)
+        kws = {'interpolate':interpolate, 'disk_cache':disk_cache}
+        super(BiasToSigmaRelation, self).__init__(z, cosmo, **kws)
 
         # store the normalizations
         self.sigmav_0 = sigmav_0
@@ -634,10 +719,10 @@ class BiasToSigmaRelation(BiasToMassRelation):
 
         Parameters
         ----------
-        sigma8 : float
+        sigma8 : float, array_like
             The sigma8 value
-        b1 : float
-            The linear bias
+        b1 : float, array_like
+            The linear bias; this is broadcast against ``sigma8_z``
         """
         # first get the halo mass
         M = self.mass(sigma8_z, b1)
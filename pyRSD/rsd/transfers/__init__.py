@@ -1,7 +1,77 @@
 from pyRSD.rsd._cache import Cache, parameter
 from pyRSD import numpy as np
+from scipy import sparse
 import warnings
 
+def average_matrix(indices, binshape, weights, norm=None):
+    """
+    Return the sparse matrix that performs a weighted average of
+    values into the bins specified by ``indices``.
+
+    This is the matrix form of the ``numpy.bincount`` re-binning used by
+    the wedge and multipole transfers. Only every other ``mu`` bin
+    is kept, since the ``mu`` edges are given as (lower, upper) pairs.
+
+    Parameters
+    ----------
+    indices : array_like, (N,)
+        the flat bin index of each input value, for bins with shape
+        ``binshape``, including the under/overflow bins
+    binshape : tuple
+        the shape of the bin counting arrays, (Nk+2, Nmu+2)
+    weights : array_like, (N,)
+        the weights to apply to each input value
+    norm : array_like, (N,), optional
+        the weights to sum to get the normalization of each bin;
+        default is ``weights``
+
+    Returns
+    -------
+    M : scipy.sparse.csr_matrix, (Nk*Nbins, N)
+        the averaging matrix, where the output is flattened in
+        column-major order, i.e., each ``mu`` bin is contiguous
+    """
+    if norm is None: norm = weights
+    N = np.bincount(indices, weights=norm, minlength=np.prod(binshape))
+
+    # map the bin indices to the rows of the output
+    dig_k, dig_mu = np.unravel_index(indices, binshape)
+    Nk = binshape[0] - 2
+    Nbins = (binshape[1] - 1) // 2
+    valid = (dig_k >= 1)&(dig_k <= Nk)&(dig_mu >= 1)&(dig_mu < binshape[1]-1)&(dig_mu % 2 == 1)
+    rows = (dig_mu - 1) // 2 * Nk + (dig_k - 1)
+    cols = np.arange(len(indices))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        data = weights / N[indices]
+
+    shape = (Nk*Nbins, len(indices))
+    return sparse.csr_matrix((data[valid], (rows[valid], cols[valid])), shape=shape)
+
+def weights_matrix(weights, Nk):
+    """
+    Return the sparse matrix that applies the same ``mu`` weights at
+    each ``k``, as used by the multipole and wedge transfers.
+
+    Parameters
+    ----------
+    weights : array_like, (Nbins, Nmu)
+        the weights mapping the power at each ``mu`` to each output bin
+    Nk : int
+        the number of ``k`` values
+
+    Returns
+    -------
+    M : scipy.sparse.csr_matrix, (Nk*Nbins, Nk*Nmu)
+        the matrix mapping the power on the (k,mu) grid to the output,
+        flattened in column-major order
+    """
+    # one block per output bin, each block is diagonal in k
+    blocks = []
+    for kern in weights:
+        blocks.append(sparse.kron(sparse.identity(Nk), kern[None,:]))
+    return sparse.vstack(blocks, format='csr')
+
 class PkmuGrid(object):
     """
     A class to represent a 2D grid of (``k``, ``mu``).
@@ -81,6 +151,19 @@ class PkmuGrid(object):
     def __repr__(self):
         return self.__str__()
 
+def quadrature_grid(k, mu, quadrature):
+    """
+    Return the :class:`PkmuGrid` with unity weights of the ``k`` values
+    and the ``mu`` nodes of the given quadrature rule
+    """
+    grid_k, grid_mu =  np.meshgrid(k, mu, indexing='ij')
+    weights = np.ones_like(grid_k) # unity weights
+    with warnings.catch_warnings():
+        # the Gauss-Legendre rule needs far fewer than 40 nodes
+        if quadrature == 'gauss':
+            warnings.filterwarnings('ignore', message="initializing PkmuGrid with fewer mu bins")
+        return PkmuGrid([k, mu], grid_k, grid_mu, weights)
+
 class TransferBase(Cache):
     """
     A base class for a P(k,mu) transfer function.
@@ -112,12 +195,10 @@ class TransferBase(Cache):
     def flatmu(self):
         return self.grid.mu[self.grid.notnull]
 
-    @parameter
-    def power(self, val):
+    def _grid_values(self, val):
         """
-        The power array holding :math:`P(k,\mu)` on the grid.
-
-        Shape is (:attr:`Nk`, :attr`Nmu`), with NaNs for any null grid points.
+        Return ``val`` as a numpy array on the grid, with shape
+        (:attr:`Nk`, :attr`Nmu`) and NaNs for any null grid points
         """
         import xarray as xr
 
@@ -125,11 +206,7 @@ class TransferBase(Cache):
         if isinstance(val, xr.DataArray):
             val = val.values
 
-        # create a DataArray on the grid with null values
         toret = np.ones(self.gridshape)*np.nan
-        coords = {'k':self.grid.k_cen, 'mu':self.grid.mu_cen}
-        toret = xr.DataArray(toret, coords=coords, dims=['k', 'mu'])
-
         if val is None:
             return toret
 
@@ -139,15 +216,29 @@ class TransferBase(Cache):
         # if flat data, we are setting the valid data points
         if np.ndim(val) == 1:
             if len(val) == valid:
-                toret.values[self.grid.notnull] = val
+                toret[self.grid.notnull] = val
             else:
                 raise ValueError("if 1D array is passed for ``power``, must have length %d" %valid)
         else:
-            toret.values[self.grid.notnull] = val[self.grid.notnull]
+            toret[self.grid.notnull] = val[self.grid.notnull]
         return toret
 
+    @parameter
+    def power(self, val):
+        """
+        The power array holding :math:`P(k,\mu)` on the grid.
+
+        Shape is (:attr:`Nk`, :attr`Nmu`), with NaNs for any null grid points.
+        """
+        import xarray as xr
+
+        # create a DataArray on the grid with null values
+        coords = {'k':self.grid.k_cen, 'mu':self.grid.mu_cen}
+        return xr.DataArray(self._grid_values(val), coords=coords, dims=['k', 'mu'])
+
 from .grid import GriddedWedgeTransfer, GriddedMultipoleTransfer
 from .poles import MultipoleTransfer
+from .wedges import WedgeTransfer
 from .window import WindowFunctionTransfer
 
 gridded_transfers = (GriddedWedgeTransfer, GriddedMultipoleTransfer)
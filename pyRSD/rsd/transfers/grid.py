@@ -1,6 +1,6 @@
 from pyRSD import numpy as np
 from pyRSD.rsd._cache import parameter, cached_property
-from pyRSD.rsd.transfers import TransferBase
+from pyRSD.rsd.transfers import TransferBase, average_matrix
 
 import xarray as xr
 from scipy.special import legendre
@@ -188,6 +188,40 @@ class GriddedWedgeTransfer(TransferBase):
         with np.errstate(invalid='ignore', divide='ignore'):
             return self.sum(d*w) / self.sum(w)
 
+    def _average_matrix(self, w=None):
+        """
+        Return the sparse matrix form of :func:`average`, acting on the
+        power at the valid grid points.
+
+        Parameters
+        ----------
+        w : array_like, (``grid.Nk``, ``grid.Nmu``)
+            optional weight array to apply before averaging; the
+            normalization always uses the number of modes
+        """
+        modes = self.grid.modes[self.grid.notnull]
+        weights = modes if w is None else (w*self.grid.modes)[self.grid.notnull]
+        toret = average_matrix(self.mu_indices, self.binshape, weights, norm=modes)
+
+        # make sure there are no empty bins in the valid k-range!
+        N = np.asarray(abs(toret).sum(axis=1)).ravel().reshape((self.N1, -1), order='F')
+        if (N[self.in_k_range[:,:N.shape[1]]] == 0.).any():
+            raise ValueError("empty bins in %s result within valid k range!" %self.__class__.__name__)
+
+        return toret
+
+    @cached_property("mu_edges", "kmin", "kmax")
+    def transfer_matrix(self):
+        """
+        The sparse matrix mapping the power at the valid grid points
+        to the flattened (column-major) wedges, with shape
+        (``N1*N2``, ``len(flatk)``).
+
+        Values outside of the valid k-range are included; they are
+        ``False`` in :attr:`in_k_range`.
+        """
+        return self._average_matrix()
+
     def __call__(self, power):
         """
         Return the ``power`` attribute re-binned into the ``mu`` bins
@@ -276,6 +310,24 @@ class GriddedMultipoleTransfer(GriddedWedgeTransfer):
         """
         return np.array([(2*ell+1)*legendre(ell)(self.grid.mu) for ell in self.ells])
 
+    def _multipole_matrix(self):
+        """
+        Return the sparse matrix form of :func:`__call__`, mapping the
+        power at the valid grid points to the flattened (column-major)
+        multipoles.
+        """
+        from scipy import sparse
+        return sparse.vstack([self._average_matrix(w) for w in self.legendre_weights], format='csr')
+
+    @cached_property("ells", "mu_edges", "kmin", "kmax")
+    def transfer_matrix(self):
+        """
+        The sparse matrix mapping the power at the valid grid points
+        to the flattened (column-major) multipoles, with shape
+        (``N1*N2``, ``len(flatk)``).
+        """
+        return self._multipole_matrix()
+
     @property
     def coords(self):
         """
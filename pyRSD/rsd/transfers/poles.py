@@ -1,8 +1,10 @@
 from pyRSD import pygcl, numpy as np
-from pyRSD.rsd.transfers import PkmuGrid, TransferBase
+from pyRSD.rsd._cache import cached_property
+from pyRSD.rsd.transfers import TransferBase, quadrature_grid, weights_matrix
+
+from pyRSD.rsd.multipoles import even_gauss_legendre, legendre_weights
 
 import xarray as xr
-from scipy.special import legendre
 
 
 class MultipoleTransfer(TransferBase):
@@ -18,30 +20,66 @@ class MultipoleTransfer(TransferBase):
     ells : int, list of int
         the multipole numbers we wish to compute
     Nmu : int, optional
-        the number of ``mu`` points to use when performing the multipole integration
+        the number of ``mu`` points to use when performing the multipole
+        integration; default is 40 for Simpson's rule and 8 for Gauss-Legendre
+    quadrature : {'simpson', 'gauss'}, optional
+        the integration rule; either Simpson's rule on a uniform ``mu`` grid,
+        or the Gauss-Legendre rule, which is exact for polynomials in ``mu``
+        and needs far fewer evaluations for smooth models
     """
-    def __init__(self, k, ells, Nmu=40):
+    def __init__(self, k, ells, Nmu=None, quadrature='simpson'):
 
         # the multipoles
         self.ells = np.array(ells, ndmin=1)
 
-        # use odd number of samples for simpson's rule
-        if Nmu % 2 == 0: Nmu += 1
+        if quadrature == 'simpson':
+            if Nmu is None: Nmu = 40
+
+            # use odd number of samples for simpson's rule
+            if Nmu % 2 == 0: Nmu += 1
+
+            # make the grid
+            # NOTE: use mu edges so we include full integration range, [0,2]
+            mu = np.linspace(0., 1., Nmu, endpoint=True)
+            w = np.array([pygcl.SimpsIntegrate(mu, x) for x in np.eye(len(mu))])
+        elif quadrature == 'gauss':
+            if Nmu is None: Nmu = 8
+            mu, w = even_gauss_legendre(Nmu)
+        else:
+            raise ValueError("'quadrature' should be 'simpson' or 'gauss', not '%s'" %quadrature)
+        self.quadrature = quadrature
+        self.mu_weights = w
+
+        self.grid = quadrature_grid(k, mu, quadrature)
+
+    @cached_property()
+    def weights(self):
+        """
+        The weights mapping the power at each ``mu`` to the multipoles,
+        with shape (``len(ells)``, ``Nmu``)
+        """
+        return legendre_weights(self.ells, self.grid.mu_cen, self.mu_weights)
 
-        # make the grid
-        # NOTE: use mu edges so we include full integration range, [0,2]
-        mu = np.linspace(0., 1., Nmu, endpoint=True)
-        grid_k, grid_mu =  np.meshgrid(k, mu, indexing='ij')
-        weights = np.ones_like(grid_k) # unity weights
-        self.grid = PkmuGrid([k,mu], grid_k, grid_mu, weights)
+    @cached_property("weights")
+    def transfer_matrix(self):
+        """
+        The sparse matrix mapping the power on the (k,mu) grid to the
+        flattened (column-major) multipoles, with shape
+        (``Nk*len(ells)``, ``Nk*Nmu``).
+        """
+        return weights_matrix(self.weights, self.Nk)
 
-    def __call__(self, power):
+    def __call__(self, power, raw=False):
         """
         Parameters
         ----------
         power : xarray.DataArray
             a DataArray holding the :math:`P(k,\mu)` values on a
-            coordinate grid with ``k`` and ``mu`` dimensions
+            coordinate grid with ``k`` and ``mu`` dimensions, or a numpy
+            array of the same shape or of the valid grid points
+        raw : bool, optional
+            if `True`, return a numpy array rather than a DataArray, and
+            do not set the :attr:`power` attribute
 
         Returns
         -------
@@ -49,21 +87,14 @@ class MultipoleTransfer(TransferBase):
             a DataArray holding the :math:`P_\ell(k)` on a coordinate grid
             with ``k`` and ``ell`` dimensions.
         """
-        self.power = power
-
-        # input coordinate grid
-        k = self.power['k']
-        mu = self.power['mu']
-
-        # return array
-        Nk = len(self.power)
-        shape = (len(k), len(self.ells))
-        Pell = xr.DataArray(np.empty(shape), coords=[('k', k), ('ell', self.ells)])
-
-        # compute each Pell
-        for ell in self.ells:
-            kern = (2*ell+1.)*legendre(ell)(mu)
-            val = np.array([pygcl.SimpsIntegrate(mu, kern*d) for d in self.power])
-            Pell.loc[dict(ell=ell)] = val
+        if raw:
+            P = self._grid_values(power)
+        else:
+            self.power = power
+            P = self.power.values
 
-        return Pell
+        # the multipoles of each k
+        Pell = np.einsum('lm,km->kl', self.weights, P)
+        if raw:
+            return Pell
+        return xr.DataArray(Pell, coords=[('k', self.grid.k_cen), ('ell', self.ells)])
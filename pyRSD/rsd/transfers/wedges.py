@@ -1,6 +1,8 @@
 from pyRSD import pygcl, numpy as np
 from pyRSD.rsd._cache import parameter, cached_property
-from pyRSD.rsd.transfers import PkmuGrid, TransferBase
+from pyRSD.rsd.transfers import TransferBase, quadrature_grid, weights_matrix
+from pyRSD.rsd.multipoles import gauss_legendre
+
 import xarray as xr
 
 
@@ -18,9 +20,14 @@ class WedgeTransfer(TransferBase):
         a list of tuples specifying (lower, upper) for each desired
         mu bin, i.e., [(0., 0.2), (0.2, 0.4), (0.4, 0.6), (0.6, 0.8), (0.8, 1.0)]
     Nmu : int, optional
-        the number of ``mu`` points to use when performing the multipole integration
+        the number of ``mu`` points to use when performing the wedge average;
+        for the Gauss-Legendre rule, this is the number of nodes per wedge,
+        with a default of 4
+    quadrature : {'uniform', 'gauss'}, optional
+        the averaging rule; either the mean of a uniform ``mu`` grid in
+        each wedge, or the Gauss-Legendre rule in each wedge
     """
-    def __init__(self, k, mu_bounds, Nmu=40):
+    def __init__(self, k, mu_bounds, Nmu=None, quadrature='uniform'):
 
         # handle a single bin
         if not isinstance(mu_bounds, list) and isinstance(mu_bounds, tuple):
@@ -28,13 +35,16 @@ class WedgeTransfer(TransferBase):
 
         # centers of the returned array
         self.mu_cen = np.array([0.5*(lo+hi) for (lo,hi) in mu_bounds])
-        self.mu_bounds = mu_bounds
 
-        # make the grid
-        mu = np.linspace(0., 1., Nmu+1, endpoint=True)
-        grid_k, grid_mu =  np.meshgrid(k, mu, indexing='ij')
-        weights = np.ones_like(grid_k) # unity weights
-        self.grid = PkmuGrid([k,mu], grid_k, grid_mu, weights)
+        if quadrature not in ['uniform', 'gauss']:
+            raise ValueError("'quadrature' should be 'uniform' or 'gauss', not '%s'" %quadrature)
+        if Nmu is None:
+            Nmu = 40 if quadrature == 'uniform' else 4
+        self.quadrature = quadrature
+        self._k = k
+        self._Nnodes = Nmu
+
+        self.mu_bounds = mu_bounds
 
     @parameter
     def mu_bounds(self, val):
@@ -62,55 +72,87 @@ class WedgeTransfer(TransferBase):
             raise ValueError("specified `mu` bounds are not monotonically increasing")
         return toret
 
-    def __call__(self, power):
+    @cached_property("mu_bounds")
+    def mu_nodes(self):
+        """
+        The ``mu`` values of the grid, and the weights of the nodes in
+        each wedge for the Gauss-Legendre rule (`None` otherwise)
+        """
+        if self.quadrature == 'uniform':
+            return np.linspace(0., 1., self._Nnodes+1, endpoint=True), None
+
+        nodes = [gauss_legendre(self._Nnodes, lo, min(hi, 1.)) for (lo, hi) in self.mu_bounds]
+        mu = np.concatenate([x for x, _ in nodes])
+        return mu, [w/w.sum() for _, w in nodes]
+
+    @cached_property("mu_nodes")
+    def grid(self):
+        """
+        The :class:`PkmuGrid` of the ``k`` values and ``mu`` nodes
+        """
+        return quadrature_grid(self._k, self.mu_nodes[0], self.quadrature)
+
+    @cached_property("mu_edges", "mu_nodes")
+    def weights(self):
+        """
+        The weights mapping the power at each ``mu`` to the wedges,
+        with shape (``len(mu_bounds)``, ``Nmu``)
+        """
+        Nw = len(self.mu_edges) // 2
+        toret = np.zeros((Nw, self.grid.Nmu))
+
+        # the Gauss-Legendre weights in each wedge
+        mu_weights = self.mu_nodes[1]
+        if mu_weights is not None:
+            start = 0
+            for i, w in enumerate(mu_weights):
+                toret[i, start:start+len(w)] = w
+                start += len(w)
+            return toret
+
+        # only odd bins are wedges, since edges are (lower, upper) pairs
+        dig_mu = np.digitize(self.grid.mu_cen, self.mu_edges)
+        valid = (dig_mu % 2 == 1)&(dig_mu < len(self.mu_edges))
+        toret[(dig_mu[valid]-1)//2, np.nonzero(valid)[0]] = 1.
+
+        # the mean in each wedge
+        return toret / toret.sum(axis=1, keepdims=True)
+
+    @cached_property("weights")
+    def transfer_matrix(self):
+        """
+        The sparse matrix mapping the power on the (k,mu) grid to the
+        flattened (column-major) wedges, with shape
+        (``Nk*len(mu_bounds)``, ``Nk*Nmu``).
+        """
+        return weights_matrix(self.weights, self.Nk)
+
+    def __call__(self, power, raw=False):
         """
         Parameters
         ----------
         power : xarray.DataArray
             a DataArray holding the :math:`P(k,\mu)` values on a
-            coordinate grid with ``k`` and ``mu`` dimensions
+            coordinate grid with ``k`` and ``mu`` dimensions, or a numpy
+            array of the same shape or of the valid grid points
+        raw : bool, optional
+            if `True`, return a numpy array rather than a DataArray, and
+            do not set the :attr:`power` attribute
 
         Returns
         -------
-        Pell : xarray.DataArray
-            a DataArray holding the :math:`P_\ell(k)` on a coordinate grid
-            with ``k`` and ``ell`` dimensions.
+        Pwedge : xarray.DataArray
+            a DataArray holding the :math:`P(k,\mu)` wedges on a coordinate
+            grid with ``k`` and ``mu`` dimensions.
         """
-        self.power = power
-
-        # input coordinate grid
-        k = self.power['k']
-        mu = self.power['mu']
-
-        # the bin shape
-        Nk = self.grid.Nk; Nmu = len(self.mu_edges)-1
-        binshape =  (Nk+2, Nmu+2)
-
-        # compute the bin indices
-        k_idx = np.arange(self.grid.Nk, dtype=int)[:,None]
-        dig_k = np.repeat(k_idx, self.grid.Nmu, axis=1)[self.grid.notnull] + 1
-        dig_mu = np.digitize(self.grid.mu[self.grid.notnull], self.mu_edges)
-        indices = np.ravel_multi_index([dig_k, dig_mu], binshape)
-
-        # sum up power
-        toret = np.zeros(binshape)
-        minlength = np.prod(binshape)
-        P = self.power.values
-        toret.flat = np.bincount(indices, weights=P[self.grid.notnull], minlength=minlength)
-        toret = toret.reshape(binshape)[1:-1, 1:-1][..., ::2]
-
-        # and the normalization
-        N = np.zeros(binshape)
-        N.flat = np.bincount(indices, minlength=minlength)
-        N = N.reshape(binshape)[1:-1, 1:-1][..., ::2]
-
-        # normalize properly
-        toret /= N
-
-        # return array
-        shape = (len(k), len(self.mu_cen))
-        Pwedge = xr.DataArray(np.empty(shape), coords=[('k', k), ('mu', self.mu_cen)])
-        for i in range(Pwedge.shape[1]):
-            Pwedge[:,i] = toret[:,i]
-
-        return Pwedge
+        if raw:
+            P = self._grid_values(power)
+        else:
+            self.power = power
+            P = self.power.values
+
+        # the wedges of each k
+        Pwedge = np.einsum('wm,km->kw', self.weights, P)
+        if raw:
+            return Pwedge
+        return xr.DataArray(Pwedge, coords=[('k', self.grid.k_cen), ('mu', self.mu_cen)])
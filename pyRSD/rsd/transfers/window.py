@@ -1,11 +1,50 @@
+from pyRSD.rsd._cache import parameter, cached_property
 from pyRSD.rsd.transfers import PkmuGrid
 from pyRSD.rsd.transfers.grid import GriddedMultipoleTransfer
 from pyRSD.rsd.window import WindowConvolution
 from pyRSD import pygcl, numpy as np
 
+from numpy.fft import rfft, hfft
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
+from scipy.interpolate import make_interp_spline
 import xarray as xr
 
+def fftlog_matrix(transform, ncols=None):
+    """
+    Return the matrix representation of a :mod:`mcfit` transform,
+    evaluated with zero-padding (``extrap=False``).
+
+    Parameters
+    ----------
+    transform : mcfit.mcfit
+        the transform object, i.e., :class:`mcfit.P2xi`
+    ncols : int, optional
+        only compute the columns for the first ``ncols`` input values;
+        this is useful if the remaining inputs are known to be zero
+
+    Returns
+    -------
+    M : array_like, (len(transform.y), ncols)
+        the matrix such that ``M @ F[:ncols]`` equals ``transform(F)[1]``
+    """
+    x, N = transform.x, transform.N
+    Nx = len(x)
+    Npad = N - Nx
+    if ncols is None: ncols = Nx
+
+    # the pre-factors times the identity, zero-padded
+    prefac = np.broadcast_to(transform.prefac * x**(-transform.q), x.shape)
+    f = np.zeros((N, ncols))
+    f[Npad//2 + np.arange(ncols), np.arange(ncols)] = prefac[:ncols]
+
+    # the convolution, for all columns at once
+    g = hfft(rfft(f, axis=0) * transform._u[:,None], N, axis=0) / N
+    g = g[Npad - Npad//2 : N - Npad//2]
+
+    y = transform.y
+    postfac = np.broadcast_to(transform.postfac * y**(-transform.q), y.shape)
+    return postfac[:,None] * g
+
 class WindowFunctionTransfer(GriddedMultipoleTransfer):
     """
     A transfer function object to go from unconvolved to convolved multipoles.
@@ -28,8 +67,19 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
     max_ellprime : int, optional
         the maximum multipole number to include when determining the leakage
         of higher-order multipoles into a multipole of order ``ell``
+    k_out : array_like, optional
+        the default ``k`` values to evaluate the convolved multipoles at
+
+    Notes
+    -----
+    The convolution is linear in the unconvolved multipoles, so it is
+    computed as a single matrix-vector product with :attr:`mixing_matrix`,
+    which is built once and cached. The matrix can be saved to disk
+    with :func:`save_mixing_matrix` and reloaded with
+    :func:`load_mixing_matrix`.
     """
-    def __init__(self, window, ells, kmin=1e-4, kmax=0.7, Nk=1024, Nmu=40, max_ellprime=4):
+    def __init__(self, window, ells, kmin=1e-4, kmax=0.7, Nk=1024, Nmu=40,
+                    max_ellprime=4, k_out=None):
 
         # make the grid
         # NOTE: we want to use the centers of the mu bins here!
@@ -47,6 +97,144 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
         self.convolver = WindowConvolution(window[:,0], window[:,1:],
                                             max_ellprime=max_ellprime,
                                             max_ell=max(ells))
+        self.k_out = k_out
+
+    @parameter(default=None)
+    def k_out(self, val):
+        """
+        The ``k`` values to evaluate the convolved multipoles at; if ``None``,
+        the multipoles are returned on :attr:`padded_k`.
+        """
+        if val is not None:
+            val = np.array(val, dtype=float, ndmin=1)
+        return val
+
+    @cached_property()
+    def padded_k(self):
+        """
+        The ``k`` values of the grid, with additional log-spaced values
+        used for zero-padding up to k=100 h/Mpc.
+        """
+        oldk = self.grid.k_cen
+        dk = np.diff(np.log10(oldk))[0]
+        newk = 10**(np.arange(np.log10(oldk.max()) + dk, 2 + 0.5*dk, dk))
+        return np.concatenate([oldk, newk])
+
+    @cached_property("ells")
+    def padded_mixing_matrix(self):
+        """
+        The matrix mapping the flattened unconvolved multipoles to the
+        flattened convolved multipoles at :attr:`padded_k`.
+
+        Both vectors are flattened in column-major order, i.e., the
+        values for each ``ell`` are contiguous. The matrix includes the
+        FFTLog transforms and the window convolution.
+        """
+        from pyRSD.extern import mcfit
+
+        oldk = self.grid.k_cen
+        newk = self.padded_k
+        Nk = len(oldk); Nell = len(self.ells)
+
+        # need at least the first npoles multipoles for the convolution
+        npoles = self.convolver.max_ellprime//2 + 1
+        if Nell < npoles:
+            raise ValueError(("shape mismatch between kernel and number of xi multipoles; "
+                              "please provide the first %d even multipoles" %npoles))
+
+        # FFT the input multipoles; only the unpadded k values are non-zero
+        P2xi = []
+        for ell in self.ells:
+            T = mcfit.P2xi(newk, l=ell)
+            P2xi.append(fftlog_matrix(T, ncols=Nk))
+        rr = T.y
+
+        # convolve and FFTLog back, for each ell
+        Nout = len(newk)
+        toret = np.zeros((Nout*Nell, Nk*Nell))
+        for i, ell in enumerate(self.ells):
+            kern = self.convolver._get_kernel(ell, rr)
+            xi2P = fftlog_matrix(mcfit.xi2P(rr, l=ell))
+
+            for j in range(npoles):
+                block = np.dot(xi2P, kern[:,j][:,None] * P2xi[j])
+                toret[i*Nout:(i+1)*Nout, j*Nk:(j+1)*Nk] = block
+
+        return toret
+
+    @cached_property("k_out", "padded_mixing_matrix")
+    def mixing_matrix(self):
+        """
+        The matrix mapping the flattened unconvolved multipoles to the
+        flattened convolved multipoles at :attr:`k_out`.
+
+        This is :attr:`padded_mixing_matrix`, followed by the spline
+        interpolation from :attr:`padded_k` to :attr:`k_out`.
+        """
+        M = self.padded_mixing_matrix
+        if self.k_out is None:
+            return M
+
+        # interpolate the rows for each ell
+        Nell = len(self.ells)
+        M = M.reshape((Nell, len(self.padded_k), -1))
+        interp = make_interp_spline(self.padded_k, M, k=3, axis=1)(self.k_out)
+        return interp.reshape((Nell*len(self.k_out), -1))
+
+    @cached_property("mixing_matrix", "mu_edges", "kmin", "kmax")
+    def transfer_matrix(self):
+        """
+        The matrix mapping the power at the valid grid points to the
+        flattened (column-major) convolved multipoles at :attr:`k_out`.
+
+        This is the product of :attr:`mixing_matrix` and the gridded
+        multipole matrix.
+        """
+        from scipy import sparse
+        return sparse.csr_matrix(self._multipole_matrix().T.dot(self.mixing_matrix.T).T)
+
+    def save_mixing_matrix(self, filename):
+        """
+        Save the :attr:`mixing_matrix` to a ``.npz`` file, along with the
+        window and multipoles used to build it.
+        """
+        k_out = self.k_out if self.k_out is not None else []
+        np.savez(filename, matrix=self.mixing_matrix, ells=self.ells,
+                    k=self.grid.k_cen, k_out=k_out, s=self.convolver.s,
+                    window=self.convolver.W, max_ellprime=self.convolver.max_ellprime)
+
+    def load_mixing_matrix(self, filename):
+        """
+        Load the :attr:`mixing_matrix` from a ``.npz`` file, as saved by
+        :func:`save_mixing_matrix`.
+
+        This also sets :attr:`k_out` to the value used to build the matrix.
+
+        Raises
+        ------
+        ValueError :
+            if the matrix was built for a different window, ``k`` grid,
+            ``ells`` or ``max_ellprime``
+        """
+        d = np.load(filename)
+        missing = set(['matrix', 'ells', 'k', 'k_out', 's', 'window', 'max_ellprime']) - set(d.files)
+        if missing:
+            raise ValueError("saved mixing matrix is missing %s; please save it again" %str(sorted(missing)))
+
+        if not np.array_equal(d['ells'], self.ells):
+            raise ValueError("multipoles of saved mixing matrix do not match: %s" %str(d['ells']))
+        if int(d['max_ellprime']) != self.convolver.max_ellprime:
+            raise ValueError("max_ellprime of saved mixing matrix does not match: %d" %d['max_ellprime'])
+        if d['k'].shape != self.grid.k_cen.shape or not np.allclose(d['k'], self.grid.k_cen):
+            raise ValueError("k grid of saved mixing matrix does not match")
+        s, W = self.convolver.s, self.convolver.W
+        if d['s'].shape != s.shape or d['window'].shape != W.shape or \
+            not np.allclose(d['s'], s) or not np.allclose(d['window'], W):
+            raise ValueError("window of saved mixing matrix does not match")
+
+        self.k_out = d['k_out'] if len(d['k_out']) else None
+        del self.mixing_matrix # invalidates the dependent matrices
+        self._cache['mixing_matrix'] = d['matrix']
 
     def __call__(self, power, k_out=None, extrap=False, mcfit_kwargs={}, **kws):
         """
@@ -59,7 +247,11 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
             coordinate grid with ``k`` and ``mu`` dimensions.
         k_out : array_like, optional
             if provided, evaluate the convolved multipoles at these
-            ``k`` values using a spline
+            ``k`` values using a spline; default is :attr:`k_out`
+        extrap : bool, optional
+            whether to extrapolate with power laws when FFTLog-ing; if
+            ``True``, the convolution is no longer linear and the
+            :attr:`mixing_matrix` is not used
         **kws :
             additional keywords for testing purposes
 
@@ -71,6 +263,26 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
         """
         from pyRSD.extern import mcfit
 
+        if k_out is None:
+            k_out = self.k_out
+
+        # the linear case: one matrix-vector product
+        if not extrap and not mcfit_kwargs and not kws:
+            Pell0 = GriddedMultipoleTransfer.__call__(self, power)
+            x = Pell0.values.ravel(order='F')
+
+            # use the cached matrix for the default k_out
+            if k_out is None or (self.k_out is not None and np.array_equal(k_out, self.k_out)):
+                Pell = np.dot(self.mixing_matrix, x).reshape((-1, len(self.ells)), order='F')
+                k = self.k_out if self.k_out is not None else self.padded_k
+            # otherwise, interpolate the padded multipoles
+            else:
+                k = np.array(k_out, dtype=float, ndmin=1)
+                Pell = np.dot(self.padded_mixing_matrix, x).reshape((-1, len(self.ells)), order='F')
+                Pell = make_interp_spline(self.padded_k, Pell, k=3, axis=0)(k)
+
+            return xr.DataArray(Pell, coords={'k':k, 'ell':Pell0.ell}, dims=['k', 'ell'])
+
         # get testing keywords
         dry_run = kws.get('dry_run', False)
         no_convolution = kws.get('no_convolution', False)
@@ -78,11 +290,8 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
         # get the unconvovled theory multipoles
         Pell0 = GriddedMultipoleTransfer.__call__(self, power)
 
-        # create additional logspaced k values for zero-padding up to k=100 h/Mpc
-        oldk = Pell0['k'].values
-        dk = np.diff(np.log10(oldk))[0]
-        newk = 10**(np.arange(np.log10(oldk.max()) + dk, 2 + 0.5*dk, dk))
-        newk = np.concatenate([oldk, newk])
+        # additional logspaced k values for zero-padding up to k=100 h/Mpc
+        newk = self.padded_k
 
         # now copy over with zeros
         Nk = len(newk); Nell = Pell0.shape[1]
@@ -1,5 +1,18 @@
 params_filename = 'params.dat'
-model_filename = 'model.npy'
+model_filename = 'model.snapshot'
+legacy_model_filename = 'model.npy'
+
+def find_model_file(folder):
+    """
+    Return the path of the model file in ``folder``, falling back to
+    a pickled model saved by earlier versions if no snapshot exists
+    """
+    import os
+    path = os.path.join(folder, model_filename)
+    legacy = os.path.join(folder, legacy_model_filename)
+    if not os.path.exists(path) and os.path.exists(legacy):
+        return legacy
+    return path
 
 class GlobalFittingDriver(object):
     """
@@ -26,13 +39,12 @@ class GlobalFittingDriver(object):
 import logging
 from .util.rsd_logging import MPILoggerAdapter
 
-# import the drivers and run functions
-from .driver import FittingDriver
-
-# import the specific modules as well
-from . import data
-from . import solvers
-from . import parameters
-from . import results
-from . import theory
-from . import util
+# the driver and the specific modules are imported on first access
+from .._lazy import lazy_attributes
+__getattr__, __dir__ = lazy_attributes(__name__,
+                                       {'FittingDriver' : '.driver',
+                                        'data' : '.data',
+                                        'solvers' : '.solvers',
+                                        'parameters' : '.parameters',
+                                        'results' : '.results',
+                                        'theory' : '.theory'})
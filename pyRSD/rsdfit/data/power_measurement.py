@@ -436,6 +436,20 @@ class PowerDataSchema(Cache):
         """
         return val
 
+    @parameter(default=None)
+    def quadrature(self, val):
+        """
+        The rule used to integrate the model over :math:`\mu` when
+        neither a grid nor a window function is used; ``'gauss'`` uses
+        the Gauss-Legendre rule, which needs far fewer model evaluations.
+
+        By default (``None``), the multipoles use Simpson's rule and the
+        wedges average a uniform :math:`\mu` grid
+        """
+        if val not in [None, 'gauss']:
+            raise ValueError("the data 'quadrature' should be None or 'gauss'")
+        return val
+
     @parameter(default=None)
     def window_file(self, val):
         """
@@ -777,6 +791,10 @@ class PowerData(PowerDataSchema):
             kws['max_ellprime'] = self.max_ellprime
             kws['kmax'] = self.window_kmax
             kws['kmin'] = self.window_kmin
+
+            # evaluate the convolved multipoles at all measured k values
+            k_out = [self.measurements[self.statistics.index(stat)].k for stat in statistics]
+            kws['k_out'] = np.unique(np.concatenate(k_out))
             transfer = [transfers.WindowFunctionTransfer(window, ells, **kws)]
         else:
 
@@ -806,6 +824,11 @@ class PowerData(PowerDataSchema):
                 else:
                     cls = transfers.MultipoleTransfer
 
+                # the mu integration rule
+                kws = {}
+                if self.quadrature is not None:
+                    kws['quadrature'] = self.quadrature
+
                 # add a transfer for each ell or mu wedge
                 # NOTE: this accounts for different k values
                 t = []
@@ -813,7 +836,7 @@ class PowerData(PowerDataSchema):
                     
                     # the measurement for this statistic
                     m = self.measurements[self.statistics.index(stat)]
-                    t.append(cls(m.k, x[i]))
+                    t.append(cls(m.k, x[i], **kws))
 
                 transfer = t
 
@@ -1,6 +1,6 @@
 from .. import numpy as np, os
 from . import MPILoggerAdapter, logging
-from . import params_filename, model_filename
+from . import params_filename, find_model_file
 
 from .parameters import ParameterSet, Parameter
 from .theory import GalaxyPowerTheory, QuasarPowerTheory
@@ -181,6 +181,17 @@ class FittingDriverSchema(Cache):
         """
         return val
 
+    @parameter(default=None)
+    def emulator_file(self, val):
+        """
+        The name of a file holding an
+        :class:`~pyRSD.rsdfit.theory.emulator.EmulatedSpectrum` to use
+        in place of the model; if the file does not exist, the emulator
+        is trained before the fit (see :func:`FittingDriver.setup_emulator`)
+        and saved
+        """
+        return val
+
     @parameter(default={})
     def stat_specific_params(self, val):
         """
@@ -260,7 +271,11 @@ class FittingDriver(FittingDriverSchema):
 
 
         # get the model callables
-        self.model_callable, self.grad_model_callable = self._get_theory_callables()
+        self.theory_callable, self.grad_theory_callable = self._get_theory_callables()
+        self.emulator = None
+        if self.emulator_file is not None and os.path.exists(self.emulator_file):
+            from .theory.emulator import EmulatedSpectrum
+            self.emulator = EmulatedSpectrum.from_file(self.emulator_file)
 
     #---------------------------------------------------------------------------
     # class methods to start from directory
@@ -300,7 +315,7 @@ class FittingDriver(FittingDriverSchema):
             if not existing_model:
                 raise rsd_io.ConfigurationError('provided model file `%s` does not exist' %model_path)
         else:
-            model_path = os.path.join(dirname, model_filename)
+            model_path = find_model_file(dirname)
         if not os.path.exists(params_path):
             raise rsd_io.ConfigurationError('parameter file `%s` must exist to load driver' %params_path)
 
@@ -418,6 +433,10 @@ class FittingDriver(FittingDriverSchema):
 
         def final_model_callable():
             return np.concatenate([c() for c in callables], axis=0)
+
+        def batch(params):
+            return np.concatenate([c.batch(params) for c in callables], axis=-1)
+        final_model_callable.batch = batch
             
         def final_grad_callable(**kwargs):
             return np.concatenate([c(**kwargs) for c in grad_callables], axis=-1)
@@ -425,6 +444,128 @@ class FittingDriver(FittingDriverSchema):
         return final_model_callable, final_grad_callable
 
 
+    @property
+    def emulator(self):
+        """
+        The :class:`~pyRSD.rsdfit.theory.emulator.EmulatedSpectrum` used in
+        place of the model to compute the theory, or `None` to use the model
+        """
+        return self._emulator
+
+    @emulator.setter
+    def emulator(self, val):
+        """
+        Set the emulator, replacing the model callables
+        """
+        self._emulator = val
+        if val is None:
+            self.model_callable = self.theory_callable
+            self.grad_model_callable = self.grad_theory_callable
+            return
+
+        val.check(self.theory.free_names, self.Nb)
+
+        # outside of the training region, use the model
+        warned = [False]
+        def outside(theta):
+            if val.in_bounds(theta):
+                return False
+            if not warned[0]:
+                logger.warning("free parameters outside the training region of the emulator; "
+                               "using the model instead")
+                warned[0] = True
+            return True
+
+        def model_callable():
+            theta = self.theory.free_values
+            if outside(theta):
+                return self.theory_callable()
+            return val(theta)
+        self.model_callable = model_callable
+
+        def grad_model_callable(theta=None, **kwargs):
+            if theta is None: theta = self.theory.free_values
+            if outside(theta):
+                return self.grad_theory_callable(theta=theta, **kwargs)
+            return val.gradient(theta)
+        self.grad_model_callable = grad_model_callable
+
+        if val.validation is not None:
+            args = (val.validation['max'], val.validation['rms'])
+            logger.info("using emulator with max error = %.3g sigma, rms error = %.3g sigma" %args, on=0)
+
+    def train_emulator(self, pool=None, comm=None, **kwargs):
+        """
+        Train an :class:`~pyRSD.rsdfit.theory.emulator.EmulatedSpectrum` of
+        the theory and use it in place of the model
+
+        .. note::
+            The emulator is only set on the ranks calling this function, so
+            the workers of ``pool`` keep using the model; use ``comm`` to
+            train the emulator on every rank before creating the pool
+
+        Parameters
+        ----------
+        pool : MPIPool, optional
+            a MPI pool object to evaluate the training points in parallel
+        comm : MPI communicator, optional
+            the communicator whose ranks all call this function, and split
+            the evaluation of the training points
+        **kwargs :
+            additional keywords passed to
+            :func:`~pyRSD.rsdfit.theory.emulator.EmulatedSpectrum.train`
+        """
+        from .theory.emulator import EmulatedSpectrum
+
+        self.emulator = None
+        self.emulator = EmulatedSpectrum.train(self, pool=pool, comm=comm, **kwargs)
+        return self.emulator
+
+    def setup_emulator(self, comm=None):
+        """
+        Load the emulator from :attr:`emulator_file`, or train it and
+        save it to that file if it does not exist
+
+        With MPI, every rank of ``comm`` should call this function before
+        the MPI pool is created, so that each rank uses the emulator. The
+        training points are split between the ranks, and only the root
+        rank writes the file.
+
+        Parameters
+        ----------
+        comm : MPI communicator, optional
+            the communicator of all ranks that evaluate the theory
+        """
+        from .theory.emulator import EmulatedSpectrum
+
+        if self.emulator_file is None:
+            return
+
+        # the root decides, so all ranks either load or train
+        exists = os.path.exists(self.emulator_file)
+        if comm is not None:
+            exists = comm.bcast(exists, root=0)
+
+        if exists:
+            if self.emulator is None:
+                self.emulator = EmulatedSpectrum.from_file(self.emulator_file)
+            return
+
+        self.train_emulator(comm=comm)
+
+        # only the root writes, and any error is raised on all ranks
+        error = None
+        if comm is None or comm.rank == 0:
+            try:
+                self.emulator.to_file(self.emulator_file)
+                logger.info("saved emulator to '%s'" %self.emulator_file, on=0)
+            except Exception as e:
+                error = e
+        if comm is not None:
+            error = comm.bcast(error, root=0)
+        if error is not None:
+            raise error
+
     def apply(self, func, pattern):
         """
         Apply a function for several results files
@@ -526,6 +667,13 @@ class FittingDriver(FittingDriverSchema):
             raise ValueError("'solver_type' parameter must be 'mcmc' or 'nlopt', not '%s'" %solver_type)
         init_values = None
 
+        # the workers of the pool cannot receive the emulator anymore
+        if self.emulator_file is not None and self.emulator is None:
+            if pool is not None:
+                raise ValueError(("the emulator must be loaded or trained on every rank before "
+                                  "creating the MPI pool; see FittingDriver.setup_emulator"))
+            self.setup_emulator()
+
         # init from maximum probability solution
         if self.init_from == 'nlopt':
             init_values = self.find_peak_probability(pool=pool)
@@ -862,6 +1010,66 @@ class FittingDriver(FittingDriverSchema):
 
             return lp + lnlike
 
+    def lnprob_batch(self, thetas):
+        """
+        Return the log of the posterior probability function for each row
+        of ``thetas``, as :func:`lnprob`, with the theory evaluated once for
+        all of the rows
+
+        The model broadcasts the parameters that do not invalidate its
+        cached spectra (see :func:`~pyRSD.rsd.DarkMatterSpectrum.power_batch`);
+        if the theory has no batch evaluation, each row is evaluated with
+        :func:`lnprob`.
+        The free parameters and the model are restored on return.
+
+        Parameters
+        ----------
+        thetas : array_like, (N, Np)
+            the free parameters of each of the ``N`` evaluations
+
+        Returns
+        -------
+        lnprob : array_like, (N,)
+            the log of the posterior probability of each row
+        """
+        batch = getattr(self.model_callable, 'batch', None)
+        if batch is None:
+            return np.array([self.lnprob(theta) for theta in thetas])
+
+        theory = self.theory
+        theta0 = np.array(theory.free_values, dtype=float)
+        toret = np.repeat(-np.inf, len(thetas))
+        try:
+            # the prior and model parameters of the rows in bounds
+            index = []; params = []
+            for i, theta in enumerate(thetas):
+                if not all(p.within_bounds(theta[j]) for j,p in enumerate(theory.free)):
+                    continue
+                theory.fit_params.update_values(**dict(zip(theory.free_names, theta)))
+                lp = self.lnprior()
+                if np.isfinite(lp):
+                    toret[i] = lp
+                    index.append(i); params.append(theory.fit_params.to_dict())
+
+            # only compute lnlike for the rows with finite prior
+            if len(index):
+                try:
+                    diff = batch(params) - self.data.combined_power
+                    lnlike = -0.5*np.sum(diff * np.dot(diff, self.data.covariance_matrix.inverse), axis=-1)
+                    if np.isnan(lnlike).any():
+                        raise ValueError("log-likelihood calculation resulted in NaN")
+                except:
+                    import traceback
+                    msg = "exception while computing log-likelihood:\n"
+                    msg += "   parameters:\n%s\n" %str(np.asarray(thetas)[index])
+                    msg += "   traceback:\n%s" %(traceback.format_exc())
+                    raise RuntimeError(msg)
+                toret[index] += lnlike
+        finally:
+            theory.fit_params.update_values(**dict(zip(theory.free_names, theta0)))
+
+        return toret
+
     def minus_lnlike(self, theta=None, use_priors=False):
         """
         Return the negative log-likelihood, optionally including priors
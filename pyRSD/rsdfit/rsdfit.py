@@ -42,10 +42,31 @@ def find_init_result(val):
     else:
         return val
 
+def limit_threads(comm):
+    """
+    Use a single OpenMP thread in each process of ``comm``, if it has
+    more than one process
+
+    Otherwise, each MPI rank would run as many threads as there are cores,
+    oversubscribing the machine. An explicit ``PYRSD_NUM_THREADS`` or
+    ``OMP_NUM_THREADS`` environment variable takes precedence.
+    """
+    from pyRSD import pygcl
+
+    if comm.size == 1:
+        return
+    if any(name in os.environ for name in ['PYRSD_NUM_THREADS', 'OMP_NUM_THREADS']):
+        return
+    pygcl.set_num_threads(1)
+
 class RSDFitDriver(object):
     """
     The main driver class to run `rsdfit`.
 
+    When running with more than one MPI process, each process uses a
+    single OpenMP thread, unless the ``PYRSD_NUM_THREADS`` or
+    ``OMP_NUM_THREADS`` environment variable is set.
+
     Parameters
     ----------
     comm : MPI communicator
@@ -130,7 +151,7 @@ class RSDFitDriver(object):
                 else:
                     if self.comm.rank == 0 and not self.no_save_model:
                         model_dir = driver.params.get('model_dir', self.folder)
-                        driver.theory.model.to_npy(os.path.join(model_dir, model_filename))
+                        driver.theory.model.to_snapshot(os.path.join(model_dir, model_filename))
 
             # only one rank needs to write out
             if self.comm.rank == 0:
@@ -197,6 +218,9 @@ class RSDFitDriver(object):
         if self.nchains > self.comm.size:
             raise ValueError("number of chains requested must be less than total processes")
 
+        # use one OpenMP thread per rank when running with MPI
+        limit_threads(self.comm)
+
         # add the console logger
         silent = getattr(self, 'silent', False)
         if not silent: rsd_logging.add_console_logger(self.comm.rank)
@@ -236,6 +260,9 @@ class RSDFitDriver(object):
         # set the global algorithm for each rank
         GlobalFittingDriver.set(self.algorithm)
 
+        # the emulator is needed on every rank, so set it up before the pool
+        self.algorithm.setup_emulator(comm=self.comm)
+
         # manage the MPI ranks
         debug = getattr(self, 'debug', False)
         with mpi_manager.MPIManager(self.comm, self.nchains, debug=debug) as mpi_master:
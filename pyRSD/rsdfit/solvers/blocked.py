@@ -0,0 +1,322 @@
+"""
+A blocked ensemble sampler that updates the "fast" parameters, which only
+affect cheap terms of the model, several times for every update of the
+"slow" parameters, which invalidate expensive cached terms
+"""
+from ... import numpy as np
+from .. import logging
+
+logger = logging.getLogger('rsdfit.blocked_sampler')
+logger.addHandler(logging.NullHandler())
+
+def expensive_names(model_cls):
+    """
+    The names of the cached attributes of a model class that are
+    expensive to recompute, i.e., the interpolated functions of `k`,
+    which require evaluating a function on a grid and building a spline
+    """
+    from pyRSD.rsd._cache import CachedProperty
+
+    toret = set()
+    for name in model_cls._cachemap:
+        if not isinstance(getattr(model_cls, name, None), CachedProperty):
+            toret.add(name)
+    return toret
+
+def invalidated_names(model_cls, names):
+    """
+    The union of the cached attributes that are invalidated when any of
+    the parameters ``names`` of a model class change, using the inverted
+    dependencies of the class ``_cachemap``
+
+    If the model class sets the biases ``b1`` and ``b1_bar`` from its
+    ``_bias_parameters`` on every evaluation (i.e., the two-halo terms of
+    :class:`~pyRSD.rsd.GalaxySpectrum`), these parameters invalidate the
+    attributes that depend on the biases, and setting the biases directly
+    invalidates nothing that is used
+    """
+    biases = getattr(model_cls, '_bias_parameters', [])
+
+    toret = set()
+    for name in names:
+        if biases and name in ['b1', 'b1_bar']:
+            continue
+        if name in biases:
+            toret |= model_cls.b1._deps | model_cls.b1_bar._deps
+        if name in model_cls._param_names:
+            toret |= getattr(model_cls, name)._deps
+    return toret
+
+def dependents(fit_params, name):
+    """
+    The names of the parameters whose values depend on the parameter
+    ``name``, directly or through other constrained parameters
+
+    Parameters
+    ----------
+    fit_params : ParameterSet
+        the prepared parameter set, where each parameter holds the
+        names of the parameters that depend directly on it as ``children``
+    name : str
+        the name of the parameter
+    """
+    # the direct dependencies of each constrained parameter
+    children = {}
+    for pname in fit_params:
+        par = fit_params[pname]
+        for dep in getattr(par, '_expr_deps', None) or []:
+            children.setdefault(dep, set()).add(pname)
+        for child in getattr(par, 'children', []):
+            children.setdefault(pname, set()).add(child)
+
+    toret = set()
+    todo = [name]
+    while todo:
+        for child in children.get(todo.pop(), []):
+            if child not in toret and child != name:
+                toret.add(child)
+                todo.append(child)
+    return toret
+
+def split_fast_slow(theory):
+    """
+    Classify the free parameters of a theory as fast or slow
+
+    A free parameter is slow if changing it, or any of the constrained
+    parameters that depend on it (directly or indirectly), invalidates an
+    expensive cached attribute of the model (see :func:`expensive_names`)
+
+    Parameters
+    ----------
+    theory : GalaxyPowerTheory or QuasarPowerTheory
+        the theory, holding the model and the fitting parameters
+
+    Returns
+    -------
+    fast, slow : list of str
+        the names of the fast and slow free parameters
+    """
+    model_cls = theory.model.__class__
+    expensive = expensive_names(model_cls)
+
+    fast, slow = [], []
+    for name in theory.free_names:
+        affected = set([name]) | dependents(theory.fit_params, name)
+        if invalidated_names(model_cls, affected) & expensive:
+            slow.append(name)
+        else:
+            fast.append(name)
+    return fast, slow
+
+class FastUpdates(object):
+    """
+    A picklable callable that performs Metropolis-Hastings updates of the
+    fast parameters of a single walker, holding the slow parameters fixed
+
+    The updates of each walker run on the same process, so the expensive
+    cached terms of the model are computed at most once per walker
+    """
+    def __init__(self, lnprobfn, fast_index, nsteps):
+        self.lnprobfn   = lnprobfn
+        self.fast_index = fast_index
+        self.nsteps     = nsteps
+
+    def __call__(self, args):
+        """
+        Parameters
+        ----------
+        args : tuple
+            the walker position, its log-probability, the Cholesky factor
+            of the proposal covariance, and the random seed
+
+        Returns
+        -------
+        theta, lnp : array_like, float
+            the final position and log-probability
+        naccept : int
+            the number of accepted proposals
+        """
+        theta, lnp, chol, seed = args
+        rstate = np.random.RandomState(seed)
+
+        theta = np.array(theta, copy=True)
+        naccept = 0
+        for i in range(self.nsteps):
+            q = theta.copy()
+            q[self.fast_index] += np.dot(chol, rstate.randn(len(self.fast_index)))
+            lnq = self.lnprobfn(q)
+            if np.isfinite(lnq) and lnq - lnp > np.log(rstate.rand()):
+                theta, lnp = q, lnq
+                naccept += 1
+        return theta, lnp, naccept
+
+class BlockedSampler(object):
+    """
+    An affine-invariant ensemble sampler with fast/slow parameter blocking
+
+    Each iteration does an ensemble stretch move (Goodman & Weare 2010) of the
+    slow parameters, followed by ``fast_steps`` Metropolis-Hastings updates of
+    the fast parameters of each walker, with a Gaussian proposal whose
+    covariance is estimated from the complementary half of the ensemble.
+
+    The interface follows :class:`emcee.EnsembleSampler`, so the sampler can
+    be used by :class:`~pyRSD.rsdfit.solvers.emcee_solver.ChainManager` and
+    :class:`~pyRSD.rsdfit.results.EmceeResults`
+    """
+    def __init__(self, nwalkers, dim, lnprobfn, fast_index, fast_steps=5,
+                    a=2., pool=None):
+        """
+        Parameters
+        ----------
+        nwalkers : int
+            the number of walkers, which must be even
+        dim : int
+            the number of free parameters
+        lnprobfn : callable
+            the (picklable) log-probability function
+        fast_index : list of int
+            the indices of the fast parameters
+        fast_steps : int, optional
+            the number of updates of the fast parameters per iteration
+        a : float, optional
+            the scale of the stretch move
+        pool : optional
+            a pool with a ``map`` method to evaluate walkers in parallel
+        """
+        self.k          = nwalkers
+        self.dim        = dim
+        self.lnprobfn   = lnprobfn
+        self.a          = a
+        self.pool       = pool
+        self.fast_index = np.array(sorted(fast_index), dtype=int)
+        self.slow_index = np.array([i for i in range(dim) if i not in fast_index], dtype=int)
+        self.fast_steps = fast_steps if len(self.fast_index) else 0
+        self._random    = np.random.mtrand.RandomState()
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the chain and the acceptance counts
+        """
+        self.iterations     = 0
+        self.naccepted      = np.zeros(self.k)
+        self.nfast_accepted = np.zeros(self.k)
+        self._chain         = np.empty((self.k, 0, self.dim))
+        self._lnprob        = np.empty((self.k, 0))
+
+    @property
+    def chain(self):
+        return self._chain
+
+    @property
+    def lnprobability(self):
+        return self._lnprob
+
+    @property
+    def acceptance_fraction(self):
+        """
+        The acceptance fraction of the slow (stretch) moves of each walker
+        """
+        return self.naccepted / max(self.iterations, 1)
+
+    @property
+    def fast_acceptance_fraction(self):
+        """
+        The acceptance fraction of the fast updates of each walker
+        """
+        return self.nfast_accepted / max(self.iterations*self.fast_steps, 1)
+
+    def get_autocorr_time(self, **kwargs):
+        from emcee.autocorr import integrated_time
+        k = self.iterations
+        return integrated_time(np.mean(self.chain[:, :k], axis=0), axis=0, **kwargs)
+
+    @property
+    def acor(self):
+        return self.get_autocorr_time()
+
+    def _map(self, f, args):
+        M = map if self.pool is None else self.pool.map
+        return list(M(f, args))
+
+    def _halves(self):
+        half = self.k // 2
+        first, second = np.arange(half), np.arange(half, self.k)
+        return [(first, second), (second, first)]
+
+    def _stretch(self, p, lnprob):
+        """
+        Stretch move of the slow parameters, updating each half of the
+        ensemble using the other half
+        """
+        slow = self.slow_index
+        ndim = len(slow)
+        if not ndim: return
+
+        for S0, S1 in self._halves():
+            Ns = len(S0)
+            zz = ((self.a - 1.) * self._random.rand(Ns) + 1)**2. / self.a
+            c = p[S1][self._random.randint(len(S1), size=Ns)]
+
+            q = p[S0].copy()
+            q[:, slow] = c[:, slow] - zz[:, None]*(c[:, slow] - q[:, slow])
+            newlnprob = np.array(self._map(self.lnprobfn, q))
+
+            lnpdiff = (ndim - 1.) * np.log(zz) + newlnprob - lnprob[S0]
+            accept = lnpdiff > np.log(self._random.rand(Ns))
+            idx = S0[accept]
+            p[idx], lnprob[idx] = q[accept], newlnprob[accept]
+            self.naccepted[idx] += 1
+
+    def _fast_updates(self, p, lnprob):
+        """
+        Metropolis-Hastings updates of the fast parameters of each walker,
+        with the proposal covariance estimated from the other half
+        """
+        fast = self.fast_index
+        nfast = len(fast)
+        update = FastUpdates(self.lnprobfn, fast, self.fast_steps)
+
+        for S0, S1 in self._halves():
+            cov = np.atleast_2d(np.cov(p[S1][:, fast], rowvar=False))
+            cov *= 2.38**2 / nfast
+            cov += 1e-12 * np.eye(nfast)
+            chol = np.linalg.cholesky(cov)
+
+            seeds = self._random.randint(2**31-1, size=len(S0))
+            args = [(p[i], lnprob[i], chol, seed) for i, seed in zip(S0, seeds)]
+            for i, (theta, lnp, naccept) in zip(S0, self._map(update, args)):
+                p[i], lnprob[i] = theta, lnp
+                self.nfast_accepted[i] += naccept
+
+    def sample(self, p0, lnprob0=None, rstate0=None, iterations=1, storechain=True, **kwargs):
+        """
+        Advance the chain ``iterations`` steps as a generator, yielding the
+        positions, log-probabilities, and random state after each step
+        """
+        p = np.array(p0, dtype=float, copy=True)
+        if rstate0 is not None:
+            self._random.set_state(rstate0)
+        if lnprob0 is None:
+            lnprob = np.array(self._map(self.lnprobfn, p))
+        else:
+            lnprob = np.array(lnprob0, dtype=float, copy=True)
+
+        if storechain:
+            N = self.iterations + iterations
+            chain = np.zeros((self.k, N, self.dim))
+            chain[:, :self.iterations] = self._chain
+            lnprobs = np.zeros((self.k, N))
+            lnprobs[:, :self.iterations] = self._lnprob
+            self._chain, self._lnprob = chain, lnprobs
+
+        for i in range(iterations):
+            self._stretch(p, lnprob)
+            if self.fast_steps:
+                self._fast_updates(p, lnprob)
+
+            if storechain:
+                self._chain[:, self.iterations] = p
+                self._lnprob[:, self.iterations] = lnprob
+            self.iterations += 1
+            yield p, lnprob, self._random.get_state()
@@ -2,6 +2,7 @@ from ... import numpy as np, os
 from .. import logging
 from ..results import EmceeResults
 from . import tools, objectives
+from .blocked import BlockedSampler, split_fast_slow
 
 import time
 import signal
@@ -140,6 +141,17 @@ class ChainManager(object):
 
         return True
 
+class VectorizedMap(object):
+    """
+    A pool for :class:`emcee.EnsembleSampler`, whose :func:`map` calls the
+    function once, with the tasks (the positions of the walkers) stacked
+    as the rows of an array, as ``vectorize=True`` in emcee 3
+
+    The function should return the log-probability of each row
+    """
+    def map(self, f, tasks):
+        return list(f(np.array(list(tasks))))
+
 #------------------------------------------------------------------------------
 # tools setup
 #------------------------------------------------------------------------------
@@ -246,6 +258,19 @@ def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
         Initial positions; if not `None`, initialize the emcee walkers
         in a small, random ball around these positions
 
+    If ``fast_steps`` is a positive integer in ``params``, the free parameters
+    are split into fast and slow parameters using the dependencies of the
+    cached model attributes (see :func:`~pyRSD.rsdfit.solvers.blocked.split_fast_slow`),
+    and a :class:`~pyRSD.rsdfit.solvers.blocked.BlockedSampler` does
+    ``fast_steps`` updates of the fast parameters for each update of the
+    slow parameters
+
+    If ``vectorize`` is `True` in ``params``, the walkers being updated are
+    evaluated together, with a single evaluation of the model for the walkers
+    that only differ in the parameters broadcast by the model (see
+    :func:`~pyRSD.rsdfit.FittingDriver.lnprob_batch`); this is ignored when
+    using a ``pool`` or ``fast_steps``
+
     Notes
     -----
 
@@ -268,6 +293,8 @@ def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
     init_from = params.get('init_from', 'prior')
     epsilon   = params.get('epsilon', 0.02)
     test_conv = params.get('test_convergence', False)
+    fast_steps = params.get('fast_steps', 0)
+    vectorize = params.get('vectorize', False)
 
     #---------------------------------------------------------------------------
     # let's check a few things so we dont mess up too badly
@@ -338,7 +365,21 @@ def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
     # initialize the sampler
     logger.warning("EMCEE: initializing sampler with {} walkers".format(nwalkers))
     objective = functools.partial(objectives.lnprob)
-    sampler = emcee.EnsembleSampler(nwalkers, ndim, objective, pool=pool)
+    if vectorize:
+        if pool is not None or fast_steps:
+            logger.warning("EMCEE: ignoring `vectorize` when using a pool or `fast_steps`")
+        else:
+            logger.warning("EMCEE: evaluating the walkers of each update together")
+            pool = VectorizedMap()
+    if fast_steps:
+        from pyRSD.rsdfit import GlobalFittingDriver
+        fast, slow = split_fast_slow(GlobalFittingDriver.get().theory)
+        logger.warning("EMCEE: blocking {} fast parameters ({} updates per step): {}".format(len(fast), fast_steps, fast))
+        logger.warning("EMCEE: slow parameters: {}".format(slow))
+        fast_index = [fit_params.free_names.index(name) for name in fast]
+        sampler = BlockedSampler(nwalkers, ndim, objective, fast_index, fast_steps=fast_steps, pool=pool)
+    else:
+        sampler = emcee.EnsembleSampler(nwalkers, ndim, objective, pool=pool)
 
     # iterator interface allows us to tap ctrl+c and know where we are
     niters -= start_iter
@@ -1,4 +1,5 @@
 from pyRSD.rsdfit import GlobalFittingDriver
+from pyRSD import numpy as np
 
 
 def minus_lnlike(x=None, scaling=False):
@@ -24,8 +25,15 @@ def minus_lnprob(x=None, scaling=False):
 def lnprob(x=None, scaling=False):
     """
     Wrapper for the log-probability (including priors)
+
+    If ``x`` is 2D, return the log-probability of each row, evaluated
+    together (see ``FittingDriver.lnprob_batch``)
     """
     driver = GlobalFittingDriver.get()
+    if x is not None and np.ndim(x) == 2:
+        if scaling:
+            x = [driver.theory.fit_params.inverse_scale(xi) for xi in x]
+        return driver.lnprob_batch(x)
     if scaling:
         x = driver.theory.fit_params.inverse_scale(x)
     return driver.lnprob(x)
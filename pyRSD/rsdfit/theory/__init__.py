@@ -1,6 +1,7 @@
 from .gal_defaults import DefaultGalaxyPowerTheory
 from .qso_defaults import DefaultQuasarPowerTheory
 from .base import BasePowerParameters, BasePowerTheory
+from .emulator import EmulatedSpectrum
 
 from pyRSD.rsd import GalaxySpectrum, QuasarSpectrum
 
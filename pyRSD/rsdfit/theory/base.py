@@ -636,6 +636,9 @@ class BasePowerTheory(object):
         # NOTE: this allows us to evaluate the model only ONCE
         k, mu, slices = self.get_kmu_pairs(transfers)
 
+        # compose the transfers into a single (sparse) matrix
+        M = get_transfer_matrix(data, transfers, stat_ids, slices, theory_decorator)
+
         def evaluate(theta, pool=None, epsilon=1e-4, numerical=False):
 
             # update model parameters first?
@@ -648,6 +651,10 @@ class BasePowerTheory(object):
                                           epsilon=epsilon, 
                                           numerical=numerical)
 
+            # apply the transfer matrix for all parameters at once
+            if M is not None:
+                return M.dot(np.asarray(gradient).T).T
+
             # apply to transfer for gradient of each parameter
             grad_lnlike = []
             for i in range(self.ndim):
@@ -686,6 +693,12 @@ class BasePowerTheory(object):
         # NOTE: this allows us to evaluate the model only ONCE
         k, mu, slices = self.get_kmu_pairs(transfers)
 
+        # compose the transfers into a single (sparse) matrix
+        M = get_transfer_matrix(data, transfers, stat_ids, slices, theory_decorator)
+
+        # the output buffer for P(k,mu), re-used for each evaluation
+        P = np.empty(len(k))
+
         def evaluate():
 
             # update model parameters first?
@@ -693,11 +706,31 @@ class BasePowerTheory(object):
                 self.model.update(**model_params)
 
             # evaluate the P(k,mu) for the (k,mu) pairs we need
-            P = self.model.power(k,mu)
+            self.model.power_array(k, mu, out=P)
+
+            # the theory is linear in P(k,mu)
+            if M is not None:
+                return M.dot(P)
 
             # apply the transfers to the power
             return apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator)
 
+        def batch(params):
+            """
+            Evaluate the theory for each of the sets of model parameters
+            ``params``, with the model evaluated once for all of them (see
+            :func:`~pyRSD.rsd.DarkMatterSpectrum.power_batch`); the rows of
+            the returned array are the theory of each set
+            """
+            if model_params is not None:
+                params = [dict(p, **model_params) for p in params]
+            Ps = self.model.power_batch(k, mu, params, flatten=True)
+
+            if M is not None:
+                return M.dot(Ps.T).T
+            return np.array([apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator) for P in Ps])
+
+        evaluate.batch = batch
         return evaluate
 
     def get_kmu_pairs(self, transfers):
@@ -720,6 +753,109 @@ class BasePowerTheory(object):
 
         return np.concatenate(k), np.concatenate(mu), slices
 
+def get_transfer_matrix(data, transfers, stat_ids, slices, theory_decorator):
+    """
+    Compose one (or more) transfer functions into a single sparse matrix
+    that maps the flattened P(k,mu) values to the theory prediction.
+
+    This is the matrix form of :func:`apply_transfers`, including the
+    interpolation to the measured ``k`` values and any linear theory
+    decorators.
+
+    Parameters
+    ----------
+    data : PowerData
+        the data object
+    transfers : list
+        the list of transfer objects to apply
+    stat_ids : dict
+        dictionary with keys of the relevant statistics and values are
+        identifers, e.g., ell or center mu values
+    slices : list
+        the list of slices to slice the power result
+    theory_decorator : dict
+        decorator to run after the transfer function is applied
+
+    Returns
+    -------
+    M : scipy.sparse.csr_matrix, None
+        the transfer matrix, or ``None`` if the theory prediction is not
+        linear in P(k,mu), in which case :func:`apply_transfers` must be used
+    """
+    from scipy import sparse
+    from scipy.interpolate import make_interp_spline
+
+    # only linear theory decorators can be absorbed into the matrix
+    for stat_name in stat_ids:
+        dec = theory_decorator.get(stat_name, None)
+        if dec is not None and dec not in decorators.linear:
+            return None
+
+    # determine which variables specify the second dimension of the basis
+    # based on the mode, pkmu or poles
+    poles = data.mode == 'poles'
+    Ntot = slices[-1].stop
+
+    toret = []
+    for stat_name in stat_ids:
+
+        # this is either ell or mu bounds for this statistic
+        binval = stat_ids[stat_name]
+        m = data.measurements[data.statistics.index(stat_name)]
+
+        # make into a list if not
+        # NOTE: this allows us to support multiple bin values per statistic
+        if not isinstance(binval, list):
+            binval = [binval]
+
+        theory = []
+        for bb in binval:
+
+            # the center of the wedge
+            if not poles and isinstance(bb, tuple):
+                bb = 0.5*(bb[0] + bb[1])
+
+            # find the transfer and the column that computes this bin value
+            for i, t in enumerate(transfers):
+                x = t.ells if poles else t.mu_cen
+                col = np.where(np.isclose(x, bb))[0]
+                if len(col): break
+            else:
+                raise ValueError("no transfer function computes the statistic '%s'" %stat_name)
+            col = col[0]
+
+            # the rows of the transfer matrix for this column
+            M = t.transfer_matrix
+            N1 = M.shape[0] // len(x)
+            M = M[col*N1:(col+1)*N1]
+
+            # interpolate the window function results
+            if isinstance(t, WindowFunctionTransfer):
+                k = t.k_out if t.k_out is not None else t.padded_k
+                interp = make_interp_spline(k, np.eye(len(k)), k=3)(m.k)
+                M = sparse.csr_matrix(M.T.dot(interp.T).T)
+            # remove out of range values from Gridded Transfer results
+            elif isinstance(t, gridded_transfers):
+                M = M[np.where(t.in_k_range[:,col])[0]]
+
+            # shift the columns to the slice of the full P(k,mu) vector
+            M = M.tocoo()
+            M = sparse.csr_matrix((M.data, (M.row, M.col + slices[i].start)), shape=(M.shape[0], Ntot))
+            theory.append(M)
+
+        # apply any (linear) theory decorators for this statistic
+        dec = theory_decorator.get(stat_name, None)
+        if dec is not None:
+            dec = getattr(decorators, dec)
+            theory = dec(*theory)
+        else:
+            assert len(theory) == 1
+            theory = theory[0]
+
+        toret.append(theory)
+
+    return sparse.vstack(toret, format='csr')
+
 def apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator):
     """
     Apply one (or more) transfer functions to the input P(k,mu) values.
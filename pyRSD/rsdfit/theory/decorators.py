@@ -1,5 +1,8 @@
 valid = ['systematic_free_P0']
 
+# decorators that are linear combinations of their inputs
+linear = ['systematic_free_P0']
+
 def systematic_free_P0(*poles):
     """
     Return :math:`P_0 + 2/5 * P_2`.
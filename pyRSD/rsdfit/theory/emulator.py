@@ -0,0 +1,311 @@
+"""
+A surrogate for the theory prediction of a :class:`~pyRSD.rsdfit.FittingDriver`
+
+The flattened theory prediction, i.e., the multipoles or wedges after
+applying the transfers of the data, is evaluated at a Latin hypercube of
+the free parameters, compressed with a principal component analysis (PCA),
+and the PCA coefficients are interpolated with a Gaussian process.
+"""
+from pyRSD.rsdfit.util.rsd_logging import MPILoggerAdapter
+
+import numpy as np
+import logging
+
+logger = MPILoggerAdapter(logging.getLogger('rsdfit.emulator'))
+
+def sampling_bounds(par, nsigma=5.):
+    """
+    The (lower, upper) bounds to sample the free parameter ``par`` in,
+    from its ``min``/``max`` bounds and prior
+
+    For a normal prior, the range is ``nsigma`` standard deviations about
+    the mean.
+    """
+    lower, upper = -np.inf, np.inf
+    if par.min is not None: lower = par.min
+    if par.max is not None: upper = par.max
+
+    if par.has_prior:
+        if par.prior_name == 'uniform':
+            lower = max(lower, par.prior.lower)
+            upper = min(upper, par.prior.upper)
+        else:
+            lower = max(lower, par.prior.mu - nsigma*par.prior.sigma)
+            upper = min(upper, par.prior.mu + nsigma*par.prior.sigma)
+
+    if not np.isfinite(lower) or not np.isfinite(upper):
+        raise ValueError("cannot sample parameter '%s' without bounds or a prior" %par.name)
+    return lower, upper
+
+def latin_hypercube(N, bounds, seed=None):
+    """
+    Return ``N`` points of a Latin hypercube within ``bounds``, a list
+    of (lower, upper) tuples for each dimension
+    """
+    rng = np.random.RandomState(seed)
+    bounds = np.asarray(bounds, dtype=float)
+
+    # one sample in each of N strata for each dimension
+    u = (np.array([rng.permutation(N) for _ in bounds]).T + rng.uniform(size=(N, len(bounds)))) / N
+    return bounds[:,0] + u * (bounds[:,1] - bounds[:,0])
+
+def _evaluate_theory(theta, driver=None):
+    """
+    Return the theory prediction of the driver at the free
+    parameters ``theta``, using the global driver if ``driver``
+    is not provided
+
+    This is defined at the module level so we can pickle it
+    """
+    if driver is None:
+        from pyRSD.rsdfit import GlobalFittingDriver
+        driver = GlobalFittingDriver.get()
+
+    if not driver.theory.set_free_parameters(theta):
+        raise ValueError("free parameters out of bounds when training emulator: %s" %str(theta))
+    return driver.theory_callable()
+
+def evaluate(driver, thetas, pool=None, comm=None):
+    """
+    Evaluate the theory prediction of ``driver`` at each of the free
+    parameter vectors ``thetas``, optionally in parallel on ``pool``,
+    or split between the ranks of the MPI communicator ``comm``, which
+    must all call this function with the same ``thetas``
+
+    The state of the free parameters is restored on return.
+    """
+    original = driver.theory.free_values
+    try:
+        if comm is not None and comm.size > 1:
+            # each rank evaluates every comm.size-th point
+            mine = [_evaluate_theory(theta, driver) for theta in thetas[comm.rank::comm.size]]
+            toret = [None]*len(thetas)
+            for rank, values in enumerate(comm.allgather(mine)):
+                toret[rank::comm.size] = values
+        elif pool is None:
+            toret = [_evaluate_theory(theta, driver) for theta in thetas]
+        else:
+            toret = pool.map(_evaluate_theory, list(thetas))
+    finally:
+        driver.theory.set_free_parameters(original)
+    return np.array(toret)
+
+class EmulatedSpectrum(object):
+    """
+    An emulator of the theory prediction of a
+    :class:`~pyRSD.rsdfit.FittingDriver` as a function of
+    the free parameters
+
+    The prediction is whitened by the diagonal errors of the data, so the
+    PCA truncation and the validation errors are in units of the data errors.
+    Use :func:`train` to build the emulator, and set
+    :attr:`FittingDriver.emulator` to use it in place of the model.
+
+    Parameters
+    ----------
+    names : list of str
+        the names of the free parameters
+    bounds : array_like, (Np, 2)
+        the (lower, upper) bounds of the training region
+    errors : array_like, (Nb,)
+        the errors of the data, used to whiten the prediction
+    mean : array_like, (Nb,)
+        the mean of the whitened training predictions
+    components : array_like, (Nc, Nb)
+        the principal components of the whitened training predictions
+    gp : sklearn.gaussian_process.GaussianProcessRegressor
+        the Gaussian process interpolating the PCA coefficients, as a
+        function of the parameters scaled to the unit hypercube
+    """
+    def __init__(self, names, bounds, errors, mean, components, gp):
+        self.names = list(names)
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.errors = np.asarray(errors)
+        self.mean = np.asarray(mean)
+        self.components = np.asarray(components)
+        self.gp = gp
+
+        # set by validate()
+        self.validation = None
+
+    @classmethod
+    def train(cls, driver, N=200, Nvalidate=50, tol=1e-3, nsigma=5., pool=None, comm=None, seed=None):
+        """
+        Train the emulator for the free parameters of ``driver``
+
+        Parameters
+        ----------
+        driver : FittingDriver
+            the driver, which defines the free parameters, data, and transfers
+        N : int, optional
+            the number of training points
+        Nvalidate : int, optional
+            the number of points to compute the validation error at
+        tol : float, optional
+            the PCA truncation tolerance; the number of components is the
+            smallest such that the rms reconstruction error of the training
+            set is below ``tol`` times the data errors
+        nsigma : float, optional
+            the number of standard deviations to sample parameters with a
+            normal prior within
+        pool : MPIPool, optional
+            if provided, evaluate the model in parallel on this pool; the
+            global driver must be set on each rank
+        comm : MPI communicator, optional
+            if provided, every rank of ``comm`` must call this function; the
+            model evaluations are split between the ranks, the Gaussian
+            process is fit on the root, and each rank returns the same emulator
+        seed : int, optional
+            the random seed for the training and validation points
+
+        Returns
+        -------
+        emulator : EmulatedSpectrum
+            the trained emulator, with :attr:`validation` set
+        """
+        from sklearn.gaussian_process import GaussianProcessRegressor
+        from sklearn.gaussian_process.kernels import ConstantKernel, RBF, WhiteKernel
+
+        names = driver.theory.free_names
+        bounds = [sampling_bounds(par, nsigma=nsigma) for par in driver.theory.free]
+        errors = driver.data.covariance_matrix.diag**0.5
+
+        # the same random points on every rank
+        if comm is not None:
+            seed = comm.bcast(np.random.randint(2**31) if seed is None else seed, root=0)
+
+        # the training points
+        rng = np.random.RandomState(seed)
+        thetas = latin_hypercube(N, bounds, seed=rng.randint(2**31))
+        logger.info("training emulator with %d points for %d free parameters" %(N, len(names)), on=0)
+        Y = evaluate(driver, thetas, pool=pool, comm=comm) / errors
+
+        # the PCA of the whitened predictions
+        mean = Y.mean(axis=0)
+        U, s, V = np.linalg.svd(Y - mean, full_matrices=False)
+
+        # rms reconstruction error when truncating at each number of components
+        residual = np.sqrt(np.maximum(np.sum(s**2) - np.cumsum(s**2), 0.) / Y.size)
+        Nc = np.argmax(residual <= tol) + 1 if (residual <= tol).any() else len(s)
+        logger.info("using %d principal components of %d" %(Nc, len(s)), on=0)
+
+        # fit the GP to the coefficients
+        x = (thetas - np.array(bounds)[:,0]) / np.ptp(bounds, axis=1)
+        coeffs = np.dot(Y - mean, V[:Nc].T)
+        random_state = rng.randint(2**31)
+        gp = None
+        if comm is None or comm.rank == 0:
+            kernel = ConstantKernel() * RBF(length_scale=np.ones(len(names))) + WhiteKernel(1e-8, noise_level_bounds=(1e-12, 1e-2))
+            gp = GaussianProcessRegressor(kernel=kernel, normalize_y=True, n_restarts_optimizer=2,
+                                            random_state=random_state)
+            gp.fit(x, coeffs)
+        if comm is not None:
+            gp = comm.bcast(gp, root=0)
+
+        toret = cls(names, bounds, errors, mean, V[:Nc], gp)
+        if Nvalidate:
+            toret.validate(driver, N=Nvalidate, pool=pool, comm=comm, seed=rng.randint(2**31))
+        return toret
+
+    def validate(self, driver, N=50, pool=None, comm=None, seed=None):
+        """
+        Compute the error of the emulator against the model of ``driver``
+        at ``N`` points of a Latin hypercube in the training region
+
+        Returns
+        -------
+        validation : dict
+            the validation errors, with keys:
+
+            - ``max``: the maximum absolute error in units of the data errors
+            - ``rms``: the rms error in units of the data errors
+            - ``chi2``: the mean absolute error of the chi-squared
+        """
+        thetas = latin_hypercube(N, self.bounds, seed=seed)
+        true = evaluate(driver, thetas, pool=pool, comm=comm)
+        emulated = np.array([self(theta) for theta in thetas])
+
+        # the errors in units of the data errors
+        err = (emulated - true) / self.errors
+
+        # the error on the chi-squared
+        d = driver.data.combined_power
+        C = driver.data.covariance_matrix.inverse
+        chi2 = lambda m: np.einsum('ij,jk,ik->i', m-d, C, m-d)
+
+        self.validation = {'max': abs(err).max(),
+                           'rms': np.sqrt(np.mean(err**2)),
+                           'chi2': np.mean(abs(chi2(emulated) - chi2(true)))}
+        args = (N, self.validation['max'], self.validation['rms'], self.validation['chi2'])
+        logger.info("emulator validation with %d points: max error = %.3g sigma, "
+                    "rms error = %.3g sigma, mean |delta chi2| = %.3g" %args, on=0)
+        return self.validation
+
+    def in_bounds(self, theta):
+        """
+        Whether the free parameters ``theta`` are within the training region
+        """
+        theta = np.asarray(theta, dtype=float)
+        return bool(np.all((theta >= self.bounds[:,0]) & (theta <= self.bounds[:,1])))
+
+    def __call__(self, theta):
+        """
+        The emulated theory prediction at the free parameters ``theta``,
+        which must be within the training region
+        """
+        theta = np.asarray(theta, dtype=float)
+        if not self.in_bounds(theta):
+            raise ValueError("free parameters %s outside the training region of the emulator" %str(theta))
+        x = np.atleast_2d((theta - self.bounds[:,0]) / np.ptp(self.bounds, axis=1))
+
+        # sklearn squeezes the prediction for a single component
+        coeffs = self.gp.predict(x).reshape(len(x), -1)[0]
+        return (self.mean + np.dot(coeffs, self.components)) * self.errors
+
+    def gradient(self, theta, epsilon=1e-4):
+        """
+        The gradient of the emulated prediction with respect to the
+        free parameters, using a central finite difference
+
+        Returns
+        -------
+        grad : array_like, (Np, Nb)
+            the gradient for each free parameter
+        """
+        theta = np.asarray(theta, dtype=float)
+        if not self.in_bounds(theta):
+            raise ValueError("free parameters %s outside the training region of the emulator" %str(theta))
+        steps = np.identity(len(theta)) * epsilon * np.ptp(self.bounds, axis=1)
+        x = np.concatenate([theta+steps, theta-steps], axis=0)
+        x = (x - self.bounds[:,0]) / np.ptp(self.bounds, axis=1)
+
+        P = self.mean + np.dot(self.gp.predict(x).reshape(len(x), -1), self.components)
+        P = P.reshape((2, len(theta), -1)) * self.errors
+        return (P[0] - P[1]) / (2*np.diag(steps)[:,None])
+
+    def check(self, names, Nb):
+        """
+        Verify the emulator was trained for the free parameters ``names``
+        and a data vector of length ``Nb``
+        """
+        if list(names) != self.names:
+            raise ValueError("emulator free parameters %s do not match %s" %(self.names, list(names)))
+        if len(self.errors) != Nb:
+            raise ValueError("emulator has %d data points, but the data has %d" %(len(self.errors), Nb))
+
+    def to_file(self, filename):
+        """
+        Save the emulator to a pickle file
+        """
+        import pickle
+        with open(filename, 'wb') as ff:
+            pickle.dump(self, ff)
+
+    @classmethod
+    def from_file(cls, filename):
+        """
+        Load an emulator from a pickle file
+        """
+        import pickle
+        with open(filename, 'rb') as ff:
+            return pickle.load(ff)
@@ -56,13 +56,16 @@ def load_model(filename, **kwargs):
     if not os.path.exists(filename):
         raise ConfigurationError('cannot load model from file `%s`; does not exist' %filename)
     _, ext = os.path.splitext(filename)
-    if ext == '.npy':
+    if os.path.isdir(filename):
+        from ...rsd import load_snapshot
+        model = load_snapshot(filename, **kwargs)
+    elif ext == '.npy':
         from ...rsd import load_model
         model = load_model(filename, **kwargs)
     elif ext == '.pickle':
         model = load_pickle(filename)
     else:
-        raise ValueError("extension for model file not recognized; must be `.npy` or `.pickle`")
+        raise ValueError("model file not recognized; must be a snapshot directory, `.npy` or `.pickle`")
 
     return model
 
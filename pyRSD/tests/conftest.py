@@ -0,0 +1,17 @@
+import tempfile
+import shutil
+import os
+
+# the disk cache directory used while testing, so the tests
+# do not write the model arrays to the user cache directory
+_cache_dir = []
+
+def pytest_configure(config):
+    if 'PYRSD_CACHE_DIR' not in os.environ:
+        _cache_dir.append(tempfile.mkdtemp(prefix='pyRSD-cache-'))
+        os.environ['PYRSD_CACHE_DIR'] = _cache_dir[0]
+
+def pytest_unconfigure(config):
+    if _cache_dir:
+        os.environ.pop('PYRSD_CACHE_DIR', None)
+        shutil.rmtree(_cache_dir.pop(), ignore_errors=True)
@@ -0,0 +1,48 @@
+"""
+This module checks the evaluation of all 16 I(m,n) integrals on shared
+quadrature nodes against the separate integral of each kernel
+"""
+from pyRSD import pygcl
+
+import pytest
+import numpy
+
+EPSREL = 1e-4
+
+@pytest.fixture(scope='module')
+def power_lin():
+
+    cosmo = pygcl.Cosmology('teppei_sims.ini', pygcl.transfers.CLASS)
+    return pygcl.LinearPS(cosmo, 0.)
+
+@pytest.fixture(scope='module')
+def k():
+    return numpy.logspace(-3, 0, 20)
+
+@pytest.fixture(scope='module')
+def table(power_lin, k):
+    return pygcl.Imn(power_lin, EPSREL).EvaluateManyAll(k).reshape((len(k), 16))
+
+@pytest.mark.parametrize("m", range(4))
+@pytest.mark.parametrize("n", range(4))
+def test_Imn_all(power_lin, k, table, m, n):
+    """
+    Each column of ``EvaluateManyAll`` should agree with the separate
+    integral ``I(m,n)`` to the integration tolerance
+
+    The tolerance is relative to the larger of the integral and the
+    linear power, as for the absolute tolerance of the integrator. The
+    separate integrals use a tighter ``epsrel``, since their error estimate
+    is not reliable at ``EPSREL`` for the kernels with the largest
+    cancellations, i.e., ``I(1,2)``.
+    """
+    ref = pygcl.Imn(power_lin, 1e-2*EPSREL)(k, m, n)
+    scale = numpy.maximum(abs(ref), power_lin(k))
+    numpy.testing.assert_array_less(abs(table[:, 4*m+n] - ref), 2*EPSREL*scale)
+
+def test_Imn_single(power_lin, k, table):
+    """
+    ``EvaluateAll`` at a single wavenumber should match the table
+    """
+    I = pygcl.Imn(power_lin, EPSREL)
+    numpy.testing.assert_allclose(I.EvaluateAll(k[5]), table[5], rtol=1e-12)
@@ -0,0 +1,40 @@
+"""
+This module checks that the power moments evaluated from the bias basis
+reproduce the biased power terms of the model
+"""
+import pytest
+import numpy
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD.rsd import GalaxySpectrum
+
+k = numpy.logspace(-2, numpy.log10(0.4), 20)
+mu = numpy.linspace(0., 1., 5)
+
+OPTIONS = [{},
+           {'use_tidal_bias':True, 'vel_disp_from_sims':True, 'correct_mu2':True},
+           {'use_mean_bias':True},
+           {'use_vlah_biasing':False},
+           {'correct_mu4':True},
+           {'max_mu':6},
+           {'use_Phm_model':True}]
+
+@pytest.mark.parametrize("options", OPTIONS, ids=lambda x: '-'.join(x) or 'default')
+def test_bias_basis(options):
+    """
+    The galaxy power with the bias basis should match the power computed
+    from the biased power terms
+    """
+    kws = {'params':'runPB.ini', 'z':0.55, 'kmin':1e-3, 'kmax':0.6}
+    model = GalaxySpectrum(**dict(kws, **options))
+    assert model.use_bias_basis
+    P1 = model.power(k, mu)
+
+    # the moments of the first pair should be reused
+    model.b1_cA = 2.0
+    model.power(k, mu)
+    model.b1_cA = 1.85
+    numpy.testing.assert_allclose(model.power(k, mu), P1, rtol=1e-12)
+
+    model.use_bias_basis = False
+    numpy.testing.assert_allclose(model.power(k, mu), P1, rtol=1e-8)
@@ -0,0 +1,103 @@
+"""
+This module checks the interpolated bias to mass relation, which inverts
+the tabulated sigma(M) and Tinker bias relations, against the mass found
+by root finding for each (sigma8_z, b1) pair
+"""
+from pyRSD import pygcl
+from pyRSD.rsd.tools import BiasToMassRelation, BiasToSigmaRelation
+
+import pytest
+import numpy
+
+z = 0.55
+sigma8_z = numpy.array([0.35, 0.45, 0.55, 0.65, 0.8, 0.95])
+b1 = numpy.array([1.0, 1.5, 2.0, 3.0, 4.5, 7.0])
+
+@pytest.fixture(scope='module')
+def cosmo():
+    return pygcl.Cosmology('runPB.ini', pygcl.transfers.CLASS)
+
+@pytest.fixture
+def cache_root(tmpdir, monkeypatch):
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+    monkeypatch.setenv('PYRSD_DISK_CACHE', '1')
+    return str(tmpdir)
+
+def test_interpolate(cosmo):
+    """
+    The interpolated mass should match the mass found by root finding
+    """
+    rel = BiasToMassRelation(z, cosmo, interpolate=True, disk_cache=False)
+    s8, b = numpy.meshgrid(sigma8_z, b1, indexing='ij')
+
+    M = rel(s8, b)
+    assert M.shape == s8.shape
+
+    _, valid = rel._mass_from_table(s8.ravel(), b.ravel())
+    assert valid.all()
+
+    M0 = [[rel._compute_fresh(*args) for args in zip(*row)] for row in zip(s8, b)]
+    numpy.testing.assert_allclose(M, M0, rtol=1e-4)
+
+    # the same as without the table
+    rel.interpolate = False
+    numpy.testing.assert_allclose(M, rel(s8, b), rtol=1e-4)
+
+def test_scalar(cosmo):
+    """
+    A scalar pair should return a float
+    """
+    for interpolate in [True, False]:
+        rel = BiasToMassRelation(z, cosmo, interpolate=interpolate, disk_cache=False)
+        M = rel(0.6, 2.)
+        assert isinstance(M, float)
+        numpy.testing.assert_allclose(M, rel._compute_fresh(0.6, 2.), rtol=1e-4)
+
+def test_out_of_table(cosmo):
+    """
+    Pairs outside the interpolation table should be found by root finding
+    """
+    rel = BiasToMassRelation(z, cosmo, interpolate=True, disk_cache=False)
+    rel.mass_grid = numpy.logspace(-1, 1, 200)
+
+    _, valid = rel._mass_from_table(sigma8_z, b1)
+    assert valid.any() and not valid.all()
+
+    M = rel(sigma8_z, b1)
+    M0 = numpy.array([rel._compute_fresh(*args) for args in zip(sigma8_z, b1)])
+    numpy.testing.assert_allclose(M[~valid], M0[~valid], rtol=1e-12)
+    numpy.testing.assert_allclose(M[valid], M0[valid], rtol=1e-4)
+
+def test_disk_cache(cosmo, cache_root, monkeypatch):
+    """
+    A second relation with the same cosmology should load sigma(M)
+    from disk
+    """
+    rel = BiasToMassRelation(z, cosmo, interpolate=True)
+    M1 = rel(sigma8_z, b1)
+    assert rel._disk_cache.path.startswith(cache_root)
+
+    def fail(self, mass):
+        raise AssertionError("sigma(M) should be loaded from disk")
+
+    rel = BiasToMassRelation(z, cosmo, interpolate=True)
+    with monkeypatch.context() as m:
+        m.setattr(BiasToMassRelation, '_mass_to_radius', fail)
+        table = rel.sigma_table
+    assert len(table) == len(rel.mass_grid)
+    numpy.testing.assert_array_equal(rel(sigma8_z, b1), M1)
+
+def test_bias_to_sigma(cosmo):
+    """
+    The velocity dispersion of the interpolated relation should match
+    that of the root finding, for arrays and scalars
+    """
+    kws = [{}, {'sigmav_0':5., 'M_0':1e13}]
+    for kw in kws:
+        rel = BiasToSigmaRelation(z, cosmo, interpolate=True, disk_cache=False, **kw)
+        sigmav = rel(sigma8_z, b1)
+
+        rel.interpolate = False
+        numpy.testing.assert_allclose(sigmav, rel(sigma8_z, b1), rtol=1e-4)
+        assert isinstance(rel(0.6, 2.), float)
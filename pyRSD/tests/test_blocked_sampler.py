@@ -0,0 +1,161 @@
+"""
+This module checks the classification of the fit parameters into
+the fast and slow blocks of the blocked sampler, and the sampling
+of an analytic target with the blocked sampler
+"""
+from pyRSD.rsdfit import FittingDriver, GlobalFittingDriver
+from pyRSD.rsdfit.solvers.blocked import split_fast_slow, dependents, BlockedSampler
+from pyRSD.rsdfit.parameters import ParameterSet
+from pyRSD import data_dir, numpy
+
+import pytest
+import os
+
+# the correlated Gaussian target, with a slow and a fast dimension
+MEAN = numpy.array([1., -2.])
+COV = numpy.array([[1., 0.6], [0.6, 2.]])
+
+def gaussian_lnprob(theta):
+    d = theta - MEAN
+    return -0.5*numpy.dot(d, numpy.linalg.solve(COV, d))
+
+def run_sampler(iterations, nwalkers=32, fast_steps=3, seed=42):
+    """
+    Run the blocked sampler on the Gaussian target, with the
+    second parameter fast
+    """
+    rng = numpy.random.RandomState(seed)
+    sampler = BlockedSampler(nwalkers, 2, gaussian_lnprob, [1], fast_steps=fast_steps)
+    p0 = MEAN + rng.randn(nwalkers, 2)
+    for result in sampler.sample(p0, rstate0=rng.get_state(), iterations=iterations):
+        pass
+    return sampler, result
+
+@pytest.fixture(scope='module')
+def theory():
+
+    os.environ['PYRSD_DATA'] = data_dir
+    path = os.path.join(data_dir, 'examples', 'params.dat')
+    driver = FittingDriver(path, init_model=False)
+    return driver.theory
+
+def test_dependents(theory):
+    """
+    The dependents should include the parameters that depend on
+    a parameter through other constrained parameters
+    """
+    deps = dependents(theory.fit_params, 'gamma_b1sA')
+    assert 'b1_sA' in deps
+
+    # b1_cB depends on b1_sA, which depends on b1_cA
+    deps = dependents(theory.fit_params, 'b1_cA')
+    assert set(['b1_sA', 'b1_sB', 'b1_cB', 'b1_c', 'b1']) <= deps
+
+def test_split_fast_slow(theory):
+    """
+    The biases, the growth rate and sigma8 should be slow, and the
+    FOG and one-halo parameters fast
+    """
+    fast, slow = split_fast_slow(theory)
+    assert sorted(fast + slow) == sorted(theory.free_names)
+
+    for name in ['b1_cA', 'gamma_b1sA', 'gamma_b1sB', 'Nsat_mult', 'f', 'sigma8_z']:
+        assert name in slow, name
+    for name in ['fs', 'sigma_c', 'sigma_sA', 'f1h_cBs', 'f1h_sBsB']:
+        assert name in fast, name
+
+def test_sampler_gaussian():
+    """
+    The chain of the blocked sampler should recover the mean and
+    covariance of a correlated Gaussian
+    """
+    sampler, _ = run_sampler(1000)
+    assert sampler.chain.shape == (32, 1000, 2)
+    assert sampler.lnprobability.shape == (32, 1000)
+
+    samples = sampler.chain[:, 200:].reshape(-1, 2)
+    numpy.testing.assert_allclose(samples.mean(axis=0), MEAN, atol=0.1)
+    numpy.testing.assert_allclose(numpy.cov(samples, rowvar=False), COV, atol=0.15)
+
+def test_sampler_acceptance():
+    """
+    The acceptance fractions of the slow and fast moves
+    """
+    sampler, _ = run_sampler(100)
+    for frac in [sampler.acceptance_fraction, sampler.fast_acceptance_fraction]:
+        assert frac.shape == (32,)
+        assert (frac > 0.).all() and (frac <= 1.).all()
+
+    # the fast fraction is per fast update, of which there are 3 per step
+    numpy.testing.assert_allclose(sampler.fast_acceptance_fraction, sampler.nfast_accepted/300.)
+    assert 0.2 < sampler.fast_acceptance_fraction.mean() < 0.7
+
+    # no fast updates without fast parameters
+    sampler = BlockedSampler(32, 2, gaussian_lnprob, [], fast_steps=3)
+    assert sampler.fast_steps == 0
+    for _ in sampler.sample(MEAN + numpy.random.randn(32, 2), iterations=5):
+        pass
+    assert (sampler.fast_acceptance_fraction == 0.).all()
+
+def test_sampler_restart():
+    """
+    Restarting from the last positions, log-probabilities and random
+    state should continue the chain exactly
+    """
+    full, _ = run_sampler(20)
+    first, (p, lnprob, rstate) = run_sampler(10)
+
+    # the log-probabilities of the restart are not recomputed
+    calls = []
+    def lnprobfn(theta):
+        calls.append(theta)
+        return gaussian_lnprob(theta)
+
+    second = BlockedSampler(32, 2, lnprobfn, [1], fast_steps=3)
+    for _ in second.sample(p, lnprob0=lnprob, rstate0=rstate, iterations=10):
+        pass
+    assert len(calls) == 10*32*(1+3)
+
+    chain = numpy.concatenate([first.chain, second.chain], axis=1)
+    lnprobs = numpy.concatenate([first.lnprobability, second.lnprobability], axis=1)
+    numpy.testing.assert_allclose(chain, full.chain)
+    numpy.testing.assert_allclose(lnprobs, full.lnprobability)
+
+    # the same sampler also continues the chain
+    for _ in first.sample(p, lnprob0=lnprob, rstate0=rstate, iterations=10):
+        pass
+    assert first.iterations == 20
+    numpy.testing.assert_allclose(first.chain, full.chain)
+
+def test_emcee_run(monkeypatch):
+    """
+    The emcee solver should run the blocked sampler when ``fast_steps``
+    is set, and return the results for the full chain
+    """
+    from pyRSD.rsdfit.solvers import emcee_solver, objectives
+    from pyRSD.rsdfit.results import EmceeResults
+
+    fit_params = ParameterSet()
+    fit_params.add('a', value=MEAN[0], vary=True, fiducial=MEAN[0])
+    fit_params.add('b', value=MEAN[1], vary=True, fiducial=MEAN[1])
+    fit_params.prepare_params()
+
+    # the Gaussian target, with the second parameter fast
+    class GaussianDriver(object):
+        theory = None
+        def lnprob(self, theta):
+            return gaussian_lnprob(theta)
+    monkeypatch.setattr(GlobalFittingDriver, '_instance', GaussianDriver())
+    monkeypatch.setattr(emcee_solver, 'split_fast_slow', lambda theory: (['b'], ['a']))
+
+    numpy.random.seed(42)
+    params = {'walkers':16, 'iterations':50, 'init_from':'fiducial', 'fast_steps':2, 'burnin':10}
+    results, exception = emcee_solver.run(params, fit_params, init_values=MEAN)
+
+    assert exception is None
+    assert isinstance(results, EmceeResults)
+    assert results.chain.shape == (16, 50, 2)
+    assert results.lnprobs.shape == (16, 50)
+    assert results.burnin == 10
+    assert results.free_names == ['a', 'b']
+    assert (results.acceptance_fraction > 0.).all()
@@ -0,0 +1,66 @@
+"""
+This module checks the ``raw`` keyword of :func:`pyRSD.rsd.tools.broadcast_kmu`,
+which should only affect the calls of the thread making the raw call
+"""
+import pytest
+import numpy
+import threading
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD.rsd import tools
+
+class ToyPower(object):
+    """
+    A power function calling a nested power function, which waits
+    for ``event`` if it is set
+    """
+    event = None
+
+    @tools.broadcast_kmu
+    def power(self, k, mu):
+        return self.inner(k, mu)
+
+    @tools.broadcast_kmu
+    def inner(self, k, mu):
+        if self.event is not None:
+            self.event.wait(5.)
+        return k * (1 + mu**2)
+
+def test_raw_nested():
+    """
+    Nested calls of a raw call return arrays, otherwise DataArrays
+    """
+    import xarray as xr
+
+    m = ToyPower()
+    k, mu = numpy.linspace(0.01, 0.4, 10), numpy.linspace(0., 1., 5)
+
+    P1 = m.power(k, mu)
+    P2 = m.power(k, mu, raw=True)
+    assert isinstance(P1, xr.DataArray)
+    assert isinstance(P2, numpy.ndarray) and P2.flags['C_CONTIGUOUS']
+    numpy.testing.assert_array_equal(P1.values, P2)
+
+    out = numpy.empty((10, 5))
+    assert m.power(k, mu, out=out) is out
+    numpy.testing.assert_array_equal(out, P2)
+
+def test_raw_threads():
+    """
+    A raw call in progress in one thread should not make the calls of
+    another thread return arrays
+    """
+    import xarray as xr
+
+    k, mu = numpy.linspace(0.01, 0.4, 10), numpy.linspace(0., 1., 5)
+
+    # a raw call blocked inside the nested call
+    blocked = ToyPower()
+    blocked.event = threading.Event()
+    t = threading.Thread(target=blocked.power, args=(k, mu), kwargs={'raw':True})
+    t.start()
+    try:
+        assert isinstance(ToyPower().power(k, mu), xr.DataArray)
+    finally:
+        blocked.event.set()
+        t.join()
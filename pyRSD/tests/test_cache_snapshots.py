@@ -0,0 +1,86 @@
+"""
+This module checks the snapshots of recent cache states
+"""
+from .utils.toy import ToyModel
+from pyRSD.rsd._cache import parameter, cached_property
+import numpy
+
+class Box(object):
+    """
+    A sub-model that is updated in place
+    """
+    def __init__(self, a, c):
+        self.a = a
+        self.c = c
+
+class MutableModel(ToyModel):
+    """
+    A model with a sub-model updated in place by the ``c`` setter
+    """
+    def __init__(self, c=0., **kws):
+        ToyModel.__init__(self, **kws)
+        self.c = c
+
+    @parameter
+    def c(self, val):
+        if 'box' in self._cache:
+            self.box.c = val
+        return val
+
+    @cached_property("a", snapshot=False)
+    def box(self):
+        return Box(self.a, self.c)
+
+def test_snapshot_restore():
+    """
+    Returning to recent parameter values should not recompute
+    """
+    model = ToyModel(shape=1000)
+    model.enable_snapshots()
+
+    for a in [1., 2., 1., 2.]:
+        model.a = a
+        numpy.testing.assert_allclose(model.y, 2*a + model.b)
+    assert model.ncalls == 4
+
+    # y depends on b too
+    model.b = 3.
+    numpy.testing.assert_allclose(model.y, 7.)
+    assert model.ncalls == 5
+
+def test_snapshot_budget():
+    """
+    The least recently used values should be evicted beyond the budget
+    """
+    model = ToyModel(shape=1000)
+    model.enable_snapshots(maxbytes=5*8000)
+
+    for a in range(10):
+        model.a = float(a)
+        model.y
+    assert model._snapshots.nbytes <= 5*8000
+    assert len(model._snapshots) < 20
+
+    # the oldest state was evicted, the newest was not
+    ncalls = model.ncalls
+    model.a = 8.; model.y
+    assert model.ncalls == ncalls
+    model.a = 0.; model.y
+    assert model.ncalls > ncalls
+
+def test_snapshot_mutable():
+    """
+    Values modified in place should not be restored from the snapshots
+    """
+    model = MutableModel()
+    model.enable_snapshots()
+
+    model.box
+    model.c = 5. # modifies the box with a=1
+    model.a = 2.; model.box
+    model.c = 7.
+
+    # the box with a=1 was modified after it was replaced
+    model.a = 1.
+    assert model.box.a == 1. and model.box.c == 7.
+    assert not any(key[0] == 'box' for key in model._snapshots._data)
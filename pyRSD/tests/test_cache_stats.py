@@ -0,0 +1,42 @@
+"""
+This module checks the instrumentation of the cache framework
+"""
+from .utils.toy import ToyModel
+
+def test_cache_stats():
+    """
+    Hits, misses and the parameter triggering each invalidation
+    should be recorded
+    """
+    model = ToyModel()
+    assert model.cache_stats() is None
+
+    model.enable_cache_stats()
+    for a in [1., 2., 3.]:
+        model.a = a
+        model.y; model.y
+    model.b = 5.
+    model.y
+
+    stats = model.cache_stats()
+    assert stats.misses['x'] == 3 and stats.misses['y'] == 4
+    assert stats.hits['y'] == 3
+    assert dict(stats.triggers['y']) == {'a': 2, 'b': 1}
+    assert stats.invalidations['x'] == 2
+    assert stats.time['y'] >= stats.self_time['y']
+
+def test_profile_cache():
+    """
+    The profiling context should only record activity in its scope
+    """
+    model = ToyModel()
+    model.y
+    with model.profile_cache() as stats:
+        model.b = 10.
+        model.y
+    model.a = 10.
+    model.y
+
+    assert stats.misses['y'] == 1 and 'x' not in stats.misses
+    assert dict(stats.triggers['y']) == {'b': 1}
+    assert model.cache_stats() is None
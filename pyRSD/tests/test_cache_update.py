@@ -0,0 +1,63 @@
+"""
+This module checks the batched parameter updates of the cache framework
+"""
+from .utils.toy import ToyModel
+from pyRSD.rsd._cache import parameter
+
+class DependentModel(ToyModel):
+    """
+    A model where setting ``z`` also sets ``a``, as setting the
+    redshift sets the growth rate
+    """
+    _always_set = set(['z'])
+
+    @parameter(default=0.)
+    def z(self, val):
+        self.a = 10*val
+        return val
+
+def test_update_changed_only():
+    """
+    Only the parameters that changed since the last update should be set
+    """
+    model = ToyModel()
+    model.update(a=1., b=2.)
+    assert model.y == 4.
+
+    nset = model.nset
+    model.update(a=1., b=2.)
+    assert model.nset == nset
+
+    model.update(a=3., b=2.)
+    assert model.nset == nset + 1
+    assert model.y == 8.
+
+def test_update_after_setattr():
+    """
+    Setting a parameter directly should not be missed by the next update
+    """
+    model = ToyModel()
+    model.update(a=1., b=2.)
+    model.a = 5.
+    assert model.y == 12.
+
+    model.update(a=1., b=2.)
+    assert model.a == 1.
+    assert model.y == 4.
+
+def test_update_dependent():
+    """
+    A parameter set by the setter of another parameter in the same
+    update should still take its value
+    """
+    model = DependentModel()
+    model.update(z=0.5, a=0.8)
+    assert model.a == 0.8
+
+    model.update(z=0.6, a=0.8)
+    assert model.a == 0.8
+    assert model.y == 3.6
+
+    # the order of the keywords is respected
+    model.update(a=0.8, z=0.7)
+    assert model.a == 7.
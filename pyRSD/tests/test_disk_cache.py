@@ -0,0 +1,213 @@
+"""
+This module checks that the PT integrals stored in the disk cache
+reproduce the model computed from scratch
+"""
+from pyRSD.rsd import DarkMatterSpectrum, _disk_cache
+from pyRSD import pygcl
+
+import pytest
+import numpy
+import os
+
+@pytest.fixture
+def cache_root(tmpdir, monkeypatch):
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+    monkeypatch.setenv('PYRSD_DISK_CACHE', '1')
+    return str(tmpdir)
+
+def test_cosmology_hash():
+    """
+    The hash should identify the cosmology and transfer function
+    """
+    cosmo = pygcl.Cosmology('teppei_sims.ini', pygcl.transfers.CLASS)
+    h1 = _disk_cache.cosmology_hash(cosmo)
+    assert h1 == _disk_cache.cosmology_hash(cosmo.clone())
+    assert h1 != _disk_cache.cosmology_hash(cosmo.clone(tf=pygcl.transfers.EH))
+    assert h1 != _disk_cache.cosmology_hash(cosmo, 'extra')
+
+def test_disk_cache_roundtrip(cache_root):
+    """
+    A second model with the same cosmology should load the integrals
+    from disk and give the same power spectrum
+    """
+    k = numpy.logspace(-2, numpy.log10(0.4), 20)
+    kws = {'params':'teppei_sims.ini', 'z':0.55, 'include_2loop':True}
+
+    model = DarkMatterSpectrum(**kws)
+    P1 = model.P_mu2(k)
+
+    path = model._disk_cache.path
+    assert path.startswith(cache_root)
+    assert len(os.listdir(path)) > 0
+
+    model = DarkMatterSpectrum(**kws)
+    assert model._disk_cache.path == path
+    assert isinstance(model._disk_cache.load('oneloop_dd'), numpy.memmap)
+    numpy.testing.assert_allclose(model.P_mu2(k), P1, rtol=1e-12)
+
+    # disabling the cache should not touch the directory
+    model = DarkMatterSpectrum(disk_cache=False, **kws)
+    assert model._disk_cache is None
+    numpy.testing.assert_allclose(model.P_mu2(k), P1, rtol=1e-12)
+
+def test_hzpt_tables_roundtrip(cache_root):
+    """
+    The HZPT interpolation tables should be loaded from disk for a known
+    cosmology and reproduce the tables computed from scratch
+    """
+    from pyRSD.rsd.hzpt import InterpolatedHZPTModels
+
+    cosmo = pygcl.Cosmology('teppei_sims.ini', pygcl.transfers.CLASS)
+    k = numpy.logspace(-2, numpy.log10(0.4), 20)
+
+    models = InterpolatedHZPTModels(cosmo, 0.6, 0.7)
+    P1 = models.P00(k)
+
+    path = models._disk_cache.path
+    assert path.startswith(cache_root)
+    assert any(f.startswith('hzpt_P00') for f in os.listdir(path))
+
+    models = InterpolatedHZPTModels(cosmo, 0.6, 0.7)
+    assert models._disk_cache.path == path
+    numpy.testing.assert_allclose(models.P00(k), P1, rtol=1e-12)
+
+    # a refined grid should meet the requested tolerance
+    models = InterpolatedHZPTModels(cosmo, 0.6, 0.7, disk_cache=False, Nsigma8=10, rtol=1e-3)
+    assert models.table.interpolation_error('P00') <= 1e-3
+
+def test_hzpt_table_kws(cache_root):
+    """
+    The table keywords are passed from the model, are part of the key
+    of the cached tables, and tabulating restores ``sigma8_z``
+    """
+    kws = {'Nsigma8':10, 'rtol':1e-3, 'Nmax':20}
+    model = DarkMatterSpectrum(params='teppei_sims.ini', z=0.55, hzpt_table_kws=kws)
+    hzpt = model.hzpt
+    assert hzpt.table.rtol == 1e-3 and hzpt.table.Nmax == 20
+    assert len(hzpt.table.grid['sigma8_z']) == 10
+
+    # changing the keywords rebuilds the models
+    model.hzpt_table_kws = {'Nsigma8':20}
+    assert model.hzpt is not hzpt and model.hzpt.table.rtol is None
+
+    # a different Nmax is a different table
+    hzpt.table['P00']
+    path = hzpt._disk_cache.path
+    names = set(os.listdir(path))
+    model.hzpt_table_kws = dict(kws, Nmax=40)
+    model.hzpt.table['P00']
+    assert len(set(os.listdir(path)) - names) > 0
+
+    # an error while tabulating restores sigma8_z
+    m = hzpt._P00
+    s8 = m._driver.GetSigma8AtZ()
+    zeldovich = m.zeldovich
+    calls = []
+    def fail(k):
+        calls.append(k)
+        if len(calls) > 2: raise RuntimeError
+        return zeldovich(k)
+    m.zeldovich = fail
+    with pytest.raises(RuntimeError):
+        hzpt.table._tabulate(m, numpy.array([0.5, 0.6, 0.7]), numpy.array([0.1]))
+    assert m._driver.GetSigma8AtZ() == s8
+
+def test_simulation_fits_roundtrip(cache_root):
+    """
+    The weights of the trained Gaussian processes should be stored in the
+    disk cache, loaded back as memory maps, and agree with ``george``
+    """
+    from pyRSD.rsd import simulation
+
+    b1 = numpy.linspace(1.5, 3., 10)
+
+    fits = simulation.VelocityDispersionFits()
+    sigma = fits(sigma8_z=0.6, b1=b1)
+    assert os.path.dirname(fits._gp_cache.path) == cache_root
+    assert os.listdir(fits._gp_cache.path) == ['alpha.npy']
+
+    # compare to the george prediction, which solves for the weights
+    # separately, up to the conditioning of the kernel matrix
+    pts = fits.x_scaler.transform(numpy.array([numpy.repeat(0.6, len(b1)), b1]).T)
+    kws = {'return_cov':False} if simulation.GEORGE_v03 else {'mean_only':True}
+    mean = fits.gp.predict(fits.y_scaled, pts, **kws)
+    numpy.testing.assert_allclose(sigma, fits.y_scaler.inverse_transform(mean.reshape(-1, 1)).ravel(), rtol=1e-6)
+
+    fits = simulation.VelocityDispersionFits()
+    assert isinstance(fits.alpha, numpy.memmap)
+    numpy.testing.assert_allclose(fits(sigma8_z=0.6, b1=b1), sigma, rtol=1e-12)
+
+def test_snapshot_roundtrip(cache_root, tmpdir):
+    """
+    A model loaded from a snapshot should memory-map the arrays stored
+    in the snapshot and give the same power spectrum
+    """
+    from pyRSD.rsd import load_model, snapshot
+
+    k = numpy.logspace(-2, numpy.log10(0.4), 20)
+    model = DarkMatterSpectrum(params='teppei_sims.ini', z=0.55)
+    P1 = model.power(k, 0.6)
+
+    path = str(tmpdir.join('model.snapshot'))
+    model.to_snapshot(path)
+    manifest = snapshot.read_manifest(path)
+    assert manifest['class'].endswith('DarkMatterSpectrum')
+    assert manifest['state']['__z'] == 0.55
+
+    # remove the user cache, so the arrays must come from the snapshot
+    import shutil
+    shutil.rmtree(model._disk_cache.path)
+
+    model = load_model(path)
+    assert isinstance(model, DarkMatterSpectrum)
+    files = model._disk_cache.files()
+    assert len(files) and all(f.startswith(path) for f in files.values())
+    numpy.testing.assert_allclose(model.power(k, 0.6), P1, rtol=1e-12)
+
+    # snapshots from another release are rejected
+    manifest['version'] = '0.0.0'
+    with pytest.raises(snapshot.IncompatibleSnapshotError):
+        snapshot.check_compatibility(manifest)
+
+def test_snapshot_versions(cache_root, tmpdir):
+    """
+    A snapshot saved by another development version of the current
+    release is loaded with a warning, which can be turned off
+    """
+    from pyRSD.rsd import load_model, snapshot, OutdatedModelWarning, __version__
+    from pyRSD.rsdfit.util import rsd_io
+    import json
+    import warnings
+
+    model = DarkMatterSpectrum(params='teppei_sims.ini', z=0.55)
+    path = str(tmpdir.join('model.snapshot'))
+    model.to_snapshot(path, initialize=False)
+
+    def outdated(load, *args, **kwargs):
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            assert isinstance(load(*args, **kwargs), DarkMatterSpectrum)
+        return any(issubclass(x.category, OutdatedModelWarning) for x in w)
+
+    # the current version
+    assert not outdated(load_model, path)
+
+    # another build of the current release
+    filename = os.path.join(path, 'manifest.json')
+    with open(filename, 'r') as ff:
+        manifest = json.load(ff)
+    manifest['version'] = snapshot.base_version(__version__) + '.dev.0000000'
+    with open(filename, 'w') as ff:
+        json.dump(manifest, ff)
+
+    assert outdated(load_model, path)
+    assert not outdated(rsd_io.load_model, path, show_warning=False)
+
+    # another release
+    manifest['version'] = '0.0.0'
+    with open(filename, 'w') as ff:
+        json.dump(manifest, ff)
+    with pytest.raises(snapshot.IncompatibleSnapshotError):
+        rsd_io.load_model(path, show_warning=False)
+    assert isinstance(load_model(path, check=False), DarkMatterSpectrum)
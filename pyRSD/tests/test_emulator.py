@@ -0,0 +1,179 @@
+"""
+This module checks the training of the emulator of the fit theory, serially
+and split between the ranks of a communicator, for a toy theory
+"""
+import pytest
+import numpy
+import threading
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD.rsdfit.theory import emulator
+from pyRSD.rsdfit import FittingDriver
+
+class ToyParameter(object):
+    def __init__(self, name, lower, upper):
+        self.name = name
+        self.min = lower
+        self.max = upper
+        self.has_prior = False
+
+class ToyTheory(object):
+    """
+    The free parameters ``a`` and ``b``
+    """
+    def __init__(self):
+        self.free = [ToyParameter('a', 0., 1.), ToyParameter('b', -1., 1.)]
+        self.free_names = [p.name for p in self.free]
+        self.free_values = numpy.array([0.5, 0.])
+
+    def set_free_parameters(self, theta):
+        self.free_values = numpy.array(theta, dtype=float)
+        return all(p.min <= v <= p.max for p, v in zip(self.free, theta))
+
+class ToyData(object):
+    def __init__(self, driver):
+        self.combined_power = driver.theory_callable()
+        self.covariance_matrix = type('Covariance', (), {'diag':numpy.ones(driver.Nb)*1e-4,
+                                                         'inverse':numpy.identity(driver.Nb)*1e4})
+
+class ToyDriver(object):
+    """
+    A driver with a smooth prediction
+    """
+    x = numpy.linspace(0.1, 1., 20)
+    Nb = len(x)
+
+    train_emulator = FittingDriver.train_emulator
+    setup_emulator = FittingDriver.setup_emulator
+
+    def __init__(self, emulator_file=None):
+        self.theory = ToyTheory()
+        self.data = ToyData(self)
+        self.emulator = None
+        self.emulator_file = emulator_file
+
+    def theory_callable(self):
+        a, b = self.theory.free_values
+        return 1. + a*self.x + b*self.x**2
+
+class ThreadComm(object):
+    """
+    A stand-in for the MPI communicator of ``size`` threads
+    """
+    def __init__(self, rank, size, shared):
+        self.rank = rank
+        self.size = size
+        self.shared = shared
+
+    def allgather(self, value):
+        self.shared['values'][self.rank] = value
+        self.shared['barrier'].wait()
+        toret = list(self.shared['values'])
+        self.shared['barrier'].wait()
+        return toret
+
+    def bcast(self, value, root=0):
+        return self.allgather(value)[root]
+
+    def Barrier(self):
+        self.allgather(None)
+
+def run_ranks(f, size):
+    """
+    Call ``f(comm)`` on ``size`` threads, and return the results
+    """
+    shared = {'values':[None]*size, 'barrier':threading.Barrier(size)}
+    results = [None]*size
+    def target(rank):
+        results[rank] = f(ThreadComm(rank, size, shared))
+
+    threads = [threading.Thread(target=target, args=(rank,)) for rank in range(size)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return results
+
+def test_evaluate_comm():
+    """
+    Splitting the evaluations between ranks gives the serial result
+    """
+    thetas = emulator.latin_hypercube(11, [(0., 1.), (-1., 1.)], seed=42)
+    serial = emulator.evaluate(ToyDriver(), thetas)
+
+    results = run_ranks(lambda comm: emulator.evaluate(ToyDriver(), thetas, comm=comm), 3)
+    for result in results:
+        numpy.testing.assert_allclose(result, serial)
+
+def test_train():
+    """
+    The emulator reproduces the theory within the training region, and
+    refuses to extrapolate
+    """
+    pytest.importorskip("sklearn")
+
+    driver = ToyDriver()
+    emu = emulator.EmulatedSpectrum.train(driver, N=50, Nvalidate=20, seed=42)
+    assert emu.validation['max'] < 1.
+
+    theta = [0.3, 0.2]
+    driver.theory.set_free_parameters(theta)
+    numpy.testing.assert_allclose(emu(theta), driver.theory_callable(), atol=1e-2)
+
+    assert not emu.in_bounds([1.5, 0.])
+    with pytest.raises(ValueError):
+        emu([1.5, 0.])
+
+def test_single_component():
+    """
+    The prediction and gradient have the right shapes when the PCA
+    keeps a single component
+    """
+    pytest.importorskip("sklearn")
+
+    # the prediction only varies along one direction
+    class RankOneDriver(ToyDriver):
+        def theory_callable(self):
+            a, b = self.theory.free_values
+            return 1. + (a+b)*self.x
+
+    driver = RankOneDriver()
+    emu = emulator.EmulatedSpectrum.train(driver, N=30, Nvalidate=10, seed=42)
+    assert emu.components.shape == (1, driver.Nb)
+
+    theta = [0.3, 0.2]
+    driver.theory.set_free_parameters(theta)
+    assert emu(theta).shape == (driver.Nb,)
+    numpy.testing.assert_allclose(emu(theta), driver.theory_callable(), atol=1e-2)
+
+    grad = emu.gradient(theta)
+    assert grad.shape == (2, driver.Nb)
+    numpy.testing.assert_allclose(grad, numpy.array([driver.x, driver.x]), atol=1e-2)
+
+def test_setup_comm(tmpdir, monkeypatch):
+    """
+    Every rank gets the same emulator, and only the root writes the file
+    """
+    pytest.importorskip("sklearn")
+
+    filename = str(tmpdir.join('emulator.pickle'))
+    def setup(comm):
+        driver = ToyDriver(emulator_file=filename)
+        driver.setup_emulator(comm=comm)
+        return driver.emulator
+
+    # record the threads writing the file
+    writers = []
+    to_file = emulator.EmulatedSpectrum.to_file
+    def record(self, filename):
+        writers.append(threading.current_thread())
+        to_file(self, filename)
+    monkeypatch.setattr(emulator.EmulatedSpectrum, 'to_file', record)
+
+    emus = run_ranks(setup, 2)
+    assert len(writers) == 1
+    theta = [0.3, 0.2]
+    numpy.testing.assert_allclose(emus[0](theta), emus[1](theta))
+
+    # the saved emulator is loaded
+    loaded = run_ranks(setup, 2)
+    assert len(writers) == 1
+    numpy.testing.assert_allclose(loaded[1](theta), emus[0](theta))
@@ -0,0 +1,28 @@
+"""
+This module validates the FFTLog PT integrals against the adaptive
+cubature of the pygcl drivers
+"""
+from pyRSD.rsd import fftlog_pt
+from pyRSD import pygcl
+
+import pytest
+import numpy
+
+@pytest.fixture(scope='module')
+def errors():
+
+    cosmo = pygcl.Cosmology('teppei_sims.ini', pygcl.transfers.CLASS)
+    power_lin = pygcl.LinearPS(cosmo, 0.)
+
+    k = numpy.logspace(-2, numpy.log10(0.5), 20)
+    return fftlog_pt.validate(power_lin, k=k)
+
+@pytest.mark.parametrize("prefix", ['I', 'J', 'K'])
+def test_fftlog_accuracy(errors, prefix):
+    """
+    The FFTLog integrals should agree with the cubature to 0.1% of
+    their amplitude over the range of wavenumbers used in fits
+    """
+    for name in errors:
+        if name.startswith(prefix):
+            assert errors[name] < 1e-3, name
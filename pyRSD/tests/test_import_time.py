@@ -0,0 +1,90 @@
+"""
+This module checks the imports of ``pyRSD.rsd`` and ``pyRSD.rsdfit``,
+which every MPI rank pays at startup, using ``python -X importtime``
+
+The import time itself depends on the machine, and is only checked if
+the ``PYRSD_IMPORT_BUDGET`` environment variable is set to the budget
+of each import, in seconds
+"""
+import subprocess
+import sys
+import os
+import pytest
+
+MODULES = ['pyRSD.rsd', 'pyRSD.rsdfit']
+
+# the budget of the cumulative import time of each module, in seconds,
+# which includes importing the pyRSD package itself (i.e., numpy and pygcl)
+BUDGET = os.environ.get('PYRSD_IMPORT_BUDGET', None)
+
+# modules that should only be imported when needed
+DEFERRED = ['astropy.cosmology', 'xarray', 'pyRSD.rsd.power', 'pyRSD.rsd.cosmology',
+            'pyRSD.rsdfit.driver', 'pyRSD.rsdfit.theory']
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="requires python -X importtime")
+
+def import_times(module):
+    """
+    Import ``module`` in a new interpreter, and return the cumulative
+    import time of each imported module, in seconds
+    """
+    cmd = [sys.executable, '-X', 'importtime', '-c', 'import %s' %module]
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = p.communicate()
+    assert p.returncode == 0, stderr.decode()
+
+    toret = {}
+    for line in stderr.decode().splitlines():
+        if not line.startswith('import time:'): continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            toret[fields[2].strip()] = int(fields[1]) * 1e-6
+        except ValueError:
+            continue # the header
+    return toret
+
+@pytest.mark.parametrize("module", MODULES)
+def test_deferred_imports(module):
+    """
+    The import should not import the models
+    """
+    times = import_times(module)
+    assert module in times
+
+    imported = [name for name in DEFERRED if name in times]
+    assert not imported, "modules imported eagerly: %s" %imported
+
+@pytest.mark.skipif(BUDGET is None, reason="set PYRSD_IMPORT_BUDGET to check the import time")
+@pytest.mark.parametrize("module", MODULES)
+def test_import_time(module):
+    """
+    The import should be within budget
+    """
+    times = import_times(module)
+    budget = float(BUDGET)
+    assert times[module] < budget, "importing %s took %.3f s" %(module, times[module])
+
+@pytest.mark.parametrize("module", MODULES)
+def test_no_subprocess(module):
+    """
+    No process (i.e., git) should be spawned at import
+    """
+    code = ("import subprocess\n"
+            "def fail(*args, **kwargs): raise RuntimeError('process spawned at import: ' + str(args))\n"
+            "subprocess.Popen = fail\n"
+            "import " + module)
+    p = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = p.communicate()
+    assert p.returncode == 0, stderr.decode()
+
+def test_lazy_attributes():
+    """
+    The model classes should be importable from ``pyRSD.rsd`` on access
+    """
+    import pyRSD.rsd
+    from pyRSD.rsd.power.gal import GalaxySpectrum
+
+    assert 'GalaxySpectrum' in dir(pyRSD.rsd)
+    assert pyRSD.rsd.GalaxySpectrum is GalaxySpectrum
+    with pytest.raises(AttributeError):
+        pyRSD.rsd.NotAModel
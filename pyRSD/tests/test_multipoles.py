@@ -0,0 +1,80 @@
+"""
+This module checks the multipoles of the models, computed from the
+``mu`` moments or with the adaptive Gauss-Legendre rule, against
+Simpson's rule with ``Nmu=40``, the previous default of ``poles()``
+"""
+import pytest
+import numpy
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD.rsd import multipoles
+
+ells = [0, 2, 4]
+k = numpy.logspace(-2, numpy.log10(0.4), 20)
+
+def check_poles(model):
+    """
+    The default multipoles should agree with Simpson's rule with
+    ``Nmu=40``, to the accuracy of the latter
+    """
+    P1 = model.poles(k, ells)
+    P2 = model.poles(k, ells, Nmu=40)
+    numpy.testing.assert_allclose(P1.values, P2.values, rtol=1e-3, atol=1e-3*abs(P2.values).max())
+
+    # the single multipoles, which converge separately with the adaptive rule
+    atol = 0. if model.has_mu_moments() else 1e-5*abs(P1.values).max()
+    for ell, f in zip(ells, [model.monopole, model.quadrupole, model.hexadecapole]):
+        numpy.testing.assert_allclose(f(k), P1.sel(ell=ell).values, rtol=1e-12, atol=atol)
+
+    # power keywords are not silently ignored
+    with pytest.raises(TypeError):
+        model.monopole(k, flatten=True)
+
+    # the ``mu`` of the previous signature is ignored
+    with pytest.warns(DeprecationWarning):
+        P = model.monopole(k, numpy.linspace(0., 1., 5))
+    numpy.testing.assert_allclose(P, P1.sel(ell=0).values, rtol=1e-12, atol=atol)
+
+def test_moment_coefficients():
+    """
+    The coefficients of ``mu^2`` and ``mu^4`` should be exact
+    """
+    C = multipoles.moment_coefficients(ells, 4)
+    numpy.testing.assert_allclose(C[:,0], [1., 0., 0.], atol=1e-14)
+    numpy.testing.assert_allclose(C[:,1], [1./3, 2./3, 0.], atol=1e-14)
+    numpy.testing.assert_allclose(C[:,2], [1./5, 4./7, 8./35], atol=1e-14)
+
+def test_gauss_legendre_poles():
+    """
+    The adaptive rule should converge for a non-polynomial integrand
+    """
+    power = lambda k, mu: numpy.exp(-(k*mu)**2 * 100.) * (1 + mu**2)
+    P1 = multipoles.gauss_legendre_poles(power, k, ells, rtol=1e-8)
+
+    # a fixed rule with many nodes
+    mu, w = numpy.polynomial.legendre.leggauss(400)
+    mu, w = 0.5*(mu + 1.), 0.5*w
+    L = numpy.array([(2*ell+1)*numpy.polynomial.legendre.legval(mu, [0]*ell + [1]) for ell in ells])
+    P2 = numpy.dot(power(k[:,None], mu[None,:]) * w, L.T).T
+    numpy.testing.assert_allclose(P1, P2, rtol=1e-6, atol=1e-8)
+
+def test_dm_poles():
+    """
+    The exact multipoles from the ``mu`` moments
+    """
+    from pyRSD.rsd import DarkMatterSpectrum
+
+    model = DarkMatterSpectrum(params='runPB.ini', z=0.55, kmin=1e-3, kmax=0.6)
+    assert model.has_mu_moments()
+    check_poles(model)
+
+def test_gal_poles():
+    """
+    The adaptive Gauss-Legendre multipoles, with FOG damping and AP
+    """
+    from pyRSD.rsd import GalaxySpectrum
+
+    model = GalaxySpectrum(params='runPB.ini', z=0.55, kmin=1e-3, kmax=0.6)
+    model.alpha_par, model.alpha_perp = 1.02, 0.98
+    assert not model.has_mu_moments()
+    check_poles(model)
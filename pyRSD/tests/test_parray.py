@@ -0,0 +1,63 @@
+"""
+This module checks the typemaps converting between NumPy arrays and the
+``parray`` of the GCL library, which hand returned arrays to NumPy
+without a copy and dispatch overloaded methods on the input type
+"""
+from pyRSD import pygcl
+
+import pytest
+import numpy
+import gc
+
+x = numpy.linspace(0., 1., 100)
+
+@pytest.fixture
+def spline():
+    return pygcl.CubicSpline(x, x**2)
+
+def test_output_owner(spline):
+    """
+    The returned array should be owned by a capsule holding the C++
+    array, and stay valid after the spline is deleted
+    """
+    k = numpy.linspace(0.1, 0.9, 50)
+    P = spline(k)
+    assert isinstance(P, numpy.ndarray) and P.dtype == numpy.float64
+    assert not P.flags.owndata
+    assert type(P.base).__name__ == 'PyCapsule'
+
+    del spline
+    gc.collect()
+    numpy.testing.assert_allclose(P, k**2, rtol=1e-6)
+    P[:] = 0.
+    assert (P == 0.).all()
+
+def test_dispatch(spline):
+    """
+    Scalars should dispatch to the ``double`` overload, and any 1-D
+    input that can be cast to float to the ``parray`` overload
+    """
+    P = spline(0.5)
+    assert isinstance(P, float)
+    numpy.testing.assert_allclose(P, 0.25, rtol=1e-6)
+
+    # empty arrays
+    for k in [numpy.array([]), []]:
+        P = spline(k)
+        assert isinstance(P, numpy.ndarray) and P.shape == (0,)
+
+    # integer and single-precision arrays, and lists
+    for k in [numpy.arange(2), numpy.arange(2, dtype='i4'), numpy.array([0., 1.], dtype='f4'), [0, 1.]]:
+        numpy.testing.assert_allclose(spline(k), [0., 1.], atol=1e-12)
+
+    # non-contiguous arrays
+    k = numpy.linspace(0.1, 0.9, 20)[::2]
+    numpy.testing.assert_allclose(spline(k), k**2, rtol=1e-6)
+
+def test_reject(spline):
+    """
+    Inputs that are not 1-D sequences of floats should be rejected
+    """
+    for k in [numpy.ones((2, 2)), numpy.ones(2, dtype=complex), ['a', 'b']]:
+        with pytest.raises(TypeError):
+            spline(k)
@@ -0,0 +1,191 @@
+"""
+This module checks the power of a batch of parameter sets, which
+broadcasts the fast parameters of the model, against the power of
+each parameter set evaluated in turn
+"""
+import os
+import pytest
+import numpy
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD import data_dir
+from pyRSD.rsd import GalaxySpectrum, QuasarSpectrum
+from pyRSD.rsdfit import FittingDriver, GlobalFittingDriver
+from pyRSD.rsdfit.solvers.blocked import expensive_names
+
+k = numpy.linspace(0.01, 0.4, 30)
+mu = numpy.linspace(0.05, 0.95, 4)
+
+def galaxy_thetas(N, f=None, seed=42):
+    """
+    Random parameter sets of the galaxy model, varying the biases,
+    velocity dispersions, sample fractions, and AP parameters
+    """
+    rng = numpy.random.RandomState(seed)
+    toret = []
+    for i in range(N):
+        theta = {'b1_cA':1.8 + 0.2*rng.rand(), 'b1_sA':2.5 + 0.2*rng.rand(), 'b1_sB':3.5 + 0.2*rng.rand(),
+                 'fs':0.1 + 0.05*rng.rand(), 'fsB':0.4 + 0.1*rng.rand(), 'sigma_c':1. + rng.rand(),
+                 'sigma_sA':4. + rng.rand(), 'NcBs':3e4*(1 + rng.rand()), 'N':100*rng.rand(),
+                 'alpha_par':0.98 + 0.04*rng.rand(), 'alpha_perp':0.98 + 0.04*rng.rand()}
+        if f is not None:
+            theta['f'] = f[i]
+        toret.append(theta)
+    return toret
+
+def serial_power(model, k, mu, thetas):
+    """
+    The power of each parameter set, evaluated in turn
+    """
+    toret = []
+    with model.preserve():
+        for theta in thetas:
+            model.update(**theta)
+            toret.append(model.power_array(k, mu))
+    return numpy.array(toret)
+
+@pytest.fixture(scope='module')
+def galaxy():
+    model = GalaxySpectrum(params='runPB.ini', z=0.55, kmin=1e-3, kmax=0.6)
+    model.initialize()
+    return model
+
+@pytest.fixture(scope='module')
+def driver():
+    os.environ['PYRSD_DATA'] = data_dir
+    return FittingDriver(os.path.join(data_dir, 'examples', 'params.dat'))
+
+def test_galaxy(galaxy):
+    """
+    The batch should match the serial power, for parameter sets with
+    two values of the growth rate
+    """
+    f = [galaxy.f]*3 + [0.8]*2
+    thetas = galaxy_thetas(5, f=f)
+    state = {name:getattr(galaxy, name) for name in thetas[0]}
+
+    P = galaxy.power_batch(k, mu, thetas)
+    assert P.shape == (5, len(k), len(mu))
+    numpy.testing.assert_allclose(P, serial_power(galaxy, k, mu, thetas), rtol=1e-8)
+
+    # the parameters are restored
+    for name in state:
+        assert getattr(galaxy, name) == state[name]
+
+def test_galaxy_cache(galaxy):
+    """
+    A batch of fast parameters should compute each spectrum at most once,
+    for the terms whose biases are not varied, rather than once per
+    parameter set
+    """
+    galaxy.power_batch(k, mu, galaxy_thetas(4))
+    with galaxy.profile_cache() as stats:
+        galaxy.power_batch(k, mu, galaxy_thetas(8, seed=1))
+    names = set(stats.misses) & expensive_names(GalaxySpectrum)
+    assert all(stats.misses[name] == 1 for name in names)
+
+@pytest.mark.parametrize("options", [{'use_mean_bias':True}, {'use_bias_basis':False}],
+                            ids=['mean_bias', 'no_bias_basis'])
+def test_galaxy_options(options):
+    """
+    The batch should match the serial power with the mean bias, and
+    without the bias basis, where the biases are not broadcast
+    """
+    model = GalaxySpectrum(params='runPB.ini', z=0.55, kmin=1e-3, kmax=0.6, **options)
+    thetas = galaxy_thetas(3)
+    P = model.power_batch(k, mu, thetas)
+    numpy.testing.assert_allclose(P, serial_power(model, k, mu, thetas), rtol=1e-8)
+
+def test_shapes(galaxy):
+    """
+    The batch should have the shape of ``power_array`` for each
+    parameter set
+    """
+    thetas = galaxy_thetas(3)
+    for args in [(k, mu), (k, mu[0]), (k[:4], mu[:4]), (k[0], mu[0])]:
+        for flatten in [False, True]:
+            P = galaxy.power_batch(args[0], args[1], thetas, flatten=flatten)
+            ref = [galaxy.power_array(*args, flatten=flatten) for theta in thetas]
+            assert P.shape == numpy.shape(ref)
+
+    with pytest.raises(ValueError):
+        galaxy.power_batch(k, mu, [])
+
+def test_quasar():
+    """
+    The batch of the quasar model, which broadcasts the bias, FOG, shot
+    noise, and AP parameters, should match the serial power
+    """
+    model = QuasarSpectrum(params='runPB.ini', z=1.5, kmin=1e-3, kmax=0.6)
+    rng = numpy.random.RandomState(42)
+    for f_nl in [0, 20.]:
+        model.f_nl = f_nl
+        thetas = [{'b1':2. + rng.rand(), 'sigma_fog':3. + rng.rand(), 'N':100*rng.rand(),
+                   'alpha_par':0.98 + 0.04*rng.rand(), 'alpha_perp':0.98 + 0.04*rng.rand()} for i in range(4)]
+        P = model.power_batch(k, mu, thetas)
+        numpy.testing.assert_allclose(P, serial_power(model, k, mu, thetas), rtol=1e-8)
+
+def test_lnprob_batch(driver):
+    """
+    The log-probability of a batch of walkers should match the
+    serial log-probability, and restore the free parameters
+    """
+    theta0 = numpy.array(driver.theory.free_values, dtype=float)
+    names = driver.theory.free_names
+
+    # perturb the fast parameters of the walkers, and the growth rate of one;
+    # the AP parameters only increase, to stay in the k range of the model
+    rng = numpy.random.RandomState(42)
+    thetas = numpy.repeat(theta0[None], 6, axis=0)
+    for name in ['b1_cA', 'fs', 'sigma_c', 'sigma_sA', 'alpha_par', 'alpha_perp']:
+        i = names.index(name)
+        thetas[:,i] *= 1 + 0.01*rng.randn(6)
+        if name.startswith('alpha'):
+            thetas[:,i] = theta0[i] + abs(thetas[:,i] - theta0[i])
+    thetas[-1, names.index('f')] *= 1.01
+
+    # out of bounds
+    thetas[2, names.index('fs')] = -1.
+
+    lnprob = driver.lnprob_batch(thetas)
+    numpy.testing.assert_array_equal(driver.theory.free_values, theta0)
+    assert lnprob[2] == -numpy.inf
+
+    numpy.testing.assert_allclose(lnprob, [driver.lnprob(theta) for theta in thetas], rtol=1e-8)
+    driver.lnprob(theta0)
+
+def test_emcee_vectorize(monkeypatch):
+    """
+    The emcee solver with ``vectorize`` should evaluate the walkers of each
+    update together, with the log-probability of each walker
+    """
+    from pyRSD.rsdfit.solvers import emcee_solver
+    from pyRSD.rsdfit.parameters import ParameterSet
+
+    mean = numpy.array([1., -2.])
+    fit_params = ParameterSet()
+    fit_params.add('a', value=mean[0], vary=True, fiducial=mean[0])
+    fit_params.add('b', value=mean[1], vary=True, fiducial=mean[1])
+    fit_params.prepare_params()
+
+    class GaussianDriver(object):
+        theory = None
+        batches = []
+        def lnprob(self, theta):
+            raise AssertionError("the walkers should be evaluated together")
+        def lnprob_batch(self, thetas):
+            self.batches.append(len(thetas))
+            return -0.5*numpy.sum((thetas - mean)**2, axis=-1)
+    driver = GaussianDriver()
+    monkeypatch.setattr(GlobalFittingDriver, '_instance', driver)
+
+    numpy.random.seed(42)
+    params = {'walkers':16, 'iterations':20, 'init_from':'fiducial', 'vectorize':True, 'burnin':0}
+    results, exception = emcee_solver.run(params, fit_params, init_values=mean)
+    assert exception is None
+    assert results.chain.shape == (16, 20, 2)
+
+    # the two halves of the walkers are updated in turn
+    assert set(driver.batches) <= set([16, 8]) and 8 in driver.batches
+    lnprobs = -0.5*numpy.sum((results.chain - mean)**2, axis=-1)
+    numpy.testing.assert_allclose(results.lnprobs, lnprobs)
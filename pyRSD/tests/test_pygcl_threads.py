@@ -0,0 +1,132 @@
+"""
+This module checks that the long-running pygcl routines release the GIL,
+so concurrent calls from Python threads overlap and give the same results
+"""
+from pyRSD import pygcl
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+import numpy
+import time
+import os
+
+NWORKERS = max(2, min(4, os.cpu_count() or 1))
+
+@pytest.fixture(scope='module')
+def power_lin():
+
+    cosmo = pygcl.Cosmology('teppei_sims.ini', pygcl.transfers.CLASS)
+    return pygcl.LinearPS(cosmo, 0.)
+
+@pytest.fixture
+def single_thread():
+
+    # use one OpenMP thread per call, so the calls only overlap through Python threads
+    nthreads = pygcl.get_num_threads()
+    pygcl.set_num_threads(1)
+    yield
+    pygcl.set_num_threads(nthreads)
+
+def check_threaded(f, args):
+    """
+    Check that evaluating ``f`` on each of ``args`` with a thread pool
+    gives the same results as evaluating serially
+    """
+    serial = [f(arg) for arg in args]
+    with ThreadPoolExecutor(max_workers=NWORKERS) as pool:
+        threaded = list(pool.map(f, args))
+
+    for a, b in zip(serial, threaded):
+        numpy.testing.assert_allclose(a, b)
+
+def progress_during(f, arg):
+    """
+    Return the progress made by a spinning Python thread while ``f(arg)``
+    is evaluated, relative to its progress when running alone
+
+    This is close to zero if ``f`` holds the GIL, and of order unity
+    if it releases it, regardless of the number of cores
+    """
+    count = [0]
+    stop = threading.Event()
+    def spin():
+        while not stop.is_set():
+            count[0] += 1
+
+    # the rate of the thread alone; sleeping releases the GIL
+    t = threading.Thread(target=spin)
+    t.start()
+    start, c0 = time.time(), count[0]
+    time.sleep(0.1)
+    rate = (count[0] - c0) / (time.time() - start)
+
+    # the progress while evaluating
+    start, c0 = time.time(), count[0]
+    f(arg)
+    elapsed, progress = time.time() - start, count[0] - c0
+    stop.set()
+    t.join()
+
+    if elapsed < 0.05:
+        pytest.skip("evaluation too fast to check the GIL release")
+    return progress / (rate * elapsed)
+
+def test_imn_threads(power_lin, single_thread):
+    """
+    Concurrent ``Imn`` evaluations should release the GIL
+    """
+    I = pygcl.Imn(power_lin)
+    k = numpy.logspace(-2, 0, 50)
+
+    args = [(1, 1), (2, 2)] * NWORKERS
+    check_threaded(lambda mn: I(k, *mn), args)
+
+    k = numpy.logspace(-3, 0, 500)
+    assert progress_during(lambda mn: I(k, *mn), (1, 1)) > 0.15
+
+def test_pk_to_xi_threads(power_lin, single_thread):
+    """
+    Concurrent correlation function transforms should release the GIL
+    """
+    k = numpy.logspace(-5, 1, 4096)
+    r = numpy.linspace(1., 200., 1000)
+    pk = power_lin(k)
+
+    method = pygcl.IntegrationMethods.SIMPS
+    f = lambda ell: pygcl.pk_to_xi(ell, k, pk, r, smoothing=0.5, method=method)
+    check_threaded(f, [0, 2] * NWORKERS)
+
+    r = numpy.linspace(1., 200., 10000)
+    f = lambda ell: pygcl.pk_to_xi(ell, k, pk, r, smoothing=0.5, method=method)
+    assert progress_during(f, 0) > 0.15
+
+@pytest.mark.parametrize("size, env, expected", [(1, {}, None), (4, {}, 1),
+                            (4, {'PYRSD_NUM_THREADS':'2'}, None), (4, {'OMP_NUM_THREADS':'2'}, None)],
+                            ids=['serial', 'mpi', 'pyrsd_env', 'omp_env'])
+def test_rsdfit_threads(size, env, expected, monkeypatch):
+    """
+    ``rsdfit`` should use one OpenMP thread per process when running with
+    MPI, unless the number of threads is set explicitly
+    """
+    if not pygcl.openmp_enabled():
+        pytest.skip("pygcl was built without OpenMP")
+    rsdfit = pytest.importorskip("pyRSD.rsdfit.rsdfit")
+
+    class Comm(object):
+        pass
+    comm = Comm()
+    comm.size = size
+
+    for name in ['PYRSD_NUM_THREADS', 'OMP_NUM_THREADS']:
+        monkeypatch.delenv(name, raising=False)
+    for name in env:
+        monkeypatch.setenv(name, env[name])
+
+    nthreads = pygcl.get_num_threads()
+    pygcl.set_num_threads(3)
+    try:
+        rsdfit.limit_threads(comm)
+        assert pygcl.get_num_threads() == (expected or 3)
+    finally:
+        pygcl.set_num_threads(nthreads)
@@ -0,0 +1,131 @@
+"""
+This module checks the predictions of the Gaussian processes of the
+simulation fits against ``george``, for a toy training set
+"""
+import pytest
+import numpy
+import pandas as pd
+import os
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+george = pytest.importorskip("george")
+from pyRSD.rsd import simulation
+
+theta = [2., 1., 1.]
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    monkeypatch.setenv('PYRSD_DISK_CACHE', '0')
+
+def toy_data(seed=42):
+    """
+    A smooth function of two variables, with small errors
+    """
+    rng = numpy.random.RandomState(seed)
+    x = rng.uniform(size=(60, 2))
+    data = {'a':x[:,0], 'b':x[:,1]}
+    data['y'] = numpy.sin(3*x[:,0]) + x[:,0]*x[:,1]
+    data['z'] = numpy.cos(2*x[:,1]) - x[:,0]
+    for col in ['y', 'z']:
+        data[col+'_err'] = 1e-3 * numpy.ones(len(x))
+    return pd.DataFrame(data)
+
+def george_predict(d, pts):
+    """
+    The prediction of the ``george`` Gaussian process of ``d``
+    """
+    kws = {'return_cov':False} if simulation.GEORGE_v03 else {'mean_only':True}
+    mean = d.gp.predict(d.y_scaled, d.x_scaler.transform(pts), **kws)
+    return d.y_scaler.inverse_transform(mean.reshape(-1, 1)).ravel()
+
+def test_predict():
+    """
+    The prediction from the cached weights agrees with ``george``
+    """
+    d = simulation.GeorgeSimulationData(['a', 'b'], toy_data(), theta)
+    pts = numpy.random.RandomState(0).uniform(size=(25, 2))
+    numpy.testing.assert_allclose(d.predict(pts), george_predict(d, pts), rtol=1e-8, atol=1e-10)
+    numpy.testing.assert_allclose(d.predict(pts, chunksize=7), d.predict(pts), rtol=1e-12)
+
+def test_disk_cache(tmpdir, monkeypatch):
+    """
+    Only the weights are stored, in the user disk cache, and a new instance
+    predicts from them without factorizing the training set
+    """
+    from pyRSD import data_dir
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+    monkeypatch.setenv('PYRSD_DISK_CACHE', '1')
+    before = sorted(os.walk(data_dir))
+
+    d = simulation.GeorgeSimulationData(['a', 'b'], toy_data(), theta)
+    pts = numpy.random.RandomState(0).uniform(size=(25, 2))
+    values = d.predict(pts)
+    assert os.listdir(str(tmpdir)) == [os.path.basename(d._gp_cache.path)]
+    assert os.listdir(d._gp_cache.path) == ['alpha.npy']
+    assert sorted(os.walk(data_dir)) == before
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the training set should not be factorized")
+    monkeypatch.setattr(simulation.linalg, 'cholesky', fail)
+
+    d = simulation.GeorgeSimulationData(['a', 'b'], toy_data(), theta)
+    assert isinstance(d.alpha, numpy.memmap)
+    numpy.testing.assert_allclose(d.predict(pts), values, rtol=1e-12)
+
+    # new hyperparameters are trained again
+    d.theta = [1., 0.5, 2.]
+    with pytest.raises(AssertionError):
+        d.predict(pts)
+
+def test_table():
+    """
+    The dense table agrees with ``george`` to within :attr:`table_error`,
+    and points outside of it are predicted directly
+    """
+    d = simulation.GeorgeSimulationData(['a', 'b'], toy_data(), theta, table_shape=40)
+    lo, hi = d.domain.T
+    pts = lo + (hi - lo) * numpy.random.RandomState(0).uniform(size=(25, 2))
+
+    assert 0. < d.table_error < 1e-2
+    values = d(a=pts[:,0], b=pts[:,1])
+    numpy.testing.assert_allclose(values, george_predict(d, pts), rtol=0, atol=2*d.table_error)
+
+    # outside of the table
+    pt = numpy.array([[hi[0] + 0.1, 0.5]])
+    numpy.testing.assert_allclose(d(a=pt[:,0], b=pt[:,1]), george_predict(d, pt), rtol=1e-8)
+
+def test_dataset_update():
+    """
+    The predictions of a data set follow changes of the hyperparameters,
+    training data, and tables of its parameters
+    """
+    data = toy_data()
+    ds = simulation.GeorgeSimulationDataSet(['a', 'b'], ['y', 'z'], data, [theta, theta])
+    pts = numpy.array([[0.3, 0.6], [0.7, 0.2]])
+
+    def check():
+        y, z = ds(a=pts[:,0], b=pts[:,1])
+        numpy.testing.assert_allclose(y, george_predict(ds._data['y'], pts), rtol=1e-8)
+        numpy.testing.assert_allclose(z, george_predict(ds._data['z'], pts), rtol=1e-8)
+        return y, z
+
+    y0, z0 = check()
+
+    # the hyperparameters
+    ds._data['z'].theta = [1., 0.5, 2.]
+    y1, z1 = check()
+    numpy.testing.assert_array_equal(y1, y0)
+    assert not numpy.allclose(z1, z0)
+
+    # the training data
+    ds._data['y'].data = toy_data(seed=1)
+    y2, z2 = check()
+    assert not numpy.allclose(y2, y1)
+
+    # the tables
+    ds.tabulate(40)
+    y3, z3 = ds(a=pts[:,0], b=pts[:,1])
+    numpy.testing.assert_allclose(y3, y2, atol=2*ds.table_error['y'])
+    ds._data['y'].table_shape = None
+    numpy.testing.assert_allclose(ds(a=pts[:,0], b=pts[:,1], select='y'), y2, rtol=1e-12)
@@ -0,0 +1,93 @@
+"""
+This module checks that the sparse transfer matrix, which maps the
+flattened P(k,mu) to the theory prediction, agrees with applying the
+transfer functions directly
+"""
+import os
+import pytest
+import numpy
+from types import SimpleNamespace
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD import data_dir
+from pyRSD.rsd.transfers import PkmuGrid, GriddedWedgeTransfer, GriddedMultipoleTransfer
+from pyRSD.rsd.transfers import MultipoleTransfer, WedgeTransfer, WindowFunctionTransfer
+from pyRSD.rsdfit.theory.base import get_transfer_matrix, apply_transfers
+
+k = numpy.linspace(0.01, 0.3, 30)
+mu_bounds = [(0., 0.2), (0.2, 0.6), (0.6, 1.0)]
+mu_cen = [0.1, 0.4, 0.8]
+
+def toy_power(k, mu):
+    return 1e4*k / (1 + (k/0.02)**2.5) * (1. + 0.5*mu**2 + 0.1*mu**4)
+
+def toy_window():
+    s = numpy.logspace(-1, 4, 500)
+    x = s / 300.
+    return numpy.array([s] + [0.5**i * x**(2*i) * numpy.exp(-x**2) for i in range(5)]).T
+
+@pytest.fixture(scope='module')
+def grid():
+    filename = os.path.join(data_dir, 'examples', 'runPB_pkmu_grid.dat')
+    return PkmuGrid.from_plaintext(filename)
+
+def check_transfers(transfers, stat_ids, mode, k_data=k, theory_decorator={}):
+    """
+    Compare ``M.dot(P)`` to :func:`apply_transfers` for a toy P(k,mu)
+    """
+    # the flattened (k,mu) pairs, as in the theory model
+    slices = []; start = 0
+    for t in transfers:
+        slices.append(slice(start, start+len(t.flatk)))
+        start += len(t.flatk)
+    kk = numpy.concatenate([t.flatk for t in transfers])
+    mu = numpy.concatenate([t.flatmu for t in transfers])
+    P = toy_power(kk, mu)
+
+    measurements = [SimpleNamespace(k=k_data) for name in stat_ids]
+    data = SimpleNamespace(mode=mode, statistics=list(stat_ids), measurements=measurements)
+
+    M = get_transfer_matrix(data, transfers, stat_ids, slices, theory_decorator)
+    assert M is not None and M.shape[1] == len(P)
+
+    direct = apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator)
+    numpy.testing.assert_allclose(M.dot(P), direct, rtol=1e-10, atol=1e-10*abs(direct).max())
+
+def test_smooth_poles():
+    t = MultipoleTransfer(k, [0, 2, 4])
+    check_transfers([t], {'pole_0':0, 'pole_2':2, 'pole_4':4}, 'poles')
+
+def test_smooth_wedges():
+    t = WedgeTransfer(k, list(mu_bounds))
+    check_transfers([t], {'pkmu_%s' %mu:mu for mu in mu_cen}, 'pkmu')
+
+def test_gridded_poles(grid):
+    t = GriddedMultipoleTransfer(grid, [0, 2, 4], kmin=0.02, kmax=0.3)
+    check_transfers([t], {'pole_0':0, 'pole_2':2, 'pole_4':4}, 'poles')
+
+def test_gridded_wedges(grid):
+    t = GriddedWedgeTransfer(grid, list(mu_bounds), kmin=[0.02, 0.03, 0.04], kmax=0.3)
+    check_transfers([t], {'pkmu_%s' %mu:mu for mu in mu_cen}, 'pkmu')
+
+@pytest.mark.parametrize("k_out", [numpy.linspace(0.005, 0.32, 40), None])
+def test_window(k_out):
+    """
+    The window transfer, with the spline to the measured ``k`` from
+    ``k_out`` or the padded ``k`` grid
+    """
+    t = WindowFunctionTransfer(toy_window(), [0, 2, 4], kmin=1e-3, Nk=256, k_out=k_out)
+    check_transfers([t], {'pole_0':0, 'pole_2':2, 'pole_4':4}, 'poles')
+
+def test_linear_decorator(grid):
+    """
+    The linear theory decorators are absorbed into the matrix
+    """
+    from pyRSD.rsdfit.theory import decorators
+
+    stat_ids = {'pole_0':[0, 2], 'pole_4':4}
+    for name in decorators.linear:
+        t = GriddedMultipoleTransfer(grid, [0, 2, 4], kmin=0.02, kmax=0.3)
+        check_transfers([t], stat_ids, 'poles', theory_decorator={'pole_0':name})
+
+        t = MultipoleTransfer(k, [0, 2, 4])
+        check_transfers([t], stat_ids, 'poles', theory_decorator={'pole_0':name})
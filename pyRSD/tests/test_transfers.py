@@ -0,0 +1,133 @@
+"""
+This module checks the Gauss-Legendre rule of the multipole and
+wedge transfers against the exact result for polynomials in ``mu``,
+and the mixing matrix of the window function transfer against the
+FFTLog convolution
+"""
+import pytest
+import numpy
+
+pygcl = pytest.importorskip("pyRSD.pygcl")
+from pyRSD.rsd.transfers import MultipoleTransfer, WedgeTransfer, WindowFunctionTransfer
+
+k = numpy.logspace(-2, numpy.log10(0.4), 20)
+
+def power(k, mu):
+    return k * (1. + 2*mu**2 + 3*mu**4)
+
+def test_multipole_gauss():
+    """
+    The Gauss-Legendre multipoles are exact, and agree with Simpson's rule
+    """
+    exact = numpy.array([k*(1. + 2./3 + 3./5), k*(2*2./3 + 3*4./7), k*(3*8./35)]).T
+
+    for kws, rtol in [({'quadrature':'gauss'}, 1e-12), ({}, 1e-3)]:
+        t = MultipoleTransfer(k, [0, 2, 4], **kws)
+        Pell = t(power(t.grid.k, t.grid.mu))
+        numpy.testing.assert_allclose(Pell.values, exact, rtol=rtol)
+
+        # the raw array
+        numpy.testing.assert_allclose(t(power(t.grid.k, t.grid.mu), raw=True), Pell.values)
+
+def wedge_mean(lo, hi):
+    """
+    The exact mean of :func:`power` over ``lo <= mu <= hi``
+    """
+    f = lambda mu: k * (mu + 2*mu**3/3. + 3*mu**5/5.)
+    return (f(hi) - f(lo)) / (hi - lo)
+
+def test_wedge_gauss():
+    """
+    The Gauss-Legendre wedges are exact, also after changing the bounds
+    """
+    bounds = [(0., 0.4), (0.4, 0.8), (0.8, 1.0)]
+    t = WedgeTransfer(k, list(bounds), quadrature='gauss')
+    exact = numpy.array([wedge_mean(lo, hi) for lo, hi in bounds]).T
+    numpy.testing.assert_allclose(t(power(t.grid.k, t.grid.mu)).values, exact, rtol=1e-12)
+
+    # the nodes and weights follow the new bounds
+    bounds = [(0., 0.5), (0.5, 1.0)]
+    t.mu_bounds = list(bounds)
+    assert t.grid.Nmu == 8
+    exact = numpy.array([wedge_mean(lo, hi) for lo, hi in bounds]).T
+    numpy.testing.assert_allclose(t(power(t.grid.k, t.grid.mu), raw=True), exact, rtol=1e-12)
+
+def test_wedge_uniform():
+    """
+    The uniform mean of each wedge agrees with the Gauss-Legendre rule
+    """
+    bounds = [(0., 0.5), (0.5, 1.0)]
+    t1 = WedgeTransfer(k, list(bounds))
+    t2 = WedgeTransfer(k, list(bounds), quadrature='gauss')
+
+    P1 = t1(power(t1.grid.k, t1.grid.mu)).values
+    P2 = t2(power(t2.grid.k, t2.grid.mu)).values
+    numpy.testing.assert_allclose(P1, P2, rtol=0.05)
+
+def toy_window(scale=300.):
+    """
+    A smooth window, with the ell = 0, ..., 8 multipoles as columns
+    """
+    s = numpy.logspace(-1, 4, 500)
+    x = s / scale
+    return numpy.array([s] + [0.5**i * x**(2*i) * numpy.exp(-x**2) for i in range(5)]).T
+
+def toy_power(k, mu):
+    return 1e4*k / (1 + (k/0.02)**2.5) * (1. + 0.5*mu**2 + 0.1*mu**4)
+
+@pytest.fixture(scope='module')
+def window_transfer():
+    k_out = numpy.linspace(0.01, 0.3, 30)
+    return WindowFunctionTransfer(toy_window(), [0, 2, 4], kmin=1e-3, Nk=256, k_out=k_out)
+
+def test_window_matrix(window_transfer):
+    """
+    The convolution with the mixing matrix agrees with the FFTLog
+    convolution with zero-padding
+    """
+    t = window_transfer
+    power = toy_power(t.grid.k, t.grid.mu)
+    k_out = t.k_out
+
+    # the testing keywords use the FFTLog convolution
+    for kws in [{}, {'k_out':k_out[::2]}]:
+        fast = t(power, **kws)
+        slow = t(power, dry_run=False, **kws)
+        numpy.testing.assert_allclose(fast['k'], slow['k'])
+        numpy.testing.assert_allclose(fast.values, slow.values, rtol=1e-10, atol=1e-10*abs(slow.values).max())
+
+    # the multipoles on the padded grid
+    try:
+        t.k_out = None
+        fast, slow = t(power), t(power, dry_run=False)
+        numpy.testing.assert_allclose(fast['k'], t.padded_k)
+        numpy.testing.assert_allclose(fast.values, slow.values, atol=1e-10*abs(slow.values).max())
+    finally:
+        t.k_out = k_out
+
+def test_window_matrix_io(window_transfer, tmpdir):
+    """
+    The saved mixing matrix is loaded, with its ``k_out``, only
+    for the same window and multipoles
+    """
+    filename = str(tmpdir.join('mixing_matrix.npz'))
+    window_transfer.save_mixing_matrix(filename)
+
+    t = WindowFunctionTransfer(toy_window(), [0, 2, 4], kmin=1e-3, Nk=256)
+    t.load_mixing_matrix(filename)
+    numpy.testing.assert_array_equal(t.k_out, window_transfer.k_out)
+    numpy.testing.assert_array_equal(t.mixing_matrix, window_transfer.mixing_matrix)
+
+    power = toy_power(t.grid.k, t.grid.mu)
+    numpy.testing.assert_allclose(t(power).values, window_transfer(power).values, rtol=1e-12)
+    numpy.testing.assert_allclose(t.transfer_matrix.toarray(), window_transfer.transfer_matrix.toarray())
+
+    # a different window, multipoles, max_ellprime or k grid
+    for window, ells, kws in [(toy_window(scale=200.), [0, 2, 4], {}),
+                              (toy_window(), [0, 2], {'max_ellprime':2}),
+                              (toy_window(), [0, 2, 4], {'max_ellprime':2}),
+                              (toy_window(), [0, 2, 4], {'Nk':128})]:
+        kws.setdefault('Nk', 256)
+        t = WindowFunctionTransfer(window, ells, kmin=1e-3, **kws)
+        with pytest.raises(ValueError):
+            t.load_mixing_matrix(filename)
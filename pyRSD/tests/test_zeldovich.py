@@ -0,0 +1,39 @@
+"""
+This module checks the Zel'dovich power spectra, where each k is computed
+from dot products with FFTLog kernels precomputed once per spectrum,
+against reference values from the previous implementation, which ran a
+full FFTLog transform for each k
+"""
+from pyRSD import pygcl
+from pyRSD.rsd.hzpt import HaloZeldovichPhm
+
+import os
+import pytest
+import numpy
+
+REFERENCE = os.path.join(os.path.dirname(__file__), 'baseline', 'zeldovich_reference.dat')
+
+@pytest.fixture(scope='module')
+def reference():
+    return numpy.loadtxt(REFERENCE)
+
+@pytest.fixture(scope='module')
+def cosmo():
+    return pygcl.Cosmology('teppei_sims.ini', pygcl.transfers.CLASS)
+
+@pytest.mark.parametrize("i, name", [(1, 'ZeldovichP00'), (2, 'ZeldovichP01'), (3, 'ZeldovichP11')])
+def test_zeldovich(cosmo, reference, i, name):
+    """
+    The Zel'dovich terms should match the per-k FFTLog results
+    """
+    k = reference[:,0]
+    P = getattr(pygcl, name)(cosmo, 0.55)(k)
+    numpy.testing.assert_allclose(P, reference[:,i], rtol=1e-10)
+
+def test_hzpt_Phm(cosmo, reference):
+    """
+    The HZPT halo-matter power, which uses the Zel'dovich P00, should match
+    """
+    k = reference[:,0]
+    P = HaloZeldovichPhm(cosmo, 0.55)(2., k)
+    numpy.testing.assert_allclose(P, reference[:,4], rtol=1e-10)
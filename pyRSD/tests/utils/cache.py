@@ -1,51 +1,11 @@
-from ... import os, sys
+from ... import os
 from ...rsd import load_model, OutdatedModelWarning
+from ...rsd._disk_cache import user_cache_dir
 import logging
 import warnings
 
 logging.basicConfig(level=logging.DEBUG)
 
-def user_cache_dir(appname):
-    r"""
-
-    This function is copied from:
-    https://github.com/pypa/pip/blob/master/pip/utils/appdirs.py
-
-    Return full path to the user-specific cache dir for this application.
-    
-    Parameters
-    ----------
-    appname : str 
-        the name of application
-    
-    Notes
-    -----
-    Typical user cache directories are:
-        
-        - Mac OS X: ~/Library/Caches/<AppName>
-        - Unix: ~/.cache/<AppName> (XDG default)
-    """
-    from os.path import expanduser
-    WINDOWS = (sys.platform.startswith("win") or
-               (sys.platform == 'cli' and os.name == 'nt'))
-
-    if WINDOWS:
-        raise OSError("sorry, not supported on Windows")
-    elif sys.platform == "darwin":
-        # Get the base path
-        path = expanduser("~/Library/Caches")
-
-        # Add our app name to it
-        path = os.path.join(path, appname)
-    else:
-        # Get the base path
-        path = os.getenv("XDG_CACHE_HOME", expanduser("~/.cache"))
-
-        # Add our app name to it
-        path = os.path.join(path, appname)
-
-    return path
-
 cache_dir = user_cache_dir('pyRSD')
 
 class cache_manager():
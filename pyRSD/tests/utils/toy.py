@@ -0,0 +1,44 @@
+from ...rsd._cache import Cache, parameter, cached_property
+import numpy
+
+class ToyModel(Cache):
+    """
+    A small model to test the cache framework, where ``y`` depends on
+    ``b`` and on ``x``, which depends on ``a``
+
+    The number of times a parameter is set and a cached property is
+    evaluated are counted in :attr:`nset` and :attr:`ncalls`
+
+    Parameters
+    ----------
+    a, b : float, optional
+        the initial values of the parameters
+    shape : int, tuple, optional
+        the shape of the cached arrays; the default is a scalar
+    """
+    def __init__(self, a=1., b=2., shape=()):
+        self.nset = 0
+        self.ncalls = 0
+        self.shape = shape
+        self.a = a
+        self.b = b
+
+    @parameter
+    def a(self, val):
+        self.nset += 1
+        return val
+
+    @parameter
+    def b(self, val):
+        self.nset += 1
+        return val
+
+    @cached_property("a")
+    def x(self):
+        self.ncalls += 1
+        return 2 * self.a * numpy.ones(self.shape)
+
+    @cached_property("x", "b")
+    def y(self):
+        self.ncalls += 1
+        return self.x + self.b
@@ -79,6 +79,55 @@ def build_CLASS(prefix):
     if ret != 0:
         raise ValueError("could not build CLASS v%s" %CLASS_VERSION)
 
+# the result of the OpenMP check, which is only run once
+_openmp_flags = []
+
+def openmp_flags():
+    """
+    Return the compiler and linker flags needed to build with OpenMP
+
+    Notes
+    -----
+    *   a small test program is compiled with ``-fopenmp``; if that fails,
+        the GCL library is built without OpenMP and runs serially
+    *   set the ``PYRSD_NO_OPENMP`` environment variable to force a serial build
+    *   the check is only run on the first call, and the result is reused
+    """
+    if not _openmp_flags:
+        _openmp_flags.append(_check_openmp())
+    return _openmp_flags[0]
+
+def _check_openmp():
+    """
+    Compile a test program with ``-fopenmp``, returning the compiler
+    and linker flags, which are empty if OpenMP is not available
+    """
+    import tempfile
+    from distutils.ccompiler import new_compiler
+    from distutils.sysconfig import customize_compiler
+    from distutils.errors import CompileError, LinkError
+
+    if os.environ.get('PYRSD_NO_OPENMP'):
+        return [], []
+
+    compiler = new_compiler()
+    customize_compiler(compiler)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        src = os.path.join(tmpdir, 'test_openmp.c')
+        with open(src, 'w') as ff:
+            ff.write("#include <omp.h>\nint main(void) { return omp_get_max_threads() > 0 ? 0 : 1; }\n")
+        objects = compiler.compile([src], output_dir=tmpdir, extra_postargs=['-fopenmp'])
+        compiler.link_executable(objects, os.path.join(tmpdir, 'test_openmp'), extra_postargs=['-fopenmp'])
+    except (CompileError, LinkError):
+        print("warning: compiler does not support OpenMP; building the GCL library without it")
+        return [], []
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return ['-fopenmp'], ['-fopenmp']
+
 def find_version(path):
     import re
     # path shall be a plain ascii text file.
@@ -185,12 +234,14 @@ def libgcl_config():
     gcl_info['sources'] =  gcl_sources
     gcl_info['include_dirs'] = ['pyRSD/_gcl/include', '/usr/local/include']
     gcl_info['language'] = 'c++'
-    gcl_info['extra_compiler_args'] = ["-O2", '-std=c++11']
+    gcl_info['extra_compiler_args'] = ["-O2", '-std=c++11'] + openmp_flags()[0]
     return ('gcl', gcl_info)
 
 def libfftlog_config():
     info = {}
     info['sources'] =  list(glob("pyRSD/_gcl/extern/fftlog/*f"))
+    # local arrays on the stack, so the transforms are safe to call from multiple threads
+    info['extra_f77_compile_args'] = ['-frecursive']
     return ('fftlog', info)
 
 def libemu_config():
@@ -214,8 +265,9 @@ def gcl_extension_config():
     # the configuration for GCL python extension
     config = {}
     config['name'] = 'pyRSD._gcl'
-    config['extra_link_args'] = ['-g', '-fPIC']
-    config['extra_compile_args'] = []
+    compile_args, link_args = openmp_flags()
+    config['extra_link_args'] = ['-g', '-fPIC'] + link_args
+    config['extra_compile_args'] = compile_args
     config['libraries'] = ['gcl', 'fftlog', 'emu', 'class', 'gsl', 'gslcblas', 'gfortran']
 
     # determine if swig needs to be called
@@ -249,7 +301,8 @@ pkg_data = ['data/dark_matter/pkmu_P*',
             'data/params/*',
             'data/simulation_fits/*',
             'data/examples/*',
-            'tests/baseline/*png']
+            'tests/baseline/*png',
+            'tests/baseline/*dat']
 
 if __name__ == '__main__':
 